@@ -0,0 +1,390 @@
+"""
+Almacén local de evaluaciones de las apps MUPAI (SQLite en modo WAL).
+
+Cada sesión guarda su evaluación (datos del cliente, entradas y resultados, el mismo
+registro plano de mupai_estructurado) en la tabla `evaluaciones`, con una fila por
+sesión y app que se actualiza mientras el cliente avanza. Así la evaluación no se
+pierde aunque la sesión muera antes de enviar el email.
+
+Las escrituras no bloquean el rerun: se dejan en una cola y un hilo escritor las
+aplica por lotes en una sola transacción; si el lote falla, cada escritura se reintenta
+en su propia transacción y solo las que vuelven a fallar se descartan (con registro en
+el log y en las estadísticas). Las lecturas usan una conexión por hilo;
+con WAL los lectores no esperan al escritor. Hay índices por email, teléfono y fecha
+para que las búsquedas y tableros sobre decenas de miles de evaluaciones tarden
+milisegundos.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+from mupai_config import es_administrador, ruta_datos
+
+RUTA_BASE_DATOS = ruta_datos("mupai.sqlite3")
+
+_LOG = logging.getLogger(__name__)
+
+# Escrituras máximas por transacción del hilo escritor
+LOTE_ESCRITURA = 200
+
+# Filas máximas que devuelve una búsqueda por defecto
+LIMITE_BUSQUEDA = 100
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS evaluaciones (
+    id          TEXT PRIMARY KEY,
+    app         TEXT NOT NULL,
+    creado      REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    fecha       TEXT,
+    nombre      TEXT,
+    email       TEXT,
+    telefono    TEXT,
+    datos       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_evaluaciones_email ON evaluaciones (email);
+CREATE INDEX IF NOT EXISTS idx_evaluaciones_telefono ON evaluaciones (telefono);
+CREATE INDEX IF NOT EXISTS idx_evaluaciones_fecha ON evaluaciones (fecha);
+CREATE INDEX IF NOT EXISTS idx_evaluaciones_app ON evaluaciones (app, actualizado);
+"""
+
+_GUARDAR = """
+INSERT INTO evaluaciones (id, app, creado, actualizado, fecha, nombre, email, telefono, datos)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    actualizado = excluded.actualizado,
+    fecha = excluded.fecha,
+    nombre = excluded.nombre,
+    email = excluded.email,
+    telefono = excluded.telefono,
+    datos = excluded.datos
+"""
+
+
+def normalizar_email(email):
+    return (email or "").strip().lower()
+
+
+def normalizar_telefono(telefono):
+    return re.sub(r"\D", "", str(telefono or ""))
+
+
+def clave_cliente(email=None, telefono=None):
+    """Identificador de un cliente entre evaluaciones: email normalizado o, sin email, el teléfono"""
+    email = normalizar_email(email)
+    if email:
+        return email
+    telefono = normalizar_telefono(telefono)
+    return f"tel:{telefono}" if telefono else None
+
+
+def _conectar(ruta, isolation_level=""):
+    conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False, isolation_level=isolation_level)
+    conexion.row_factory = sqlite3.Row
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    return conexion
+
+
+class AlmacenEvaluaciones:
+    """SQLite WAL con un hilo escritor por proceso y conexiones de lectura por hilo"""
+
+    def __init__(self, ruta=RUTA_BASE_DATOS):
+        self.ruta = ruta
+        self._cola = queue.Queue()
+        self._lectores = threading.local()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._suscriptores = []
+        self.escritas = 0
+        self.lotes = 0
+        self.errores = 0
+        self.ultimo_error = None
+        self.crear_tablas(ESQUEMA)
+
+    def iniciar(self):
+        """Arranca el hilo escritor una sola vez por proceso"""
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="mupai-almacen", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        # Sin transacciones implícitas del módulo sqlite3: cada lote abre la suya con BEGIN
+        conexion = _conectar(self.ruta, isolation_level=None)
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < LOTE_ESCRITURA:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._transaccion(conexion, lote)
+                self.escritas += len(lote)
+            except Exception:
+                # El lote se revirtió completo: cada escritura se reintenta en su propia
+                # transacción para que una fila inválida no se lleve a las demás
+                for escritura in lote:
+                    try:
+                        self._transaccion(conexion, [escritura])
+                        self.escritas += 1
+                    except Exception as error:
+                        self._registrar_error(escritura, error)
+            finally:
+                self.lotes += 1
+                for _ in lote:
+                    self._cola.task_done()
+
+    def _transaccion(self, conexion, escrituras):
+        """
+        Aplica escrituras en una transacción explícita: BEGIN ... COMMIT, o ROLLBACK si
+        algo falla. Así el SAVEPOINT de una función siempre queda anidado en el lote y su
+        RELEASE no confirma nada por su cuenta, aunque la función sea la primera escritura.
+        """
+        conexion.execute("BEGIN")
+        try:
+            self._aplicar(conexion, escrituras)
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+        conexion.execute("COMMIT")
+
+    def _aplicar(self, conexion, escrituras):
+        """
+        Aplica escrituras dentro de la transacción abierta. Las consecutivas con la misma
+        sentencia van en un solo executemany; una función recibe la conexión.
+        """
+        for sql, grupo in itertools.groupby(escrituras, key=lambda escritura: escritura[0]):
+            if callable(sql):
+                for _, parametros in grupo:
+                    self._aplicar_funcion(conexion, sql, parametros)
+            else:
+                conexion.executemany(sql, [parametros for _, parametros in grupo])
+
+    def _aplicar_funcion(self, conexion, funcion, parametros):
+        """
+        Una función en su propio SAVEPOINT: si falla (p. ej. un suscriptor con un error) solo
+        se deshace lo que ella escribió y se registra, sin tocar el resto del lote.
+        """
+        conexion.execute("SAVEPOINT escritura_funcion")
+        try:
+            funcion(conexion, *parametros)
+        except Exception as error:
+            conexion.execute("ROLLBACK TO escritura_funcion")
+            self._registrar_error((funcion, parametros), error)
+        finally:
+            conexion.execute("RELEASE escritura_funcion")
+
+    def _registrar_error(self, escritura, error):
+        sql, parametros = escritura
+        descripcion = getattr(sql, "__name__", None) or " ".join(str(sql).split())[:80]
+        self.errores += 1
+        self.ultimo_error = f"{descripcion}: {error}"
+        _LOG.error("Escritura descartada en el almacén (%s) con parámetros %.200r", descripcion, parametros,
+                   exc_info=error)
+
+    def crear_tablas(self, esquema):
+        """Crea tablas adicionales en la misma base (otros módulos que usan el hilo escritor)"""
+        conexion = _conectar(self.ruta)
+        conexion.executescript(esquema)
+        conexion.close()
+
+    def escribir(self, sql, parametros):
+        """
+        Encola una escritura para el hilo escritor: una sentencia SQL con sus parámetros,
+        o una función que se llama como sql(conexion, *parametros) dentro del lote.
+        """
+        self._cola.put((sql, parametros))
+        self.iniciar()
+
+    def suscribir(self, funcion):
+        """Registra funcion(app, id_evaluacion, datos), llamada en cada guardar (p. ej. series por cliente)"""
+        if funcion not in self._suscriptores:
+            self._suscriptores.append(funcion)
+
+    def guardar(self, app, datos, id_evaluacion=None):
+        """
+        Encola la evaluación (datos es el registro plano con nombre, email, telefono y
+        fecha_evaluacion) y devuelve su id; con el mismo id se actualiza la misma fila.
+        """
+        id_evaluacion = id_evaluacion or uuid.uuid4().hex
+        ahora = time.time()
+        self.escribir(_GUARDAR, (
+            id_evaluacion, app, ahora, ahora,
+            str(datos.get("fecha_evaluacion") or "")[:10] or time.strftime("%Y-%m-%d"),
+            datos.get("nombre"),
+            normalizar_email(datos.get("email")),
+            normalizar_telefono(datos.get("telefono")),
+            json.dumps(datos, ensure_ascii=False, default=str),
+        ))
+        for funcion in self._suscriptores:
+            funcion(app, id_evaluacion, datos)
+        return id_evaluacion
+
+    def esperar(self):
+        """Bloquea hasta que el hilo escritor aplica todo lo encolado (scripts y pruebas)"""
+        self.iniciar()
+        self._cola.join()
+
+    def _lector(self):
+        conexion = getattr(self._lectores, "conexion", None)
+        if conexion is None:
+            conexion = self._lectores.conexion = _conectar(self.ruta)
+        return conexion
+
+    def consultar(self, sql, parametros=()):
+        """Filas (sqlite3.Row) de una consulta de solo lectura"""
+        return self._lector().execute(sql, parametros).fetchall()
+
+    def buscar(self, email=None, telefono=None, desde=None, hasta=None, app=None, limite=LIMITE_BUSQUEDA):
+        """Evaluaciones (con sus datos ya decodificados) de la más reciente a la más antigua"""
+        condiciones, parametros = [], []
+        if email:
+            condiciones.append("email = ?")
+            parametros.append(normalizar_email(email))
+        if telefono:
+            condiciones.append("telefono = ?")
+            parametros.append(normalizar_telefono(telefono))
+        if desde:
+            condiciones.append("fecha >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("fecha <= ?")
+            parametros.append(hasta)
+        if app:
+            condiciones.append("app = ?")
+            parametros.append(app)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        filas = self.consultar(
+            f"SELECT * FROM evaluaciones {donde} ORDER BY actualizado DESC LIMIT ?", (*parametros, limite)
+        )
+        return [dict(fila, datos=json.loads(fila["datos"])) for fila in filas]
+
+    def estadisticas(self):
+        filas = self.consultar("SELECT app, COUNT(*) AS total FROM evaluaciones GROUP BY app")
+        return {
+            "por_app": {fila["app"]: fila["total"] for fila in filas},
+            "en_cola": self._cola.qsize(),
+            "escritas": self.escritas,
+            "lotes": self.lotes,
+            "errores": self.errores,
+            "ultimo_error": self.ultimo_error,
+        }
+
+
+# Almacén compartido por todas las sesiones del proceso
+ALMACEN = AlmacenEvaluaciones()
+
+
+def registrar_suscriptores():
+    """
+    Suscribe lo que se deriva de cada evaluación guardada: la serie de mediciones por
+    cliente (mupai_series), los agregados del tablero (mupai_analitica) y el índice
+    alimento -> clientes (mupai_indice, avisado al guardar selecciones). Todo punto de
+    entrada que guarda evaluaciones la llama antes; repetirla no duplica nada. Los
+    módulos se importan aquí porque todos importan este.
+    """
+    from mupai_analitica import registrar_contribucion
+    from mupai_indice import indexar_selecciones
+    from mupai_selecciones import suscribir as suscribir_selecciones
+    from mupai_series import registrar_medicion
+    ALMACEN.suscribir(registrar_medicion)
+    ALMACEN.suscribir(registrar_contribucion)
+    suscribir_selecciones(indexar_selecciones)
+
+
+def persistir_evaluacion(app, datos):
+    """
+    Guarda la evaluación de esta sesión en el almacén, solo si cambió desde el último
+    rerun. La fila de la sesión se crea la primera vez y después se actualiza.
+    """
+    huella = hashlib.sha1(json.dumps(datos, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    if st.session_state.get(f"huella_almacen_{app}") == huella:
+        return st.session_state.get(f"id_almacen_{app}")
+    try:
+        id_evaluacion = ALMACEN.guardar(app, datos, st.session_state.get(f"id_almacen_{app}"))
+    except sqlite3.Error:
+        return None  # Guardar es best-effort: nunca debe interrumpir la evaluación
+    st.session_state[f"id_almacen_{app}"] = id_evaluacion
+    st.session_state[f"huella_almacen_{app}"] = huella
+    return id_evaluacion
+
+
+def mostrar_panel_almacen():
+    """Panel de administración (barra lateral) con el estado del almacén y búsqueda por cliente"""
+    if not es_administrador():
+        return
+    with st.sidebar.expander("🗃️ Almacén de evaluaciones (admin)", expanded=False):
+        estadisticas = ALMACEN.estadisticas()
+        for app, total in sorted(estadisticas["por_app"].items()):
+            st.caption(f"{app}: {total} evaluaciones")
+        st.caption(f"En cola: {estadisticas['en_cola']} · escritas en este proceso: {estadisticas['escritas']} "
+                   f"en {estadisticas['lotes']} lotes · errores: {estadisticas['errores']}")
+        if estadisticas["ultimo_error"]:
+            st.caption(f"Último error: {estadisticas['ultimo_error']}")
+        email = st.text_input("Email", key="almacen_email")
+        telefono = st.text_input("Teléfono", key="almacen_telefono")
+        if email or telefono:
+            inicio = time.perf_counter()
+            filas = ALMACEN.buscar(email=email, telefono=telefono, limite=20)
+            st.caption(f"{len(filas)} evaluaciones en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+            for fila in filas:
+                st.markdown(f"- `{fila['fecha']}` · {fila['app']} · {fila['nombre']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    # El almacén del módulo importable (no el de __main__), el mismo en el que escriben
+    # los suscriptores
+    import mupai_almacen
+
+    almacen = mupai_almacen.ALMACEN
+
+    parser = argparse.ArgumentParser(description="Consulta y prueba de carga del almacén de evaluaciones MUPAI")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    buscar = subcomandos.add_parser("buscar", help="Lista evaluaciones por email, teléfono o fechas")
+    buscar.add_argument("--email")
+    buscar.add_argument("--telefono")
+    buscar.add_argument("--desde", help="YYYY-MM-DD")
+    buscar.add_argument("--hasta", help="YYYY-MM-DD")
+    buscar.add_argument("--app")
+    carga = subcomandos.add_parser("carga", help="Inserta N evaluaciones sintéticas y mide escritura y consultas")
+    carga.add_argument("-n", type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.comando == "buscar":
+        for fila in almacen.buscar(args.email, args.telefono, args.desde, args.hasta, args.app):
+            print(f"{fila['id'][:8]}  {fila['fecha']}  {fila['app']:<22} {fila['nombre']} <{fila['email']}> {fila['telefono']}")
+    else:
+        mupai_almacen.registrar_suscriptores()
+        inicio = time.perf_counter()
+        for i in range(args.n):
+            almacen.guardar("simulacion", {
+                "nombre": f"Cliente {i}", "email": f"cliente{i % 5000}@ejemplo.com",
+                "telefono": f"55{i % 5000:08d}", "fecha_evaluacion": f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "peso_kg": 60 + i % 40, "grasa_corregida_pct": 10 + i % 25,
+            })
+        encolar_s = time.perf_counter() - inicio
+        almacen.esperar()
+        total_s = time.perf_counter() - inicio
+        print(f"Encolar {args.n}: {encolar_s * 1000:.0f} ms · escritas en disco a los {total_s * 1000:.0f} ms "
+              f"({almacen.lotes} lotes)")
+        for descripcion, consulta in (
+            ("por email", lambda: almacen.buscar(email="cliente42@ejemplo.com")),
+            ("por teléfono", lambda: almacen.buscar(telefono="55-0000-0042")),
+            ("por rango de fechas", lambda: almacen.buscar(desde="2026-03-01", hasta="2026-03-07", limite=50)),
+        ):
+            inicio = time.perf_counter()
+            filas = consulta()
+            print(f"Búsqueda {descripcion}: {len(filas)} filas en {(time.perf_counter() - inicio) * 1000:.2f} ms")
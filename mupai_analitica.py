@@ -0,0 +1,311 @@
+"""
+Agregados de las evaluaciones MUPAI mantenidos al escribir, para el tablero de administración.
+
+Cada evaluación que se guarda en el almacén suma sus claves en la tabla `agregados`
+(app, mes, dimensión, valor) → total y suma: conteos por sexo, nivel de
+entrenamiento, fase, elegibilidad a PSMF y método de medición de grasa, e
+histogramas por mes de FFMI y % de grasa corregida. La suma permite sacar promedios
+y los histogramas, percentiles por mes.
+
+Como una evaluación se guarda varias veces mientras el cliente avanza, la tabla
+`contribuciones` recuerda qué claves aportó cada una; al actualizarla se restan las
+anteriores y se suman las nuevas en la misma transacción del hilo escritor. El
+tablero solo lee unas cuantas filas de `agregados`, sin importar cuántas
+evaluaciones haya.
+"""
+import json
+import math
+import re
+import time
+
+import pandas as pd
+import streamlit as st
+
+from mupai_almacen import ALMACEN
+
+APP_FITNESS = "evaluacion_fitness"
+
+# Dimensiones de conteo: campo del registro -> título en el tablero
+DIMENSIONES = {
+    "sexo": "Sexo",
+    "nivel_entrenamiento": "Nivel de entrenamiento",
+    "fase": "Fase",
+    "psmf_aplicable": "Elegibilidad PSMF",
+    "metodo_grasa": "Método de medición de grasa",
+}
+
+# Distribuciones: campo -> (título, ancho del intervalo del histograma)
+DISTRIBUCIONES = {
+    "ffmi": ("FFMI", 0.5),
+    "grasa_corregida_pct": ("% de grasa corregida", 1.0),
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS agregados (
+    app       TEXT NOT NULL,
+    mes       TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    valor     TEXT NOT NULL,
+    total     INTEGER NOT NULL,
+    suma      REAL NOT NULL,
+    PRIMARY KEY (app, dimension, mes, valor)
+);
+CREATE TABLE IF NOT EXISTS contribuciones (
+    id_evaluacion TEXT PRIMARY KEY,
+    app           TEXT NOT NULL,
+    claves        TEXT NOT NULL
+);
+"""
+
+_SUMAR = """
+INSERT INTO agregados (app, mes, dimension, valor, total, suma) VALUES (?, ?, ?, ?, 1, ?)
+ON CONFLICT (app, dimension, mes, valor) DO UPDATE SET total = total + 1, suma = suma + excluded.suma
+"""
+
+_RESTAR = """
+UPDATE agregados SET total = total - 1, suma = suma - ?
+WHERE app = ? AND mes = ? AND dimension = ? AND valor = ?
+"""
+
+_LIMPIAR = "DELETE FROM agregados WHERE app = ? AND mes = ? AND dimension = ? AND valor = ? AND total <= 0"
+
+_GUARDAR_CONTRIBUCION = """
+INSERT INTO contribuciones (id_evaluacion, app, claves) VALUES (?, ?, ?)
+ON CONFLICT (id_evaluacion) DO UPDATE SET app = excluded.app, claves = excluded.claves
+"""
+
+ALMACEN.crear_tablas(ESQUEMA)
+
+
+def _categoria_fase(fase):
+    """'Déficit recomendado: 20%' -> 'Déficit recomendado', para no abrir una categoría por porcentaje"""
+    return re.split(r"[:(]| - ", str(fase))[0].strip() or None
+
+
+def _valor_dimension(campo, valor):
+    if valor is None or valor == "":
+        return None
+    if campo == "fase":
+        return _categoria_fase(valor)
+    if campo == "psmf_aplicable":
+        return "Elegible" if valor else "No elegible"
+    if campo == "nivel_entrenamiento":
+        return str(valor).capitalize()
+    return str(valor)
+
+
+def claves_evaluacion(app, datos):
+    """Claves [mes, dimensión, valor, suma] con las que una evaluación contribuye a los agregados"""
+    mes = str(datos.get("fecha_evaluacion") or "")[:7] or time.strftime("%Y-%m")
+    claves = [[mes, "total", "", 0.0]]
+    if app != APP_FITNESS:
+        return claves
+    for campo in DIMENSIONES:
+        valor = _valor_dimension(campo, datos.get(campo))
+        if valor is not None:
+            claves.append([mes, campo, valor, 0.0])
+    for campo, (_, ancho) in DISTRIBUCIONES.items():
+        try:
+            valor = float(datos.get(campo))
+        except (TypeError, ValueError):
+            continue
+        if math.isfinite(valor) and valor > 0:
+            claves.append([mes, campo, f"{math.floor(valor / ancho) * ancho:.1f}", round(valor, 3)])
+    return claves
+
+
+def _aplicar_contribucion(conexion, app, id_evaluacion, claves):
+    """Se ejecuta en el hilo escritor: cambia las claves anteriores de la evaluación por las nuevas"""
+    fila = conexion.execute(
+        "SELECT app, claves FROM contribuciones WHERE id_evaluacion = ?", (id_evaluacion,)
+    ).fetchone()
+    if fila and fila["app"] == app and json.loads(fila["claves"]) == claves:
+        return
+    if fila:
+        anteriores = [(fila["app"], *clave[:3]) for clave in json.loads(fila["claves"])]
+        conexion.executemany(_RESTAR, [
+            (clave[3], fila["app"], *clave[:3]) for clave in json.loads(fila["claves"])
+        ])
+        conexion.executemany(_LIMPIAR, anteriores)
+    conexion.executemany(_SUMAR, [(app, *clave) for clave in claves])
+    conexion.execute(_GUARDAR_CONTRIBUCION, (id_evaluacion, app, json.dumps(claves, ensure_ascii=False)))
+
+
+def registrar_contribucion(app, id_evaluacion, datos):
+    """Suscriptor del almacén: encola la actualización de agregados de cada evaluación guardada"""
+    ALMACEN.escribir(_aplicar_contribucion, (app, id_evaluacion, claves_evaluacion(app, datos)))
+
+
+def reconstruir_agregados(conexion):
+    """Recalcula todos los agregados desde las evaluaciones (datos previos a esta tabla o tras importar)"""
+    conexion.execute("DELETE FROM agregados")
+    conexion.execute("DELETE FROM contribuciones")
+    for fila in conexion.execute("SELECT id, app, datos FROM evaluaciones"):
+        _aplicar_contribucion(conexion, fila["app"], fila["id"], claves_evaluacion(fila["app"], json.loads(fila["datos"])))
+
+
+# ==================== LECTURA ====================
+
+def leer_agregados(app, desde=None, hasta=None):
+    """Filas de agregados de una app en un rango de meses (YYYY-MM, inclusivo)"""
+    condiciones, parametros = ["app = ?"], [app]
+    if desde:
+        condiciones.append("mes >= ?")
+        parametros.append(desde)
+    if hasta:
+        condiciones.append("mes <= ?")
+        parametros.append(hasta)
+    return [dict(fila) for fila in ALMACEN.consultar(
+        f"SELECT mes, dimension, valor, total, suma FROM agregados WHERE {' AND '.join(condiciones)}", parametros
+    )]
+
+
+def meses_disponibles(app):
+    return [fila["mes"] for fila in ALMACEN.consultar(
+        "SELECT mes FROM agregados WHERE app = ? AND dimension = 'total' ORDER BY mes", (app,)
+    )]
+
+
+def conteos(filas, dimension):
+    """{valor: total} de una dimensión sumando los meses de las filas"""
+    resultado = {}
+    for fila in filas:
+        if fila["dimension"] == dimension:
+            resultado[fila["valor"]] = resultado.get(fila["valor"], 0) + fila["total"]
+    return dict(sorted(resultado.items(), key=lambda par: -par[1]))
+
+
+def percentil_histograma(intervalos, ancho, q):
+    """Percentil aproximado de un histograma {inicio del intervalo: total}, interpolando dentro del intervalo"""
+    total = sum(intervalos.values())
+    if not total:
+        return None
+    objetivo = q * total
+    acumulado = 0
+    for inicio, n in sorted(intervalos.items()):
+        if acumulado + n >= objetivo:
+            return inicio + ancho * (objetivo - acumulado) / n
+        acumulado += n
+    return max(intervalos) + ancho
+
+
+def distribucion_mensual(filas, campo):
+    """Por mes: n, promedio y percentiles 25/50/75 a partir del histograma del campo"""
+    _, ancho = DISTRIBUCIONES[campo]
+    por_mes = {}
+    for fila in filas:
+        if fila["dimension"] == campo:
+            mes = por_mes.setdefault(fila["mes"], {"intervalos": {}, "n": 0, "suma": 0.0})
+            mes["intervalos"][float(fila["valor"])] = fila["total"]
+            mes["n"] += fila["total"]
+            mes["suma"] += fila["suma"]
+    return [
+        {
+            "mes": mes,
+            "n": datos["n"],
+            "promedio": round(datos["suma"] / datos["n"], 2),
+            "p25": round(percentil_histograma(datos["intervalos"], ancho, 0.25), 2),
+            "p50": round(percentil_histograma(datos["intervalos"], ancho, 0.50), 2),
+            "p75": round(percentil_histograma(datos["intervalos"], ancho, 0.75), 2),
+        }
+        for mes, datos in sorted(por_mes.items()) if datos["n"]
+    ]
+
+
+# ==================== TABLERO ====================
+
+def mostrar_tablero():
+    """Tablero de analítica para administración (página protegida por la contraseña de acceso)"""
+    inicio = time.perf_counter()
+    meses = meses_disponibles(APP_FITNESS)
+    if not meses:
+        st.info("Aún no hay evaluaciones fitness guardadas en el almacén.")
+        return
+
+    desde, hasta = (meses[0], meses[-1]) if len(meses) == 1 else st.select_slider(
+        "Periodo", options=meses, value=(meses[max(0, len(meses) - 12)], meses[-1])
+    )
+    filas = leer_agregados(APP_FITNESS, desde, hasta)
+    totales_fitness = conteos(filas, "total").get("", 0)
+    totales_patrones = conteos(leer_agregados("patrones_alimentarios", desde, hasta), "total").get("", 0)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Evaluaciones fitness", f"{totales_fitness:,}")
+    col2.metric("Evaluaciones de patrones alimentarios", f"{totales_patrones:,}")
+    col3.metric("Meses en el periodo", len([mes for mes in meses if desde <= mes <= hasta]))
+
+    st.markdown("#### Evaluaciones por mes")
+    por_mes = {fila["mes"]: fila["total"] for fila in filas if fila["dimension"] == "total"}
+    st.bar_chart(pd.DataFrame({"evaluaciones": por_mes}))
+
+    st.markdown("#### Distribución de clientes")
+    columnas = st.columns(2)
+    for i, (dimension, titulo) in enumerate(DIMENSIONES.items()):
+        with columnas[i % 2]:
+            st.markdown(f"**{titulo}**")
+            valores = conteos(filas, dimension)
+            if valores:
+                st.bar_chart(pd.DataFrame({"evaluaciones": valores}), horizontal=True)
+            else:
+                st.caption("Sin datos en el periodo.")
+
+    for campo, (titulo, ancho) in DISTRIBUCIONES.items():
+        st.markdown(f"#### {titulo} a lo largo del tiempo")
+        mensual = distribucion_mensual(filas, campo)
+        if not mensual:
+            st.caption("Sin datos en el periodo.")
+            continue
+        tabla = pd.DataFrame(mensual).set_index("mes")
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.line_chart(tabla[["p25", "p50", "promedio", "p75"]])
+        with col2:
+            histograma = conteos(filas, campo)
+            st.bar_chart(pd.DataFrame(
+                {"evaluaciones": {f"{float(valor):.1f}": histograma[valor] for valor in sorted(histograma, key=float)}}
+            ))
+            st.caption(f"Histograma del periodo (intervalos de {ancho:g})")
+        st.dataframe(tabla, use_container_width=True)
+
+    st.caption(f"Tablero calculado en {(time.perf_counter() - inicio) * 1000:.0f} ms "
+               f"a partir de {len(filas)} filas precalculadas")
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+
+    parser = argparse.ArgumentParser(description="Agregados del tablero de analítica MUPAI")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    subcomandos.add_parser("reconstruir", help="Recalcula los agregados desde todas las evaluaciones")
+    carga = subcomandos.add_parser("carga", help="Inserta N evaluaciones fitness sintéticas y mide las lecturas")
+    carga.add_argument("-n", type=int, default=100000)
+    args = parser.parse_args()
+
+    from mupai_almacen import registrar_suscriptores
+    registrar_suscriptores()
+
+    if args.comando == "reconstruir":
+        inicio = time.perf_counter()
+        ALMACEN.escribir(reconstruir_agregados, ())
+        ALMACEN.esperar()
+        print(f"Agregados reconstruidos en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    else:
+        inicio = time.perf_counter()
+        for i in range(args.n):
+            ALMACEN.guardar(APP_FITNESS, {
+                "nombre": f"Cliente {i}", "email": f"cliente{i}@ejemplo.com",
+                "fecha_evaluacion": f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "sexo": random.choice(("Hombre", "Mujer")), "peso_kg": random.uniform(50, 110),
+                "nivel_entrenamiento": random.choice(("principiante", "intermedio", "avanzado", "élite")),
+                "fase": random.choice(("Déficit recomendado: 20%", "Mantenimiento", "Superávit recomendado: 10%")),
+                "psmf_aplicable": random.random() < 0.2, "metodo_grasa": "Omron HBF-516 (BIA)",
+                "ffmi": random.gauss(20, 2), "grasa_corregida_pct": random.uniform(8, 40),
+            })
+        ALMACEN.esperar()
+        print(f"{args.n} evaluaciones guardadas con agregados en {time.perf_counter() - inicio:.1f} s")
+        inicio = time.perf_counter()
+        filas = leer_agregados(APP_FITNESS)
+        resultado = {dimension: conteos(filas, dimension) for dimension in DIMENSIONES}
+        resultado.update((campo, distribucion_mensual(filas, campo)) for campo in DISTRIBUCIONES)
+        print(f"Lectura del tablero: {len(filas)} filas en {(time.perf_counter() - inicio) * 1000:.1f} ms")
@@ -0,0 +1,385 @@
+"""
+Archivo local de todos los resúmenes generados por las apps MUPAI.
+
+Cada resumen (texto del email más los datos estructurados) se guarda comprimido en
+segmentos de solo-anexado: `segmento_000001.zst`, `segmento_000002.zst`... Cuando
+un segmento supera TAMANO_SEGMENTO se abre el siguiente. Los registros se comprimen
+uno por uno con zstd (o gzip si el paquete `zstandard` no está instalado), de modo
+que para leer uno basta con saltar a su offset y descomprimir solo sus bytes.
+
+Cada registro lleva una cabecera fija (MARCA + longitud), lo que permite reconstruir
+el índice recorriendo los segmentos si `indice.jsonl` se pierde. El índice (cliente,
+email, fecha, segmento, offset, longitud) se carga en memoria una vez por proceso y
+se consulta sin tocar los segmentos; cada consulta solo lee las líneas que otros
+procesos hayan anexado desde la última.
+
+Las dos apps pueden correr en procesos distintos sobre el mismo directorio: anexar un
+registro y su línea del índice se hace bajo un `flock` sobre `archivo.lock`, de modo
+que el offset tomado al final del segmento es el del registro propio. Sin `fcntl`
+(Windows) debe haber un solo proceso escritor.
+"""
+import gzip
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+from mupai_config import DIRECTORIO_DATOS, es_administrador
+
+try:
+    import zstandard
+except ImportError:  # gzip de la biblioteca estándar como respaldo
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: un solo proceso escritor
+    fcntl = None
+
+DIRECTORIO_ARCHIVO = os.path.join(DIRECTORIO_DATOS, "archivo_resumenes")
+
+# Tamaño a partir del cual se abre un segmento nuevo
+TAMANO_SEGMENTO = 16 * 1024 * 1024
+
+# Cabecera de cada registro: marca de 4 bytes y longitud del bloque comprimido
+MARCA = b"MUPA"
+CABECERA = struct.Struct(">4sI")
+
+NIVEL_ZSTD = 9
+NIVEL_GZIP = 6
+
+# Resultados máximos que devuelve una búsqueda por defecto
+LIMITE_BUSQUEDA = 50
+
+
+class _CodecZstd:
+    extension = "zst"
+
+    def __init__(self):
+        self._compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD)
+        self._descompresor = zstandard.ZstdDecompressor()
+
+    def comprimir(self, datos):
+        return self._compresor.compress(datos)
+
+    def descomprimir(self, datos):
+        return self._descompresor.decompress(datos)
+
+
+class _CodecGzip:
+    extension = "gz"
+
+    def comprimir(self, datos):
+        return gzip.compress(datos, compresslevel=NIVEL_GZIP, mtime=0)
+
+    def descomprimir(self, datos):
+        return gzip.decompress(datos)
+
+
+def _normalizar(texto):
+    return (texto or "").strip().lower()
+
+
+class ArchivoResumenes:
+    """Segmentos comprimidos de solo-anexado con un índice en memoria"""
+
+    def __init__(self, directorio=DIRECTORIO_ARCHIVO, tamano_segmento=TAMANO_SEGMENTO):
+        self.directorio = directorio
+        self.tamano_segmento = tamano_segmento
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._leido = 0                          # bytes del índice ya cargados
+        self._entradas = {}                      # id -> entrada del índice
+        self._por_email = defaultdict(list)      # email normalizado -> ids
+        self._por_cliente = defaultdict(list)    # nombre normalizado -> ids
+        self._codecs = {"gz": _CodecGzip()}
+        if zstandard is not None:
+            self._codecs["zst"] = _CodecZstd()
+        self._codec = self._codecs["zst" if zstandard is not None else "gz"]
+
+    @property
+    def _ruta_indice(self):
+        return os.path.join(self.directorio, "indice.jsonl")
+
+    def _ruta_segmento(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def _segmentos(self):
+        if not os.path.isdir(self.directorio):
+            return []
+        return sorted(nombre for nombre in os.listdir(self.directorio) if nombre.startswith("segmento_"))
+
+    def _indexar(self, entrada):
+        self._entradas[entrada["id"]] = entrada
+        self._por_email[_normalizar(entrada["email"])].append(entrada["id"])
+        self._por_cliente[_normalizar(entrada["cliente"])].append(entrada["id"])
+
+    def _limpiar(self):
+        self._entradas.clear()
+        self._por_email.clear()
+        self._por_cliente.clear()
+        self._leido = 0
+
+    def tamano_indice(self):
+        """Bytes de indice.jsonl (cambia con cada registro anexado por cualquier proceso)"""
+        try:
+            return os.path.getsize(self._ruta_indice)
+        except FileNotFoundError:
+            return 0
+
+    def _cargar(self):
+        """
+        Carga las líneas del índice aún no leídas (llamar con el lock tomado): todo el
+        índice la primera vez y luego solo lo anexado por este u otros procesos.
+        """
+        if not self._cargado:
+            os.makedirs(self.directorio, exist_ok=True)
+            self._cargado = True
+        tamano = self.tamano_indice()
+        if tamano < self._leido:
+            self._limpiar()  # Otro proceso reconstruyó el índice
+        if tamano == self._leido:
+            return
+        with open(self._ruta_indice, "rb") as archivo:
+            archivo.seek(self._leido)
+            for linea in archivo:
+                if not linea.endswith(b"\n"):
+                    break  # Línea a medio escribir: se lee en la próxima consulta
+                self._leido += len(linea)
+                try:
+                    self._indexar(json.loads(linea))
+                except (ValueError, KeyError):
+                    continue  # Línea truncada por una caída anterior
+
+    @contextmanager
+    def _bloqueo_procesos(self):
+        """Exclusión entre procesos para anexar (sin fcntl no hace nada)"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directorio, "archivo.lock"), "a") as candado:
+            fcntl.flock(candado, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(candado, fcntl.LOCK_UN)
+
+    def _segmento_para_anexar(self, extension):
+        """
+        Último segmento, o uno nuevo si está lleno o usa otro codec. Se consulta el
+        directorio cada vez (con el bloqueo tomado) porque otro proceso pudo abrir uno.
+        """
+        segmentos = self._segmentos()
+        if segmentos:
+            ultimo = segmentos[-1]
+            lleno = os.path.getsize(self._ruta_segmento(ultimo)) >= self.tamano_segmento
+            if not lleno and ultimo.endswith("." + extension):
+                return ultimo
+            numero = int(ultimo.split("_")[1].split(".")[0]) + 1
+        else:
+            numero = 1
+        return f"segmento_{numero:06d}.{extension}"
+
+    def guardar(self, app, cliente, email, fecha, resumen, datos=None):
+        """Anexa un resumen al archivo y devuelve su id"""
+        registro = {
+            "id": uuid.uuid4().hex,
+            "app": app,
+            "cliente": cliente,
+            "email": email,
+            "fecha": fecha,
+            "creado": time.time(),
+            "resumen": resumen,
+            "datos": datos,
+        }
+        bloque = self._codec.comprimir(json.dumps(registro, ensure_ascii=False, default=str).encode("utf-8"))
+        with self._lock:
+            self._cargar()
+            with self._bloqueo_procesos():
+                segmento = self._segmento_para_anexar(self._codec.extension)
+                with open(self._ruta_segmento(segmento), "ab") as archivo:
+                    offset = archivo.tell()
+                    archivo.write(CABECERA.pack(MARCA, len(bloque)) + bloque)
+                entrada = self._entrada(registro, segmento, offset, len(bloque))
+                with open(self._ruta_indice, "a", encoding="utf-8") as archivo:
+                    archivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            self._cargar()  # Indexa la línea propia y las que otros procesos anexaron antes
+        return registro["id"]
+
+    @staticmethod
+    def _entrada(registro, segmento, offset, longitud):
+        return {
+            "id": registro["id"],
+            "app": registro["app"],
+            "cliente": registro["cliente"],
+            "email": registro["email"],
+            "fecha": registro["fecha"],
+            "creado": registro["creado"],
+            "segmento": segmento,
+            "offset": offset,
+            "longitud": longitud,
+        }
+
+    def leer(self, id_registro):
+        """Registro completo (resumen y datos) por id, o None si no existe"""
+        with self._lock:
+            self._cargar()
+            entrada = self._entradas.get(id_registro)
+        if entrada is None:
+            return None
+        with open(self._ruta_segmento(entrada["segmento"]), "rb") as archivo:
+            archivo.seek(entrada["offset"] + CABECERA.size)
+            bloque = archivo.read(entrada["longitud"])
+        codec = self._codecs[entrada["segmento"].rsplit(".", 1)[1]]
+        return json.loads(codec.descomprimir(bloque))
+
+    def buscar(self, email=None, cliente=None, fecha=None, app=None, limite=LIMITE_BUSQUEDA):
+        """
+        Entradas del índice (sin el resumen) que coinciden, de la más reciente a la más antigua.
+        email y cliente buscan coincidencia exacta sin distinguir mayúsculas; fecha es 'YYYY-MM-DD'.
+        """
+        with self._lock:
+            self._cargar()
+            if email:
+                ids = self._por_email.get(_normalizar(email), [])
+            elif cliente:
+                ids = self._por_cliente.get(_normalizar(cliente), [])
+            else:
+                ids = list(self._entradas)
+            entradas = [self._entradas[id_registro] for id_registro in ids]
+        if cliente and email:
+            entradas = [entrada for entrada in entradas if _normalizar(entrada["cliente"]) == _normalizar(cliente)]
+        if fecha:
+            entradas = [entrada for entrada in entradas if str(entrada["fecha"]).startswith(fecha)]
+        if app:
+            entradas = [entrada for entrada in entradas if entrada["app"] == app]
+        entradas.sort(key=lambda entrada: entrada["creado"], reverse=True)
+        return entradas[:limite]
+
+    def reconstruir_indice(self):
+        """Vuelve a generar indice.jsonl recorriendo las cabeceras de todos los segmentos"""
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._lock, self._bloqueo_procesos():
+            entradas = []
+            for segmento in self._segmentos():
+                codec = self._codecs.get(segmento.rsplit(".", 1)[1])
+                if codec is None:
+                    continue  # Segmento zstd sin el paquete zstandard instalado
+                with open(self._ruta_segmento(segmento), "rb") as archivo:
+                    while True:
+                        offset = archivo.tell()
+                        cabecera = archivo.read(CABECERA.size)
+                        if len(cabecera) < CABECERA.size:
+                            break
+                        marca, longitud = CABECERA.unpack(cabecera)
+                        bloque = archivo.read(longitud)
+                        if marca != MARCA or len(bloque) < longitud:
+                            break  # Registro truncado al final del segmento
+                        registro = json.loads(codec.descomprimir(bloque))
+                        entradas.append(self._entrada(registro, segmento, offset, longitud))
+            temporal = self._ruta_indice + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                for entrada in entradas:
+                    archivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            os.replace(temporal, self._ruta_indice)
+            self._limpiar()
+            self._cargado = True
+            self._cargar()
+            return len(entradas)
+
+    def estadisticas(self):
+        with self._lock:
+            self._cargar()
+            total = len(self._entradas)
+        segmentos = self._segmentos()
+        return {
+            "registros": total,
+            "segmentos": len(segmentos),
+            "bytes": sum(os.path.getsize(self._ruta_segmento(segmento)) for segmento in segmentos),
+            "codec": self._codec.extension,
+        }
+
+
+# Archivo compartido por todas las sesiones del proceso
+ARCHIVO = ArchivoResumenes()
+
+
+def archivar_resumen(app, cliente, email, fecha, resumen, datos=None):
+    """Guarda el resumen en el archivo local; un fallo aquí nunca debe impedir el envío del email"""
+    try:
+        return ARCHIVO.guardar(app, cliente, email, fecha, resumen, datos)
+    except OSError as e:
+        st.warning(f"⚠️ No se pudo archivar el resumen localmente: {e}")
+        return None
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _resumenes_encontrados(email, cliente, tamano_indice):
+    """
+    Entradas de una búsqueda con su resumen ya descomprimido. `tamano_indice` solo
+    forma parte de la llave: un registro nuevo invalida la búsqueda, y los reruns
+    del panel sin cambios no vuelven a descomprimir hasta LIMITE_BUSQUEDA registros.
+    """
+    resultados = []
+    for entrada in ARCHIVO.buscar(email=email, cliente=cliente):
+        registro = ARCHIVO.leer(entrada["id"])
+        if registro is not None:
+            resultados.append((entrada, registro["resumen"]))
+    return resultados
+
+
+def mostrar_panel_archivo():
+    """Panel de administración (barra lateral) para buscar y descargar resúmenes archivados"""
+    if not es_administrador():
+        return
+    with st.sidebar.expander("🗄️ Archivo de resúmenes (admin)", expanded=False):
+        estadisticas = ARCHIVO.estadisticas()
+        st.caption(f"{estadisticas['registros']} resúmenes en {estadisticas['segmentos']} segmentos "
+                   f"({estadisticas['bytes'] / 1024:.0f} KB, {estadisticas['codec']})")
+        email = st.text_input("Email del cliente", key="archivo_email")
+        cliente = st.text_input("Nombre del cliente", key="archivo_cliente")
+        if not (email or cliente):
+            return
+        t0 = time.perf_counter()
+        resultados = _resumenes_encontrados(email, cliente, ARCHIVO.tamano_indice())
+        st.caption(f"{len(resultados)} resultados en {(time.perf_counter() - t0) * 1000:.1f} ms")
+        for entrada, resumen in resultados:
+            creado = datetime.fromtimestamp(entrada["creado"]).strftime("%Y-%m-%d %H:%M")
+            st.download_button(
+                f"⬇️ {entrada['cliente']} · {entrada['app']} · {creado}",
+                resumen,
+                file_name=f"resumen_{entrada['id'][:8]}.txt",
+                key=f"archivo_{entrada['id']}",
+            )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Consulta el archivo local de resúmenes MUPAI")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    buscar = subcomandos.add_parser("buscar", help="Lista resúmenes por email, cliente o fecha")
+    buscar.add_argument("--email")
+    buscar.add_argument("--cliente")
+    buscar.add_argument("--fecha", help="YYYY-MM-DD o prefijo (YYYY-MM)")
+    buscar.add_argument("--limite", type=int, default=LIMITE_BUSQUEDA)
+    leer = subcomandos.add_parser("leer", help="Imprime un resumen archivado")
+    leer.add_argument("id")
+    subcomandos.add_parser("reconstruir", help="Regenera el índice desde los segmentos")
+    args = parser.parse_args()
+
+    if args.comando == "buscar":
+        for entrada in ARCHIVO.buscar(args.email, args.cliente, args.fecha, limite=args.limite):
+            print(f"{entrada['id']}  {entrada['fecha']}  {entrada['app']:<22} {entrada['cliente']} <{entrada['email']}>")
+    elif args.comando == "leer":
+        registro = ARCHIVO.leer(args.id)
+        print(registro["resumen"] if registro else "No existe ese id en el índice.")
+    else:
+        print(f"Índice reconstruido: {ARCHIVO.reconstruir_indice()} registros")
@@ -0,0 +1,192 @@
+"""
+Catálogo de alimentos del cuestionario con IDs enteros estables y selecciones como bitsets.
+
+`catalogo/alimentos.json` es la fuente de las opciones de las 38 multiselecciones (y
+de las listas de frecuencia de comidas y opciones rápidas de menú): cambiar el
+catálogo no requiere tocar el código. Cada alimento tiene un ID entero que no cambia
+nunca, su clave de multiselección, grupo de alimentos y macronutriente predominante.
+Un alimento nuevo recibe el siguiente ID libre y uno que se retira conserva el suyo
+(con "retirado": true): deja de ofrecerse, pero un bitset guardado con una versión
+anterior del catálogo se sigue leyendo igual. Al cambiar el archivo hay que subir su
+"version".
+
+El archivo se lee una sola vez por proceso y queda en estructuras inmutables (tuplas
+y mappingproxy), de modo que cada rerun de la app solo toma referencias ya hechas.
+
+Las selecciones de un cliente se codifican como un bitset empaquetado en palabras
+uint64 de NumPy (el bit `id` está en la palabra id // 64): unos 56 bytes para todo el
+cuestionario, pertenencia en O(1) y operaciones de conjuntos vectorizadas. Las
+funciones de conjuntos aceptan un bitset (1-D) o una matriz de clientes x palabras
+(2-D), de modo que unión, intersección y conteo sobre toda la base son una sola
+operación de NumPy.
+"""
+import json
+import os
+import threading
+import unicodedata
+from collections import namedtuple
+from types import MappingProxyType
+
+import numpy as np
+
+RUTA_CATALOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogo", "alimentos.json")
+
+BITS_PALABRA = 64
+
+Alimento = namedtuple("Alimento", ["id", "clave", "nombre", "grupo", "macro", "nula", "retirado"])
+
+# Bits encendidos por byte, para contar sin np.bitwise_count (NumPy < 2.0)
+_BITS_POR_BYTE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def normalizar_nombre(texto):
+    """Texto en minúsculas, sin acentos ni espacios repetidos, para buscar alimentos por nombre"""
+    sin_acentos = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(sin_acentos.lower().split())
+
+
+class Catalogo:
+    """Catálogo inmutable cargado una vez: alimentos por ID, por (clave, nombre) y opciones por clave"""
+
+    def __init__(self, datos):
+        self.version = datos["version"]
+        macros = set(datos.get("macros", ())) | {None}
+        alimentos = sorted(
+            (
+                Alimento(a["id"], a["clave"], a["nombre"], a.get("grupo"), a.get("macro"),
+                         a.get("nula", False), a.get("retirado", False))
+                for a in datos["alimentos"]
+            ),
+            key=lambda alimento: alimento.id,
+        )
+        desconocidos = {a.macro for a in alimentos} - macros
+        if desconocidos:
+            raise ValueError(f"Macronutrientes fuera de la lista del catálogo: {sorted(desconocidos)}")
+        if [alimento.id for alimento in alimentos] != list(range(len(alimentos))):
+            raise ValueError("Los IDs del catálogo deben ser consecutivos desde 0 y sin repetirse")
+        self.alimentos = tuple(alimentos)
+        self.por_clave_nombre = {(a.clave, a.nombre): a.id for a in alimentos}
+        if len(self.por_clave_nombre) != len(alimentos):
+            raise ValueError("Hay alimentos repetidos en la misma clave del catálogo")
+        self.palabras = (len(alimentos) + BITS_PALABRA - 1) // BITS_PALABRA
+
+        opciones = {}
+        for alimento in alimentos:
+            if not alimento.retirado:
+                opciones.setdefault(alimento.clave, []).append(alimento.nombre)
+        # Opciones de cada multiselección en el orden del catálogo (solo alimentos vigentes)
+        self.opciones = MappingProxyType({clave: tuple(nombres) for clave, nombres in opciones.items()})
+        # Otras listas de opciones del cuestionario (radio y selectbox)
+        self.listas = MappingProxyType({clave: tuple(valores) for clave, valores in datos.get("listas", {}).items()})
+        self.grupos = tuple(dict.fromkeys(a.grupo for a in alimentos if a.grupo))
+
+    def __len__(self):
+        return len(self.alimentos)
+
+    def vacio(self, clientes=None):
+        """Bitset vacío, o matriz vacía de `clientes` bitsets"""
+        forma = self.palabras if clientes is None else (clientes, self.palabras)
+        return np.zeros(forma, dtype=np.uint64)
+
+    def ids(self, selecciones):
+        """IDs de un dict {clave: [nombres]}; los nombres fuera del catálogo se ignoran"""
+        return [
+            self.por_clave_nombre[(clave, nombre)]
+            for clave, nombres in selecciones.items()
+            for nombre in nombres or ()
+            if (clave, nombre) in self.por_clave_nombre
+        ]
+
+    def desde_ids(self, ids):
+        bits = self.vacio()
+        ids = np.asarray(ids, dtype=np.uint64)
+        if ids.size:
+            np.bitwise_or.at(bits, (ids // BITS_PALABRA).astype(np.intp), np.left_shift(np.uint64(1), ids % BITS_PALABRA))
+        return bits
+
+    def codificar(self, selecciones):
+        """Bitset uint64 de las selecciones {clave: [nombres]}"""
+        return self.desde_ids(self.ids(selecciones))
+
+    def ids_de(self, bits):
+        """IDs encendidos de un bitset, en orden"""
+        desempacados = np.unpackbits(np.ascontiguousarray(bits, dtype="<u8").view(np.uint8), bitorder="little")
+        return np.flatnonzero(desempacados[:len(self.alimentos)])
+
+    def decodificar(self, bits):
+        """{clave: [nombres]} en el orden del catálogo"""
+        selecciones = {}
+        for id_alimento in self.ids_de(bits):
+            alimento = self.alimentos[id_alimento]
+            selecciones.setdefault(alimento.clave, []).append(alimento.nombre)
+        return selecciones
+
+    def mascara_clave(self, *claves):
+        """Bitset con todos los alimentos de una o varias claves de multiselección"""
+        return self.desde_ids([a.id for a in self.alimentos if a.clave in claves])
+
+    def mascara_grupo(self, *grupos):
+        """Bitset con los alimentos reales (sin las opciones "Ninguno") de uno o varios grupos"""
+        return self.desde_ids([a.id for a in self.alimentos if a.grupo in grupos and not a.nula])
+
+    def mascara_macro(self, *macros):
+        return self.desde_ids([a.id for a in self.alimentos if a.macro in macros and not a.nula])
+
+    def a_bytes(self, bits):
+        return np.ascontiguousarray(bits, dtype="<u8").tobytes()
+
+    def desde_bytes(self, datos):
+        """Bitset guardado; uno de una versión anterior (más corto) se completa con ceros"""
+        guardado = np.frombuffer(datos, dtype="<u8").astype(np.uint64)
+        bits = self.vacio()
+        bits[:min(len(guardado), self.palabras)] = guardado[:self.palabras]
+        return bits
+
+
+# ==================== OPERACIONES DE CONJUNTOS ====================
+
+def contiene(bits, id_alimento):
+    """Pertenencia de un alimento; con una matriz devuelve un arreglo booleano por cliente"""
+    palabra, bit = divmod(int(id_alimento), BITS_PALABRA)
+    return (bits[..., palabra] >> np.uint64(bit)) & np.uint64(1) == 1
+
+
+def union(a, b):
+    return np.bitwise_or(a, b)
+
+
+def interseccion(a, b):
+    return np.bitwise_and(a, b)
+
+
+def diferencia(a, b):
+    return np.bitwise_and(a, np.bitwise_not(b))
+
+
+def popcount(bits):
+    """Número de alimentos de un bitset, o por fila en una matriz de clientes"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).sum(axis=-1, dtype=np.int64)
+    bytes_ = np.ascontiguousarray(bits).view(np.uint8)
+    return _BITS_POR_BYTE[bytes_].sum(axis=-1, dtype=np.int64)
+
+
+def jaccard(a, b):
+    """Similitud entre selecciones (1-D contra 1-D, o un bitset contra cada fila de una matriz)"""
+    total = popcount(union(a, b))
+    return np.where(total > 0, popcount(interseccion(a, b)) / np.maximum(total, 1), 0.0)
+
+
+_CATALOGO = None
+_LOCK = threading.Lock()
+
+
+def cargar_catalogo(ruta=RUTA_CATALOGO):
+    """Catálogo leído y validado una sola vez por proceso"""
+    global _CATALOGO
+    if _CATALOGO is None:
+        with _LOCK:
+            if _CATALOGO is None:
+                with open(ruta, encoding="utf-8") as archivo:
+                    _CATALOGO = Catalogo(json.load(archivo))
+    return _CATALOGO
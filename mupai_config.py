@@ -0,0 +1,64 @@
+"""
+Configuración compartida por las apps MUPAI.
+
+Los valores se buscan primero en los secrets de Streamlit (.streamlit/secrets.toml)
+y después en variables de entorno con el nombre de la clave en mayúsculas, de modo
+que los hilos de fondo y los scripts de línea de comandos usan la misma configuración.
+"""
+import hmac
+import os
+
+import streamlit as st
+
+# Carpeta local donde las apps guardan buzón de salida, archivos y bases de datos
+DIRECTORIO_DATOS = os.environ.get(
+    "MUPAI_DATOS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos")
+)
+
+
+def leer_config(clave, defecto=None):
+    """Valor de configuración: st.secrets[clave], o la variable de entorno CLAVE, o el defecto"""
+    try:
+        if clave in st.secrets:
+            return st.secrets[clave]
+    except Exception:
+        pass  # Sin secrets.toml o fuera de un script de Streamlit
+    return os.environ.get(clave.upper(), defecto)
+
+
+# Contraseña de acceso a las apps: la comparten los clientes para llenar los cuestionarios
+ADMIN_PASSWORD = leer_config("admin_password", "MUPAI2025")
+
+# Contraseña propia de los paneles "(admin)" de la barra lateral y de las páginas de
+# administración, que muestran datos de todos los clientes. Sin configurarla no se
+# muestran a nadie.
+PANEL_ADMIN_PASSWORD = leer_config("panel_admin_password")
+
+
+def es_administrador():
+    """True si esta sesión se identificó con PANEL_ADMIN_PASSWORD"""
+    return bool(PANEL_ADMIN_PASSWORD) and st.session_state.get("administrador", False)
+
+
+def mostrar_acceso_administrador():
+    """
+    Campo de la barra lateral para identificarse como administrador; se dibuja una vez
+    por rerun, antes de los paneles (admin). Devuelve es_administrador().
+    """
+    if not PANEL_ADMIN_PASSWORD or es_administrador():
+        return es_administrador()
+    with st.sidebar.expander("🔐 Administración", expanded=False):
+        clave = st.text_input("Contraseña de administración", type="password", key="password_administrador")
+        if clave:
+            if hmac.compare_digest(clave.encode("utf-8"), str(PANEL_ADMIN_PASSWORD).encode("utf-8")):
+                st.session_state.administrador = True
+                st.rerun()
+            st.error("❌ Contraseña incorrecta.")
+    return False
+
+
+def ruta_datos(*partes):
+    """Ruta dentro de DIRECTORIO_DATOS, creando la carpeta contenedora si no existe"""
+    ruta = os.path.join(DIRECTORIO_DATOS, *partes)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    return ruta
@@ -0,0 +1,728 @@
+"""
+Buzón de salida de los emails de resumen de las apps MUPAI.
+
+Los botones de envío ya no abren la conexión SMTP dentro del rerun: dejan el
+mensaje en un buzón local durable (un archivo JSON por mensaje, en una carpeta
+por estado: pendientes, enviados, fallidos) y regresan de
+inmediato. Un hilo de fondo del proceso entrega los mensajes pendientes y, si el
+servidor falla, reintenta con espera exponencial hasta MAX_INTENTOS. La interfaz
+consulta el estado del mensaje por su id mientras se entrega.
+
+En modo digest (configuración `email_digest`) los resúmenes no salen uno por uno:
+se acumulan hasta `digest_ventana_min` minutos o `digest_max_mensajes` mensajes y
+se entregan en un solo email con una sección por cliente y un adjunto combinado.
+
+Cada mensaje lleva una huella (hash del destinatario y del contenido, sin la marca
+de hora "Generado:"). Si llega el mismo resumen dentro de la ventana de
+deduplicación (doble clic, "Reenviar" sin cambios) no se vuelve a enviar: se
+devuelve el id del mensaje original, salvo que el envío se fuerce.
+
+Además, los clics simultáneos de una misma sesión sobre el mismo resumen ("Enviar"
+y "Reenviar" mientras el primero aún no termina) se agrupan en una sola operación
+en vuelo cuyo resultado comparten todas las llamadas (ver VueloUnico).
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import streamlit as st
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # Versiones de Streamlit sin runtime expuesto
+    get_script_run_ctx = None
+
+from mupai_config import DIRECTORIO_DATOS, es_administrador, leer_config
+from mupai_estructurado import adjuntos_combinados
+from mupai_metricas import REGISTRO_LATENCIAS
+from mupai_transporte import (
+    CIRCUITO, TRANSPORTES, CircuitoAbierto, crear_transporte, entregar, iniciar_servidor_smtp_local, obtener_transporte
+)
+
+DIRECTORIO_BUZON = os.path.join(DIRECTORIO_DATOS, "buzon_salida")
+
+_LOG = logging.getLogger(__name__)
+
+EMAIL_ADMINISTRACION = "administracion@muscleupgym.fitness"
+
+# Reintentos: 5 s, 10 s, 20 s... hasta 10 min entre intentos
+MAX_INTENTOS = 8
+ESPERA_BASE_S = 5
+ESPERA_MAX_S = 600
+
+# Cada cuánto revisa el hilo si hay mensajes vencidos (también despierta al encolar)
+INTERVALO_REVISION_S = 2
+
+# Cada cuánto refresca la interfaz el estado de un mensaje aún no entregado
+INTERVALO_SONDEO_S = 2
+
+# Modo digest: ventana y tamaño máximo por defecto de cada envío agrupado
+DIGEST_VENTANA_MIN = 15
+DIGEST_MAX_MENSAJES = 50
+
+# Un resumen idéntico dentro de esta ventana se considera duplicado
+DEDUP_VENTANA_MIN = 30
+MAX_HUELLAS_RECORDADAS = 5000
+
+# Líneas que cambian en cada generación sin que cambie el resumen
+LINEAS_VOLATILES = re.compile(r"^Generado: .*$", re.MULTILINE)
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_ENVIADO = "enviado"
+ESTADO_FALLIDO = "fallido"
+
+# Cada estado vive en su propia carpeta, así contar o listar pendientes no lee todo el historial
+CARPETAS_ESTADO = {ESTADO_PENDIENTE: "pendientes", ESTADO_ENVIADO: "enviados", ESTADO_FALLIDO: "fallidos"}
+
+
+def espera_reintento(intentos):
+    """Segundos hasta el siguiente intento tras `intentos` fallos (exponencial con ±10% de variación)"""
+    espera = min(ESPERA_MAX_S, ESPERA_BASE_S * 2 ** max(0, intentos - 1))
+    return espera * random.uniform(0.9, 1.1)
+
+
+def huella_resumen(cuerpo, destinatario):
+    """Hash del contenido y el destinatario; ignora la marca de hora de generación"""
+    contenido = LINEAS_VOLATILES.sub("", cuerpo)
+    return hashlib.sha256(f"{destinatario}\n{contenido}".encode("utf-8")).hexdigest()
+
+
+def config_digest():
+    """(activo, ventana en segundos, máximo de mensajes) del modo digest según la configuración"""
+    activo = str(leer_config("email_digest", "no")).strip().lower() in ("1", "true", "si", "sí", "yes")
+    ventana_s = float(leer_config("digest_ventana_min", DIGEST_VENTANA_MIN)) * 60
+    maximo = int(leer_config("digest_max_mensajes", DIGEST_MAX_MENSAJES))
+    return activo, ventana_s, maximo
+
+
+def construir_mime(mensaje):
+    """Mensaje MIME listo para enviar a partir del registro guardado en el buzón"""
+    msg = MIMEMultipart()
+    msg['From'] = mensaje["remitente"]
+    msg['To'] = mensaje["destinatario"]
+    msg['Subject'] = mensaje["asunto"]
+    if mensaje.get("cuerpo_html"):
+        alternativas = MIMEMultipart("alternative")
+        alternativas.attach(MIMEText(mensaje["cuerpo"], 'plain'))
+        alternativas.attach(MIMEText(mensaje["cuerpo_html"], 'html', 'utf-8'))
+        msg.attach(alternativas)
+    else:
+        msg.attach(MIMEText(mensaje["cuerpo"], 'plain'))
+    for adjunto in mensaje.get("adjuntos", []):
+        tipo_principal, subtipo = adjunto["tipo"].split("/", 1)
+        if tipo_principal == "text":
+            parte = MIMEText(adjunto["contenido"], subtipo, "utf-8")
+        else:
+            parte = MIMEApplication(adjunto["contenido"].encode("utf-8"), subtipo)
+        parte.add_header("Content-Disposition", "attachment", filename=adjunto["nombre"])
+        msg.attach(parte)
+    return msg
+
+
+def construir_digest(mensajes):
+    """
+    Un solo mensaje con una sección por evaluación, un adjunto de texto con todas juntas
+    y los datos estructurados combinados (un JSON y un CSV de varias filas por esquema)
+    """
+    mensajes = sorted(mensajes, key=lambda mensaje: mensaje["creado"])
+    desde = datetime.fromtimestamp(mensajes[0]["creado"]).strftime("%Y-%m-%d %H:%M")
+    hasta = datetime.fromtimestamp(mensajes[-1]["creado"]).strftime("%Y-%m-%d %H:%M")
+    separador = "#" * 37
+
+    indice = "\n".join(f"{i:>3}. {mensaje['asunto']}" for i, mensaje in enumerate(mensajes, 1))
+    secciones = "\n\n".join(
+        f"{separador}\n[{i}/{len(mensajes)}] {mensaje['asunto']}\n{separador}\n{mensaje['cuerpo']}"
+        for i, mensaje in enumerate(mensajes, 1)
+    )
+    cuerpo = f"""=====================================
+RESUMEN AGRUPADO MUPAI - {len(mensajes)} evaluaciones
+=====================================
+Periodo: {desde} a {hasta}
+
+ÍNDICE:
+{indice}
+
+{secciones}
+"""
+    nombre_base = f"evaluaciones_mupai_{datetime.fromtimestamp(mensajes[-1]['creado']).strftime('%Y%m%d_%H%M')}"
+    # Los JSON estructurados de cada mensaje se combinan en un solo JSON y un CSV por esquema
+    documentos = [
+        json.loads(adjunto["contenido"])
+        for mensaje in mensajes
+        for adjunto in mensaje.get("adjuntos", [])
+        if adjunto["tipo"] == "application/json"
+    ]
+    adjuntos = [{"nombre": f"{nombre_base}.txt", "tipo": "text/plain", "contenido": secciones}]
+    if documentos:
+        adjuntos.extend(adjuntos_combinados(documentos, nombre_base))
+
+    return {
+        "remitente": mensajes[0]["remitente"],
+        "destinatario": mensajes[0]["destinatario"],
+        "asunto": f"Resumen agrupado MUPAI - {len(mensajes)} evaluaciones ({desde} a {hasta})",
+        "cuerpo": cuerpo,
+        "adjuntos": adjuntos,
+    }
+
+
+def entregar_mensaje(mensaje):
+    """Entrega un registro del buzón con el transporte configurado; lanza excepción si falla"""
+    entregar(construir_mime(mensaje), mensaje["remitente"])
+
+
+class BuzonSalida:
+    """Cola durable de mensajes en disco con un hilo de entrega por proceso"""
+
+    def __init__(self, directorio=DIRECTORIO_BUZON, entregar=entregar_mensaje):
+        self.directorio = directorio
+        self.entregar = entregar
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pendientes = None  # id -> instante del próximo intento (se carga al arrancar)
+        self._digest = set()  # ids pendientes que esperan el próximo envío agrupado
+        self._digest_bloqueado_hasta = 0.0  # espera tras un digest fallido
+        self._lock_encolar = threading.Lock()
+        self._huellas = OrderedDict()  # huella -> (id del mensaje, instante), de la más antigua a la más nueva
+        self.suprimidos = 0
+
+    def _ruta(self, id_mensaje, estado):
+        return os.path.join(self.directorio, CARPETAS_ESTADO[estado], f"{id_mensaje}.json")
+
+    def _guardar(self, mensaje, estado_anterior=None):
+        """Escritura atómica en la carpeta de su estado; un lector nunca ve un archivo a medias"""
+        ruta = self._ruta(mensaje["id"], mensaje["estado"])
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(mensaje, archivo, ensure_ascii=False)
+        os.replace(temporal, ruta)
+        if estado_anterior and estado_anterior != mensaje["estado"]:
+            try:
+                os.remove(self._ruta(mensaje["id"], estado_anterior))
+            except FileNotFoundError:
+                pass
+
+    def leer(self, id_mensaje):
+        """Registro completo de un mensaje, o None si no existe"""
+        for estado in CARPETAS_ESTADO:
+            try:
+                with open(self._ruta(id_mensaje, estado), encoding="utf-8") as archivo:
+                    return json.load(archivo)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def ids(self, estado):
+        """Ids de los mensajes guardados en un estado"""
+        carpeta = os.path.join(self.directorio, CARPETAS_ESTADO[estado])
+        if not os.path.isdir(carpeta):
+            return []
+        return [nombre[:-5] for nombre in os.listdir(carpeta) if nombre.endswith(".json")]
+
+    def _cargar_pendientes(self):
+        """Recupera los mensajes que quedaron pendientes si el proceso se reinició"""
+        pendientes = {}
+        for id_mensaje in self.ids(ESTADO_PENDIENTE):
+            mensaje = self.leer(id_mensaje)
+            if mensaje:
+                pendientes[id_mensaje] = mensaje["proximo_intento"]
+                if mensaje.get("digest"):
+                    self._digest.add(id_mensaje)
+        return pendientes
+
+    def _duplicado(self, huella, ahora):
+        """Id del mensaje con la misma huella dentro de la ventana (si no terminó en fallo)"""
+        ventana_s = float(leer_config("dedup_ventana_min", DEDUP_VENTANA_MIN)) * 60
+        while self._huellas:
+            _, (_, instante) = next(iter(self._huellas.items()))
+            if ahora - instante <= ventana_s and len(self._huellas) <= MAX_HUELLAS_RECORDADAS:
+                break
+            self._huellas.popitem(last=False)
+        anterior = self._huellas.get(huella)
+        if anterior is None:
+            return None
+        mensaje = self.leer(anterior[0])
+        if mensaje is None or mensaje["estado"] == ESTADO_FALLIDO:
+            return None
+        return anterior[0]
+
+    def encolar(self, asunto, cuerpo, app, remitente=EMAIL_ADMINISTRACION, destinatario=EMAIL_ADMINISTRACION,
+                forzar=False, adjuntos=None, html=None):
+        """
+        Guarda el mensaje en disco, despierta al hilo de entrega y devuelve su id.
+        adjuntos es una lista de dicts {nombre, tipo, contenido} que viajan con el mensaje;
+        html, si se da, es la versión HTML del cuerpo y se envía como alternativa al texto.
+        Si el mismo resumen ya se encoló dentro de la ventana devuelve el id original
+        (salvo forzar=True) y cuenta el envío como suprimido.
+        """
+        with self._lock_encolar:
+            ahora = time.time()
+            huella = huella_resumen(cuerpo, destinatario)
+            if not forzar:
+                id_anterior = self._duplicado(huella, ahora)
+                if id_anterior is not None:
+                    self.suprimidos += 1
+                    return id_anterior
+            id_mensaje = self._encolar_nuevo(asunto, cuerpo, app, remitente, destinatario, huella, ahora,
+                                             adjuntos or [], html)
+            self._huellas.pop(huella, None)
+            self._huellas[huella] = (id_mensaje, ahora)
+            return id_mensaje
+
+    def _encolar_nuevo(self, asunto, cuerpo, app, remitente, destinatario, huella, ahora, adjuntos, html):
+        digest, ventana_s, _ = config_digest()
+        mensaje = {
+            "id": uuid.uuid4().hex,
+            "huella": huella,
+            "app": app,
+            "creado": ahora,
+            "estado": ESTADO_PENDIENTE,
+            "intentos": 0,
+            "proximo_intento": ahora + ventana_s if digest else ahora,
+            "digest": digest,
+            "ultimo_error": None,
+            "enviado_en": None,
+            "remitente": remitente,
+            "destinatario": destinatario,
+            "asunto": asunto,
+            "cuerpo": cuerpo,
+            "cuerpo_html": html,
+            "adjuntos": adjuntos,
+        }
+        self._guardar(mensaje)
+        self.iniciar()
+        with self._lock:
+            self._pendientes[mensaje["id"]] = mensaje["proximo_intento"]
+            if digest:
+                self._digest.add(mensaje["id"])
+        self._despertar.set()
+        return mensaje["id"]
+
+    def estado(self, id_mensaje):
+        """Estado resumido para la interfaz (sin los cuerpos ni los adjuntos del mensaje)"""
+        mensaje = self.leer(id_mensaje)
+        if mensaje is None:
+            return None
+        mensaje.pop("cuerpo", None)
+        mensaje.pop("cuerpo_html", None)
+        mensaje.pop("adjuntos", None)
+        return mensaje
+
+    def iniciar(self):
+        """Arranca el hilo de entrega una sola vez por proceso"""
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            if self._pendientes is None:
+                self._pendientes = self._cargar_pendientes()
+            self._hilo = threading.Thread(target=self._bucle, name="mupai-buzon-salida", daemon=True)
+            self._hilo.start()
+
+    def _vencidos(self):
+        """Ids individuales vencidos y, si toca enviar el digest, todos los ids agrupados"""
+        ahora = time.time()
+        _, _, maximo = config_digest()
+        with self._lock:
+            vencidos = sorted(id_mensaje for id_mensaje, cuando in self._pendientes.items()
+                              if cuando <= ahora and id_mensaje not in self._digest)
+            toca_digest = self._digest and ahora >= self._digest_bloqueado_hasta and (
+                len(self._digest) >= maximo or any(self._pendientes[i] <= ahora for i in self._digest)
+            )
+            # Los más antiguos primero, nunca más de `maximo` por envío
+            return vencidos, sorted(self._digest, key=self._pendientes.get)[:maximo] if toca_digest else []
+
+    def _bucle(self):
+        while True:
+            vencidos, digest = self._vencidos()
+            if digest:
+                try:
+                    self.procesar_digest(digest)
+                except Exception as e:
+                    _LOG.exception("Error inesperado al procesar un digest de %d mensajes", len(digest))
+                    self._error_inesperado(digest, e)
+            for id_mensaje in vencidos:
+                try:
+                    self.procesar(id_mensaje)
+                except Exception as e:  # Un mensaje dañado no debe detener la entrega de los demás
+                    _LOG.exception("Error inesperado al procesar el mensaje %s", id_mensaje)
+                    self._error_inesperado([id_mensaje], e)
+            self._despertar.wait(INTERVALO_REVISION_S)
+            self._despertar.clear()
+
+    def _error_inesperado(self, ids, error):
+        """
+        Un error fuera de la entrega (mensaje dañado, disco) cuenta como un intento fallido:
+        espera exponencial y, al agotar MAX_INTENTOS, a fallidos. Un mensaje en el que ni
+        eso se puede registrar sale de la cola del proceso en lugar de reintentarse cada
+        INTERVALO_REVISION_S.
+        """
+        for id_mensaje in ids:
+            try:
+                mensaje = self.leer(id_mensaje)
+                if mensaje is not None and mensaje["estado"] == ESTADO_PENDIENTE:
+                    self._registrar_resultado(mensaje, error)
+                    continue
+            except Exception:
+                _LOG.exception("No se pudo registrar el error del mensaje %s; sale de la cola", id_mensaje)
+            with self._lock:
+                self._pendientes.pop(id_mensaje, None)
+                self._digest.discard(id_mensaje)
+        with self._lock:
+            esperas = [self._pendientes[i] for i in ids if i in self._digest and i in self._pendientes]
+            if esperas:
+                self._digest_bloqueado_hasta = min(esperas)
+
+    def _registrar_resultado(self, mensaje, error, id_digest=None):
+        """Guarda el resultado de un intento: enviado, reintento programado o fallido"""
+        mensaje["intentos"] += 1
+        if error is not None:
+            mensaje["ultimo_error"] = str(error)
+            if mensaje["intentos"] >= MAX_INTENTOS:
+                mensaje["estado"] = ESTADO_FALLIDO
+            else:
+                mensaje["proximo_intento"] = time.time() + espera_reintento(mensaje["intentos"])
+        else:
+            mensaje["estado"] = ESTADO_ENVIADO
+            mensaje["enviado_en"] = time.time()
+            mensaje["ultimo_error"] = None
+            if id_digest:
+                mensaje["id_digest"] = id_digest
+        mensaje.pop("en_pausa", None)
+
+        self._guardar(mensaje, estado_anterior=ESTADO_PENDIENTE)
+        with self._lock:
+            if mensaje["estado"] == ESTADO_PENDIENTE:
+                self._pendientes[mensaje["id"]] = mensaje["proximo_intento"]
+            else:
+                self._pendientes.pop(mensaje["id"], None)
+                self._digest.discard(mensaje["id"])
+
+    def procesar(self, id_mensaje):
+        """Intenta entregar un mensaje y actualiza su estado o programa el reintento"""
+        mensaje = self.leer(id_mensaje)
+        if mensaje is None or mensaje["estado"] != ESTADO_PENDIENTE:
+            with self._lock:
+                self._pendientes.pop(id_mensaje, None)
+            return
+
+        error = None
+        inicio = time.perf_counter()
+        try:
+            self.entregar(mensaje)
+        except CircuitoAbierto as e:
+            self._posponer([mensaje], e)
+            return
+        except Exception as e:
+            error = e
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        REGISTRO_LATENCIAS.registrar(mensaje["app"], "envio_email_smtp", duracion_ms, 0)
+        self._registrar_resultado(mensaje, error)
+
+    def _posponer(self, mensajes, circuito_abierto):
+        """Con el circuito abierto no hubo intento: se reprograma sin gastar reintentos"""
+        proximo = time.time() + circuito_abierto.segundos
+        for mensaje in mensajes:
+            mensaje["proximo_intento"] = proximo
+            mensaje["ultimo_error"] = str(circuito_abierto)
+            mensaje["en_pausa"] = True
+            self._guardar(mensaje)
+            with self._lock:
+                self._pendientes[mensaje["id"]] = proximo
+
+    def procesar_digest(self, ids):
+        """Entrega en un solo email todos los mensajes agrupados pendientes"""
+        mensajes = [mensaje for mensaje in map(self.leer, ids)
+                    if mensaje is not None and mensaje["estado"] == ESTADO_PENDIENTE]
+        with self._lock:
+            self._digest.difference_update(set(ids) - {mensaje["id"] for mensaje in mensajes})
+        if not mensajes:
+            return
+
+        id_digest = uuid.uuid4().hex
+        error = None
+        inicio = time.perf_counter()
+        try:
+            self.entregar(construir_digest(mensajes))
+        except CircuitoAbierto as e:
+            self._posponer(mensajes, e)
+            with self._lock:
+                self._digest_bloqueado_hasta = time.time() + e.segundos
+            return
+        except Exception as e:
+            error = e
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        REGISTRO_LATENCIAS.registrar("digest", "envio_email_smtp", duracion_ms, 0)
+        for mensaje in mensajes:
+            self._registrar_resultado(mensaje, error, id_digest)
+        if error is not None:
+            bloqueado_hasta = min(mensaje["proximo_intento"] for mensaje in mensajes)
+            with self._lock:
+                self._digest_bloqueado_hasta = bloqueado_hasta
+
+    def resumen(self):
+        """Conteo de mensajes por estado en el buzón (para el panel de administración)"""
+        return {estado: len(self.ids(estado)) for estado in CARPETAS_ESTADO}
+
+    def en_digest(self):
+        """Mensajes que esperan el próximo envío agrupado"""
+        with self._lock:
+            return len(self._digest)
+
+    def reintentar_fallidos(self):
+        """Devuelve a la cola los mensajes que agotaron sus intentos"""
+        self.iniciar()
+        reintentados = 0
+        for id_mensaje in self.ids(ESTADO_FALLIDO):
+            mensaje = self.leer(id_mensaje)
+            if mensaje:
+                mensaje.update(estado=ESTADO_PENDIENTE, intentos=0, proximo_intento=time.time())
+                self._guardar(mensaje, estado_anterior=ESTADO_FALLIDO)
+                with self._lock:
+                    self._pendientes[id_mensaje] = mensaje["proximo_intento"]
+                reintentados += 1
+        self._despertar.set()
+        return reintentados
+
+
+# Buzón compartido por todas las sesiones del proceso
+BUZON = BuzonSalida()
+
+
+class _Vuelo:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class VueloUnico:
+    """
+    Agrupa las llamadas concurrentes con la misma clave en una sola ejecución.
+    La primera llamada ejecuta la función; las que llegan mientras sigue en curso
+    esperan y reciben el mismo resultado (o la misma excepción).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+        self.ejecutados = 0
+        self.compartidos = 0
+
+    def ejecutar(self, clave, funcion):
+        with self._lock:
+            vuelo = self._en_vuelo.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._en_vuelo[clave] = _Vuelo()
+                self.ejecutados += 1
+            else:
+                self.compartidos += 1
+        if not lider:
+            vuelo.listo.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+        try:
+            vuelo.resultado = funcion()
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+            vuelo.listo.set()
+        return vuelo.resultado
+
+    def en_vuelo(self):
+        with self._lock:
+            return len(self._en_vuelo)
+
+
+# Envíos en curso de todo el proceso, por sesión y huella del resumen
+VUELOS_ENVIO = VueloUnico()
+
+
+def id_sesion():
+    """Id de la sesión de Streamlit que ejecuta el script (None fuera de una sesión)"""
+    if get_script_run_ctx is None:
+        return None
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def enviar_una_vez(cuerpo, funcion):
+    """
+    Ejecuta funcion() (preparar, encolar y archivar el resumen) una sola vez por sesión y
+    resumen aunque lleguen clics simultáneos; todos reciben el id del mismo mensaje.
+    """
+    clave = (id_sesion(), huella_resumen(cuerpo, EMAIL_ADMINISTRACION))
+    return VUELOS_ENVIO.ejecutar(clave, funcion)
+
+
+def encolar_email(asunto, cuerpo, app, forzar=False, adjuntos=None, html=None):
+    """
+    Deja un email para administración en el buzón de salida y devuelve su id.
+    Un resumen idéntico a uno reciente devuelve el id original sin reenviarlo, salvo forzar=True.
+    """
+    return BUZON.encolar(asunto, cuerpo, app, forzar=forzar, adjuntos=adjuntos, html=html)
+
+
+def _pintar_estado_envio(id_mensaje):
+    estado = BUZON.estado(id_mensaje)
+    final = estado is None or estado["estado"] != ESTADO_PENDIENTE
+    if final and st.session_state.pop(f"sondeo_envio_{id_mensaje}", False):
+        # El intervalo del fragmento se fijó al crearlo: un rerun completo lo vuelve a
+        # crear sin sondeo (y actualiza el resto de la página con el envío terminado)
+        st.rerun(scope="app")
+    if estado is None:
+        st.warning("⚠️ No se encontró el email en el buzón de salida.")
+    elif estado["estado"] == ESTADO_ENVIADO:
+        st.success("✅ Email entregado a administración")
+    elif estado["estado"] == ESTADO_FALLIDO:
+        st.error(f"❌ No se pudo entregar el email tras {estado['intentos']} intentos. Contacta a soporte técnico.")
+    elif estado.get("en_pausa"):
+        st.info("📬 El servidor de correo está en pausa por fallos recientes. Tu email quedó guardado "
+                "en la cola y se enviará en cuanto se recupere; no necesitas volver a enviarlo.")
+    elif estado["intentos"] == 0 and estado.get("digest"):
+        hora = datetime.fromtimestamp(estado["proximo_intento"]).strftime("%H:%M")
+        st.info(f"📬 Tu resumen se incluirá en el envío agrupado a administración (a más tardar a las {hora}).")
+    elif estado["intentos"] == 0:
+        st.info("📬 Email en cola de envío; se entregará en unos segundos.")
+    else:
+        espera = max(0, estado["proximo_intento"] - time.time())
+        st.warning(f"🔁 El servidor de correo no respondió (intento {estado['intentos']} de {MAX_INTENTOS}). "
+                   f"Reintentando en {espera:.0f} s; no necesitas volver a enviarlo.")
+
+
+def mostrar_estado_envio(id_mensaje):
+    """
+    Muestra el estado de entrega; mientras esté pendiente se refresca solo sin rerun
+    completo, y al terminar el envío hace un rerun de la app para dejar de sondear
+    """
+    estado = BUZON.estado(id_mensaje)
+    pendiente = estado is not None and estado["estado"] == ESTADO_PENDIENTE
+    st.session_state[f"sondeo_envio_{id_mensaje}"] = pendiente
+    st.fragment(_pintar_estado_envio, run_every=INTERVALO_SONDEO_S if pendiente else None)(id_mensaje)
+
+
+def mostrar_panel_buzon():
+    """Panel de administración (barra lateral) con el estado del buzón de salida"""
+    if not es_administrador():
+        return
+    with st.sidebar.expander("📬 Buzón de salida de emails (admin)", expanded=False):
+        conteo = BUZON.resumen()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Pendientes", conteo[ESTADO_PENDIENTE])
+        col2.metric("Enviados", conteo[ESTADO_ENVIADO])
+        col3.metric("Fallidos", conteo[ESTADO_FALLIDO])
+        digest, ventana_s, maximo = config_digest()
+        st.caption(f"Envíos duplicados suprimidos en este proceso: {BUZON.suprimidos} · "
+                   f"clics simultáneos agrupados: {VUELOS_ENVIO.compartidos}")
+        if digest:
+            st.caption(f"Modo digest: {BUZON.en_digest()} en espera (se envía cada {ventana_s / 60:.0f} min o {maximo} mensajes)")
+        if conteo[ESTADO_FALLIDO] and st.button("🔁 Reintentar fallidos", key="reintentar_buzon"):
+            st.caption(f"{BUZON.reintentar_fallidos()} mensajes devueltos a la cola.")
+
+        transporte = obtener_transporte()
+        st.markdown(f"**Transporte:** `{transporte.nombre}`")
+
+        circuito = CIRCUITO.estadisticas()
+        iconos = {"cerrado": "🟢", "semiabierto": "🟡", "abierto": "🔴"}
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Circuito", f"{iconos[circuito['estado']]} {circuito['estado']}")
+        col2.metric("Latencia p50 / p95", f"{circuito['ms_p50']:.0f} / {circuito['ms_p95']:.0f} ms")
+        col3.metric("Error reciente", f"{circuito['tasa_error_reciente']:.0%}")
+        st.caption(f"Éxitos: {circuito['exitos']} · fallos: {circuito['fallos']} · "
+                   f"sin conectar (circuito abierto): {circuito['rechazados']} · aperturas: {circuito['aperturas']}")
+        if circuito["estado"] == "abierto":
+            st.caption(f"Prueba de recuperación en {circuito['segundos_para_prueba']:.0f} s. "
+                       f"Último error: {circuito['ultimo_error']}")
+        if not hasattr(transporte, "pool"):
+            st.caption(" · ".join(f"{clave}: {valor}" for clave, valor in transporte.estadisticas().items()))
+            return
+
+        pool = transporte.estadisticas()
+        col1, col2 = st.columns(2)
+        col1.metric("Reutilización", f"{pool['tasa_reutilizacion']:.0%}", f"{pool['reutilizaciones']} de {pool['reutilizaciones'] + pool['handshakes']}")
+        col2.metric("Handshake ahorrado", f"{pool['ms_ahorrados_estimados'] / 1000:.1f} s", f"{pool['ms_handshake_promedio']:.0f} ms c/u")
+        st.caption(f"Conexiones libres: {pool['conexiones_libres']} · en uso: {pool['conexiones_en_uso']} · "
+                   f"reconexiones: {pool['reconexiones']} · descartadas: {pool['descartadas']}")
+
+
+# ==================== SIMULACIÓN DE CARGA ====================
+
+def simular_envios(n, transporte, tamano_cuerpo=6000, limite_s=300):
+    """
+    Encola n resúmenes simulados en un buzón temporal y espera a que el hilo los entregue,
+    como mucho limite_s segundos (un transporte caído deja mensajes en reintento).
+    Devuelve tiempos de encolado (lo que espera el usuario), el throughput de extremo a
+    extremo y los mensajes que seguían pendientes al cumplirse el límite.
+    """
+    import tempfile
+
+    cuerpo = ("Resumen simulado MUPAI - " * (tamano_cuerpo // 25 + 1))[:tamano_cuerpo]
+    with tempfile.TemporaryDirectory() as directorio:
+        buzon = BuzonSalida(
+            directorio,
+            entregar=lambda mensaje: transporte.enviar(construir_mime(mensaje), mensaje["remitente"]),
+        )
+        tiempos_ms = []
+        inicio = time.perf_counter()
+        for i in range(n):
+            t0 = time.perf_counter()
+            # Cuerpo distinto por mensaje: si no, la deduplicación suprimiría todos menos el primero
+            buzon.encolar(f"Simulación {i}", f"{i}\n{cuerpo}", app="simulacion")
+            tiempos_ms.append((time.perf_counter() - t0) * 1000)
+        fin = time.monotonic() + limite_s
+        while buzon.resumen()[ESTADO_PENDIENTE] and time.monotonic() < fin:
+            time.sleep(0.05)
+        total_s = time.perf_counter() - inicio
+        conteo = buzon.resumen()
+
+    tiempos_ms.sort()
+    return {
+        "mensajes": n,
+        "enviados": conteo[ESTADO_ENVIADO],
+        "fallidos": conteo[ESTADO_FALLIDO],
+        "pendientes": conteo[ESTADO_PENDIENTE],
+        "encolar_p50_ms": round(tiempos_ms[len(tiempos_ms) // 2], 3),
+        "encolar_max_ms": round(tiempos_ms[-1], 3),
+        "segundos_total": round(total_s, 2),
+        "mensajes_por_segundo": round(conteo[ESTADO_ENVIADO] / total_s, 1),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simula envíos de resúmenes sin tocar Zoho y mide el throughput")
+    parser.add_argument("-n", type=int, default=1000, help="Número de resúmenes simulados")
+    parser.add_argument("--transporte", choices=[t for t in TRANSPORTES if t != "smtp"], default="memoria")
+    parser.add_argument("--limite", type=float, default=300, help="Segundos máximos de espera a que se vacíe la cola")
+    args = parser.parse_args()
+
+    servidor = None
+    if args.transporte == "smtp_local":
+        # Servidor de prueba en un puerto libre, apuntando el transporte hacia él
+        servidor = iniciar_servidor_smtp_local(puerto=0)
+        os.environ["SMTP_LOCAL_PUERTO"] = str(servidor.server_address[1])
+    resultado = simular_envios(args.n, crear_transporte(args.transporte), limite_s=args.limite)
+    if servidor is not None:
+        resultado["recibidos_por_servidor"] = servidor.recibidos
+        servidor.shutdown()
+    for clave, valor in resultado.items():
+        print(f"{clave:>24}: {valor}")
+    if resultado["pendientes"]:
+        print(f"Aviso: {resultado['pendientes']} mensajes seguían pendientes al cumplirse el límite de {args.limite:.0f} s")
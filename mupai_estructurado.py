@@ -0,0 +1,146 @@
+"""
+Adjuntos estructurados (JSON y CSV de una fila) para los emails de resumen MUPAI.
+
+Cada app arma un dict plano con los resultados de la evaluación y este módulo lo
+serializa según un esquema versionado, de modo que administración pueda importar
+las cifras sin volver a leer el texto del resumen. Al cambiar el significado o el
+orden de los campos hay que subir la versión del esquema correspondiente, una sola
+vez por entrega: los cambios que aún no salen se acumulan en la misma versión.
+"""
+import csv
+import io
+import json
+import re
+from datetime import datetime
+
+# Campos de cada esquema, en el orden en que aparecen en el CSV
+CAMPOS_EVALUACION_FITNESS = (
+    # Cliente
+    "nombre", "email", "telefono", "edad", "sexo", "fecha_evaluacion",
+    # Antropometría y composición
+    "peso_kg", "estatura_cm", "imc", "metodo_grasa", "grasa_medida_pct", "grasa_corregida_pct",
+    "mlg_kg", "masa_grasa_kg", "categoria_grasa",
+    # Índices metabólicos
+    "tmb_kcal", "ffmi", "nivel_ffmi", "ffmi_max_estimado", "potencial_pct", "edad_metabolica",
+    # Actividad
+    "nivel_actividad", "geaf", "eta", "dias_fuerza", "kcal_sesion", "gee_promedio_kcal", "gasto_total_kcal",
+    # Plan nutricional
+    "nivel_entrenamiento", "fase", "plan_elegido", "psmf_aplicable", "es_psmf", "ingesta_kcal", "kcal_por_kg",
+    "proteina_g", "proteina_pct", "grasa_g", "grasa_pct", "carbo_g", "carbo_pct",
+    # Proyección a 6 semanas
+    "proyeccion_pct", "cambio_semanal_kg_min", "cambio_semanal_kg_max",
+    "cambio_6sem_kg_min", "cambio_6sem_kg_max",
+)
+
+CAMPOS_PATRONES_ALIMENTARIOS = (
+    # Cliente
+    "nombre", "email", "telefono", "edad", "sexo", "fecha_evaluacion",
+    # Totales del perfil
+    "total_proteinas_grasas", "total_proteinas_magras", "total_grasas", "total_carbohidratos",
+    "total_vegetales", "total_frutas", "total_metodos_coccion", "total_antojos",
+    # Listas de selección
+    "proteinas_grasas", "proteinas_magras", "grasas", "carbohidratos", "vegetales", "frutas",
+    "aceites_coccion", "bebidas_sin_calorias", "metodos_coccion", "alergias", "intolerancias",
+    "antojos_dulces", "antojos_salados", "antojos_comida_rapida", "antojos_bebidas", "antojos_picantes",
+    # Texto libre
+    "otra_alergia", "otra_intolerancia", "alimento_adicional", "otro_metodo_coccion",
+    "otros_antojos", "frecuencia_comidas", "otra_frecuencia", "sugerencias_menus",
+)
+
+# nombre del esquema -> (versión, campos)
+ESQUEMAS = {
+    "evaluacion_fitness": (2, CAMPOS_EVALUACION_FITNESS),
+    "patrones_alimentarios": (1, CAMPOS_PATRONES_ALIMENTARIOS),
+}
+
+# Separador de los valores de una lista dentro de una celda del CSV
+SEPARADOR_LISTA = "; "
+
+
+def _valor_json(valor):
+    """Convierte valores no nativos (p. ej. numpy) a tipos serializables"""
+    if isinstance(valor, float):
+        return round(valor, 2)
+    if isinstance(valor, (list, tuple)):
+        return [_valor_json(elemento) for elemento in valor]
+    if hasattr(valor, "item"):
+        return _valor_json(valor.item())
+    if valor is None or isinstance(valor, (bool, int, str)):
+        return valor
+    return str(valor)
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, list):
+        return SEPARADOR_LISTA.join(str(elemento) for elemento in valor)
+    return valor
+
+
+def registro_estructurado(esquema, datos):
+    """
+    Registro con los campos del esquema en orden; los que falten quedan en None.
+    Un campo que no pertenece al esquema es un error de programación y se rechaza.
+    """
+    version, campos = ESQUEMAS[esquema]
+    desconocidos = set(datos) - set(campos)
+    if desconocidos:
+        raise ValueError(f"Campos fuera del esquema {esquema} v{version}: {sorted(desconocidos)}")
+    return {campo: _valor_json(datos.get(campo)) for campo in campos}
+
+
+def adjuntos_estructurados(esquema, datos, nombre_base):
+    """
+    Lista de adjuntos {nombre, tipo, contenido} para el buzón de salida:
+    un JSON con cabecera de esquema y un CSV de una sola fila con los mismos datos.
+    """
+    version, campos = ESQUEMAS[esquema]
+    registro = registro_estructurado(esquema, datos)
+    nombre_base = re.sub(r"[^\w\-]+", "_", nombre_base).strip("_") or esquema
+
+    contenido_json = json.dumps({
+        "esquema": f"mupai.{esquema}",
+        "version": version,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "datos": registro,
+    }, ensure_ascii=False, separators=(",", ":"))
+
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator="\n")
+    escritor.writerow(("esquema", "version") + campos)
+    escritor.writerow([f"mupai.{esquema}", version] + [_valor_csv(registro[campo]) for campo in campos])
+
+    return [
+        {"nombre": f"{nombre_base}.json", "tipo": "application/json", "contenido": contenido_json},
+        {"nombre": f"{nombre_base}.csv", "tipo": "text/csv", "contenido": salida.getvalue()},
+    ]
+
+
+def adjuntos_combinados(documentos, nombre_base):
+    """
+    Adjuntos de un envío agrupado a partir de los JSON de adjuntos_estructurados: un solo
+    JSON con el arreglo de documentos y un CSV de varias filas por esquema y versión.
+    """
+    nombre_base = re.sub(r"[^\w\-]+", "_", nombre_base).strip("_") or "evaluaciones"
+    adjuntos = [{
+        "nombre": f"{nombre_base}.json",
+        "tipo": "application/json",
+        "contenido": json.dumps(documentos, ensure_ascii=False, separators=(",", ":")),
+    }]
+    por_esquema = {}
+    for documento in documentos:
+        por_esquema.setdefault((documento["esquema"], documento["version"]), []).append(documento["datos"])
+    for (esquema, version), registros in por_esquema.items():
+        campos = tuple(registros[0])
+        salida = io.StringIO()
+        escritor = csv.writer(salida, lineterminator="\n")
+        escritor.writerow(("esquema", "version") + campos)
+        for registro in registros:
+            escritor.writerow([esquema, version] + [_valor_csv(registro.get(campo)) for campo in campos])
+        adjuntos.append({
+            "nombre": f"{nombre_base}_{esquema.rsplit('.', 1)[-1]}_v{version}.csv",
+            "tipo": "text/csv",
+            "contenido": salida.getvalue(),
+        })
+    return adjuntos
@@ -0,0 +1,235 @@
+"""
+Exportación columnar (Parquet) de las evaluaciones del almacén local.
+
+Las evaluaciones guardadas por mupai_almacen se escriben como datasets Parquet con
+particiones estilo Hive, uno por app porque cada una tiene su propio esquema:
+
+    datos/parquet/evaluacion_fitness/sucursal=centro/mes=2026-03/parte-20260401T020000.parquet
+
+Las columnas siguen los esquemas de mupai_estructurado con tipos fijos (números como
+float64/int64, es_psmf como booleano, las selecciones de alimentos como listas de
+texto), así que se leen sin parsear texto. Cada parte lleva en los metadatos de su
+esquema Arrow el nombre y la versión con que se escribió (`esquema`, `version`).
+
+Un dataset puede mezclar versiones: las partes escritas antes de que el esquema ganara
+una columna no la tienen (p. ej. psmf_aplicable en evaluacion_fitness v1). Los tipos de
+una columna nunca cambian entre versiones, así que basta leer con el esquema actual;
+las columnas que le faltan a una parte vieja salen nulas. Sin un esquema explícito,
+pyarrow toma el de la primera parte que encuentra y puede omitir columnas nuevas:
+
+    abrir_dataset("evaluacion_fitness").to_table().to_pandas()
+    pq.read_schema(ruta_parte).metadata[b"version"]
+
+La exportación es incremental: `_estado.json` guarda hasta qué `actualizado` ya se
+exportó y cada corrida solo agrega partes nuevas con las filas posteriores. Como una
+evaluación se actualiza mientras el cliente avanza, solo se exportan las que llevan
+ESPERA_CIERRE_S sin cambios; si una fila vuelve a cambiar después, aparece otra vez
+en una parte posterior y basta quedarse con la de mayor `actualizado` por `id`.
+
+Cada despliegue (sucursal) tiene su propio almacén; la sucursal de las particiones
+sale de la configuración `sucursal`.
+"""
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from mupai_almacen import ALMACEN
+from mupai_config import DIRECTORIO_DATOS, leer_config
+from mupai_estructurado import ESQUEMAS
+
+DIRECTORIO_PARQUET = os.path.join(DIRECTORIO_DATOS, "parquet")
+
+# Segundos sin cambios para considerar cerrada una evaluación
+ESPERA_CIERRE_S = 2 * 60 * 60
+
+# Filas leídas del almacén por consulta
+LOTE_LECTURA = 5000
+
+SUCURSAL_POR_DEFECTO = "principal"
+
+# Tipos de las columnas que no son float64
+CAMPOS_TEXTO = {
+    "nombre", "email", "telefono", "sexo", "fecha_evaluacion", "metodo_grasa", "categoria_grasa",
+    "nivel_ffmi", "nivel_actividad", "dias_fuerza", "kcal_sesion", "nivel_entrenamiento", "fase",
+    "plan_elegido", "otra_alergia", "otra_intolerancia", "alimento_adicional", "otro_metodo_coccion",
+    "otros_antojos", "frecuencia_comidas", "otra_frecuencia", "sugerencias_menus",
+}
+CAMPOS_ENTEROS = {
+    "edad", "total_proteinas_grasas", "total_proteinas_magras", "total_grasas", "total_carbohidratos",
+    "total_vegetales", "total_frutas", "total_metodos_coccion", "total_antojos",
+}
+CAMPOS_BOOLEANOS = {"psmf_aplicable", "es_psmf"}
+CAMPOS_LISTA = {
+    "proteinas_grasas", "proteinas_magras", "grasas", "carbohidratos", "vegetales", "frutas",
+    "aceites_coccion", "bebidas_sin_calorias", "metodos_coccion", "alergias", "intolerancias",
+    "antojos_dulces", "antojos_salados", "antojos_comida_rapida", "antojos_bebidas", "antojos_picantes",
+}
+
+
+def _tipo(campo):
+    if campo in CAMPOS_TEXTO:
+        return pa.string()
+    if campo in CAMPOS_ENTEROS:
+        return pa.int64()
+    if campo in CAMPOS_BOOLEANOS:
+        return pa.bool_()
+    if campo in CAMPOS_LISTA:
+        return pa.list_(pa.string())
+    return pa.float64()
+
+
+def esquema_arrow(esquema):
+    """Esquema Arrow de un dataset: metadatos de la fila y los campos del esquema versionado"""
+    version, campos = ESQUEMAS[esquema]
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("creado", pa.timestamp("s", tz="UTC")),
+            ("actualizado", pa.timestamp("s", tz="UTC")),
+        ]
+        + [(campo, _tipo(campo)) for campo in campos],
+        metadata={"esquema": f"mupai.{esquema}", "version": str(version)},
+    )
+
+
+# Particiones de cada dataset, en el orden de las carpetas
+PARTICIONES = pa.schema([("sucursal", pa.string()), ("mes", pa.string())])
+
+
+def abrir_dataset(esquema, directorio=DIRECTORIO_PARQUET):
+    """Dataset de una app con el esquema actual: las partes de versiones anteriores se leen con nulos"""
+    return ds.dataset(
+        os.path.join(directorio, esquema),
+        schema=pa.unify_schemas([esquema_arrow(esquema), PARTICIONES]),
+        partitioning=ds.partitioning(PARTICIONES, flavor="hive"),
+    )
+
+
+def _convertir(valor, tipo):
+    """Valor del JSON del almacén al tipo de su columna; lo que no se puede convertir queda nulo"""
+    if valor is None or valor == "":
+        return None
+    try:
+        if pa.types.is_list(tipo):
+            return [str(elemento) for elemento in valor] if isinstance(valor, list) else [str(valor)]
+        if pa.types.is_string(tipo):
+            return str(valor)
+        if pa.types.is_boolean(tipo):
+            return bool(valor)
+        if pa.types.is_integer(tipo):
+            return int(float(valor))
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _nombre_particion(texto):
+    return re.sub(r"[^\w\-]+", "_", str(texto)).strip("_") or SUCURSAL_POR_DEFECTO
+
+
+class ExportadorParquet:
+    """Exporta por lotes las evaluaciones cerradas posteriores a la última exportación"""
+
+    def __init__(self, directorio=DIRECTORIO_PARQUET, almacen=ALMACEN, sucursal=None):
+        self.directorio = directorio
+        self.almacen = almacen
+        self.sucursal = _nombre_particion(sucursal or leer_config("sucursal", SUCURSAL_POR_DEFECTO))
+        self.ruta_estado = os.path.join(directorio, "_estado.json")
+
+    def leer_estado(self):
+        try:
+            with open(self.ruta_estado, encoding="utf-8") as archivo:
+                return json.load(archivo)
+        except FileNotFoundError:
+            return {"hasta": 0.0, "filas": 0, "partes": 0}
+
+    def _guardar_estado(self, estado):
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = f"{self.ruta_estado}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(estado, archivo, indent=2)
+        os.replace(temporal, self.ruta_estado)
+
+    def _filas_nuevas(self, desde, hasta):
+        """Filas del almacén con desde < actualizado <= hasta, por lotes y en orden"""
+        ultimo = (desde, "")
+        while True:
+            filas = self.almacen.consultar(
+                "SELECT id, app, creado, actualizado, fecha, datos FROM evaluaciones "
+                "WHERE (actualizado, id) > (?, ?) AND actualizado <= ? "
+                "ORDER BY actualizado, id LIMIT ?",
+                (*ultimo, hasta, LOTE_LECTURA),
+            )
+            yield from filas
+            if len(filas) < LOTE_LECTURA:
+                return
+            ultimo = (filas[-1]["actualizado"], filas[-1]["id"])
+
+    def _escribir_parte(self, app, mes, filas, sello):
+        esquema = esquema_arrow(app)
+        columnas = {nombre: [] for nombre in esquema.names}
+        for fila in filas:
+            datos = json.loads(fila["datos"])
+            columnas["id"].append(fila["id"])
+            columnas["creado"].append(datetime.fromtimestamp(fila["creado"], timezone.utc))
+            columnas["actualizado"].append(datetime.fromtimestamp(fila["actualizado"], timezone.utc))
+            for campo in esquema.names[3:]:
+                columnas[campo].append(_convertir(datos.get(campo), esquema.field(campo).type))
+        tabla = pa.Table.from_pydict(columnas, schema=esquema)
+        carpeta = os.path.join(self.directorio, app, f"sucursal={self.sucursal}", f"mes={mes}")
+        os.makedirs(carpeta, exist_ok=True)
+        ruta = os.path.join(carpeta, f"parte-{sello}.parquet")
+        # Se escribe con otro nombre y se renombra: un lector nunca ve una parte a medias
+        pq.write_table(tabla, f"{ruta}.tmp", compression="zstd")
+        os.replace(f"{ruta}.tmp", ruta)
+        return ruta
+
+    def exportar(self, ahora=None, espera_cierre_s=ESPERA_CIERRE_S):
+        """Escribe las partes nuevas y avanza la marca; devuelve {filas, partes, rutas}"""
+        ahora = time.time() if ahora is None else ahora
+        estado = self.leer_estado()
+        hasta = ahora - espera_cierre_s
+        if hasta <= estado["hasta"]:
+            return {"filas": 0, "partes": 0, "rutas": []}
+
+        grupos = defaultdict(list)
+        for fila in self._filas_nuevas(estado["hasta"], hasta):
+            if fila["app"] in ESQUEMAS:
+                grupos[(fila["app"], (fila["fecha"] or "")[:7] or "sin_fecha")].append(fila)
+
+        sello = datetime.fromtimestamp(ahora).strftime("%Y%m%dT%H%M%S")
+        rutas = [self._escribir_parte(app, mes, filas, sello) for (app, mes), filas in sorted(grupos.items())]
+        filas = sum(len(grupo) for grupo in grupos.values())
+        self._guardar_estado({
+            "hasta": hasta,
+            "filas": estado["filas"] + filas,
+            "partes": estado["partes"] + len(rutas),
+            "ultima_exportacion": datetime.fromtimestamp(ahora).isoformat(timespec="seconds"),
+        })
+        return {"filas": filas, "partes": len(rutas), "rutas": rutas}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Exporta las evaluaciones MUPAI nuevas a Parquet particionado")
+    parser.add_argument("--directorio", default=DIRECTORIO_PARQUET)
+    parser.add_argument("--sucursal", help="Partición de sucursal (por defecto la configuración `sucursal`)")
+    parser.add_argument("--espera-cierre-min", type=float, default=ESPERA_CIERRE_S / 60,
+                        help="Minutos sin cambios para exportar una evaluación")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    exportador = ExportadorParquet(args.directorio, sucursal=args.sucursal)
+    resultado = exportador.exportar(espera_cierre_s=args.espera_cierre_min * 60)
+    print(f"{resultado['filas']} evaluaciones en {resultado['partes']} partes "
+          f"({(time.perf_counter() - inicio) * 1000:.0f} ms)")
+    for ruta in resultado["rutas"]:
+        print(f"  {ruta}")
@@ -0,0 +1,281 @@
+"""
+Índice invertido alimento -> clientes para consultas de coaches.
+
+Para cada alimento del catálogo (incluidas las alergias e intolerancias, que también
+son opciones del cuestionario) el índice guarda el conjunto de clientes que lo
+marcaron como un bitmap empaquetado: una fila de bytes por alimento y un bit por
+cliente. Una consulta booleana es entonces un puñado de AND/OR/NOT de NumPy sobre
+filas de unos pocos KB, en microsegundos aunque haya decenas de miles de clientes.
+
+El índice se construye una vez por proceso desde la tabla `selecciones` (la matriz
+de bitsets de mupai_selecciones, transpuesta) y se actualiza en memoria en cada
+envío del cuestionario, cambiando solo la columna de ese cliente (indexar_selecciones,
+suscrito por mupai_almacen.registrar_suscriptores).
+
+Consultas (mayúsculas o minúsculas, con o sin acentos):
+
+    salmón Y arrachera Y NO intolerancia:lactosa
+    (atún O sardina) Y NO alergia:pescado
+    "aguja norteña" O ribeye Y NO alergia:"frutos secos"
+
+Un término sin prefijo busca entre los alimentos; `alergia:` e `intolerancia:` buscan
+en esas preguntas y `<clave>:` en una multiselección concreta. Un término que
+coincide con varios alimentos (p. ej. "salmón") equivale a su O.
+"""
+import re
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+from mupai_almacen import ALMACEN
+from mupai_catalogo import cargar_catalogo, normalizar_nombre
+from mupai_config import es_administrador
+from mupai_selecciones import cargar_matriz
+
+# Prefijos de término -> clave de la multiselección
+PREFIJOS = {
+    "alergia": "alergias_alimentarias",
+    "intolerancia": "intolerancias_digestivas",
+}
+CLAVES_RESTRICCIONES = frozenset(PREFIJOS.values())
+
+OPERADORES = {
+    "y": "and", "and": "and", "&": "and",
+    "o": "or", "or": "or", "|": "or",
+    "no": "not", "not": "not", "-": "not",
+}
+
+_TOKEN = re.compile(r'\(|\)|(?:[^\s()"]+:)?"[^"]*"|[^\s()]+')
+
+# Clientes reservados por adelantado al crecer el índice
+CAPACIDAD_INICIAL = 1024
+
+
+class IndiceInvertido:
+    """Bitmaps alimento x clientes con actualización por columna"""
+
+    def __init__(self, catalogo=None):
+        self.catalogo = catalogo or cargar_catalogo()
+        self.clientes = []
+        self._posicion = {}
+        self._filas = np.zeros((len(self.catalogo), CAPACIDAD_INICIAL // 8), dtype=np.uint8)
+        self._vivos = np.zeros(CAPACIDAD_INICIAL // 8, dtype=np.uint8)
+        self._nombres = [normalizar_nombre(a.nombre) for a in self.catalogo.alimentos]
+        self._lock = threading.Lock()
+
+    def _asegurar_capacidad(self, clientes):
+        bytes_necesarios = (clientes + 7) // 8
+        if bytes_necesarios <= self._filas.shape[1]:
+            return
+        nuevos = max(bytes_necesarios, self._filas.shape[1] * 2)
+        self._filas = np.pad(self._filas, ((0, 0), (0, nuevos - self._filas.shape[1])))
+        self._vivos = np.pad(self._vivos, (0, nuevos - len(self._vivos)))
+
+    def construir(self, clientes, matriz):
+        """Índice completo desde una matriz clientes x palabras (transpuesta y empaquetada por cliente)"""
+        if len(clientes) != len(matriz):
+            raise ValueError("Debe haber un bitset por cliente")
+        with self._lock:
+            n = len(clientes)
+            self.clientes = list(clientes)
+            self._posicion = {cliente: i for i, cliente in enumerate(self.clientes)}
+            self._filas = np.zeros((len(self.catalogo), 0), dtype=np.uint8)
+            self._vivos = np.zeros(0, dtype=np.uint8)
+            self._asegurar_capacidad(max(n, CAPACIDAD_INICIAL))
+            if n:
+                pertenencia = np.unpackbits(
+                    np.ascontiguousarray(matriz, dtype="<u8").view(np.uint8), axis=1, bitorder="little"
+                )[:, :len(self.catalogo)]
+                empaquetado = np.packbits(pertenencia.T, axis=1, bitorder="little")
+                self._filas[:, :empaquetado.shape[1]] = empaquetado
+                self._vivos[:empaquetado.shape[1]] = np.packbits(np.ones(n, dtype=np.uint8), bitorder="little")
+        return self
+
+    def actualizar(self, cliente, bits):
+        """Reemplaza las selecciones de un cliente (nuevo o existente) tocando solo su columna"""
+        marcados = np.unpackbits(
+            np.ascontiguousarray(bits, dtype="<u8").view(np.uint8), bitorder="little"
+        )[:len(self.catalogo)].astype(bool)
+        with self._lock:
+            posicion = self._posicion.get(cliente)
+            if posicion is None:
+                posicion = len(self.clientes)
+                self._asegurar_capacidad(posicion + 1)
+                self.clientes.append(cliente)
+                self._posicion[cliente] = posicion
+            byte, mascara = divmod(posicion, 8)
+            mascara = np.uint8(1 << mascara)
+            columna = self._filas[:, byte]
+            columna &= ~mascara
+            columna[marcados] |= mascara
+            self._vivos[byte] |= mascara
+
+    # ---------- consultas ----------
+
+    def resolver(self, termino):
+        """IDs de alimentos que coinciden con un término (con prefijo opcional)"""
+        prefijo, separador, texto = termino.partition(":")
+        if separador and prefijo.lower() in PREFIJOS:
+            claves = {PREFIJOS[prefijo.lower()]}
+        elif separador and any(a.clave == prefijo for a in self.catalogo.alimentos):
+            claves = {prefijo}
+        else:
+            claves, texto = None, termino
+        buscado = normalizar_nombre(texto.strip('"'))
+        ids = [
+            alimento.id for alimento in self.catalogo.alimentos
+            if (alimento.clave in claves if claves else alimento.clave not in CLAVES_RESTRICCIONES)
+            and buscado in self._nombres[alimento.id]
+        ]
+        if not buscado or not ids:
+            raise ValueError(f"Ningún alimento del catálogo coincide con: {termino}")
+        return ids
+
+    def _bitmap_termino(self, termino):
+        return np.bitwise_or.reduce(self._filas[self.resolver(termino)], axis=0)
+
+    def evaluar(self, consulta):
+        """Bitmap de clientes (bytes empaquetados) que cumplen la consulta booleana"""
+        tokens = _TOKEN.findall(consulta)
+        if not tokens:
+            raise ValueError("La consulta está vacía")
+        posicion = 0
+
+        def siguiente():
+            return tokens[posicion] if posicion < len(tokens) else None
+
+        def operador(token):
+            return OPERADORES.get((token or "").lower())
+
+        def expresion_o():
+            nonlocal posicion
+            resultado = expresion_y()
+            while operador(siguiente()) == "or":
+                posicion += 1
+                resultado = resultado | expresion_y()
+            return resultado
+
+        def expresion_y():
+            nonlocal posicion
+            resultado = factor()
+            # Dos términos seguidos sin operador se unen con Y
+            while siguiente() not in (None, ")") and operador(siguiente()) != "or":
+                if operador(siguiente()) == "and":
+                    posicion += 1
+                resultado = resultado & factor()
+            return resultado
+
+        def factor():
+            nonlocal posicion
+            token = siguiente()
+            if token is None:
+                raise ValueError("La consulta termina de forma incompleta")
+            posicion += 1
+            if operador(token) == "not":
+                return self._vivos & ~factor()
+            if token == "(":
+                resultado = expresion_o()
+                if siguiente() != ")":
+                    raise ValueError("Falta cerrar un paréntesis")
+                posicion += 1
+                return resultado
+            if token == ")" or operador(token):
+                raise ValueError(f"Operador o paréntesis inesperado: {token}")
+            return self._bitmap_termino(token)
+
+        with self._lock:
+            resultado = expresion_o() & self._vivos
+        if posicion != len(tokens):
+            raise ValueError(f"No se entiende la consulta a partir de: {' '.join(tokens[posicion:])}")
+        return resultado
+
+    def consultar(self, consulta):
+        """Claves de los clientes que cumplen la consulta"""
+        posiciones = np.flatnonzero(np.unpackbits(self.evaluar(consulta), bitorder="little"))
+        return [self.clientes[i] for i in posiciones if i < len(self.clientes)]
+
+    def contar(self, consulta):
+        return int(np.unpackbits(self.evaluar(consulta)).sum())
+
+
+_INDICE = None
+_LOCK = threading.Lock()
+
+
+def obtener_indice():
+    """Índice del proceso, construido la primera vez desde las selecciones guardadas"""
+    global _INDICE
+    if _INDICE is None:
+        with _LOCK:
+            if _INDICE is None:
+                ALMACEN.esperar()  # Que las selecciones encoladas ya estén en la base
+                _INDICE = IndiceInvertido().construir(*cargar_matriz())
+    return _INDICE
+
+
+def indexar_selecciones(cliente, bits):
+    """Mantiene el índice al día con un envío; si aún no se construyó, lo hará desde la base"""
+    with _LOCK:
+        indice = _INDICE
+    if indice is not None:
+        indice.actualizar(cliente, bits)
+
+
+def mostrar_panel_consultas():
+    """Panel de administración (barra lateral) para consultas booleanas sobre los clientes"""
+    if not es_administrador():
+        return
+    with st.sidebar.expander("🔎 Consulta de clientes por alimentos (admin)", expanded=False):
+        st.caption('Ej.: salmón Y arrachera Y NO intolerancia:lactosa · (atún O sardina) Y NO alergia:pescado')
+        consulta = st.text_input("Consulta", key="consulta_indice")
+        if not consulta:
+            return
+        indice = obtener_indice()
+        inicio = time.perf_counter()
+        try:
+            clientes = indice.consultar(consulta)
+        except ValueError as error:
+            st.error(str(error))
+            return
+        st.caption(f"{len(clientes)} de {len(indice.clientes)} clientes en "
+                   f"{(time.perf_counter() - inicio) * 1000:.2f} ms")
+        for cliente in clientes[:50]:
+            st.markdown(f"- {cliente}")
+        if len(clientes) > 50:
+            st.caption(f"… y {len(clientes) - 50} más")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Consultas booleanas sobre el índice alimento -> clientes")
+    parser.add_argument("consulta", nargs="?", help='Ej.: "salmón Y arrachera Y NO intolerancia:lactosa"')
+    parser.add_argument("--sinteticos", type=int, default=0,
+                        help="Usa N clientes sintéticos en lugar de la base (para medir)")
+    args = parser.parse_args()
+
+    if args.sinteticos:
+        catalogo = cargar_catalogo()
+        generador = np.random.default_rng(0)
+        matriz = catalogo.vacio(args.sinteticos)
+        for i in range(args.sinteticos):
+            matriz[i] = catalogo.desde_ids(generador.choice(len(catalogo), size=60, replace=False))
+        inicio = time.perf_counter()
+        indice = IndiceInvertido(catalogo).construir([f"cliente{i}" for i in range(args.sinteticos)], matriz)
+        print(f"Índice de {args.sinteticos} clientes construido en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        inicio = time.perf_counter()
+        indice.actualizar("cliente0", catalogo.desde_ids([0, 1, 2]))
+        print(f"Actualización de un cliente: {(time.perf_counter() - inicio) * 1e6:.0f} µs")
+    else:
+        indice = obtener_indice()
+    consultas = [args.consulta] if args.consulta else [
+        "salmón Y arrachera Y NO intolerancia:lactosa",
+        "(atún O sardina) Y NO alergia:pescado",
+        "NO alergia:ninguna",
+    ]
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        clientes = indice.consultar(consulta)
+        print(f"{consulta}: {len(clientes)} clientes en {(time.perf_counter() - inicio) * 1000:.2f} ms")
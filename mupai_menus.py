@@ -0,0 +1,513 @@
+"""
+Generador de menús diarios con los alimentos del cliente y sus macros objetivo.
+
+Los alimentos permitidos salen del bitset de selecciones del cliente (mupai_selecciones):
+los alimentos que marcó, menos los que excluyen sus alergias e intolerancias (que
+también son bits del mismo bitset). Las que el cliente escribe a mano no se excluyen:
+los menús se muestran con una advertencia y el lote las copia en cada línea. Cada comida se arma con una proteína, opcionalmente
+un carbohidrato y una grasa, y en las comidas principales una porción fija de vegetal.
+
+Los gramos de cada combinación (proteína, carbohidrato, grasa) se calculan resolviendo
+el sistema 3 x 3 de macros (proteína, grasa y carbohidratos por gramo de cada alimento)
+contra el objetivo de la comida. La pseudoinversa de todas las combinaciones se calcula
+una vez por cliente; después cada comida es un solo producto matriz-vector por lotes
+sobre todas las combinaciones, el recorte a porciones realistas (múltiplos de 5 g) y
+la verificación de la tolerancia. Entre las combinaciones dentro de tolerancia se elige
+al azar la que menos repite alimentos ya usados en la semana.
+
+Un día tarda unos pocos milisegundos, así que una semana se genera al vuelo en la app
+y el lote de todos los clientes corre de noche desde la línea de comandos:
+
+    python mupai_menus.py lote --salida datos/menus/menus.jsonl
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import streamlit as st
+
+from mupai_almacen import ALMACEN, clave_cliente
+from mupai_catalogo import cargar_catalogo, contiene, diferencia, normalizar_nombre
+from mupai_nutrientes import NUTRIENTES, cargar_nutrientes
+from mupai_config import ruta_datos
+from mupai_selecciones import cargar_matriz, selecciones_cliente
+
+APP_FITNESS = "evaluacion_fitness"
+APP_PATRONES = "patrones_alimentarios"
+
+# Macros que se ajustan, en el orden de los objetivos (columnas de la tabla de nutrientes)
+MACROS = ("proteina_g", "grasa_g", "carbohidratos_g")
+_COLUMNAS_MACROS = [NUTRIENTES.index(macro) for macro in MACROS]
+
+# Componente de una comida -> grupos del catálogo de donde sale
+GRUPOS_COMPONENTE = {
+    "proteina": ("proteinas_magras", "proteinas_grasas"),
+    "carbohidrato": ("carbohidratos", "frutas"),
+    "grasa": ("grasas_saludables", "aceites_coccion"),
+    "vegetal": ("vegetales",),
+}
+
+# Densidad mínima (g del macro por 100 g) para que un alimento sirva como fuente del componente
+DENSIDAD_MINIMA = {"proteina": ("proteina_g", 10), "carbohidrato": ("carbohidratos_g", 8), "grasa": ("grasa_g", 10)}
+# Los vegetales más densos (p. ej. ajo) son condimentos, no una porción de vegetal
+CARBOHIDRATOS_MAXIMOS_VEGETAL = 15
+
+# Porción máxima por grupo (g); una porción calculada se redondea a múltiplos de PASO_G
+PORCION_MAXIMA_G = {
+    "proteinas_magras": 300, "proteinas_grasas": 250, "carbohidratos": 300, "frutas": 300,
+    "grasas_saludables": 100, "aceites_coccion": 20,
+}
+PASO_G = 5
+# Debajo de esta porción el alimento se omite de la comida (aceites y mantequillas van de 5 g)
+PORCION_MINIMA_G = 10
+PORCION_MINIMA_GRUPO_G = {"aceites_coccion": 5}
+PORCION_VEGETAL_G = 150
+
+# Tolerancia por macro: la mayor entre el porcentaje del objetivo y los gramos absolutos
+TOLERANCIA_PCT = 10
+TOLERANCIA_G = 3
+
+# Combinaciones máximas por cliente (si hay más, se toma una muestra al azar)
+MAX_COMBINACIONES = 20000
+
+# Restricción del cuestionario -> (claves excluidas completas, palabras de nombres excluidos,
+# palabras que salvan a un alimento de las claves excluidas). Las palabras se comparan
+# como palabras completas sobre el nombre normalizado (sin acentos ni mayúsculas).
+EXCLUSIONES = {
+    "Lácteos": (
+        ("quesos_grasos", "lacteos_enteros", "quesos_magros", "lacteos_light"),
+        ("mantequilla con sal", "mantequilla sin sal", "ghee"),
+        ("almendra", "coco", "soya"),
+    ),
+    "Lácteos con lactosa": (
+        ("quesos_grasos", "lacteos_enteros", "quesos_magros", "lacteos_light"),
+        (),
+        ("almendra", "coco", "soya", "deslactosada"),
+    ),
+    "Huevo": ((), ("huevo", "yema"), ()),
+    "Frutos secos": ((), ("almendra", "almendras", "nuez", "nueces", "pistaches", "cacahuates", "mani"), ()),
+    "Mariscos": (("mariscos_grasos", "mariscos_magros"), (), ()),
+    "Pescado": (("pescados_grasos", "pescados_magros"), (), ()),
+    "Gluten": (
+        (),
+        ("trigo", "pasta integral", "spaguetti", "macarrones", "lasana", "cuscus", "fideos chinos", "pan",
+         "tortilla de harina", "tortilla integral", "tortilla de avena", "avena", "cereal integral", "centeno"),
+        (),
+    ),
+    "Soya": ((), ("soya", "edamames"), ()),
+    "Semillas": ((), ("semillas", "chia", "linaza", "tahini", "ajonjoli"), ()),
+    "Leguminosas": (("leguminosas",), ("legumbres", "guisantes", "habas", "cacahuates", "mani", "soya"), ()),
+    "FODMAPs": (
+        (),
+        ("ajo", "cebolla blanca", "cebolla morada", "manzana", "pera", "mango", "sandia", "coliflor",
+         "champinones", "durazno", "ciruela", "higo", "leche entera", "frijoles", "lentejas", "garbanzos",
+         "hummus", "legumbres", "guisantes", "habas", "trigo", "pan", "spaguetti", "macarrones", "lasana", "cuscus",
+         "nuez de la india", "pistaches", "leche descremada", "yogur"),
+        (),
+    ),
+    "Crucíferas": ((), ("brocoli", "coliflor", "col morada", "col verde", "repollo", "kale", "rabano"), ()),
+    "Endulzantes artificiales": ((), ("refrescos sin calorias", "electrolitos"), ()),
+}
+# Alergias e intolerancias escritas a mano en el cuestionario: no se traducen a exclusiones,
+# así que los menús de un cliente que las tiene se muestran con una advertencia
+CAMPOS_RESTRICCION_LIBRE = ("otra_alergia", "otra_intolerancia")
+
+# Frecuencia de comidas del cuestionario -> (nombre, fracción de los macros del día, lleva vegetal)
+PLAN_COMIDAS = {
+    "Desayuno, comida y cena (3 comidas principales)": (
+        ("Desayuno", 0.30, True), ("Comida", 0.40, True), ("Cena", 0.30, True),
+    ),
+    "Desayuno, comida, cena y una colación": (
+        ("Desayuno", 0.25, True), ("Colación", 0.15, False), ("Comida", 0.35, True), ("Cena", 0.25, True),
+    ),
+    "Desayuno, comida, cena y dos colaciones": (
+        ("Desayuno", 0.25, True), ("Colación matutina", 0.10, False), ("Comida", 0.30, True),
+        ("Colación vespertina", 0.10, False), ("Cena", 0.25, True),
+    ),
+    "Solo dos comidas principales al día": (
+        ("Primera comida", 0.50, True), ("Segunda comida", 0.50, True),
+    ),
+}
+PLAN_POR_DEFECTO = "Desayuno, comida, cena y una colación"
+
+ObjetivoComida = namedtuple("ObjetivoComida", ["nombre", "proteina_g", "grasa_g", "carbo_g", "vegetal"])
+
+DIAS_SEMANA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+
+def repartir_objetivos(proteina_g, grasa_g, carbo_g, frecuencia=None):
+    """Objetivos por comida a partir de los macros del día y la frecuencia de comidas preferida"""
+    plan = PLAN_COMIDAS.get(frecuencia) or PLAN_COMIDAS[PLAN_POR_DEFECTO]
+    return tuple(
+        ObjetivoComida(nombre, proteina_g * fraccion, grasa_g * fraccion, carbo_g * fraccion, vegetal)
+        for nombre, fraccion, vegetal in plan
+    )
+
+
+def _mascaras_exclusion(catalogo):
+    """{ID de la alergia o intolerancia: bitset de alimentos que excluye}"""
+    nombres = [normalizar_nombre(alimento.nombre) for alimento in catalogo.alimentos]
+
+    def coincide(nombre, palabras):
+        return any(re.search(rf"\b{re.escape(palabra)}\b", nombre) for palabra in palabras)
+
+    mascaras = {}
+    for alimento in catalogo.alimentos:
+        if alimento.grupo != "restricciones" or alimento.nula or alimento.nombre not in EXCLUSIONES:
+            continue
+        claves, palabras, salvadas = EXCLUSIONES[alimento.nombre]
+        mascaras[alimento.id] = catalogo.desde_ids([
+            otro.id for otro in catalogo.alimentos
+            if otro.grupo not in ("restricciones", None) and not otro.nula
+            and ((otro.clave in claves and not coincide(nombres[otro.id], salvadas))
+                 or coincide(nombres[otro.id], palabras))
+        ])
+    return mascaras
+
+
+_MASCARAS = None
+_LOCK = threading.Lock()
+
+
+def mascaras_exclusion():
+    """Máscaras de exclusión de cada alergia e intolerancia, calculadas una vez por proceso"""
+    global _MASCARAS
+    if _MASCARAS is None:
+        with _LOCK:
+            if _MASCARAS is None:
+                _MASCARAS = _mascaras_exclusion(cargar_catalogo())
+    return _MASCARAS
+
+
+def alimentos_permitidos(bits):
+    """Bitset de los alimentos elegidos menos los que excluyen las alergias e intolerancias marcadas"""
+    catalogo = cargar_catalogo()
+    excluidos = catalogo.vacio()
+    for id_restriccion, mascara in mascaras_exclusion().items():
+        if contiene(bits, id_restriccion):
+            excluidos |= mascara
+    return diferencia(bits, excluidos)
+
+
+def _macros(gramos, por_gramo):
+    """{kcal, proteina_g, grasa_g, carbo_g} redondeados de unas porciones"""
+    kcal, proteina, grasa, carbo = gramos @ por_gramo
+    return {"kcal": round(float(kcal)), "proteina_g": round(float(proteina), 1),
+            "grasa_g": round(float(grasa), 1), "carbo_g": round(float(carbo), 1)}
+
+
+class GeneradorMenus:
+    """
+    Menús de un cliente: las combinaciones (proteína, carbohidrato, grasa) de sus alimentos
+    permitidos y la pseudoinversa de cada una se calculan al crearlo; cada comida después
+    es un producto por lotes sobre todas las combinaciones.
+    """
+
+    def __init__(self, bits, semilla=0, tabla=None):
+        self.tabla = tabla or cargar_nutrientes()
+        self.catalogo = self.tabla.catalogo
+        self.generador = np.random.default_rng(semilla)
+        n = len(self.catalogo)
+
+        # Por gramo, con una fila extra de ceros (índice -1) para "sin este componente"
+        self._por_gramo = np.vstack([self.tabla.matriz[:, _COLUMNAS_MACROS] / 100.0, np.zeros((1, len(MACROS)))])
+        self._kcal_por_gramo = np.append(self.tabla.columnas["kcal"] / 100.0, 0.0)
+        maximos = np.zeros(n + 1)
+        minimos = np.zeros(n + 1)
+        for alimento in self.catalogo.alimentos:
+            maximos[alimento.id] = PORCION_MAXIMA_G.get(alimento.grupo, 0)
+            minimos[alimento.id] = PORCION_MINIMA_GRUPO_G.get(alimento.grupo, PORCION_MINIMA_G)
+
+        ids = set(self.catalogo.ids_de(alimentos_permitidos(bits)).tolist())
+        self.candidatos = {}
+        for componente, grupos in GRUPOS_COMPONENTE.items():
+            nutriente, minimo = DENSIDAD_MINIMA.get(componente, (None, 0))
+            self.candidatos[componente] = np.array([
+                alimento.id for alimento in self.catalogo.alimentos
+                if alimento.id in ids and alimento.grupo in grupos and self.tabla.con_datos[alimento.id]
+                and (nutriente is None or self.tabla.columnas[nutriente][alimento.id] >= minimo)
+                and (componente != "vegetal"
+                     or self.tabla.columnas["carbohidratos_g"][alimento.id] <= CARBOHIDRATOS_MAXIMOS_VEGETAL)
+            ], dtype=np.intp)
+        if not len(self.candidatos["proteina"]):
+            raise ValueError("El cliente no tiene fuentes de proteína permitidas para armar menús")
+
+        # Combinaciones proteína x (carbohidrato o nada) x (grasa o nada)
+        ejes = [
+            self.candidatos["proteina"],
+            np.append(self.candidatos["carbohidrato"], -1),
+            np.append(self.candidatos["grasa"], -1),
+        ]
+        total = np.prod([len(eje) for eje in ejes])
+        if total > MAX_COMBINACIONES:
+            combinaciones = np.stack(
+                [eje[self.generador.integers(len(eje), size=MAX_COMBINACIONES)] for eje in ejes], axis=1
+            )
+            combinaciones = np.unique(combinaciones, axis=0)
+        else:
+            combinaciones = np.stack(np.meshgrid(*ejes, indexing="ij"), axis=-1).reshape(-1, len(ejes))
+        self.combinaciones = combinaciones
+        # Sistema de cada combinación: macros (filas) x alimentos (columnas), en g de macro por g de alimento
+        self._sistemas = self._por_gramo[combinaciones].transpose(0, 2, 1)
+        self._pseudoinversas = np.linalg.pinv(self._sistemas)
+        self._maximos = maximos[combinaciones]
+        self._minimos = minimos[combinaciones]
+        self._usos = np.zeros(n + 1)
+
+    def _vegetal(self):
+        """Vegetal menos usado (al azar entre los empatados) y su aporte de macros"""
+        vegetales = self.candidatos["vegetal"]
+        if not len(vegetales):
+            return None, np.zeros(len(MACROS))
+        usos = self._usos[vegetales]
+        id_vegetal = int(self.generador.choice(vegetales[usos == usos.min()]))
+        return id_vegetal, self._por_gramo[id_vegetal] * PORCION_VEGETAL_G
+
+    def comida(self, objetivo):
+        """Una comida lo más cerca posible del objetivo; dentro_tolerancia indica si se logró y armada=False
+        que ninguna combinación lleva proteína (la comida trae solo el vegetal, si lo hay)"""
+        meta = np.array([objetivo.proteina_g, objetivo.grasa_g, objetivo.carbo_g], dtype=np.float64)
+        id_vegetal, aporte_vegetal = self._vegetal() if objetivo.vegetal else (None, np.zeros(len(MACROS)))
+        resto = np.maximum(meta - aporte_vegetal, 0.0)
+
+        gramos = np.clip(self._pseudoinversas @ resto, 0.0, self._maximos)
+        gramos = np.round(gramos / PASO_G) * PASO_G
+        gramos[gramos < self._minimos] = 0.0
+        logrado = np.einsum("nmf,nf->nm", self._sistemas, gramos) + aporte_vegetal
+        tolerancia = np.maximum(meta * TOLERANCIA_PCT / 100.0, TOLERANCIA_G)
+        error = (np.abs(logrado - meta) / tolerancia).max(axis=1)
+        # Sin proteína no hay comida
+        error[gramos[:, 0] == 0] = np.inf
+
+        porciones = []
+        if id_vegetal is not None:
+            porciones.append((id_vegetal, float(PORCION_VEGETAL_G)))
+        if np.isinf(error).all():
+            # Ninguna combinación lleva proteína: mejor decirlo que mostrar una comida vacía
+            return self._resultado(objetivo, porciones, armada=False, dentro_tolerancia=False)
+
+        dentro = error <= 1.0
+        repeticiones = (self._usos[self.combinaciones] * (gramos > 0)).sum(axis=1)
+        if dentro.any():
+            opciones = np.flatnonzero(dentro & (repeticiones == repeticiones[dentro].min()))
+            elegida = int(self.generador.choice(opciones))
+        else:
+            elegida = int(np.argmin(error + 0.01 * repeticiones))
+
+        porciones[:0] = [(int(i), float(g)) for i, g in zip(self.combinaciones[elegida], gramos[elegida]) if g > 0]
+        return self._resultado(objetivo, porciones, armada=True, dentro_tolerancia=bool(error[elegida] <= 1.0))
+
+    def _resultado(self, objetivo, porciones, armada, dentro_tolerancia):
+        """Comida con sus porciones y macros; armada=False si no se pudo armar con los alimentos del cliente"""
+        vector = np.zeros(len(self._por_gramo))
+        for id_alimento, g in porciones:
+            vector[id_alimento] = g
+            self._usos[id_alimento] += 1
+        return {
+            "comida": objetivo.nombre,
+            "objetivo": {"proteina_g": round(objetivo.proteina_g, 1), "grasa_g": round(objetivo.grasa_g, 1),
+                         "carbo_g": round(objetivo.carbo_g, 1)},
+            "alimentos": [
+                {"id": id_alimento, "nombre": self.catalogo.alimentos[id_alimento].nombre, "gramos": round(g)}
+                for id_alimento, g in porciones
+            ],
+            "macros": _macros(vector, np.column_stack([self._kcal_por_gramo, self._por_gramo])),
+            "armada": armada,
+            "dentro_tolerancia": dentro_tolerancia,
+        }
+
+    def dia(self, objetivos):
+        comidas = [self.comida(objetivo) for objetivo in objetivos]
+        totales = {
+            campo: round(sum(comida["macros"][campo] for comida in comidas), 1)
+            for campo in ("kcal", "proteina_g", "grasa_g", "carbo_g")
+        }
+        return {"comidas": comidas, "totales": totales,
+                "dentro_tolerancia": all(comida["dentro_tolerancia"] for comida in comidas)}
+
+    def semana(self, objetivos, dias=DIAS_SEMANA):
+        """Un menú por día; los alimentos se rotan a lo largo de toda la semana"""
+        return [dict(self.dia(objetivos), dia=dia) for dia in dias]
+
+
+def generar_semana(bits, proteina_g, grasa_g, carbo_g, frecuencia=None, semilla=0):
+    """Menús de una semana para un bitset de selecciones y los macros del día"""
+    objetivos = repartir_objetivos(proteina_g, grasa_g, carbo_g, frecuencia)
+    return GeneradorMenus(bits, semilla).semana(objetivos)
+
+
+def _ultimos_patrones(email=None, telefono=None):
+    """
+    Datos de la última evaluación de patrones alimentarios con este email y teléfono
+    juntos (ambos deben coincidir, como al reanudar el cuestionario), o None si no hay.
+    """
+    if not (email and telefono):
+        return None
+    evaluaciones = ALMACEN.buscar(email=email, telefono=telefono, app=APP_PATRONES, limite=1)
+    return evaluaciones[0]["datos"] if evaluaciones else None
+
+
+def frecuencia_cliente(email=None, telefono=None):
+    """Frecuencia de comidas de la última evaluación de patrones alimentarios del cliente"""
+    return (_ultimos_patrones(email, telefono) or {}).get("frecuencia_comidas")
+
+
+def restricciones_libres(datos):
+    """Alergias e intolerancias escritas a mano en unos datos de patrones alimentarios"""
+    return [datos[campo].strip() for campo in CAMPOS_RESTRICCION_LIBRE
+            if isinstance(datos.get(campo), str) and datos[campo].strip()]
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _semana_cacheada(bits_guardados, proteina_g, grasa_g, carbo_g, frecuencia, semilla):
+    bits = cargar_catalogo().desde_bytes(bits_guardados)
+    return generar_semana(bits, proteina_g, grasa_g, carbo_g, frecuencia, semilla)
+
+
+def mostrar_menus_cliente(email, telefono, proteina_g, grasa_g, carbo_g):
+    """
+    Menús de ejemplo de una semana con los alimentos del cuestionario de patrones
+    alimentarios del cliente y los macros de esta evaluación. email y telefono son los
+    del cliente registrado en la sesión; no muestra nada si no hay un cuestionario con
+    ese email y ese teléfono juntos, para que teclear el email de otro no enseñe sus
+    alimentos ni sus alergias.
+    """
+    patrones = _ultimos_patrones(email, telefono)
+    bits = selecciones_cliente(email, telefono) if patrones is not None else None
+    if bits is None:
+        return False
+    st.markdown("### 🍽️ Menús de ejemplo con tus alimentos")
+    if st.button("🔄 Generar otras opciones", key="generar_menus"):
+        st.session_state.semilla_menus = st.session_state.get("semilla_menus", 0) + 1
+    inicio = time.perf_counter()
+    try:
+        semana = _semana_cacheada(
+            cargar_catalogo().a_bytes(bits), round(float(proteina_g), 1), round(float(grasa_g), 1),
+            round(float(carbo_g), 1), patrones.get("frecuencia_comidas"), st.session_state.get("semilla_menus", 0),
+        )
+    except ValueError as error:
+        st.info(f"No se pudieron armar menús de ejemplo: {error}")
+        return False
+    st.caption(f"Porciones en crudo para carnes y pescados, y cocidas para cereales y leguminosas · "
+               f"tolerancia ±{TOLERANCIA_PCT}% por macro · {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    libres = restricciones_libres(patrones)
+    if libres:
+        st.warning(f"⚠️ Estos menús no toman en cuenta lo que escribiste como otra alergia o intolerancia "
+                   f"({'; '.join(libres)}). Revisa cada comida antes de seguirla.")
+    for pestana, dia in zip(st.tabs([dia["dia"] for dia in semana]), semana):
+        with pestana:
+            for comida in dia["comidas"]:
+                alimentos = ", ".join(f"{alimento['gramos']} g {alimento['nombre']}" for alimento in comida["alimentos"])
+                macros, objetivo = comida["macros"], comida["objetivo"]
+                if not comida["armada"]:
+                    st.markdown(f"**{comida['comida']}:** no se pudo armar con tus alimentos "
+                                f"(ninguna fuente de proteína alcanza el objetivo)")
+                    continue
+                st.markdown(f"**{comida['comida']}:** {alimentos}")
+                st.caption(f"{'' if comida['dentro_tolerancia'] else '⚠️ '}{macros['kcal']} kcal · "
+                           f"P {macros['proteina_g']}/{objetivo['proteina_g']} g · "
+                           f"G {macros['grasa_g']}/{objetivo['grasa_g']} g · "
+                           f"C {macros['carbo_g']}/{objetivo['carbo_g']} g")
+            totales = dia["totales"]
+            st.markdown(f"**Total del día:** {totales['kcal']:.0f} kcal · proteína {totales['proteina_g']} g · "
+                        f"grasa {totales['grasa_g']} g · carbohidratos {totales['carbo_g']} g")
+    return True
+
+
+def _ultimas_evaluaciones(app):
+    """{cliente: datos} de la evaluación más reciente de cada cliente en una app"""
+    filas = ALMACEN.consultar(
+        "SELECT email, telefono, datos FROM evaluaciones WHERE app = ? ORDER BY actualizado", (app,)
+    )
+    ultimas = {}
+    for fila in filas:
+        cliente = clave_cliente(fila["email"], fila["telefono"])
+        if cliente:
+            ultimas[cliente] = fila["datos"]
+    return ultimas
+
+
+def generar_lote(ruta, semilla=0):
+    """
+    Semana de menús de cada cliente con selecciones y una evaluación fitness con macros,
+    en JSON Lines (una línea por cliente). Devuelve {clientes, omitidos, fuera_tolerancia}.
+    """
+    fitness = _ultimas_evaluaciones(APP_FITNESS)
+    patrones = _ultimas_evaluaciones(APP_PATRONES)
+    clientes, matriz = cargar_matriz()
+    resultado = {"clientes": 0, "omitidos": 0, "fuera_tolerancia": 0}
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        for cliente, bits in zip(clientes, matriz):
+            datos = json.loads(fitness[cliente]) if cliente in fitness else {}
+            macros = [datos.get(campo) for campo in ("proteina_g", "grasa_g", "carbo_g")]
+            if any(not isinstance(valor, (int, float)) for valor in macros):
+                resultado["omitidos"] += 1
+                continue
+            datos_patrones = json.loads(patrones[cliente]) if cliente in patrones else {}
+            frecuencia = datos_patrones.get("frecuencia_comidas")
+            try:
+                semana = generar_semana(bits, *macros, frecuencia=frecuencia, semilla=semilla)
+            except ValueError:
+                resultado["omitidos"] += 1
+                continue
+            resultado["clientes"] += 1
+            resultado["fuera_tolerancia"] += not all(dia["dentro_tolerancia"] for dia in semana)
+            archivo.write(json.dumps({
+                "cliente": cliente, "nombre": datos.get("nombre"), "frecuencia_comidas": frecuencia,
+                "objetivo_dia": dict(zip(("proteina_g", "grasa_g", "carbo_g"), macros)),
+                "restricciones_libres": restricciones_libres(datos_patrones), "semana": semana,
+            }, ensure_ascii=False) + "\n")
+    os.replace(temporal, ruta)
+    return resultado
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import date
+
+    parser = argparse.ArgumentParser(description="Menús semanales MUPAI con los alimentos y macros de cada cliente")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    lote = subcomandos.add_parser("lote", help="Genera la semana de todos los clientes con selecciones y macros")
+    lote.add_argument("--salida", help="Archivo JSON Lines (por defecto datos/menus/menus-AAAAMMDD.jsonl)")
+    lote.add_argument("--semilla", type=int, default=0)
+    carga = subcomandos.add_parser("carga", help="Mide la generación con N clientes sintéticos (no se guardan)")
+    carga.add_argument("-n", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.comando == "lote":
+        ruta = args.salida or ruta_datos("menus", f"menus-{date.today():%Y%m%d}.jsonl")
+        inicio = time.perf_counter()
+        resultado = generar_lote(ruta, args.semilla)
+        print(f"{resultado['clientes']} clientes en {time.perf_counter() - inicio:.1f} s "
+              f"({resultado['omitidos']} omitidos sin macros o sin proteínas, "
+              f"{resultado['fuera_tolerancia']} con alguna comida fuera de tolerancia) -> {ruta}")
+    else:
+        catalogo = cargar_catalogo()
+        generador = np.random.default_rng(0)
+        comibles = [a.id for a in catalogo.alimentos if a.grupo in sum(GRUPOS_COMPONENTE.values(), ())]
+        restricciones = list(mascaras_exclusion())
+        tiempos_cliente, tiempos_dia, fuera = [], [], 0
+        for _ in range(args.n):
+            ids = generador.choice(comibles, size=generador.integers(30, 120), replace=False).tolist()
+            ids += generador.choice(restricciones, size=generador.integers(0, 2), replace=False).tolist()
+            proteina, grasa = generador.uniform(100, 220), generador.uniform(40, 100)
+            carbo = generador.uniform(20, 350)
+            inicio = time.perf_counter()
+            try:
+                menus = GeneradorMenus(catalogo.desde_ids(ids), semilla=1)
+            except ValueError:
+                continue
+            construido = time.perf_counter()
+            semana = menus.semana(repartir_objetivos(proteina, grasa, carbo))
+            fin = time.perf_counter()
+            tiempos_cliente.append(construido - inicio)
+            tiempos_dia.append((fin - construido) / len(semana))
+            fuera += sum(not comida["dentro_tolerancia"] for dia in semana for comida in dia["comidas"])
+        print(f"{len(tiempos_cliente)} clientes: preparación media {np.mean(tiempos_cliente) * 1000:.1f} ms, "
+              f"día medio {np.mean(tiempos_dia) * 1000:.2f} ms (p99 {np.percentile(tiempos_dia, 99) * 1000:.2f} ms), "
+              f"{fuera} comidas fuera de tolerancia de {len(tiempos_cliente) * 7 * 4}")
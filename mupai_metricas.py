@@ -0,0 +1,336 @@
+"""
+Instrumentación ligera compartida por las apps MUPAI.
+
+Cada rerun de Streamlit se divide en secciones (encabezado, pasos, resultados,
+envío de email...) y su duración se guarda en un buffer circular en memoria del
+proceso. El panel de administración muestra p50/p95/p99 por sección y permite
+exportar las muestras a JSONL para análisis fuera de línea.
+
+Además se cuentan los reruns de cada sesión y los bytes de markdown/HTML que
+cada sección envía al navegador, agregados entre todas las sesiones.
+"""
+import functools
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+from mupai_config import es_administrador
+
+# Número máximo de muestras que se conservan en memoria (las más antiguas se descartan)
+CAPACIDAD_BUFFER = 20000
+
+# Nombre de la sección que acumula la duración total de cada rerun
+SECCION_TOTAL = "rerun_total"
+
+# Sesiones distintas que se recuerdan para el conteo de reruns por sesión
+MAX_SESIONES_RECORDADAS = 5000
+
+# Funciones de Streamlit cuyo primer argumento es markdown/HTML enviado al navegador
+FUNCIONES_MEDIDAS = ("markdown", "write", "html", "caption", "info", "success", "warning", "error")
+
+
+def percentil(valores_ordenados, p):
+    """
+    Percentil con interpolación lineal sobre una lista ya ordenada.
+    Retorna 0.0 si la lista está vacía.
+    """
+    if not valores_ordenados:
+        return 0.0
+    if len(valores_ordenados) == 1:
+        return float(valores_ordenados[0])
+    posicion = (len(valores_ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(valores_ordenados) - 1)
+    fraccion = posicion - inferior
+    return valores_ordenados[inferior] + (valores_ordenados[superior] - valores_ordenados[inferior]) * fraccion
+
+
+class RegistroLatencias:
+    """Buffer circular, seguro entre hilos, con las duraciones por sección de cada rerun"""
+
+    def __init__(self, capacidad=CAPACIDAD_BUFFER):
+        self._muestras = deque(maxlen=capacidad)
+        self._lock = threading.Lock()
+
+    def registrar(self, app, seccion, duracion_ms, rerun_id):
+        with self._lock:
+            self._muestras.append({
+                "ts": round(time.time(), 3),
+                "app": app,
+                "seccion": seccion,
+                "duracion_ms": round(duracion_ms, 3),
+                "rerun_id": rerun_id,
+            })
+
+    def muestras(self):
+        with self._lock:
+            return list(self._muestras)
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+
+    def resumen_percentiles(self):
+        """
+        Agrupa las muestras por (app, sección) y calcula sus percentiles.
+        Retorna una lista de diccionarios ordenada por p95 descendente.
+        """
+        grupos = {}
+        for muestra in self.muestras():
+            grupos.setdefault((muestra["app"], muestra["seccion"]), []).append(muestra["duracion_ms"])
+
+        filas = []
+        for (app, seccion), duraciones in grupos.items():
+            duraciones.sort()
+            filas.append({
+                "app": app,
+                "seccion": seccion,
+                "n": len(duraciones),
+                "p50_ms": round(percentil(duraciones, 50), 2),
+                "p95_ms": round(percentil(duraciones, 95), 2),
+                "p99_ms": round(percentil(duraciones, 99), 2),
+                "max_ms": round(duraciones[-1], 2),
+            })
+        filas.sort(key=lambda fila: fila["p95_ms"], reverse=True)
+        return filas
+
+    def exportar_jsonl(self):
+        """Serializa todas las muestras como JSON Lines (una muestra por línea)"""
+        return "".join(json.dumps(muestra, ensure_ascii=False) + "\n" for muestra in self.muestras())
+
+
+class MedidorPayload:
+    """Agregados del proceso: reruns por sesión y bytes de markdown/HTML por rerun y por sección"""
+
+    def __init__(self, max_sesiones=MAX_SESIONES_RECORDADAS):
+        self._lock = threading.Lock()
+        self._max_sesiones = max_sesiones
+        self._secciones = {}
+        self._apps = {}
+        self._sesiones = OrderedDict()
+
+    def registrar_emision(self, app, seccion, n_bytes):
+        with self._lock:
+            datos = self._secciones.setdefault((app, seccion), {"bytes": 0, "emisiones": 0, "max_bytes": 0})
+            datos["bytes"] += n_bytes
+            datos["emisiones"] += 1
+            datos["max_bytes"] = max(datos["max_bytes"], n_bytes)
+
+    def registrar_rerun(self, app, sesion_id, bytes_rerun):
+        with self._lock:
+            datos = self._apps.setdefault(app, {"reruns": 0, "bytes": 0, "max_bytes": 0})
+            datos["reruns"] += 1
+            datos["bytes"] += bytes_rerun
+            datos["max_bytes"] = max(datos["max_bytes"], bytes_rerun)
+
+            clave = (app, sesion_id)
+            self._sesiones[clave] = self._sesiones.get(clave, 0) + 1
+            self._sesiones.move_to_end(clave)
+            while len(self._sesiones) > self._max_sesiones:
+                self._sesiones.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._secciones.clear()
+            self._apps.clear()
+            self._sesiones.clear()
+
+    def resumen_apps(self):
+        """Reruns, sesiones y bytes promedio por rerun para cada app"""
+        with self._lock:
+            filas = []
+            for app, datos in self._apps.items():
+                sesiones = [n for (app_sesion, _), n in self._sesiones.items() if app_sesion == app]
+                filas.append({
+                    "app": app,
+                    "sesiones": len(sesiones),
+                    "reruns": datos["reruns"],
+                    "reruns_por_sesion": round(sum(sesiones) / len(sesiones), 1) if sesiones else 0.0,
+                    "kb_por_rerun": round(datos["bytes"] / datos["reruns"] / 1024, 1) if datos["reruns"] else 0.0,
+                    "kb_max_rerun": round(datos["max_bytes"] / 1024, 1),
+                })
+            return filas
+
+    def resumen_secciones(self):
+        """Bytes emitidos por sección, ordenados de la más pesada a la más ligera"""
+        with self._lock:
+            reruns_por_app = {app: datos["reruns"] for app, datos in self._apps.items()}
+            filas = []
+            for (app, seccion), datos in self._secciones.items():
+                reruns = reruns_por_app.get(app, 0)
+                filas.append({
+                    "app": app,
+                    "seccion": seccion,
+                    "kb_total": round(datos["bytes"] / 1024, 1),
+                    "kb_por_rerun": round(datos["bytes"] / reruns / 1024, 2) if reruns else 0.0,
+                    "emisiones": datos["emisiones"],
+                    "kb_max_bloque": round(datos["max_bytes"] / 1024, 2),
+                })
+            filas.sort(key=lambda fila: fila["kb_total"], reverse=True)
+            return filas
+
+
+# Registros únicos del proceso: Streamlit re-ejecuta los scripts, pero los módulos se importan una sola vez
+REGISTRO_LATENCIAS = RegistroLatencias()
+MEDIDOR_PAYLOAD = MedidorPayload()
+
+_contador_reruns = itertools.count(1)
+_hilo_actual = threading.local()
+
+
+class CronometroRerun:
+    """
+    Mide las secciones consecutivas de un rerun.
+    Cada llamada a marcar() cierra la sección anterior y abre la siguiente,
+    así el script no necesita re-indentarse dentro de bloques with.
+    """
+
+    def __init__(self, app, sesion_id=None, registro=REGISTRO_LATENCIAS, medidor=MEDIDOR_PAYLOAD):
+        self.app = app
+        self.sesion_id = sesion_id
+        self.registro = registro
+        self.medidor = medidor
+        self.rerun_id = next(_contador_reruns)
+        self.seccion_actual = None
+        self.bytes_rerun = 0
+        self._inicio_rerun = time.perf_counter()
+        self._inicio_seccion = None
+
+    def _cerrar_seccion(self):
+        if self.seccion_actual is not None:
+            duracion_ms = (time.perf_counter() - self._inicio_seccion) * 1000
+            self.registro.registrar(self.app, self.seccion_actual, duracion_ms, self.rerun_id)
+        self.seccion_actual = None
+
+    def marcar(self, seccion):
+        """Cierra la sección en curso (si la hay) y empieza a medir una nueva"""
+        self._cerrar_seccion()
+        self.seccion_actual = seccion
+        self._inicio_seccion = time.perf_counter()
+
+    def registrar_bytes(self, n_bytes):
+        """Atribuye bytes de markdown/HTML emitidos a la sección en curso"""
+        self.bytes_rerun += n_bytes
+        self.medidor.registrar_emision(self.app, self.seccion_actual or "sin_seccion", n_bytes)
+
+    def terminar(self):
+        """Cierra la última sección y registra la duración total y los bytes del rerun"""
+        self._cerrar_seccion()
+        duracion_ms = (time.perf_counter() - self._inicio_rerun) * 1000
+        self.registro.registrar(self.app, SECCION_TOTAL, duracion_ms, self.rerun_id)
+        self.medidor.registrar_rerun(self.app, self.sesion_id, self.bytes_rerun)
+        if getattr(_hilo_actual, "cronometro", None) is self:
+            _hilo_actual.cronometro = None
+
+
+def iniciar_cronometro(app):
+    """
+    Crea el cronómetro del rerun actual y lo deja activo para el hilo del script.
+    También cuenta el rerun en la sesión (st.session_state['_mupai_reruns']).
+    """
+    if "_mupai_sesion_id" not in st.session_state:
+        st.session_state["_mupai_sesion_id"] = uuid.uuid4().hex
+    st.session_state["_mupai_reruns"] = st.session_state.get("_mupai_reruns", 0) + 1
+
+    cronometro = CronometroRerun(app, sesion_id=st.session_state["_mupai_sesion_id"])
+    _hilo_actual.cronometro = cronometro
+    return cronometro
+
+
+def cronometro_activo():
+    """Cronómetro del rerun que se ejecuta en este hilo, o None"""
+    return getattr(_hilo_actual, "cronometro", None)
+
+
+@contextmanager
+def medir_seccion(seccion):
+    """
+    Mide un bloque puntual (p. ej. el envío SMTP) sin alterar la secuencia de marcar().
+    Si no hay cronómetro activo, la muestra se atribuye a la app 'externa'.
+    """
+    cronometro = cronometro_activo()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        if cronometro is not None:
+            REGISTRO_LATENCIAS.registrar(cronometro.app, seccion, duracion_ms, cronometro.rerun_id)
+        else:
+            REGISTRO_LATENCIAS.registrar("externa", seccion, duracion_ms, 0)
+
+
+def _bytes_emitidos(args, kwargs):
+    """Tamaño en bytes (UTF-8) del texto que recibe una función de Streamlit"""
+    valores = args if args else (kwargs.get("body"),)
+    return sum(len(valor.encode("utf-8")) for valor in valores if isinstance(valor, str))
+
+
+def _envolver_funcion(funcion):
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        cronometro = cronometro_activo()
+        if cronometro is not None:
+            cronometro.registrar_bytes(_bytes_emitidos(args, kwargs))
+        return funcion(*args, **kwargs)
+
+    envoltura._mupai_medida = True
+    return envoltura
+
+
+def instalar_medidor_payload():
+    """
+    Envuelve st.markdown, st.write, st.info, etc. para medir los bytes que emite cada sección.
+    Es idempotente: en reruns posteriores las funciones ya envueltas se dejan intactas.
+    """
+    for nombre in FUNCIONES_MEDIDAS:
+        funcion = getattr(st, nombre, None)
+        if funcion is not None and not getattr(funcion, "_mupai_medida", False):
+            setattr(st, nombre, _envolver_funcion(funcion))
+
+
+def mostrar_panel_latencias():
+    """Panel de administración (barra lateral) con percentiles por sección y exportación JSONL"""
+    if not es_administrador():
+        return
+    with st.sidebar.expander("⏱️ Latencia por sección (admin)", expanded=False):
+        filas = REGISTRO_LATENCIAS.resumen_percentiles()
+        if not filas:
+            st.caption("Aún no hay muestras registradas en este proceso.")
+            return
+
+        st.caption(f"{sum(fila['n'] for fila in filas)} muestras en memoria (máx. {CAPACIDAD_BUFFER})")
+        st.dataframe(filas, use_container_width=True, hide_index=True)
+        st.download_button(
+            "📥 Exportar muestras (JSONL)",
+            data=REGISTRO_LATENCIAS.exportar_jsonl(),
+            file_name=f"latencias_mupai_{time.strftime('%Y%m%d_%H%M%S')}.jsonl",
+            mime="application/x-ndjson",
+            key="exportar_latencias_jsonl",
+        )
+        if st.button("🧹 Vaciar muestras", key="vaciar_latencias"):
+            REGISTRO_LATENCIAS.limpiar()
+
+
+def mostrar_panel_payload():
+    """Panel de administración (barra lateral) con reruns por sesión y bytes emitidos por sección"""
+    if not es_administrador():
+        return
+    with st.sidebar.expander("📦 Reruns y payload HTML (admin)", expanded=False):
+        st.caption(f"Reruns de esta sesión: {st.session_state.get('_mupai_reruns', 0)}")
+        apps = MEDIDOR_PAYLOAD.resumen_apps()
+        if not apps:
+            st.caption("Aún no hay reruns completos registrados en este proceso.")
+            return
+
+        st.dataframe(apps, use_container_width=True, hide_index=True)
+        st.markdown("**Bloques más pesados por sección**")
+        st.dataframe(MEDIDOR_PAYLOAD.resumen_secciones(), use_container_width=True, hide_index=True)
+        if st.button("🧹 Reiniciar contadores", key="vaciar_payload"):
+            MEDIDOR_PAYLOAD.limpiar()
@@ -0,0 +1,157 @@
+"""
+Tabla local de nutrientes de los alimentos del catálogo.
+
+`catalogo/nutrientes.csv` tiene una fila por alimento del catálogo (por su ID estable)
+con kcal, proteína, grasa, carbohidratos totales (incluida la fibra) y fibra por
+100 g de porción comestible: cereales, pastas y leguminosas ya cocidos, carnes y
+pescados crudos. La columna `nombre` solo sirve para leer el archivo; al cargarlo se
+compara con el catálogo para detectar una fila desplazada. Los alimentos sin fila
+(alergias, métodos de cocción, opciones "Ninguno") quedan en cero y fuera de
+`con_datos`.
+
+La tabla se lee una vez por proceso a una matriz NumPy alimentos x nutrientes en
+orden de columnas (cada nutriente contiguo en memoria) y de solo lectura. Un bitset
+de mupai_catalogo se desempaqueta a un vector 0/1 por alimento y el perfil de una
+selección, o de toda una matriz de clientes, es un solo producto de matrices:
+
+    tabla = cargar_nutrientes()
+    tabla.total(bits)                   # suma por 100 g de cada alimento elegido
+    tabla.promedio(matriz_clientes)     # perfil medio por 100 g, una fila por cliente
+    tabla.por_grupo(bits)               # {grupo: perfil medio} con un producto más
+"""
+import csv
+import os
+import threading
+from types import MappingProxyType
+
+import numpy as np
+
+from mupai_catalogo import cargar_catalogo
+
+RUTA_NUTRIENTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogo", "nutrientes.csv")
+
+NUTRIENTES = ("kcal", "proteina_g", "grasa_g", "carbohidratos_g", "fibra_g")
+
+
+class TablaNutrientes:
+    """Matriz inmutable alimentos x nutrientes (por 100 g) alineada con los IDs del catálogo"""
+
+    def __init__(self, filas, catalogo=None):
+        self.catalogo = catalogo or cargar_catalogo()
+        matriz = np.zeros((len(self.catalogo), len(NUTRIENTES)), dtype=np.float64, order="F")
+        con_datos = np.zeros(len(self.catalogo), dtype=bool)
+        for fila in filas:
+            id_alimento = int(fila["id"])
+            if not 0 <= id_alimento < len(self.catalogo):
+                raise ValueError(f"ID de nutrientes fuera del catálogo: {id_alimento}")
+            if con_datos[id_alimento]:
+                raise ValueError(f"ID de nutrientes repetido: {id_alimento}")
+            alimento = self.catalogo.alimentos[id_alimento]
+            if fila.get("nombre") and fila["nombre"] != alimento.nombre:
+                raise ValueError(f"El ID {id_alimento} es '{alimento.nombre}' en el catálogo, no '{fila['nombre']}'")
+            valores = [float(fila[nutriente]) for nutriente in NUTRIENTES]
+            if min(valores) < 0:
+                raise ValueError(f"Nutrientes negativos en el ID {id_alimento}")
+            matriz[id_alimento] = valores
+            con_datos[id_alimento] = True
+
+        matriz.flags.writeable = False
+        con_datos.flags.writeable = False
+        self.matriz = matriz
+        self.con_datos = con_datos
+        # Vistas por nutriente (contiguas por estar la matriz en orden de columnas)
+        self.columnas = MappingProxyType({nutriente: matriz[:, i] for i, nutriente in enumerate(NUTRIENTES)})
+
+        grupos = self.catalogo.grupos
+        indicadora = np.zeros((len(grupos), len(self.catalogo)), dtype=np.float64)
+        for alimento in self.catalogo.alimentos:
+            if alimento.grupo and con_datos[alimento.id]:
+                indicadora[grupos.index(alimento.grupo), alimento.id] = 1.0
+        indicadora.flags.writeable = False
+        # Grupos x alimentos (solo alimentos con datos), para perfiles por grupo
+        self._indicadora_grupos = indicadora
+
+    def __len__(self):
+        return int(self.con_datos.sum())
+
+    def pertenencia(self, bits):
+        """Vector 0/1 por alimento (o matriz clientes x alimentos) de un bitset, solo alimentos con datos"""
+        bytes_ = np.ascontiguousarray(bits, dtype="<u8").view(np.uint8)
+        desempacados = np.unpackbits(bytes_, axis=-1, bitorder="little")[..., :len(self.catalogo)]
+        return desempacados * self.con_datos
+
+    def total(self, bits, gramos=None):
+        """
+        Suma de nutrientes de los alimentos elegidos. Sin `gramos` cada alimento cuenta
+        100 g; con `gramos` (un valor, o un arreglo por alimento) se escala a esa porción.
+        Con una matriz de clientes devuelve una fila por cliente.
+        """
+        pesos = self.pertenencia(bits).astype(np.float64)
+        if gramos is not None:
+            pesos *= np.asarray(gramos, dtype=np.float64) / 100.0
+        return pesos @ self.matriz
+
+    def promedio(self, bits):
+        """Perfil medio por 100 g de los alimentos elegidos (ceros si no hay ninguno con datos)"""
+        pesos = self.pertenencia(bits).astype(np.float64)
+        cuenta = pesos.sum(axis=-1, keepdims=True)
+        return (pesos @ self.matriz) / np.maximum(cuenta, 1.0)
+
+    def por_grupo(self, bits):
+        """{grupo: (alimentos, perfil medio por 100 g)} de una selección, solo grupos con alimentos elegidos"""
+        ponderada = self._indicadora_grupos * self.pertenencia(bits)
+        cuentas = ponderada.sum(axis=1)
+        perfiles = (ponderada @ self.matriz) / np.maximum(cuentas, 1.0)[:, None]
+        return {
+            grupo: (int(cuentas[i]), perfiles[i])
+            for i, grupo in enumerate(self.catalogo.grupos)
+            if cuentas[i]
+        }
+
+    def como_dict(self, perfil):
+        """{nutriente: valor redondeado} de un vector de perfil"""
+        return {nutriente: round(float(valor), 1) for nutriente, valor in zip(NUTRIENTES, perfil)}
+
+
+_TABLA = None
+_LOCK = threading.Lock()
+
+
+def cargar_nutrientes(ruta=RUTA_NUTRIENTES):
+    """Tabla de nutrientes leída y validada una sola vez por proceso"""
+    global _TABLA
+    if _TABLA is None:
+        with _LOCK:
+            if _TABLA is None:
+                with open(ruta, encoding="utf-8", newline="") as archivo:
+                    _TABLA = TablaNutrientes(list(csv.DictReader(archivo)))
+    return _TABLA
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Perfiles de nutrientes de selecciones de clientes sintéticos")
+    parser.add_argument("-n", type=int, default=50000, help="Clientes sintéticos (no se guardan)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tabla = cargar_nutrientes()
+    print(f"{len(tabla)} alimentos con nutrientes cargados en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    catalogo = tabla.catalogo
+    generador = np.random.default_rng(0)
+    matriz = catalogo.vacio(args.n)
+    for i in range(args.n):
+        matriz[i] = catalogo.desde_ids(generador.choice(len(catalogo), size=60, replace=False))
+
+    inicio = time.perf_counter()
+    perfiles = tabla.promedio(matriz)
+    print(f"Perfil medio de {args.n} clientes en {(time.perf_counter() - inicio) * 1000:.1f} ms: "
+          f"{tabla.como_dict(perfiles.mean(axis=0))}")
+    inicio = time.perf_counter()
+    grupos = tabla.por_grupo(matriz[0])
+    print(f"Perfil por grupo de un cliente en {(time.perf_counter() - inicio) * 1e6:.0f} µs")
+    for grupo, (alimentos, perfil) in grupos.items():
+        print(f"  {grupo} ({alimentos}): {tabla.como_dict(perfil)}")
@@ -0,0 +1,252 @@
+"""
+Plantillas precompiladas para los resúmenes de las apps MUPAI.
+
+Las plantillas viven en la carpeta `plantillas/` como texto plano con marcadores
+al estilo de str.format: `{peso:.1f}`, `{nombre}`. Un marcador puede llevar un
+filtro (`{vegetales_lista|lista}`) que se aplica antes del formato. Cada plantilla
+se lee y se compila una sola vez por proceso en dos listas de partes, una para
+texto plano y otra para HTML, de modo que renderizar es solo recorrer las partes
+con un dict de datos ya preparado.
+
+La versión HTML se deriva del mismo texto: los bloques entre líneas de `=` son
+encabezados, las líneas que empiezan con "- " son elementos de lista y el resto
+son párrafos. Los valores se escapan en HTML; un marcador solo en su línea cuyo
+valor es un Fragmento (otra plantilla con sus datos) se inserta renderizado en el
+mismo formato.
+"""
+import html
+import os
+import re
+import string
+import threading
+import time
+from collections import namedtuple
+
+DIRECTORIO_PLANTILLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plantillas")
+
+# Texto para listas vacías, igual que en los resúmenes originales
+SIN_ESPECIFICAR = "No especificado"
+
+_REGLA = re.compile(r"^=+\s*$")
+_MARCADOR_SOLO = re.compile(r"^\{[^{}]+\}$")
+_FORMATEADOR = string.Formatter()
+
+# Subplantilla ya enlazada con sus datos, para secciones que dependen de una condición
+Fragmento = namedtuple("Fragmento", ["plantilla", "datos"])
+
+# Parte compilada que toma su valor de los datos
+_Campo = namedtuple("_Campo", ["campo", "filtro", "formato", "bloque"])
+
+
+def _lista(valor):
+    return ", ".join(valor) if valor else SIN_ESPECIFICAR
+
+
+FILTROS = {
+    "lista": _lista,
+    "mayusculas": lambda valor: str(valor).upper(),
+    "capitalizar": lambda valor: str(valor).capitalize(),
+}
+
+
+def _compilar_linea(linea, escapar=False):
+    """Partes (texto literal o _Campo) de una línea o fragmento de plantilla"""
+    partes = []
+    for literal, campo, formato, conversion in _FORMATEADOR.parse(linea):
+        if literal:
+            partes.append(html.escape(literal, quote=False) if escapar else literal)
+        if campo is None:
+            continue
+        if conversion:
+            raise ValueError(f"Conversión !{conversion} no soportada en plantillas: {{{campo}}}")
+        nombre, _, filtro = campo.partition("|")
+        if filtro and filtro not in FILTROS:
+            raise ValueError(f"Filtro desconocido en plantilla: {filtro}")
+        partes.append(_Campo(nombre, filtro or None, formato or "", False))
+    return partes
+
+
+def _compilar_html(fuente):
+    """Partes HTML: encabezados, listas y párrafos derivados de la estructura del texto"""
+    partes = []
+    lineas = fuente.strip("\n").split("\n")
+    en_lista = False
+    i = 0
+
+    def cerrar_lista():
+        nonlocal en_lista
+        if en_lista:
+            partes.append("</ul>\n")
+            en_lista = False
+
+    while i < len(lineas):
+        linea = lineas[i].rstrip()
+        if _REGLA.match(linea):
+            cerrar_lista()
+            fin = i + 1
+            while fin < len(lineas) and not _REGLA.match(lineas[fin]):
+                fin += 1
+            partes.append("<h3>")
+            for j, titulo in enumerate(lineas[i + 1:fin]):
+                if j:
+                    partes.append("<br>")
+                partes.extend(_compilar_linea(titulo.strip(), escapar=True))
+            partes.append("</h3>\n")
+            i = fin + 1
+            continue
+        if not linea:
+            cerrar_lista()
+        elif _MARCADOR_SOLO.match(linea):
+            cerrar_lista()
+            campo = _compilar_linea(linea)[0]
+            partes.append(campo._replace(bloque=True))
+        elif linea.startswith("- "):
+            if not en_lista:
+                partes.append("<ul>\n")
+                en_lista = True
+            partes.append("<li>")
+            partes.extend(_compilar_linea(linea[2:], escapar=True))
+            partes.append("</li>\n")
+        else:
+            cerrar_lista()
+            partes.append("<p>")
+            partes.extend(_compilar_linea(linea, escapar=True))
+            partes.append("</p>\n")
+        i += 1
+    cerrar_lista()
+    return _fusionar_literales(partes)
+
+
+def _fusionar_literales(partes):
+    """Une textos literales consecutivos para que el render recorra menos partes"""
+    fusionadas = []
+    for parte in partes:
+        if isinstance(parte, str) and fusionadas and isinstance(fusionadas[-1], str):
+            fusionadas[-1] += parte
+        else:
+            fusionadas.append(parte)
+    return tuple(fusionadas)
+
+
+class Plantilla:
+    """Plantilla compilada una vez; renderiza texto plano o HTML desde un dict de datos"""
+
+    def __init__(self, fuente, nombre="plantilla"):
+        self.nombre = nombre
+        self._texto = _fusionar_literales(_compilar_linea(fuente))
+        self._html = _compilar_html(fuente)
+        self.campos = frozenset(parte.campo for parte in self._texto if isinstance(parte, _Campo))
+
+    def _render(self, partes, datos, es_html):
+        salida = []
+        for parte in partes:
+            if parte.__class__ is str:
+                salida.append(parte)
+                continue
+            valor = datos[parte.campo]
+            if isinstance(valor, Fragmento):
+                texto = valor.plantilla._render(
+                    valor.plantilla._html if es_html else valor.plantilla._texto, valor.datos, es_html
+                )
+                salida.append(texto if (parte.bloque or not es_html) else html.escape(texto, quote=False))
+                continue
+            if parte.filtro:
+                valor = FILTROS[parte.filtro](valor)
+            texto = format(valor, parte.formato)
+            if es_html:
+                texto = html.escape(texto, quote=False)
+                if parte.bloque and texto.strip():
+                    texto = "<p>" + texto.strip("\n").replace("\n", "<br>\n") + "</p>\n"
+            salida.append(texto)
+        return "".join(salida)
+
+    def texto(self, datos):
+        return self._render(self._texto, datos, False)
+
+    def html(self, datos):
+        return f'<div class="resumen-mupai">\n{self._render(self._html, datos, True)}</div>\n'
+
+    def faltantes(self, datos):
+        """Campos de la plantilla que no vienen en los datos (útil al cambiar una plantilla)"""
+        return sorted(self.campos - set(datos))
+
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def cargar_plantilla(nombre, directorio=DIRECTORIO_PLANTILLAS):
+    """Plantilla `plantillas/<nombre>.txt`, leída y compilada una sola vez por proceso"""
+    clave = (directorio, nombre)
+    plantilla = _CACHE.get(clave)
+    if plantilla is None:
+        with _LOCK:
+            plantilla = _CACHE.get(clave)
+            if plantilla is None:
+                with open(os.path.join(directorio, f"{nombre}.txt"), encoding="utf-8") as archivo:
+                    fuente = archivo.read()
+                # El salto de línea con el que termina el archivo no forma parte de la plantilla
+                if fuente.endswith("\n"):
+                    fuente = fuente[:-1]
+                plantilla = Plantilla(fuente, nombre)
+                _CACHE[clave] = plantilla
+    return plantilla
+
+
+def renderizar_lote(plantilla, lista_datos, formato="texto"):
+    """Renderiza muchos resúmenes con la misma plantilla (p. ej. reenvíos o exportaciones)"""
+    render = plantilla.html if formato == "html" else plantilla.texto
+    return [render(datos) for datos in lista_datos]
+
+
+# ==================== BENCHMARK ====================
+
+def datos_de_ejemplo(plantilla, semilla=0):
+    """Datos sintéticos con todos los campos de la plantilla (números donde hay formato)"""
+    datos = {}
+    for parte in plantilla._texto:
+        if not isinstance(parte, _Campo) or parte.campo in datos:
+            continue
+        if parte.filtro == "lista":
+            datos[parte.campo] = [f"Alimento {semilla}-{i}" for i in range(6)]
+        elif parte.formato:
+            datos[parte.campo] = 70.0 + semilla % 30
+        else:
+            datos[parte.campo] = f"valor {parte.campo} {semilla}"
+    return datos
+
+
+def medir(nombres, n=2000):
+    """Tiempo medio por resumen (texto y HTML) y throughput de renderizar_lote"""
+    resultados = {}
+    for nombre in nombres:
+        t0 = time.perf_counter()
+        _CACHE.clear()
+        plantilla = cargar_plantilla(nombre)
+        compilar_ms = (time.perf_counter() - t0) * 1000
+        lote = [datos_de_ejemplo(plantilla, semilla) for semilla in range(n)]
+        for formato in ("texto", "html"):
+            t0 = time.perf_counter()
+            renderizar_lote(plantilla, lote, formato)
+            total_s = time.perf_counter() - t0
+            resultados[f"{nombre}/{formato}"] = {
+                "compilar_ms": round(compilar_ms, 2),
+                "us_por_resumen": round(total_s / n * 1e6, 1),
+                "resumenes_por_segundo": round(n / total_s),
+            }
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mide el render de las plantillas de resumen MUPAI")
+    parser.add_argument("-n", type=int, default=2000, help="Resúmenes por lote")
+    parser.add_argument("plantillas", nargs="*", help="Nombres en plantillas/ (por defecto todas)")
+    args = parser.parse_args()
+
+    nombres = args.plantillas or sorted(
+        archivo[:-4] for archivo in os.listdir(DIRECTORIO_PLANTILLAS) if archivo.endswith(".txt")
+    )
+    for clave, resultado in medir(nombres, args.n).items():
+        print(f"{clave:>45}: " + " · ".join(f"{k}={v}" for k, v in resultado.items()))
@@ -0,0 +1,148 @@
+"""
+Puntos de control del cuestionario por pasos (patrones alimentarios).
+
+En cada cambio de paso la app guarda el estado del asistente (paso actual, paso
+máximo desbloqueado, pasos completados y todas las selecciones) en la tabla
+`progreso_cuestionario` de la misma base SQLite del almacén de evaluaciones, usando
+su hilo escritor. El estado se guarda compacto: JSON sin listas vacías, pasos
+completados como máscara de bits y todo comprimido con zlib (unos cientos de bytes
+aunque el cliente marque muchos alimentos).
+
+Si la sesión se pierde (Wi-Fi del gimnasio, pestaña cerrada), el cliente recupera su
+avance con el código corto que se le muestra o con el email y el teléfono con los que
+se registró, y vuelve directo al último paso en el que estaba.
+"""
+import json
+import re
+import secrets
+import sqlite3
+import time
+import zlib
+
+from mupai_almacen import ALMACEN, normalizar_email, normalizar_telefono
+
+# Versión del formato del estado serializado
+VERSION_ESTADO = 1
+
+# Caracteres del código de reanudación (sin 0/O ni 1/I/L, que se confunden al dictarlos)
+ALFABETO_TOKEN = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
+LONGITUD_TOKEN = 8
+
+# Los puntos de control más antiguos se eliminan al arrancar el proceso
+DIAS_RETENCION = 30
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS progreso_cuestionario (
+    token       TEXT PRIMARY KEY,
+    app         TEXT NOT NULL,
+    actualizado REAL NOT NULL,
+    email       TEXT,
+    telefono    TEXT,
+    paso        INTEGER NOT NULL,
+    estado      BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_progreso_email ON progreso_cuestionario (email, actualizado);
+CREATE INDEX IF NOT EXISTS idx_progreso_telefono ON progreso_cuestionario (telefono, actualizado);
+"""
+
+_GUARDAR = """
+INSERT INTO progreso_cuestionario (token, app, actualizado, email, telefono, paso, estado)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (token) DO UPDATE SET
+    actualizado = excluded.actualizado,
+    email = excluded.email,
+    telefono = excluded.telefono,
+    paso = excluded.paso,
+    estado = excluded.estado
+"""
+
+_PURGAR = "DELETE FROM progreso_cuestionario WHERE actualizado < ?"
+
+ALMACEN.crear_tablas(ESQUEMA)
+ALMACEN.escribir(_PURGAR, (time.time() - DIAS_RETENCION * 86400,))
+
+
+def nuevo_token():
+    return "".join(secrets.choice(ALFABETO_TOKEN) for _ in range(LONGITUD_TOKEN))
+
+
+def formatear_token(token):
+    """Código para mostrar al cliente: ABCD-EFGH"""
+    mitad = len(token) // 2
+    return f"{token[:mitad]}-{token[mitad:]}"
+
+
+def normalizar_token(texto):
+    return re.sub(r"[^A-Z0-9]", "", (texto or "").upper())
+
+
+def _mascara(pasos_completados):
+    return sum(1 << (int(paso) - 1) for paso, completado in pasos_completados.items() if completado)
+
+
+def _pasos(mascara, total_pasos):
+    return {paso: bool(mascara >> (paso - 1) & 1) for paso in range(1, total_pasos + 1)}
+
+
+def serializar_estado(paso_actual, paso_maximo, pasos_completados, valores):
+    """
+    Estado comprimido del asistente. `valores` es {clave de session_state: valor}
+    con las selecciones y los datos del cliente; los vacíos no se guardan.
+    """
+    estado = {
+        "v": VERSION_ESTADO,
+        "paso": paso_actual,
+        "max": paso_maximo,
+        "hechos": _mascara(pasos_completados),
+        "valores": {clave: list(valor) if isinstance(valor, tuple) else valor
+                    for clave, valor in valores.items() if valor not in (None, "", [], ())},
+    }
+    return zlib.compress(json.dumps(estado, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def deserializar_estado(blob, total_pasos=12):
+    estado = json.loads(zlib.decompress(blob).decode("utf-8"))
+    if estado.get("v") != VERSION_ESTADO:
+        raise ValueError(f"Versión de punto de control no soportada: {estado.get('v')}")
+    return {
+        "paso_actual": estado["paso"],
+        "paso_maximo": estado["max"],
+        "pasos_completados": _pasos(estado["hechos"], total_pasos),
+        "valores": estado["valores"],
+    }
+
+
+def guardar_progreso(app, token, email, telefono, paso_actual, paso_maximo, pasos_completados, valores):
+    """Encola el punto de control de la sesión (una fila por código, se sobrescribe en cada paso)"""
+    blob = serializar_estado(paso_actual, paso_maximo, pasos_completados, valores)
+    ALMACEN.escribir(_GUARDAR, (
+        token, app, time.time(), normalizar_email(email), normalizar_telefono(telefono),
+        paso_actual, sqlite3.Binary(blob),
+    ))
+    return len(blob)
+
+
+def cargar_progreso(app, token=None, email=None, telefono=None):
+    """
+    Último punto de control por código, o por email y teléfono juntos (ambos deben
+    coincidir con los del registro). Devuelve el estado con su "token", o None.
+    """
+    if token:
+        condicion, parametros = "token = ?", [normalizar_token(token)]
+    elif email and telefono:
+        condicion, parametros = "email = ? AND telefono = ?", [normalizar_email(email), normalizar_telefono(telefono)]
+    else:
+        return None
+    filas = ALMACEN.consultar(
+        f"SELECT token, estado FROM progreso_cuestionario WHERE app = ? AND {condicion} "
+        "ORDER BY actualizado DESC LIMIT 1",
+        (app, *parametros),
+    )
+    if not filas:
+        return None
+    try:
+        estado = deserializar_estado(bytes(filas[0]["estado"]))
+    except (ValueError, KeyError, zlib.error):
+        return None
+    estado["token"] = filas[0]["token"]
+    return estado
@@ -0,0 +1,118 @@
+"""
+Selecciones de alimentos de cada cliente guardadas como bitsets del catálogo.
+
+La tabla `selecciones` tiene una fila por cliente con su última respuesta al
+cuestionario de patrones alimentarios: el bitset (palabras uint64 en little-endian)
+y la versión del catálogo con la que se codificó. Se escribe con el hilo escritor
+del almacén solo cuando las selecciones cambian.
+
+`cargar_matriz()` lee todos los bitsets en una matriz clientes x palabras, sobre la
+que las operaciones de mupai_catalogo (contiene, interseccion, popcount, jaccard)
+se aplican a toda la base de una vez.
+"""
+import time
+
+import numpy as np
+import streamlit as st
+
+from mupai_almacen import ALMACEN, clave_cliente
+from mupai_catalogo import cargar_catalogo
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS selecciones (
+    cliente          TEXT PRIMARY KEY,
+    id_evaluacion    TEXT NOT NULL,
+    actualizado      REAL NOT NULL,
+    version_catalogo INTEGER NOT NULL,
+    bits             BLOB NOT NULL
+);
+"""
+
+_GUARDAR = """
+INSERT INTO selecciones (cliente, id_evaluacion, actualizado, version_catalogo, bits) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (cliente) DO UPDATE SET
+    id_evaluacion = excluded.id_evaluacion,
+    actualizado = excluded.actualizado,
+    version_catalogo = excluded.version_catalogo,
+    bits = excluded.bits
+"""
+
+ALMACEN.crear_tablas(ESQUEMA)
+
+# Funciones (cliente, bits) avisadas en cada guardado, p. ej. el índice invertido
+_SUSCRIPTORES = []
+
+
+def suscribir(funcion):
+    if funcion not in _SUSCRIPTORES:
+        _SUSCRIPTORES.append(funcion)
+
+
+def guardar_selecciones(cliente, id_evaluacion, bits):
+    catalogo = cargar_catalogo()
+    ALMACEN.escribir(_GUARDAR, (cliente, id_evaluacion, time.time(), catalogo.version, catalogo.a_bytes(bits)))
+    for funcion in _SUSCRIPTORES:
+        funcion(cliente, bits)
+
+
+def persistir_selecciones(id_evaluacion, email, telefono, selecciones):
+    """
+    Codifica {clave: [nombres]} y lo guarda como las selecciones actuales del cliente,
+    solo si el bitset cambió desde el último rerun de la sesión. Devuelve el bitset.
+    """
+    catalogo = cargar_catalogo()
+    bits = catalogo.codificar(selecciones)
+    cliente = clave_cliente(email, telefono)
+    huella = (cliente, catalogo.a_bytes(bits))
+    if cliente and id_evaluacion and st.session_state.get("huella_selecciones") != huella:
+        guardar_selecciones(cliente, id_evaluacion, bits)
+        st.session_state["huella_selecciones"] = huella
+    return bits
+
+
+def selecciones_cliente(email=None, telefono=None):
+    """Bitset actual del cliente, o None si nunca respondió el cuestionario"""
+    cliente = clave_cliente(email, telefono)
+    filas = ALMACEN.consultar("SELECT bits FROM selecciones WHERE cliente = ?", (cliente,)) if cliente else []
+    return cargar_catalogo().desde_bytes(filas[0]["bits"]) if filas else None
+
+
+def cargar_matriz(desde_actualizado=None):
+    """(clientes, matriz uint64 clientes x palabras) con las selecciones guardadas"""
+    catalogo = cargar_catalogo()
+    if desde_actualizado is None:
+        filas = ALMACEN.consultar("SELECT cliente, bits FROM selecciones ORDER BY cliente")
+    else:
+        filas = ALMACEN.consultar(
+            "SELECT cliente, bits FROM selecciones WHERE actualizado > ? ORDER BY cliente", (desde_actualizado,)
+        )
+    matriz = catalogo.vacio(len(filas))
+    for i, fila in enumerate(filas):
+        matriz[i] = catalogo.desde_bytes(fila["bits"])
+    return [fila["cliente"] for fila in filas], matriz
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from mupai_catalogo import popcount
+
+    parser = argparse.ArgumentParser(description="Prueba de bitsets de selecciones sobre clientes sintéticos")
+    parser.add_argument("-n", type=int, default=50000, help="Clientes sintéticos (no se guardan)")
+    args = parser.parse_args()
+
+    catalogo = cargar_catalogo()
+    generador = np.random.default_rng(0)
+    inicio = time.perf_counter()
+    matriz = catalogo.vacio(args.n)
+    for i in range(args.n):
+        matriz[i] = catalogo.desde_ids(generador.choice(len(catalogo), size=60, replace=False))
+    print(f"{args.n} bitsets de {catalogo.palabras * 8} bytes codificados en {time.perf_counter() - inicio:.2f} s")
+
+    inicio = time.perf_counter()
+    conteos = popcount(matriz)
+    comunes = np.bitwise_and.reduce(matriz[:1000], axis=0)
+    cualquiera = np.bitwise_or.reduce(matriz, axis=0)
+    print(f"popcount de toda la base + intersección/unión: {(time.perf_counter() - inicio) * 1000:.1f} ms "
+          f"(media {conteos.mean():.1f} alimentos, {len(catalogo.ids_de(cualquiera))} distintos, "
+          f"{len(catalogo.ids_de(comunes))} comunes a los primeros 1000)")
@@ -0,0 +1,296 @@
+"""
+Serie de mediciones por cliente y resumen de progreso mantenido al escribir.
+
+Cada evaluación fitness guardada en el almacén agrega (o actualiza) un punto en la
+tabla `mediciones`: peso, grasa corregida, MLG, FFMI, nivel de entrenamiento y
+calorías objetivo, ligado al cliente por email normalizado (o por teléfono si no hay
+email). Así se enlazan las evaluaciones que un cliente repite cada 6 semanas.
+
+En la misma transacción del hilo escritor se actualiza la fila del cliente en
+`progreso_clientes`: primera, penúltima y última medición, cambios contra la
+anterior y contra la primera, ritmo semanal y mejores marcas. La vista de progreso
+lee solo esa fila; nunca recorre el historial. Solo un punto que llega fuera de
+orden (o que corrige uno que no es el último) reconstruye el resumen, y únicamente
+con las mediciones de ese cliente.
+"""
+import json
+import time
+from datetime import date
+
+import streamlit as st
+
+from mupai_almacen import ALMACEN, clave_cliente
+
+APP_SERIE = "evaluacion_fitness"
+
+# Campos de cada punto de la serie (todos del registro de mupai_estructurado)
+CAMPOS_NUMERICOS = ("peso_kg", "grasa_corregida_pct", "mlg_kg", "ffmi", "ingesta_kcal")
+CAMPOS_SERIE = CAMPOS_NUMERICOS + ("nivel_entrenamiento",)
+
+# Sentido de la mejor marca de cada campo (el peso y las calorías dependen de la fase)
+MEJOR = {"grasa_corregida_pct": min, "mlg_kg": max, "ffmi": max}
+
+ETIQUETAS = {
+    "peso_kg": ("Peso", "kg"),
+    "grasa_corregida_pct": ("Grasa corporal", "%"),
+    "mlg_kg": ("Masa libre de grasa", "kg"),
+    "ffmi": ("FFMI", ""),
+    "ingesta_kcal": ("Calorías objetivo", "kcal"),
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mediciones (
+    id_evaluacion       TEXT PRIMARY KEY,
+    cliente             TEXT NOT NULL,
+    fecha               TEXT NOT NULL,
+    registrado          REAL NOT NULL,
+    peso_kg             REAL,
+    grasa_corregida_pct REAL,
+    mlg_kg              REAL,
+    ffmi                REAL,
+    ingesta_kcal        REAL,
+    nivel_entrenamiento TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_mediciones_cliente ON mediciones (cliente, fecha, registrado);
+CREATE TABLE IF NOT EXISTS progreso_clientes (
+    cliente     TEXT PRIMARY KEY,
+    actualizado REAL NOT NULL,
+    resumen     TEXT NOT NULL
+);
+"""
+
+_GUARDAR_MEDICION = f"""
+INSERT INTO mediciones (id_evaluacion, cliente, fecha, registrado, {", ".join(CAMPOS_SERIE)})
+VALUES (?, ?, ?, ?, {", ".join("?" for _ in CAMPOS_SERIE)})
+ON CONFLICT (id_evaluacion) DO UPDATE SET
+    cliente = excluded.cliente,
+    fecha = excluded.fecha,
+    {", ".join(f"{campo} = excluded.{campo}" for campo in CAMPOS_SERIE)}
+"""
+
+_GUARDAR_RESUMEN = """
+INSERT INTO progreso_clientes (cliente, actualizado, resumen) VALUES (?, ?, ?)
+ON CONFLICT (cliente) DO UPDATE SET actualizado = excluded.actualizado, resumen = excluded.resumen
+"""
+
+ALMACEN.crear_tablas(ESQUEMA)
+
+
+def _numero(valor):
+    try:
+        return round(float(valor), 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def punto_de_evaluacion(id_evaluacion, datos, registrado=None):
+    """Punto de la serie a partir del registro plano de una evaluación fitness"""
+    punto = {campo: _numero(datos.get(campo)) for campo in CAMPOS_NUMERICOS}
+    punto["nivel_entrenamiento"] = datos.get("nivel_entrenamiento") or None
+    punto["id"] = id_evaluacion
+    punto["fecha"] = str(datos.get("fecha_evaluacion") or "")[:10] or time.strftime("%Y-%m-%d")
+    punto["registrado"] = time.time() if registrado is None else registrado
+    return punto
+
+
+def _orden(punto):
+    return punto["fecha"], punto["registrado"]
+
+
+def _semanas(desde, hasta):
+    dias = (date.fromisoformat(hasta["fecha"]) - date.fromisoformat(desde["fecha"])).days
+    return dias / 7 if dias > 0 else None
+
+
+def _diferencias(desde, hasta):
+    if desde is None:
+        return {}
+    return {
+        campo: round(hasta[campo] - desde[campo], 2)
+        for campo in CAMPOS_NUMERICOS
+        if hasta[campo] is not None and desde[campo] is not None
+    }
+
+
+def _agregar_marca(marcas, punto):
+    """Combina las mejores marcas acumuladas con un punto más"""
+    marcas = dict(marcas)
+    for campo, elegir in MEJOR.items():
+        valor = punto[campo]
+        if valor is None:
+            continue
+        actual = marcas.get(campo)
+        if actual is None or elegir(valor, actual["valor"]) != actual["valor"]:
+            marcas[campo] = {"valor": valor, "fecha": punto["fecha"]}
+    return marcas
+
+
+def _plegar(estado, punto):
+    """Estado con un punto nuevo (posterior a todos) o con el último punto corregido"""
+    if estado is None:
+        return {"mediciones": 1, "primera": punto, "previa": None, "ultima": punto, "marcas_previas": {}}
+    if estado["ultima"]["id"] == punto["id"]:
+        if estado["primera"]["id"] == punto["id"]:
+            return dict(estado, primera=punto, ultima=punto)
+        return dict(estado, ultima=punto)
+    return {
+        "mediciones": estado["mediciones"] + 1,
+        "primera": estado["primera"],
+        "previa": estado["ultima"],
+        "ultima": punto,
+        "marcas_previas": _agregar_marca(estado["marcas_previas"], estado["ultima"]),
+    }
+
+
+def _completar(estado):
+    """Agrega al estado los derivados que muestra la vista: cambios, ritmo y mejores marcas"""
+    ultima, previa, primera = estado["ultima"], estado["previa"], estado["primera"]
+    cambios = _diferencias(previa, ultima)
+    semanas = _semanas(previa, ultima) if previa else None
+    semanas_total = _semanas(primera, ultima) if estado["mediciones"] > 1 else None
+    total = _diferencias(primera, ultima) if estado["mediciones"] > 1 else {}
+    return dict(
+        estado,
+        cambios=cambios,
+        cambio_total=total,
+        ritmo_semanal={campo: round(valor / semanas, 3) for campo, valor in cambios.items()} if semanas else {},
+        ritmo_semanal_total={campo: round(valor / semanas_total, 3) for campo, valor in total.items()}
+        if semanas_total else {},
+        mejores=_agregar_marca(estado["marcas_previas"], ultima),
+        semanas_desde_previa=round(semanas, 1) if semanas else None,
+    )
+
+
+def _reconstruir(conexion, cliente):
+    filas = conexion.execute(
+        f"SELECT id_evaluacion, fecha, registrado, {', '.join(CAMPOS_SERIE)} FROM mediciones "
+        "WHERE cliente = ? ORDER BY fecha, registrado",
+        (cliente,),
+    ).fetchall()
+    estado = None
+    for fila in filas:
+        punto = {campo: fila[campo] for campo in CAMPOS_SERIE}
+        punto.update(id=fila["id_evaluacion"], fecha=fila["fecha"], registrado=fila["registrado"])
+        estado = _plegar(estado, punto)
+    return estado
+
+
+def _guardar_resumen(conexion, cliente, estado):
+    conexion.execute(_GUARDAR_RESUMEN, (cliente, time.time(), json.dumps(_completar(estado), ensure_ascii=False)))
+
+
+def reconstruir_resumen(conexion, cliente):
+    """Recalcula el resumen de un cliente desde sus mediciones (escritura para el hilo escritor)"""
+    estado = _reconstruir(conexion, cliente)
+    if estado is not None:
+        _guardar_resumen(conexion, cliente, estado)
+
+
+def _aplicar_medicion(conexion, cliente, punto):
+    """Se ejecuta en el hilo escritor: guarda el punto y actualiza el resumen del cliente"""
+    conexion.execute(_GUARDAR_MEDICION, (
+        punto["id"], cliente, punto["fecha"], punto["registrado"], *(punto[campo] for campo in CAMPOS_SERIE)
+    ))
+    fila = conexion.execute("SELECT resumen FROM progreso_clientes WHERE cliente = ?", (cliente,)).fetchone()
+    estado = json.loads(fila["resumen"]) if fila else None
+    if estado is not None and estado["ultima"]["id"] == punto["id"]:
+        # Mismo registrado que al crearlo, para que el orden de la serie no cambie al corregirlo
+        punto = dict(punto, registrado=estado["ultima"]["registrado"])
+    en_orden = (
+        estado is None
+        or estado["ultima"]["id"] == punto["id"]
+        or (_orden(punto) >= _orden(estado["ultima"])
+            and punto["id"] not in (estado["primera"]["id"], (estado["previa"] or {}).get("id")))
+    )
+    if en_orden:
+        _guardar_resumen(conexion, cliente, _plegar(estado, punto))
+    else:
+        reconstruir_resumen(conexion, cliente)
+
+
+def registrar_medicion(app, id_evaluacion, datos):
+    """Suscriptor del almacén: encola el punto de cada evaluación fitness con peso y cliente"""
+    if app != APP_SERIE:
+        return
+    cliente = clave_cliente(datos.get("email"), datos.get("telefono"))
+    punto = punto_de_evaluacion(id_evaluacion, datos)
+    if cliente and punto["peso_kg"]:
+        ALMACEN.escribir(_aplicar_medicion, (cliente, punto))
+
+
+def resumen_progreso(email=None, telefono=None):
+    """Resumen de progreso del cliente (una sola fila), o None si no tiene mediciones"""
+    cliente = clave_cliente(email, telefono)
+    if not cliente:
+        return None
+    filas = ALMACEN.consultar("SELECT resumen FROM progreso_clientes WHERE cliente = ?", (cliente,))
+    return json.loads(filas[0]["resumen"]) if filas else None
+
+
+def serie_cliente(email=None, telefono=None):
+    """Todas las mediciones del cliente en orden (para gráficas o exportaciones, no para la vista)"""
+    cliente = clave_cliente(email, telefono)
+    filas = ALMACEN.consultar(
+        "SELECT * FROM mediciones WHERE cliente = ? ORDER BY fecha, registrado", (cliente,)
+    ) if cliente else []
+    return [dict(fila) for fila in filas]
+
+
+def mostrar_progreso_cliente(email, telefono=None, id_evaluacion_actual=None):
+    """
+    Vista de progreso contra la evaluación anterior. Si la última medición guardada es
+    la de esta misma sesión, los cambios son contra la previa; si no, se muestra la
+    última evaluación registrada como punto de partida.
+    """
+    resumen = resumen_progreso(email, telefono)
+    if not resumen or resumen["mediciones"] < 2:
+        return False
+    ultima = resumen["ultima"]
+    st.markdown(f"### 📈 Tu progreso ({resumen['mediciones']} evaluaciones desde {resumen['primera']['fecha']})")
+    if id_evaluacion_actual and ultima["id"] != id_evaluacion_actual:
+        st.caption("Aún no se registra la evaluación actual; estas cifras son hasta tu última evaluación guardada.")
+    columnas = st.columns(len(ETIQUETAS))
+    for columna, (campo, (etiqueta, unidad)) in zip(columnas, ETIQUETAS.items()):
+        if ultima.get(campo) is None:
+            continue
+        cambio = resumen["cambios"].get(campo)
+        columna.metric(
+            etiqueta,
+            f"{ultima[campo]:,.1f} {unidad}".strip(),
+            f"{cambio:+.1f} {unidad}".strip() if cambio is not None else None,
+            delta_color="inverse" if campo == "grasa_corregida_pct" else "normal",
+        )
+    detalles = []
+    if resumen.get("semanas_desde_previa"):
+        ritmo = resumen["ritmo_semanal"]
+        detalles.append(f"Desde tu evaluación anterior ({resumen['previa']['fecha']}, "
+                        f"{resumen['semanas_desde_previa']} semanas)"
+                        + (f": peso {ritmo['peso_kg']:+.2f} kg/semana" if "peso_kg" in ritmo else ""))
+    if resumen["previa"] and resumen["previa"].get("nivel_entrenamiento") != ultima.get("nivel_entrenamiento"):
+        detalles.append(f"Nivel de entrenamiento: {resumen['previa'].get('nivel_entrenamiento')} → "
+                        f"{ultima.get('nivel_entrenamiento')}")
+    for campo, marca in resumen["mejores"].items():
+        etiqueta, unidad = ETIQUETAS[campo]
+        detalles.append(f"Mejor {etiqueta.lower()}: {marca['valor']:.1f} {unidad} ({marca['fecha']})")
+    for detalle in detalles:
+        st.markdown(f"- {detalle}")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serie de mediciones y resumen de progreso de un cliente MUPAI")
+    parser.add_argument("--email")
+    parser.add_argument("--telefono")
+    parser.add_argument("--reconstruir", action="store_true",
+                        help="Recalcula el resumen desde las mediciones (p. ej. tras importar datos)")
+    args = parser.parse_args()
+
+    cliente = clave_cliente(args.email, args.telefono)
+    if args.reconstruir and cliente:
+        ALMACEN.escribir(reconstruir_resumen, (cliente,))
+        ALMACEN.esperar()
+    for fila in serie_cliente(args.email, args.telefono):
+        print(f"{fila['fecha']}  " + "  ".join(f"{campo}={fila[campo]}" for campo in CAMPOS_SERIE))
+    print(json.dumps(resumen_progreso(args.email, args.telefono), ensure_ascii=False, indent=2))
@@ -0,0 +1,559 @@
+"""
+Transporte de correo de las apps MUPAI.
+
+Abrir una conexión SMTP con Zoho cuesta TCP + STARTTLS + AUTH en cada envío. El
+pool mantiene conexiones ya autenticadas y las comparte entre todos los envíos del
+proceso: antes de reutilizar una conexión inactiva se comprueba con NOOP, un hilo
+de mantenimiento envía NOOP a las que esperan y cierra las que llevan demasiado
+tiempo sin uso, y si una conexión se cae a media entrega se reabre una sola vez.
+
+El transporte se elige con la clave de configuración `transporte_email`:
+  - "smtp" (por defecto): Zoho con el pool de conexiones autenticadas
+  - "smtp_local": servidor SMTP local sin TLS ni AUTH (p. ej. el de este módulo)
+  - "maildir": cada mensaje se escribe en una carpeta Maildir local
+  - "memoria": los mensajes se guardan en memoria del proceso (pruebas de carga)
+
+Todas las entregas pasan por un circuit breaker (CIRCUITO): tras varios fallos
+seguidos, o con una tasa de error alta en los últimos envíos, el circuito se abre y
+las entregas fallan al instante con CircuitoAbierto, sin intentar conectar; el buzón
+de salida las pospone sin gastar reintentos. Pasada la espera el circuito queda
+semiabierto y deja pasar un solo envío de prueba: si funciona se cierra, si no se
+vuelve a abrir con el doble de espera.
+
+Servidor SMTP local para pruebas sin Zoho:
+    python mupai_transporte.py servidor --puerto 1025 [--maildir datos/maildir_smtp]
+"""
+import argparse
+import mailbox
+import os
+import smtplib
+import socketserver
+import threading
+import time
+from collections import deque
+
+from mupai_config import DIRECTORIO_DATOS, leer_config
+
+SMTP_HOST = "smtp.zoho.com"
+SMTP_PUERTO = 587
+SMTP_TIMEOUT_S = 30
+
+# Conexiones autenticadas simultáneas como máximo (en uso + libres)
+TAMANO_POOL = 4
+
+# Una conexión libre con más de este tiempo sin uso se verifica con NOOP antes de reutilizarla
+INTERVALO_NOOP_S = 30
+
+# Una conexión libre con más de este tiempo sin uso se cierra (los servidores cortan las inactivas)
+INACTIVIDAD_MAX_S = 240
+
+# Errores que indican una conexión rota: se reconecta y se reintenta una vez
+ERRORES_CONEXION = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+# Valores por defecto de los transportes de prueba
+SMTP_LOCAL_HOST = "127.0.0.1"
+SMTP_LOCAL_PUERTO = 1025
+DIRECTORIO_MAILDIR = os.path.join(DIRECTORIO_DATOS, "maildir")
+CAPACIDAD_MEMORIA = 10000
+
+
+def _cerrar(conexion):
+    try:
+        conexion.quit()
+    except Exception:
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+
+class PoolSMTP:
+    """Pool acotado y seguro entre hilos de conexiones SMTP autenticadas"""
+
+    def __init__(self, host=SMTP_HOST, puerto=SMTP_PUERTO, tamano=TAMANO_POOL, timeout=SMTP_TIMEOUT_S,
+                 seguro=True):
+        self.host = host
+        self.puerto = puerto
+        self.tamano = tamano
+        self.timeout = timeout
+        self.seguro = seguro  # STARTTLS + AUTH; False para servidores locales de prueba
+        self._libres = deque()  # (conexión, usuario, instante del último uso)
+        self._en_uso = 0
+        self._cond = threading.Condition()
+        self._hilo_mantenimiento = None
+        self._reiniciar_contadores()
+
+    def _reiniciar_contadores(self):
+        self.handshakes = 0
+        self.ms_handshake_total = 0.0
+        self.reutilizaciones = 0
+        self.reconexiones = 0
+        self.descartadas = 0
+        self.envios = 0
+
+    def _conectar(self, usuario):
+        """Conexión nueva: TCP + STARTTLS + AUTH (lo que el pool intenta evitar)"""
+        inicio = time.perf_counter()
+        conexion = smtplib.SMTP(self.host, self.puerto, timeout=self.timeout)
+        try:
+            if self.seguro:
+                conexion.starttls()
+                conexion.login(usuario, leer_config("zoho_password", "TU_PASSWORD_AQUI"))
+        except Exception:
+            _cerrar(conexion)
+            raise
+        with self._cond:
+            self.handshakes += 1
+            self.ms_handshake_total += (time.perf_counter() - inicio) * 1000
+        return conexion
+
+    @staticmethod
+    def _viva(conexion):
+        try:
+            return conexion.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _tomar(self, usuario):
+        """Conexión libre del mismo usuario si la hay y responde; si no, una nueva cuando haya cupo"""
+        while True:
+            candidata = None
+            desplazada = None
+            with self._cond:
+                while True:
+                    for i, (conexion, dueno, ultimo_uso) in enumerate(self._libres):
+                        if dueno == usuario:
+                            del self._libres[i]
+                            candidata = (conexion, ultimo_uso)
+                            break
+                    if candidata or self._en_uso + len(self._libres) < self.tamano:
+                        break
+                    if self._libres:
+                        # Pool lleno con conexiones de otro usuario: la más antigua cede su lugar
+                        desplazada, _, _ = self._libres.popleft()
+                        self.descartadas += 1
+                        break
+                    self._cond.wait()
+                self._en_uso += 1
+            if desplazada is not None:
+                _cerrar(desplazada)  # QUIT fuera del lock para no bloquear a los demás hilos
+
+            if candidata is None:
+                try:
+                    return self._conectar(usuario)
+                except Exception:
+                    self._soltar()
+                    raise
+
+            conexion, ultimo_uso = candidata
+            inactiva = time.monotonic() - ultimo_uso
+            if inactiva < INACTIVIDAD_MAX_S and (inactiva < INTERVALO_NOOP_S or self._viva(conexion)):
+                with self._cond:
+                    self.reutilizaciones += 1
+                return conexion
+            _cerrar(conexion)
+            with self._cond:
+                self.descartadas += 1
+            self._soltar()
+
+    def _soltar(self):
+        with self._cond:
+            self._en_uso -= 1
+            self._cond.notify()
+
+    def _devolver(self, conexion, usuario):
+        with self._cond:
+            self._en_uso -= 1
+            self._libres.append((conexion, usuario, time.monotonic()))
+            self._cond.notify()
+        self._iniciar_mantenimiento()
+
+    def enviar(self, mensaje_mime, usuario):
+        """Envía un mensaje con una conexión del pool; si la conexión estaba rota reconecta una vez"""
+        conexion = self._tomar(usuario)
+        try:
+            try:
+                conexion.send_message(mensaje_mime)
+            except ERRORES_CONEXION:
+                _cerrar(conexion)
+                with self._cond:
+                    self.reconexiones += 1
+                conexion = self._conectar(usuario)
+                conexion.send_message(mensaje_mime)
+        except Exception:
+            _cerrar(conexion)
+            self._soltar()
+            raise
+        with self._cond:
+            self.envios += 1
+        self._devolver(conexion, usuario)
+
+    def _iniciar_mantenimiento(self):
+        with self._cond:
+            if self._hilo_mantenimiento is not None and self._hilo_mantenimiento.is_alive():
+                return
+            self._hilo_mantenimiento = threading.Thread(
+                target=self._bucle_mantenimiento, name="mupai-pool-smtp", daemon=True
+            )
+            self._hilo_mantenimiento.start()
+
+    def _bucle_mantenimiento(self):
+        while True:
+            time.sleep(INTERVALO_NOOP_S)
+            self.mantener()
+
+    def mantener(self):
+        """NOOP a las conexiones libres que lo necesitan; cierra las caídas o demasiado inactivas"""
+        with self._cond:
+            revisar = list(self._libres)
+            self._libres.clear()
+            self._en_uso += len(revisar)
+        conservar = []
+        for conexion, usuario, ultimo_uso in revisar:
+            inactiva = time.monotonic() - ultimo_uso
+            if inactiva < INACTIVIDAD_MAX_S and (inactiva < INTERVALO_NOOP_S or self._viva(conexion)):
+                conservar.append((conexion, usuario, ultimo_uso))
+            else:
+                _cerrar(conexion)
+        with self._cond:
+            self._en_uso -= len(revisar)
+            self.descartadas += len(revisar) - len(conservar)
+            self._libres.extend(conservar)
+            self._cond.notify_all()
+
+    def cerrar_todas(self):
+        """Cierra las conexiones libres (las que están en uso se cierran al devolverse fallidas)"""
+        with self._cond:
+            revisar = list(self._libres)
+            self._libres.clear()
+            self._cond.notify_all()
+        for conexion, _, _ in revisar:
+            _cerrar(conexion)
+
+    def estadisticas(self):
+        """Reutilización y tiempo de handshake ahorrado desde el arranque del proceso"""
+        with self._cond:
+            obtenciones = self.handshakes + self.reutilizaciones
+            ms_promedio = self.ms_handshake_total / self.handshakes if self.handshakes else 0.0
+            return {
+                "conexiones_libres": len(self._libres),
+                "conexiones_en_uso": self._en_uso,
+                "envios": self.envios,
+                "handshakes": self.handshakes,
+                "reutilizaciones": self.reutilizaciones,
+                "tasa_reutilizacion": round(self.reutilizaciones / obtenciones, 3) if obtenciones else 0.0,
+                "ms_handshake_promedio": round(ms_promedio, 1),
+                "ms_ahorrados_estimados": round(ms_promedio * self.reutilizaciones, 1),
+                "reconexiones": self.reconexiones,
+                "descartadas": self.descartadas,
+            }
+
+
+# ==================== TRANSPORTES ====================
+
+class TransporteSMTP:
+    """Zoho (o un servidor SMTP local) a través de un pool de conexiones"""
+
+    def __init__(self, pool, nombre="smtp"):
+        self.pool = pool
+        self.nombre = nombre
+
+    def enviar(self, mensaje_mime, remitente):
+        self.pool.enviar(mensaje_mime, remitente)
+
+    def estadisticas(self):
+        return self.pool.estadisticas()
+
+
+class TransporteMaildir:
+    """Escribe cada mensaje como un archivo en una carpeta Maildir (se abre con cualquier cliente de correo)"""
+
+    nombre = "maildir"
+
+    def __init__(self, directorio=DIRECTORIO_MAILDIR):
+        self.directorio = directorio
+        os.makedirs(os.path.dirname(os.path.abspath(directorio)), exist_ok=True)
+        self.buzon = mailbox.Maildir(directorio, create=True)
+        self._lock = threading.Lock()
+        self.envios = 0
+
+    def enviar(self, mensaje_mime, remitente):
+        with self._lock:
+            self.buzon.add(mensaje_mime)
+            self.envios += 1
+
+    def estadisticas(self):
+        return {"envios": self.envios, "directorio": self.directorio}
+
+
+class TransporteMemoria:
+    """Guarda los últimos mensajes en memoria del proceso; no sale nada a la red"""
+
+    nombre = "memoria"
+
+    def __init__(self, capacidad=CAPACIDAD_MEMORIA):
+        self.mensajes = deque(maxlen=capacidad)
+        self._lock = threading.Lock()
+        self.envios = 0
+
+    def enviar(self, mensaje_mime, remitente):
+        with self._lock:
+            self.mensajes.append((remitente, mensaje_mime))
+            self.envios += 1
+
+    def estadisticas(self):
+        return {"envios": self.envios, "en_memoria": len(self.mensajes)}
+
+
+TRANSPORTES = ("smtp", "smtp_local", "maildir", "memoria")
+
+
+def crear_transporte(nombre=None):
+    """Transporte indicado por nombre o por la configuración `transporte_email`"""
+    nombre = nombre or leer_config("transporte_email", "smtp")
+    if nombre == "smtp":
+        return TransporteSMTP(PoolSMTP())
+    if nombre == "smtp_local":
+        pool = PoolSMTP(
+            host=leer_config("smtp_local_host", SMTP_LOCAL_HOST),
+            puerto=int(leer_config("smtp_local_puerto", SMTP_LOCAL_PUERTO)),
+            seguro=False,
+        )
+        return TransporteSMTP(pool, nombre="smtp_local")
+    if nombre == "maildir":
+        return TransporteMaildir(leer_config("maildir_email", DIRECTORIO_MAILDIR))
+    if nombre == "memoria":
+        return TransporteMemoria()
+    raise ValueError(f"Transporte de email desconocido: {nombre} (opciones: {', '.join(TRANSPORTES)})")
+
+
+_transporte = None
+_lock_transporte = threading.Lock()
+
+
+def obtener_transporte():
+    """Transporte compartido por todas las sesiones del proceso (se crea al primer envío)"""
+    global _transporte
+    with _lock_transporte:
+        if _transporte is None:
+            _transporte = crear_transporte()
+        return _transporte
+
+
+def entregar(mensaje_mime, remitente):
+    """
+    Entrega un mensaje con el transporte configurado; lanza excepción si falla.
+    Con el circuito abierto lanza CircuitoAbierto sin intentar conectar.
+    """
+    CIRCUITO.permitir()
+    inicio = time.perf_counter()
+    try:
+        obtener_transporte().enviar(mensaje_mime, remitente)
+    except Exception as e:
+        CIRCUITO.registrar(False, (time.perf_counter() - inicio) * 1000, e)
+        raise
+    CIRCUITO.registrar(True, (time.perf_counter() - inicio) * 1000)
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+# Fallos consecutivos que abren el circuito
+FALLOS_PARA_ABRIR = 5
+
+# Con al menos MUESTRAS_MINIMAS de los últimos VENTANA_ENVIOS, esta tasa de error lo abre
+VENTANA_ENVIOS = 20
+MUESTRAS_MINIMAS = 10
+TASA_ERROR_MAXIMA = 0.5
+
+# Un envío correcto más lento que esto cuenta como fallo para la tasa de error
+LATENCIA_LENTA_MS = 10000
+
+# Espera antes de dejar pasar el envío de prueba; se duplica si la prueba falla
+ESPERA_APERTURA_S = 30
+ESPERA_APERTURA_MAX_S = 600
+
+CIRCUITO_CERRADO = "cerrado"
+CIRCUITO_ABIERTO = "abierto"
+CIRCUITO_SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbierto(Exception):
+    """El circuito está abierto: no se intentó conectar. `segundos` hasta la próxima prueba"""
+
+    def __init__(self, segundos):
+        super().__init__(f"Servidor de correo en pausa por fallos repetidos; nueva prueba en {segundos:.0f} s")
+        self.segundos = segundos
+
+
+class CircuitoSMTP:
+    """Circuit breaker con métricas de latencia y errores de las entregas"""
+
+    def __init__(self, fallos_para_abrir=FALLOS_PARA_ABRIR, ventana=VENTANA_ENVIOS,
+                 espera_s=ESPERA_APERTURA_S, espera_max_s=ESPERA_APERTURA_MAX_S):
+        self.fallos_para_abrir = fallos_para_abrir
+        self.espera_base_s = espera_s
+        self.espera_max_s = espera_max_s
+        self._lock = threading.Lock()
+        self._recientes = deque(maxlen=ventana)         # (exito, duracion_ms)
+        self.estado = CIRCUITO_CERRADO
+        self.fallos_seguidos = 0
+        self.espera_s = espera_s
+        self.abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        self.aperturas = 0
+        self.rechazados = 0
+        self.exitos = 0
+        self.fallos = 0
+        self.ultimo_error = None
+
+    def permitir(self):
+        """Lanza CircuitoAbierto si no se debe intentar la entrega ahora"""
+        with self._lock:
+            if self.estado == CIRCUITO_CERRADO:
+                return
+            ahora = time.time()
+            if self.estado == CIRCUITO_ABIERTO and ahora >= self.abierto_hasta:
+                self.estado = CIRCUITO_SEMIABIERTO
+            if self.estado == CIRCUITO_SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return
+            self.rechazados += 1
+            raise CircuitoAbierto(max(self.abierto_hasta - ahora, 1.0))
+
+    def registrar(self, exito, duracion_ms, error=None):
+        with self._lock:
+            muestra = (exito and duracion_ms <= LATENCIA_LENTA_MS, duracion_ms)
+            self._recientes.append(muestra)
+            if exito:
+                self.exitos += 1
+                self.fallos_seguidos = 0
+            else:
+                self.fallos += 1
+                self.fallos_seguidos += 1
+                self.ultimo_error = str(error)
+
+            if self.estado == CIRCUITO_SEMIABIERTO:
+                self._prueba_en_curso = False
+                if exito:
+                    self.estado = CIRCUITO_CERRADO
+                    self.espera_s = self.espera_base_s
+                    self._recientes.clear()  # La tasa de error vuelve a contar desde la prueba
+                    self._recientes.append(muestra)
+                else:
+                    self._abrir(min(self.espera_s * 2, self.espera_max_s))
+            elif self.estado == CIRCUITO_CERRADO and self._debe_abrir():
+                self._abrir(self.espera_base_s)
+
+    def _debe_abrir(self):
+        if self.fallos_seguidos >= self.fallos_para_abrir:
+            return True
+        if len(self._recientes) < MUESTRAS_MINIMAS:
+            return False
+        errores = sum(1 for exito, _ in self._recientes if not exito)
+        return errores / len(self._recientes) >= TASA_ERROR_MAXIMA
+
+    def _abrir(self, espera_s):
+        self.estado = CIRCUITO_ABIERTO
+        self.espera_s = espera_s
+        self.abierto_hasta = time.time() + espera_s
+        self.aperturas += 1
+
+    def estadisticas(self):
+        with self._lock:
+            latencias = sorted(duracion for _, duracion in self._recientes)
+            errores = sum(1 for exito, _ in self._recientes if not exito)
+            return {
+                "estado": self.estado,
+                "segundos_para_prueba": max(self.abierto_hasta - time.time(), 0) if self.estado == CIRCUITO_ABIERTO else 0,
+                "fallos_seguidos": self.fallos_seguidos,
+                "tasa_error_reciente": errores / len(latencias) if latencias else 0.0,
+                "ms_p50": latencias[len(latencias) // 2] if latencias else 0.0,
+                "ms_p95": latencias[int(len(latencias) * 0.95)] if latencias else 0.0,
+                "exitos": self.exitos,
+                "fallos": self.fallos,
+                "rechazados": self.rechazados,
+                "aperturas": self.aperturas,
+                "ultimo_error": self.ultimo_error,
+            }
+
+
+# Circuito compartido por todas las entregas del proceso
+CIRCUITO = CircuitoSMTP()
+
+
+# ==================== SERVIDOR SMTP LOCAL DE PRUEBA ====================
+
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    """Subconjunto mínimo de SMTP: lo justo para que smtplib entregue mensajes"""
+
+    def _responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode("ascii"))
+
+    def handle(self):
+        self._responder("220 mupai-smtp-local listo")
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            verbo = linea[:4].decode("ascii", "replace").upper()
+            if verbo == "EHLO":
+                self._responder("250-mupai-smtp-local")
+                self._responder("250 8BITMIME")
+            elif verbo in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self._responder("250 OK")
+            elif verbo == "DATA":
+                self._responder("354 Termina con <CRLF>.<CRLF>")
+                lineas = []
+                for linea in self.rfile:
+                    if linea in (b".\r\n", b".\n"):
+                        break
+                    lineas.append(linea[1:] if linea.startswith(b"..") else linea)
+                self.server.recibir(b"".join(lineas))
+                self._responder("250 OK recibido")
+            elif verbo == "QUIT":
+                self._responder("221 Adios")
+                return
+            else:
+                self._responder("502 Comando no implementado")
+
+
+class ServidorSMTPLocal(socketserver.ThreadingTCPServer):
+    """Servidor SMTP de prueba: cuenta los mensajes y opcionalmente los guarda en un Maildir"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host=SMTP_LOCAL_HOST, puerto=SMTP_LOCAL_PUERTO, maildir=None):
+        super().__init__((host, puerto), _ManejadorSMTP)
+        self.maildir = mailbox.Maildir(maildir, create=True) if maildir else None
+        self._lock = threading.Lock()
+        self.recibidos = 0
+
+    def recibir(self, datos):
+        with self._lock:
+            self.recibidos += 1
+            if self.maildir is not None:
+                self.maildir.add(datos)
+
+
+def iniciar_servidor_smtp_local(host=SMTP_LOCAL_HOST, puerto=SMTP_LOCAL_PUERTO, maildir=None):
+    """Arranca el servidor de prueba en un hilo de fondo (puerto 0 = uno libre) y lo devuelve"""
+    servidor = ServidorSMTPLocal(host, puerto, maildir)
+    threading.Thread(target=servidor.serve_forever, name="mupai-smtp-local", daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor SMTP local de prueba para las apps MUPAI")
+    parser.add_argument("comando", choices=["servidor"])
+    parser.add_argument("--host", default=SMTP_LOCAL_HOST)
+    parser.add_argument("--puerto", type=int, default=SMTP_LOCAL_PUERTO)
+    parser.add_argument("--maildir", default=None, help="Carpeta Maildir donde guardar lo recibido")
+    args = parser.parse_args()
+
+    servidor = ServidorSMTPLocal(args.host, args.puerto, args.maildir)
+    print(f"Servidor SMTP local escuchando en {args.host}:{args.puerto} (Ctrl+C para salir)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{servidor.recibidos} mensajes recibidos")
@@ -0,0 +1,32 @@
+import hmac
+
+import streamlit as st
+
+from mupai_analitica import mostrar_tablero
+from mupai_config import PANEL_ADMIN_PASSWORD, es_administrador
+
+st.set_page_config(
+    page_title="MUPAI - Analítica (admin)",
+    page_icon="📊",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+st.markdown("## 📊 Analítica de evaluaciones MUPAI")
+
+# Contraseña de administración, no la que comparten los clientes; si la sesión ya se
+# identificó en la barra lateral de una app no se vuelve a pedir
+if not PANEL_ADMIN_PASSWORD:
+    st.error("La analítica requiere configurar `panel_admin_password` (secrets o variable de entorno).")
+    st.stop()
+if not es_administrador():
+    password_input = st.text_input("Contraseña de administración", type="password", key="password_analitica")
+    if st.button("🔐 Acceder"):
+        if hmac.compare_digest(password_input.encode("utf-8"), str(PANEL_ADMIN_PASSWORD).encode("utf-8")):
+            st.session_state.administrador = True
+            st.rerun()
+        else:
+            st.error("❌ Contraseña incorrecta. Acceso denegado.")
+    st.stop()
+
+mostrar_tablero()
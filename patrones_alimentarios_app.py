@@ -1,12 +1,29 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import time
 import re
+import hashlib
+from mupai_almacen import mostrar_panel_almacen, persistir_evaluacion, registrar_suscriptores
+from mupai_archivo import archivar_resumen, mostrar_panel_archivo
+from mupai_catalogo import cargar_catalogo
+from mupai_config import ADMIN_PASSWORD, mostrar_acceso_administrador
+from mupai_correo import encolar_email, enviar_una_vez, mostrar_estado_envio, mostrar_panel_buzon
+from mupai_estructurado import adjuntos_estructurados
+from mupai_indice import mostrar_panel_consultas
+from mupai_metricas import (
+    iniciar_cronometro, instalar_medidor_payload, medir_seccion,
+    mostrar_panel_latencias, mostrar_panel_payload
+)
+from mupai_nutrientes import cargar_nutrientes
+from mupai_plantillas import cargar_plantilla
+from mupai_progreso import cargar_progreso, formatear_token, guardar_progreso, nuevo_token
+from mupai_selecciones import persistir_selecciones
+
+# Series por cliente y agregados de analítica se actualizan en cada evaluación guardada
+registrar_suscriptores()
 
 # ==================== FUNCIONES DE VALIDACIÓN PROGRESIVA ====================
 
@@ -133,6 +150,7 @@ def advance_to_next_step():
         if current_step < 12:
             st.session_state.current_step = current_step + 1
             st.session_state.max_unlocked_step = max(st.session_state.max_unlocked_step, current_step + 1)
+        guardar_punto_control()
         return True
     else:
         # Mostrar mensaje de error profesional
@@ -144,6 +162,521 @@ def go_to_previous_step():
     current_step = st.session_state.get('current_step', 1)
     if current_step > 1:
         st.session_state.current_step = current_step - 1
+        guardar_punto_control()
+
+# ==================== PERFIL ALIMENTARIO FINAL (CÁLCULO BAJO DEMANDA) ====================
+# Claves de las 38 multiselecciones del cuestionario, en el orden de los pasos
+CLAVES_MULTISELECCION = (
+    'huevos_embutidos', 'carnes_res_grasas', 'carnes_cerdo_grasas', 'carnes_pollo_grasas',
+    'organos_grasos', 'quesos_grasos', 'lacteos_enteros', 'pescados_grasos', 'mariscos_grasos',
+    'carnes_res_magras', 'carnes_cerdo_magras', 'carnes_pollo_magras', 'organos_magros',
+    'pescados_magros', 'mariscos_magros', 'quesos_magros', 'lacteos_light', 'huevos_embutidos_light',
+    'grasas_naturales', 'frutos_secos_semillas', 'mantequillas_vegetales',
+    'cereales_integrales', 'pastas', 'tortillas_panes', 'raices_tuberculos', 'leguminosas',
+    'vegetales_lista', 'frutas_lista', 'aceites_coccion', 'bebidas_sin_calorias',
+    'alergias_alimentarias', 'intolerancias_digestivas', 'metodos_coccion_accesibles',
+    'antojos_dulces', 'antojos_salados', 'antojos_comida_rapida', 'antojos_bebidas', 'antojos_picantes'
+)
+
+# Opciones de las multiselecciones y demás listas, desde catalogo/alimentos.json (leído una vez por proceso)
+CATALOGO = cargar_catalogo()
+OPCIONES = CATALOGO.opciones
+LISTAS = CATALOGO.listas
+NUTRIENTES = cargar_nutrientes()
+
+# Campos de texto libre que también forman parte del perfil
+CLAVES_TEXTO_PERFIL = (
+    'otra_alergia', 'otra_intolerancia', 'alimento_adicional', 'otro_metodo_coccion',
+    'otros_antojos', 'frecuencia_comidas', 'otra_frecuencia', 'sugerencias_menus'
+)
+
+# ==================== PUNTOS DE CONTROL DEL CUESTIONARIO ====================
+APP_PROGRESO = "patrones_alimentarios"
+
+# Todo lo que se guarda y restaura además del paso: datos del cliente y respuestas
+CLAVES_PROGRESO = (
+    ('nombre', 'telefono', 'email_cliente', 'edad', 'sexo', 'fecha_llenado', 'acepto_terminos')
+    + CLAVES_MULTISELECCION + CLAVES_TEXTO_PERFIL + ('opcion_rapida_menu',)
+)
+
+def conservar_respuestas():
+    """
+    Streamlit borra de session_state el valor de un widget en cuanto deja de dibujarse,
+    es decir, al pasar al siguiente paso. Las respuestas se copian a `respuestas` (una
+    clave que no es de ningún widget) y las de los pasos que ya no se dibujan se
+    devuelven a sus claves: validaciones, punto de control, perfil y bitset ven todo el
+    cuestionario, y un paso al que se regresa muestra lo que ya se había elegido.
+    Se llama al inicio de cada rerun, antes de dibujar los widgets, y cada vez que se
+    leen las respuestas (para incluir lo asignado durante el rerun).
+    """
+    respuestas = st.session_state.setdefault('respuestas', {})
+    for clave in CLAVES_PROGRESO:
+        if clave in st.session_state:
+            respuestas[clave] = st.session_state[clave]
+        elif clave in respuestas:
+            st.session_state[clave] = respuestas[clave]
+    return respuestas
+
+def guardar_punto_control():
+    """Guarda el estado del asistente en cada cambio de paso para poder reanudarlo"""
+    if not st.session_state.get('token_progreso'):
+        st.session_state.token_progreso = nuevo_token()
+    guardar_progreso(
+        APP_PROGRESO,
+        st.session_state.token_progreso,
+        st.session_state.get('email_cliente'),
+        st.session_state.get('telefono'),
+        st.session_state.get('current_step', 1),
+        st.session_state.get('max_unlocked_step', 1),
+        st.session_state.get('step_completed', {}),
+        dict(conservar_respuestas()),
+    )
+
+def restaurar_punto_control(progreso):
+    """Vuelca un punto de control en session_state; debe llamarse antes de dibujar los widgets"""
+    respuestas = {
+        clave: valor for clave, valor in progreso["valores"].items()
+        if clave in CLAVES_PROGRESO and valor is not None
+    }
+    st.session_state.respuestas = respuestas
+    for clave, valor in respuestas.items():
+        st.session_state[clave] = valor
+    st.session_state.current_step = progreso["paso_actual"]
+    st.session_state.max_unlocked_step = progreso["paso_maximo"]
+    st.session_state.step_completed = progreso["pasos_completados"]
+    st.session_state.token_progreso = progreso["token"]
+    st.session_state.datos_completos = True
+
+def obtener_selecciones():
+    """Toma una instantánea inmutable (tuplas) de todas las respuestas del cuestionario"""
+    respuestas = conservar_respuestas()
+    multiselecciones = tuple((clave, tuple(respuestas.get(clave) or ())) for clave in CLAVES_MULTISELECCION)
+    textos = tuple((clave, respuestas.get(clave) or '') for clave in CLAVES_TEXTO_PERFIL)
+    return multiselecciones + textos
+
+def hash_selecciones(selecciones):
+    """Huella estable de una instantánea de selecciones"""
+    return hashlib.sha1(repr(selecciones).encode('utf-8')).hexdigest()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def calcular_perfil_alimentario(huella, _selecciones):
+    """
+    Calcula totales, restricciones y recomendaciones del perfil alimentario.
+    La caché se indexa solo por la huella de las selecciones, por lo que abrir o cerrar
+    el resultado final no vuelve a recorrer las 38 listas.
+    """
+    sel = dict(_selecciones)
+    n = {clave: len(sel[clave]) for clave in CLAVES_MULTISELECCION}
+
+    def total(*claves):
+        return sum(n[clave] for clave in claves)
+
+    # Verificar diversidad de alimentos por grupo
+    total_grupos_completos = sum([
+        total('huevos_embutidos', 'carnes_res_grasas') > 0,
+        total('carnes_res_magras', 'pescados_magros') > 0,
+        total('grasas_naturales', 'frutos_secos_semillas') > 0,
+        total('cereales_integrales', 'pastas', 'tortillas_panes') > 0,
+        n['vegetales_lista'] > 5,
+        n['frutas_lista'] > 5,
+    ])
+
+    recomendaciones = []
+    if total_grupos_completos >= 5:
+        recomendaciones.append("✅ **Diversidad nutricional excelente:** Tienes una buena variedad de alimentos en la mayoría de grupos alimentarios.")
+    elif total_grupos_completos >= 3:
+        recomendaciones.append("🔄 **Diversidad nutricional moderada:** Considera ampliar la variedad en algunos grupos alimentarios.")
+    else:
+        recomendaciones.append("📈 **Oportunidad de mejora:** Ampliar la variedad de alimentos puede enriquecer tu plan nutricional.")
+
+    # Verificar métodos de cocción
+    if n['metodos_coccion_accesibles'] >= 4:
+        recomendaciones.append("👨‍🍳 **Versatilidad culinaria:** Tienes múltiples métodos de cocción disponibles, ideal para variedad en preparaciones.")
+    elif n['metodos_coccion_accesibles'] >= 2:
+        recomendaciones.append("🔧 **Métodos básicos:** Con tus métodos de cocción actuales puedes crear preparaciones nutritivas y variadas.")
+
+    # Verificar restricciones
+    tiene_restricciones = bool(sel['alergias_alimentarias'] or sel['intolerancias_digestivas'])
+    if tiene_restricciones:
+        recomendaciones.append("⚠️ **Plan especializado:** Tus restricciones alimentarias requerirán un plan personalizado cuidadoso.")
+
+    # Verificar antojos
+    total_antojos = total('antojos_dulces', 'antojos_salados', 'antojos_comida_rapida')
+    if total_antojos > 10:
+        recomendaciones.append("🧠 **Manejo de antojos:** Se recomienda desarrollar estrategias específicas para controlar los antojos identificados.")
+    elif total_antojos > 5:
+        recomendaciones.append("⚖️ **Equilibrio:** Incluir alternativas saludables para satisfacer antojos ocasionales.")
+
+    if not recomendaciones:
+        recomendaciones.append("📋 **Perfil base establecido:** Se requiere más información para recomendaciones específicas.")
+
+    # Perfil nutrimental medio (por 100 g) de lo elegido en cada grupo, con un producto de matrices
+    bits = CATALOGO.codificar({clave: sel[clave] for clave in CLAVES_MULTISELECCION})
+    nutrientes_por_grupo = {
+        grupo: (alimentos, NUTRIENTES.como_dict(perfil))
+        for grupo, (alimentos, perfil) in NUTRIENTES.por_grupo(bits).items()
+    }
+
+    sugerencias = sel['sugerencias_menus']
+    return {
+        "conteos": n,
+        "total_proteinas_grasas": total(*CLAVES_MULTISELECCION[0:9]),
+        "total_proteinas_magras": total(*CLAVES_MULTISELECCION[9:18]),
+        "total_grasas": total('grasas_naturales', 'frutos_secos_semillas', 'mantequillas_vegetales'),
+        "total_carbohidratos": total('cereales_integrales', 'pastas', 'tortillas_panes', 'raices_tuberculos', 'leguminosas'),
+        "aceites_top": list(sel['aceites_coccion'][:3]),
+        "bebidas_top": list(sel['bebidas_sin_calorias'][:3]),
+        "metodos_top": list(sel['metodos_coccion_accesibles'][:3]),
+        "alergias": list(sel['alergias_alimentarias']),
+        "intolerancias": list(sel['intolerancias_digestivas']),
+        "textos": {clave: sel[clave] for clave in CLAVES_TEXTO_PERFIL},
+        "sugerencias_palabras": len(sugerencias.split()) if sugerencias else 0,
+        "recomendaciones": recomendaciones,
+        "nutrientes_por_grupo": nutrientes_por_grupo,
+    }
+
+def mostrar_perfil_alimentario(perfil):
+    """Renderiza el perfil alimentario final ya calculado"""
+    n = perfil["conteos"]
+    textos = perfil["textos"]
+
+    st.markdown('<div class="content-card">', unsafe_allow_html=True)
+    
+    st.markdown("### 🎯 Tu Perfil Alimentario Personalizado")
+    
+    # Crear resumen del perfil por grupos actuales
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### 👤 Información Personal")
+        st.write(f"• **Nombre:** {st.session_state.get('nombre', 'No especificado')}")
+        st.write(f"• **Edad:** {st.session_state.get('edad', 'No especificado')} años")
+        st.write(f"• **Sexo:** {st.session_state.get('sexo', 'No especificado')}")
+        st.write(f"• **Fecha evaluación:** {st.session_state.get('fecha_llenado', 'No especificado')}")
+        
+        st.markdown("#### 🥩 Grupo 1: Proteínas Grasas")
+        st.write(f"• **Total alimentos seleccionados:** {perfil['total_proteinas_grasas']}")
+        if n['huevos_embutidos']:
+            st.write(f"• **Huevos/embutidos:** {n['huevos_embutidos']}")
+        if n['carnes_res_grasas']:
+            st.write(f"• **Carnes de res grasas:** {n['carnes_res_grasas']}")
+        if n['carnes_cerdo_grasas']:
+            st.write(f"• **Carnes de cerdo grasas:** {n['carnes_cerdo_grasas']}")
+        if n['carnes_pollo_grasas']:
+            st.write(f"• **Carnes de pollo/pavo grasas:** {n['carnes_pollo_grasas']}")
+        
+        st.markdown("#### 🍗 Grupo 2: Proteínas Magras")
+        st.write(f"• **Total alimentos seleccionados:** {perfil['total_proteinas_magras']}")
+        if n['carnes_res_magras']:
+            st.write(f"• **Carnes de res magras:** {n['carnes_res_magras']}")
+        if n['pescados_magros']:
+            st.write(f"• **Pescados magros:** {n['pescados_magros']}")
+    
+    with col2:
+        st.markdown("#### 🥑 Grupo 3: Grasas Saludables")
+        st.write(f"• **Total alimentos seleccionados:** {perfil['total_grasas']}")
+        if n['grasas_naturales']:
+            st.write(f"• **Grasas naturales:** {n['grasas_naturales']}")
+        if n['frutos_secos_semillas']:
+            st.write(f"• **Frutos secos/semillas:** {n['frutos_secos_semillas']}")
+        
+        st.markdown("#### 🍞 Grupo 4: Carbohidratos")
+        st.write(f"• **Total alimentos seleccionados:** {perfil['total_carbohidratos']}")
+        if n['cereales_integrales']:
+            st.write(f"• **Cereales:** {n['cereales_integrales']}")
+        if n['tortillas_panes']:
+            st.write(f"• **Tortillas/panes:** {n['tortillas_panes']}")
+        
+        st.markdown("#### 🥬 Grupos 5 y 6: Vegetales y Frutas")
+        st.write(f"• **Vegetales:** {n['vegetales_lista']} seleccionados")
+        st.write(f"• **Frutas:** {n['frutas_lista']} seleccionadas")
+    
+    # Sección de información adicional
+    st.markdown("### 🍳 Información Adicional")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### 🧈 Aceites de Cocción")
+        if n['aceites_coccion']:
+            st.write(f"• **Aceites preferidos:** {n['aceites_coccion']} seleccionados")
+            for aceite in perfil['aceites_top']:
+                st.write(f"  - {aceite}")
+        
+        st.markdown("#### 🥤 Bebidas Sin Calorías")
+        if n['bebidas_sin_calorias']:
+            st.write(f"• **Bebidas preferidas:** {n['bebidas_sin_calorias']} seleccionadas")
+            for bebida in perfil['bebidas_top']:
+                st.write(f"  - {bebida}")
+    
+    with col2:
+        st.markdown("#### 👨‍🍳 Métodos de Cocción")
+        if n['metodos_coccion_accesibles']:
+            st.write(f"• **Métodos preferidos:** {n['metodos_coccion_accesibles']} seleccionados")
+            for metodo in perfil['metodos_top']:
+                st.write(f"  - {metodo}")
+        
+        if textos['otro_metodo_coccion']:
+            st.write(f"• **Otro método:** {textos['otro_metodo_coccion']}")
+
+    # Restricciones importantes
+    if perfil['alergias'] or perfil['intolerancias']:
+        st.markdown("### ⚠️ Restricciones Importantes")
+        if perfil['alergias']:
+            st.warning(f"**Alergias alimentarias:** {', '.join(perfil['alergias'])}")
+            if textos['otra_alergia']:
+                st.write(f"• **Otra alergia:** {textos['otra_alergia']}")
+        
+        if perfil['intolerancias']:
+            st.info(f"**Intolerancias digestivas:** {', '.join(perfil['intolerancias'])}")
+            if textos['otra_intolerancia']:
+                st.write(f"• **Otra intolerancia:** {textos['otra_intolerancia']}")
+
+    # Antojos alimentarios
+    st.markdown("### 😋 Patrones de Antojos Alimentarios")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if n['antojos_dulces']:
+            st.write(f"• **Antojos dulces:** {n['antojos_dulces']} tipos")
+        if n['antojos_salados']:
+            st.write(f"• **Antojos salados:** {n['antojos_salados']} tipos")
+        if n['antojos_comida_rapida']:
+            st.write(f"• **Comida rápida:** {n['antojos_comida_rapida']} tipos")
+    
+    with col2:
+        if n['antojos_bebidas']:
+            st.write(f"• **Bebidas con calorías:** {n['antojos_bebidas']} tipos")
+        if n['antojos_picantes']:
+            st.write(f"• **Condimentos picantes:** {n['antojos_picantes']} tipos")
+        if textos['otros_antojos']:
+            st.write(f"• **Otros antojos especificados:** Sí")
+
+    # Información adicional especificada
+    if textos['alimento_adicional']:
+        st.markdown("### ➕ Alimentos Adicionales Especificados")
+        st.info(f"**Alimentos mencionados:** {textos['alimento_adicional']}")
+
+    # Información de frecuencia de comidas
+    if textos['frecuencia_comidas']:
+        st.markdown("### 🍽️ Frecuencia de Comidas Preferida")
+        frecuencia = textos['frecuencia_comidas']
+        if frecuencia == "Otro (especificar)" and textos['otra_frecuencia']:
+            st.info(f"**Frecuencia personalizada:** {textos['otra_frecuencia']}")
+        else:
+            st.info(f"**Frecuencia seleccionada:** {frecuencia}")
+
+    # Sugerencias de menús
+    if textos['sugerencias_menus']:
+        st.markdown("### 📝 Sugerencias de Menús")
+        sugerencias = textos['sugerencias_menus']
+        st.info(f"**Sugerencias del cliente:** {sugerencias[:200]}{'...' if len(sugerencias) > 200 else ''}")
+        if perfil['sugerencias_palabras'] > 0:
+            st.success(f"**Detalle:** {perfil['sugerencias_palabras']} palabras de sugerencias específicas proporcionadas")
+
+    # Perfil nutrimental de los alimentos elegidos
+    if perfil['nutrientes_por_grupo']:
+        st.markdown("### 🔬 Perfil Nutrimental de tus Alimentos (promedio por 100 g)")
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {"Grupo": grupo.replace('_', ' ').capitalize(), "Alimentos": alimentos,
+                     "kcal": valores['kcal'], "Proteína (g)": valores['proteina_g'],
+                     "Grasa (g)": valores['grasa_g'], "Carbohidratos (g)": valores['carbohidratos_g'],
+                     "Fibra (g)": valores['fibra_g']}
+                    for grupo, (alimentos, valores) in perfil['nutrientes_por_grupo'].items()
+                ]
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+    # Recomendaciones personalizadas basadas en datos reales
+    st.markdown("### 💡 Recomendaciones Personalizadas Iniciales")
+    for i, rec in enumerate(perfil['recomendaciones'], 1):
+        st.write(f"{i}. {rec}")
+
+    st.success(f"""
+    ### ✅ Análisis de patrones alimentarios completado exitosamente
+    
+    **Tu perfil nutricional personalizado está listo** y incluye información detallada sobre:
+    - 6 grupos alimentarios principales evaluados
+    - Métodos de cocción disponibles y preferidos  
+    - Restricciones, alergias e intolerancias específicas
+    - Patrones de antojos alimentarios identificados
+    - Aceites de cocción y bebidas sin calorías preferidas
+    
+    **Este análisis integral permitirá crear un plan nutricional completamente adaptado** 
+    a tus gustos, tolerancias y necesidades específicas.
+    
+    La información será enviada a nuestro equipo de nutrición para desarrollar tu plan personalizado.
+    """)
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# ==================== CROMO DE LOS PASOS DEL CUESTIONARIO ====================
+# Cada paso comparte la misma estructura visual (cabecera, tarjeta de título, barra de
+# progreso e indicador); solo cambian estos metadatos. El HTML se genera una vez por paso.
+TARJETA_PRINCIPAL = {"c1": "#F4C430", "c2": "#DAA520", "borde": "#DAA520", "texto": "#1E1E1E", "nota": None}
+TARJETA_OPCIONAL = {"c1": "#27AE60", "c2": "#2ECC71", "borde": "#27AE60", "texto": "#1E1E1E", "nota": "Información Adicional - Opcional"}
+
+PASOS_CUESTIONARIO = {
+    1: {"emoji": "🥩", "titulo": "PROTEÍNA ANIMAL CON MÁS CONTENIDO GRASO", "corto": "Proteínas Grasas",
+        "subtitulo": "Estás en el paso 1 de 12 - Selecciona las proteínas grasas que consumes",
+        "colores": ("#4CAF50", "#45a049", "rgba(76, 175, 80, 0.3)"), "tarjeta": TARJETA_PRINCIPAL,
+        "progreso": (8, "Paso 1 de 12: Proteínas con más contenido graso"),
+        "indicador": "PASO ACTUAL", "enfocar": True},
+    2: {"emoji": "🍗", "titulo": "PROTEÍNA ANIMAL MAGRA", "corto": "Proteínas Magras",
+        "subtitulo": "Estás en el paso 2 de 12 - Selecciona las proteínas magras que consumes",
+        "colores": ("#2196F3", "#1976D2", "rgba(33, 150, 243, 0.3)"), "tarjeta": TARJETA_PRINCIPAL,
+        "progreso": (17, "Paso 2 de 12: Proteínas animales magras"),
+        "indicador": "PASO ACTUAL", "enfocar": True},
+    3: {"emoji": "🥑", "titulo": "FUENTES DE GRASA SALUDABLE", "corto": "Grasas Saludables",
+        "subtitulo": "Estás en el paso 3 de 12 - Selecciona las grasas saludables que consumes",
+        "colores": ("#FF9800", "#F57C00", "rgba(255, 152, 0, 0.3)"), "tarjeta": TARJETA_PRINCIPAL,
+        "progreso": (25, "Paso 3 de 12: Fuentes de grasa saludable"),
+        "indicador": "PASO ACTUAL", "enfocar": True},
+    4: {"emoji": "🍞", "titulo": "CARBOHIDRATOS COMPLEJOS Y CEREALES", "corto": "Carbohidratos",
+        "subtitulo": "Estás en el paso 4 de 12 - Selecciona los carbohidratos que consumes",
+        "colores": ("#9C27B0", "#7B1FA2", "rgba(156, 39, 176, 0.3)"), "tarjeta": TARJETA_PRINCIPAL,
+        "progreso": (33, "Paso 4 de 12: Carbohidratos complejos y cereales"),
+        "indicador": "PASO ACTUAL", "enfocar": True},
+    5: {"emoji": "🥬", "titulo": "VEGETALES", "corto": "Vegetales",
+        "subtitulo": "Estás en el paso 5 de 12 - Selecciona los vegetales que consumes",
+        "colores": ("#4CAF50", "#388E3C", "rgba(76, 175, 80, 0.3)"), "tarjeta": TARJETA_PRINCIPAL,
+        "progreso": (42, "Paso 5 de 12: Vegetales"),
+        "indicador": "PASO ACTUAL", "enfocar": True},
+    6: {"emoji": "🍎", "titulo": "FRUTAS", "corto": "Frutas",
+        "subtitulo": "Estás en el paso 6 de 12 - Selecciona las frutas que consumes",
+        "colores": ("#E91E63", "#C2185B", "rgba(233, 30, 99, 0.3)"), "tarjeta": TARJETA_PRINCIPAL,
+        "progreso": (50, "Paso 6 de 12: Frutas - ¡Completando grupos principales!"),
+        "indicador": "¡ÚLTIMO GRUPO PRINCIPAL!", "enfocar": True},
+    7: {"emoji": "🍳", "titulo": "ACEITES DE COCCIÓN PREFERIDOS", "corto": "Aceites",
+        "subtitulo": "Estás en el paso 7 de 12 - Información Adicional (Opcional)",
+        "colores": ("#795548", "#5D4037", "rgba(121, 85, 72, 0.3)"), "tarjeta": TARJETA_OPCIONAL,
+        "progreso": (58, "Paso 7 de 12: Aceites de cocción (Opcional)"),
+        "indicador": None, "enfocar": True},
+    8: {"emoji": "🥤", "titulo": "BEBIDAS PARA HIDRATACIÓN", "corto": "Bebidas",
+        "subtitulo": "Estás en el paso 8 de 12 - Información Adicional (Opcional)",
+        "colores": ("#00BCD4", "#0097A7", "rgba(0, 188, 212, 0.3)"), "tarjeta": TARJETA_OPCIONAL,
+        "progreso": (67, "Paso 8 de 12: Bebidas para hidratación (Opcional)"),
+        "indicador": None, "enfocar": True},
+    9: {"emoji": "🚨", "titulo": "ALERGIAS E INTOLERANCIAS", "corto": "Alergias",
+        "subtitulo": "Estás en el paso 9 de 12 - Información Crítica para tu Seguridad",
+        "colores": ("#F44336", "#D32F2F", "rgba(244, 67, 54, 0.3)"),
+        "tarjeta": {"c1": "#E74C3C", "c2": "#C0392B", "borde": "#E74C3C", "texto": "#FFFFFF",
+                    "nota": "Información Crítica para tu Seguridad"},
+        "progreso": (75, "Paso 9 de 12: Alergias e intolerancias (Crítico)"),
+        "indicador": None, "enfocar": True},
+    10: {"emoji": "😋", "titulo": "EVALUACIÓN DE ANTOJOS", "corto": "Antojos",
+         "subtitulo": "Estás en el paso 10 de 12 - Información para Estrategias",
+         "colores": ("#673AB7", "#512DA8", "rgba(103, 58, 183, 0.3)"),
+         "tarjeta": {"c1": "#9B59B6", "c2": "#8E44AD", "borde": "#9B59B6", "texto": "#FFFFFF",
+                     "nota": "¡Último Paso! - Información para Estrategias"},
+         "progreso": (83, "Paso 10 de 12: Antojos alimentarios"),
+         "indicador": None, "enfocar": True},
+    11: {"emoji": "🍽️", "titulo": "FRECUENCIA DE COMIDAS PREFERIDA", "corto": "Frecuencia",
+         "subtitulo": "Estás en el paso 11 de 12 - Adaptación a tu Estilo de Vida",
+         "colores": ("#FF9800", "#F57C00", "rgba(255, 152, 0, 0.3)"), "tarjeta": None,
+         "progreso": (92, "Paso 11 de 12: Frecuencia de comidas preferida"),
+         "indicador": None, "enfocar": False},
+    12: {"emoji": "📝", "titulo": "SUGERENCIAS DE MENÚS", "corto": "Menús",
+         "subtitulo": "¡Último Paso! Estás en el paso 12 de 12 - Personalización Final",
+         "colores": ("#4CAF50", "#388E3C", "rgba(76, 175, 80, 0.3)"), "tarjeta": None,
+         "progreso": (100, "Paso 12 de 12: Sugerencias de menús - ¡Último paso!"),
+         "indicador": None, "enfocar": False},
+}
+
+@st.cache_data(show_spinner=False)
+def html_cromo_paso(numero):
+    """HTML fijo de cabecera, tarjeta de título e indicador de un paso (se genera una vez por paso)"""
+    paso = PASOS_CUESTIONARIO[numero]
+    c1, c2, sombra = paso["colores"]
+    titulo = f"{paso['emoji']} PASO {numero}: {paso['titulo']}"
+    html = f"""
+    <div class="paso-cabecera" style="--paso-c1: {c1}; --paso-c2: {c2}; --paso-sombra: {sombra};">
+        <h2>{titulo}</h2>
+        <p>{paso['subtitulo']}</p>
+    </div>
+    <div id="paso{numero}"></div>
+    """
+    tarjeta = paso["tarjeta"]
+    if tarjeta:
+        nota = f"<p>{tarjeta['nota']}</p>" if tarjeta["nota"] else ""
+        html += f"""
+    <div class="content-card paso-tarjeta" style="--paso-c1: {tarjeta['c1']}; --paso-c2: {tarjeta['c2']}; --paso-borde: {tarjeta['borde']}; --paso-texto: {tarjeta['texto']};">
+        <h2>{titulo}</h2>{nota}
+    </div>
+    """
+    if paso["indicador"]:
+        html += f"""
+    <div class="paso-indicador">
+        <div>{numero}</div>
+        <h4>{paso['indicador']}</h4>
+    </div>
+    """
+    return html
+
+@st.cache_data(show_spinner=False)
+def script_desplazamiento_paso(numero, enfocar):
+    """Script que lleva la vista al marcador del paso y, si aplica, enfoca su primera selección múltiple"""
+    enfoque = """
+                setTimeout(function() {
+                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
+                    if (firstMultiselect) {
+                        firstMultiselect.focus();
+                        firstMultiselect.click();
+                    }
+                }, 200);""" if enfocar else ""
+    return f"""
+    <script>
+        setTimeout(function() {{
+            const stepElement = window.parent.document.getElementById('paso{numero}');
+            if (stepElement) {{
+                stepElement.scrollIntoView({{behavior: 'smooth'}});{enfoque}
+            }}
+        }}, 100);
+    </script>
+    """
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def html_mapa_progreso(paso_actual, max_desbloqueado, pasos_validos):
+    """Mapa de los 12 pasos con su estado (actual, completo, incompleto o bloqueado)"""
+    circulos = []
+    for numero, paso in PASOS_CUESTIONARIO.items():
+        if numero == paso_actual:
+            estado = "actual"
+        elif numero in pasos_validos:
+            estado = "completo"
+        elif numero == 1 or max_desbloqueado >= numero:
+            estado = "incompleto"
+        else:
+            estado = "bloqueado"
+        etiqueta = "✓" if numero in pasos_validos else str(numero)
+        circulos.append(f'<div><div class="paso-circulo {estado}">{etiqueta}</div><small>{paso["corto"]}</small></div>')
+    return f"""
+    <div class="content-card" style="background: #2A2A2A; border-left: 5px solid #F4C430;">
+        <h3 style="color: #F4C430; text-align: center; margin-bottom: 1rem;">🗺️ Progreso del Cuestionario</h3>
+        <div class="mapa-pasos">{''.join(circulos)}</div>
+        <div style="text-align: center; margin-top: 1rem; color: #CCCCCC;">
+            <small>Paso {paso_actual} de 12 - {'✅ Completado' if paso_actual in pasos_validos else '⏳ En progreso'}</small>
+        </div>
+        <div style="text-align: center; margin-top: 0.5rem; font-size: 0.9rem;">
+            <span style="color: #27AE60;">● Completo</span> | 
+            <span style="color: #F4C430;">● Actual</span> | 
+            <span style="color: #E74C3C;">● Incompleto</span> | 
+            <span style="color: #666;">● Bloqueado</span>
+        </div>
+    </div>
+    """
+
+def mostrar_cromo_paso(numero, barra_progreso):
+    """Muestra el encabezado completo de un paso y actualiza la barra de progreso"""
+    paso = PASOS_CUESTIONARIO[numero]
+    st.markdown(html_cromo_paso(numero), unsafe_allow_html=True)
+    # Los <script> dentro de st.markdown no se ejecutan; el desplazamiento va en un componente sin altura
+    components.html(script_desplazamiento_paso(numero, paso["enfocar"]), height=0)
+    valor, texto = paso["progreso"]
+    barra_progreso.progress(valor, text=texto)
 
 # ==================== FUNCIONES DE VALIDACIÓN ESTRICTA ====================
 def validate_name(name):
@@ -205,6 +738,10 @@ def validate_email(email):
     
     return True, ""
 
+# Instrumentación: tiempo y bytes de HTML de cada sección de este rerun (paneles admin en la barra lateral)
+instalar_medidor_payload()
+cronometro = iniciar_cronometro("patrones_alimentarios")
+cronometro.marcar("encabezado")
 # ==================== CONFIGURACIÓN DE PÁGINA Y CSS MEJORADO ====================
 st.set_page_config(
     page_title="MUPAI - Evaluación de Patrones Alimentarios",
@@ -434,6 +971,45 @@ hr {
     font-weight: 600;
     font-size: 1.01rem;
 }
+/* Cromo de los pasos del cuestionario (cabecera, tarjeta de título, indicador y mapa de progreso) */
+.paso-cabecera {
+    background: linear-gradient(135deg, var(--paso-c1) 0%, var(--paso-c2) 100%);
+    color: white;
+    padding: 1.5rem;
+    border-radius: 15px;
+    text-align: center;
+    margin-bottom: 2rem;
+    box-shadow: 0 8px 25px var(--paso-sombra);
+    border: 3px solid var(--paso-c1);
+    animation: slideIn 0.5s ease-out;
+}
+.paso-cabecera h2 { margin: 0; font-size: 1.8rem; font-weight: bold; color: white; }
+.paso-cabecera p { margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white; }
+.paso-tarjeta {
+    background: linear-gradient(135deg, var(--paso-c1) 0%, var(--paso-c2) 100%);
+    color: var(--paso-texto);
+    margin-bottom: 2rem;
+    border: 3px solid var(--paso-borde);
+}
+.paso-tarjeta h2 { color: var(--paso-texto); text-align: center; margin-bottom: 1rem; }
+.paso-tarjeta p { text-align: center; margin: 0; font-weight: bold; }
+.paso-indicador { text-align: center; margin-bottom: 1rem; }
+.paso-indicador div {
+    background: #F4C430; color: #1E1E1E; border-radius: 50%; width: 50px; height: 50px;
+    display: flex; align-items: center; justify-content: center; margin: 0 auto;
+    font-weight: bold; font-size: 1.2rem;
+}
+.paso-indicador h4 { color: #F4C430; margin-top: 0.5rem; }
+.mapa-pasos { display: flex; justify-content: space-between; flex-wrap: wrap; gap: 10px; }
+.mapa-pasos > div { text-align: center; flex: 1; min-width: 80px; }
+.mapa-pasos .paso-circulo {
+    border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center;
+    justify-content: center; margin: 0 auto 5px; font-weight: bold;
+}
+.paso-circulo.actual { background: #F4C430; color: #1E1E1E; }
+.paso-circulo.completo { background: #27AE60; color: #1E1E1E; }
+.paso-circulo.incompleto { background: #E74C3C; color: #FFF; }
+.paso-circulo.bloqueado { background: #666; color: #FFF; }
 </style>
 """, unsafe_allow_html=True)
 
@@ -543,6 +1119,7 @@ st.markdown(f"""
 defaults = {
     "datos_completos": False,
     "correo_enviado": False,
+    "email_id": None,
     "preferencias_alimentarias": {},
     "restricciones_dieteticas": {},
     "nombre": "",
@@ -574,9 +1151,11 @@ defaults = {
 for k, v in defaults.items():
     if k not in st.session_state:
         st.session_state[k] = v
+conservar_respuestas()
 
+cronometro.marcar("autenticacion")
 # ==================== SISTEMA DE AUTENTICACIÓN ====================
-ADMIN_PASSWORD = "MUPAI2025"  # Contraseña predefinida
+# ADMIN_PASSWORD viene de mupai_config (secret `admin_password` o variable de entorno)
 
 # Si no está autenticado, mostrar login
 if not st.session_state.authenticated:
@@ -645,31 +1224,45 @@ def crear_tarjeta(titulo, contenido, tipo="info"):
     </div>
     """
 
-def enviar_email_resumen(contenido, nombre_cliente, email_cliente, fecha, edad, telefono):
-    """Envía el email con el resumen completo de la evaluación de patrones alimentarios."""
-    try:
-        email_origen = "administracion@muscleupgym.fitness"
-        email_destino = "administracion@muscleupgym.fitness"
-        password = st.secrets.get("zoho_password", "TU_PASSWORD_AQUI")
-
-        msg = MIMEMultipart()
-        msg['From'] = email_origen
-        msg['To'] = email_destino
-        msg['Subject'] = f"Evaluación patrones alimentarios MUPAI - {nombre_cliente} ({fecha})"
-
-        msg.attach(MIMEText(contenido, 'plain'))
-
-        server = smtplib.SMTP('smtp.zoho.com', 587)
-        server.starttls()
-        server.login(email_origen, password)
-        server.send_message(msg)
-        server.quit()
+def enviar_email_resumen(contenido, nombre_cliente, email_cliente, fecha, edad, telefono, forzar=False,
+                         datos=None, html=None):
+    """
+    Deja en el buzón de salida el email con el resumen de la evaluación de patrones alimentarios.
+    Regresa de inmediato con el id del mensaje (None si no se pudo encolar); un hilo
+    de fondo lo entrega por SMTP con reintentos (ver mupai_correo). Un resumen
+    idéntico a uno enviado hace poco devuelve el id original sin reenviarse, salvo forzar=True.
+    Si se pasan datos, el email lleva además los adjuntos JSON y CSV del esquema patrones_alimentarios;
+    html es la versión HTML del mismo resumen, renderizada con la misma plantilla.
+    Cada resumen nuevo queda también en el archivo local comprimido (ver mupai_archivo).
+    Los clics simultáneos de la misma sesión con el mismo resumen se agrupan en un solo envío.
+    """
+    def encolar_y_archivar():
+        adjuntos = None
+        if datos is not None:
+            adjuntos = adjuntos_estructurados(
+                "patrones_alimentarios", datos, f"patrones_mupai_{nombre_cliente}_{fecha}"
+            )
+        email_id = encolar_email(
+            f"Evaluación patrones alimentarios MUPAI - {nombre_cliente} ({fecha})",
+            contenido,
+            app="patrones_alimentarios",
+            forzar=forzar,
+            adjuntos=adjuntos,
+            html=html
+        )
+        if email_id and email_id != st.session_state.get("email_id"):
+            # Un resumen duplicado devuelve el id anterior y ya está archivado
+            archivar_resumen("patrones_alimentarios", nombre_cliente, email_cliente, fecha, contenido, datos)
+        return email_id
 
-        return True
+    try:
+        # Clics simultáneos de esta sesión con el mismo resumen comparten un solo envío
+        return enviar_una_vez(contenido, encolar_y_archivar)
     except Exception as e:
-        st.error(f"Error al enviar email: {str(e)}")
-        return False
+        st.error(f"Error al preparar el email: {str(e)}")
+        return None
 
+cronometro.marcar("datos_personales")
 # ==================== VISUALES INICIALES ====================
 
 # Misión, Visión y Compromiso con diseño mejorado
@@ -699,6 +1292,24 @@ st.markdown('<div class="content-card">', unsafe_allow_html=True)
 st.markdown("### 👤 Información Personal")
 st.markdown("Por favor, completa todos los campos para comenzar tu evaluación de patrones alimentarios personalizada.")
 
+# Reanudar una evaluación interrumpida: va antes de los widgets para poder restaurar sus valores
+if not st.session_state.datos_completos:
+    with st.expander("🔄 ¿Se interrumpió tu evaluación? Continúa donde te quedaste", expanded=False):
+        st.caption("Usa el código que te mostramos durante el cuestionario, o el email y teléfono con los que te registraste.")
+        codigo_reanudar = st.text_input("Código para continuar", placeholder="ABCD-EFGH", key="codigo_reanudar")
+        col_email, col_tel = st.columns(2)
+        with col_email:
+            email_reanudar = st.text_input("Email registrado", key="email_reanudar")
+        with col_tel:
+            telefono_reanudar = st.text_input("Teléfono registrado", key="telefono_reanudar")
+        if st.button("Continuar mi evaluación", disabled=not (codigo_reanudar or (email_reanudar and telefono_reanudar))):
+            progreso = cargar_progreso(APP_PROGRESO, token=codigo_reanudar, email=email_reanudar, telefono=telefono_reanudar)
+            if progreso:
+                restaurar_punto_control(progreso)
+                st.rerun()
+            else:
+                st.error("No encontramos una evaluación en progreso con esos datos.")
+
 col1, col2 = st.columns(2)
 with col1:
     nombre = st.text_input("Nombre completo*", value=st.session_state.get('nombre', ''), placeholder="Ej: Juan Pérez García", help="Tu nombre legal completo")
@@ -840,6 +1451,7 @@ if not st.session_state.datos_completos:
 datos_personales_completos = all([nombre, telefono, email_cliente]) and acepto_terminos
 
 if datos_personales_completos and st.session_state.datos_completos:
+    cronometro.marcar("progreso_cuestionario")
     # Progress bar mejorado y más prominente
     st.markdown("### 📊 Progreso de tu Evaluación")
     progress = st.progress(0, text="Iniciando evaluación...")
@@ -863,6 +1475,10 @@ if datos_personales_completos and st.session_state.datos_completos:
     </div>
     """, unsafe_allow_html=True)
 
+    if st.session_state.get('token_progreso'):
+        st.caption(f"🔖 Tu avance se guarda en cada paso. Si se corta la conexión, continúa con el código "
+                   f"**{formatear_token(st.session_state.token_progreso)}** o con tu email y teléfono.")
+
     # Navegación mejorada por pasos - Ahora refleja el progreso real
     current_step = st.session_state.get('current_step', 1)
     max_unlocked = st.session_state.get('max_unlocked_step', 1)
@@ -884,114 +1500,16 @@ if datos_personales_completos and st.session_state.datos_completos:
         12: validate_step_12()
     }
     
-    st.markdown(f"""
-    <div class="content-card" style="background: #2A2A2A; border-left: 5px solid #F4C430;">
-        <h3 style="color: #F4C430; text-align: center; margin-bottom: 1rem;">🗺️ Progreso del Cuestionario</h3>
-        <div style="display: flex; justify-content: space-between; flex-wrap: wrap; gap: 10px;">
-            <div style="text-align: center; flex: 1; min-width: 120px;">
-                <div style="background: {'#F4C430' if current_step == 1 else '#27AE60' if step_validators[1] else '#E74C3C'}; color: #1E1E1E; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; margin: 0 auto 5px; font-weight: bold;">{'✓' if step_validators[1] else '1'}</div>
-                <small>Proteínas Grasas</small>
-            </div>
-            <div style="text-align: center; flex: 1; min-width: 120px;">
-                <div style="background: {'#F4C430' if current_step == 2 else '#27AE60' if step_validators[2] else '#E74C3C' if max_unlocked >= 2 else '#666'}; color: {'#1E1E1E' if current_step == 2 or step_validators[2] else '#FFF'}; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; margin: 0 auto 5px; font-weight: bold;">{'✓' if step_validators[2] else '2'}</div>
-                <small>Proteínas Magras</small>
-            </div>
-            <div style="text-align: center; flex: 1; min-width: 120px;">
-                <div style="background: {'#F4C430' if current_step == 3 else '#27AE60' if step_validators[3] else '#E74C3C' if max_unlocked >= 3 else '#666'}; color: {'#1E1E1E' if current_step == 3 or step_validators[3] else '#FFF'}; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; margin: 0 auto 5px; font-weight: bold;">{'✓' if step_validators[3] else '3'}</div>
-                <small>Grasas Saludables</small>
-            </div>
-            <div style="text-align: center; flex: 1; min-width: 120px;">
-                <div style="background: {'#F4C430' if current_step == 4 else '#27AE60' if step_validators[4] else '#E74C3C' if max_unlocked >= 4 else '#666'}; color: {'#1E1E1E' if current_step == 4 or step_validators[4] else '#FFF'}; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; margin: 0 auto 5px; font-weight: bold;">{'✓' if step_validators[4] else '4'}</div>
-                <small>Carbohidratos</small>
-            </div>
-            <div style="text-align: center; flex: 1; min-width: 120px;">
-                <div style="background: {'#F4C430' if current_step == 5 else '#27AE60' if step_validators[5] else '#E74C3C' if max_unlocked >= 5 else '#666'}; color: {'#1E1E1E' if current_step == 5 or step_validators[5] else '#FFF'}; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; margin: 0 auto 5px; font-weight: bold;">{'✓' if step_validators[5] else '5'}</div>
-                <small>Vegetales</small>
-            </div>
-            <div style="text-align: center; flex: 1; min-width: 120px;">
-                <div style="background: {'#F4C430' if current_step == 6 else '#27AE60' if step_validators[6] else '#E74C3C' if max_unlocked >= 6 else '#666'}; color: {'#1E1E1E' if current_step == 6 or step_validators[6] else '#FFF'}; border-radius: 50%; width: 40px; height: 40px; display: flex; align-items: center; justify-content: center; margin: 0 auto 5px; font-weight: bold;">{'✓' if step_validators[6] else '6'}</div>
-                <small>Frutas</small>
-            </div>
-        </div>
-        <div style="text-align: center; margin-top: 1rem; color: #CCCCCC;">
-            <small>Paso {current_step} de 12 - {'✅ Completado' if step_validators.get(current_step, False) else '⏳ En progreso'}</small>
-        </div>
-        <div style="text-align: center; margin-top: 0.5rem; font-size: 0.9rem;">
-            <span style="color: #27AE60;">● Completo</span> | 
-            <span style="color: #F4C430;">● Actual</span> | 
-            <span style="color: #E74C3C;">● Incompleto</span> | 
-            <span style="color: #666;">● Bloqueado</span>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    pasos_validos = tuple(paso for paso, valido in step_validators.items() if valido)
+    st.markdown(html_mapa_progreso(current_step, max_unlocked, pasos_validos), unsafe_allow_html=True)
 
     # Mostrar solo el paso actual
+    cronometro.marcar(f"paso_{current_step}")
     current_step = st.session_state.get('current_step', 1)
 
     # GRUPO 1: PROTEÍNA ANIMAL CON MÁS CONTENIDO GRASO
     if current_step == 1:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #4CAF50 0%, #45a049 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(76, 175, 80, 0.3);
-            border: 3px solid #4CAF50;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🥩 PASO 1: PROTEÍNA ANIMAL CON MÁS CONTENIDO GRASO
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 1 de 12 - Selecciona las proteínas grasas que consumes
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso1"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso1');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #F4C430 0%, #DAA520 100%); color: #1E1E1E; margin-bottom: 2rem; border: 3px solid #DAA520;">
-            <h2 style="color: #1E1E1E; text-align: center; margin-bottom: 1rem;">
-                🥩 PASO 1: PROTEÍNA ANIMAL CON MÁS CONTENIDO GRASO
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(8, text="Paso 1 de 12: Proteínas con más contenido graso")
-        
-        # Actualizar indicador visual
-        st.markdown("""
-        <div style="text-align: center; margin-bottom: 1rem;">
-            <div style="background: #F4C430; color: #1E1E1E; border-radius: 50%; width: 50px; height: 50px; display: flex; align-items: center; justify-content: center; margin: 0 auto; font-weight: bold; font-size: 1.2rem;">1</div>
-            <h4 style="color: #F4C430; margin-top: 0.5rem;">PASO ACTUAL</h4>
-        </div>
-        """, unsafe_allow_html=True)
+        mostrar_cromo_paso(1, progress)
 
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
@@ -1006,7 +1524,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         huevos_embutidos = st.multiselect(
             "¿Cuáles de estos huevos y embutidos consumes? (Puedes seleccionar varios)",
-            ["Huevo entero", "Chorizo", "Salchicha (Viena, alemana, parrillera)", "Longaniza", "Tocino", "Jamón serrano", "Jamón ibérico", "Salami", "Mortadela", "Pastrami", "Pepperoni", "Ninguno"],
+            OPCIONES["huevos_embutidos"],
             key="huevos_embutidos",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los que consumes. Marca 'Ninguno' si no consumes ninguno de estos alimentos."
@@ -1016,7 +1534,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         carnes_res_grasas = st.multiselect(
             "¿Cuáles de estas carnes de res grasas consumes? (Puedes seleccionar varios)",
-            ["Aguja norteña", "Diezmillo marmoleado", "Costilla/Costillar", "Ribeye", "New York", "T-bone", "Porterhouse", "Prime rib", "Arrachera", "Picaña", "Suadero", "Brisket/Pecho de res", "Chamberete con tuétano", "Falda marmoleada", "Molida 80/20", "Molida 85/15", "Carne para asar con grasa", "Chuck roast (diezmillo graso)", "Paleta con grasa", "Retazo con grasa", "Short ribs", "Cowboy steak", "Tomahawk", "Matambre", "Entraña", "Ninguno"],
+            OPCIONES["carnes_res_grasas"],
             key="carnes_res_grasas",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los cortes que consumes. Marca 'Ninguno' si no consumes ninguno de estos cortes."
@@ -1026,7 +1544,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         carnes_cerdo_grasas = st.multiselect(
             "¿Cuáles de estas carnes de cerdo grasas consumes? (Puedes seleccionar varios)",
-            ["Costilla de cerdo", "Panceta (belly)", "Chuleta con grasa", "Carnitas", "Chicharrón prensado", "Codillo", "Espalda (Boston butt)", "Picnic shoulder", "Pata de cerdo", "Ninguno"],
+            OPCIONES["carnes_cerdo_grasas"],
             key="carnes_cerdo_grasas",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los cortes que consumes. Marca 'Ninguno' si no consumes ninguno de estos cortes."
@@ -1036,7 +1554,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         carnes_pollo_grasas = st.multiselect(
             "¿Cuáles de estas carnes de pollo/pavo grasas consumes? (Puedes seleccionar varios)",
-            ["Muslo de pollo con piel", "Pierna de pollo con piel", "Alitas de pollo", "Pollo entero con piel", "Pavo con piel", "Muslo de pavo", "Ninguno"],
+            OPCIONES["carnes_pollo_grasas"],
             key="carnes_pollo_grasas",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los cortes que consumes. Marca 'Ninguno' si no consumes ninguno de estos cortes."
@@ -1046,7 +1564,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         organos_grasos = st.multiselect(
             "¿Cuáles de estos órganos y vísceras grasas consumes? (Puedes seleccionar varios)",
-            ["Sesos de res", "Tuétano de res", "Molleja de res", "Hígado de res", "Riñón de res", "Ninguno"],
+            OPCIONES["organos_grasos"],
             key="organos_grasos",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los órganos que consumes. Marca 'Ninguno' si no consumes ninguno de estos alimentos."
@@ -1056,7 +1574,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         quesos_grasos = st.multiselect(
             "¿Cuáles de estos quesos altos en grasa consumes? (Puedes seleccionar varios)",
-            ["Queso manchego", "Queso doble crema", "Queso oaxaca", "Queso gouda", "Queso crema", "Queso cheddar", "Queso roquefort", "Queso brie", "Queso camembert", "Queso parmesano", "Queso gruyere", "Queso de cabra maduro", "Ninguno"],
+            OPCIONES["quesos_grasos"],
             key="quesos_grasos",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los quesos que consumes. Marca 'Ninguno' si no consumes ninguno de estos quesos."
@@ -1066,8 +1584,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         lacteos_enteros = st.multiselect(
             "¿Cuáles de estos lácteos enteros consumes? (Puedes seleccionar varios)",
-            ["Leche entera", "Yogur entero azucarado", "Yogur tipo griego entero", "Yogur de frutas azucarado", 
-             "Yogur bebible regular", "Crema", "Queso para untar (tipo Philadelphia original)", "Nata", "Crema agria", "Ninguno"],
+            OPCIONES["lacteos_enteros"],
             key="lacteos_enteros",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los lácteos enteros que uses. Marca 'Ninguno' si no consumes ninguno de estos lácteos."
@@ -1077,7 +1594,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         pescados_grasos = st.multiselect(
             "¿Cuáles de estos pescados grasos consumes? (Puedes seleccionar varios)",
-            ["Atún en aceite", "Salmón", "Sardinas", "Macarela", "Trucha", "Arenque", "Anchovetas", "Pez espada", "Anguila", "Ninguno"],
+            OPCIONES["pescados_grasos"],
             key="pescados_grasos",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los pescados grasos que consumes. Marca 'Ninguno' si no consumes ninguno de estos pescados."
@@ -1087,7 +1604,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         mariscos_grasos = st.multiselect(
             "¿Cuáles de estos mariscos/comida marina grasos consumes? (Puedes seleccionar varios)",
-            ["Pulpo", "Calamar", "Mejillones", "Ostras", "Cangrejo", "Langosta", "Caracol de mar", "Ninguno"],
+            OPCIONES["mariscos_grasos"],
             key="mariscos_grasos",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los mariscos grasos que consumes. Marca 'Ninguno' si no consumes ninguno de estos mariscos."
@@ -1119,68 +1636,7 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # GRUPO 2: PROTEÍNA ANIMAL MAGRA
     elif current_step == 2:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #2196F3 0%, #1976D2 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(33, 150, 243, 0.3);
-            border: 3px solid #2196F3;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🍗 PASO 2: PROTEÍNA ANIMAL MAGRA
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 2 de 12 - Selecciona las proteínas magras que consumes
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso2"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso2');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #F4C430 0%, #DAA520 100%); color: #1E1E1E; margin-bottom: 2rem; border: 3px solid #DAA520;">
-            <h2 style="color: #1E1E1E; text-align: center; margin-bottom: 1rem;">
-                🍗 PASO 2: PROTEÍNA ANIMAL MAGRA
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(17, text="Paso 2 de 12: Proteínas animales magras")
-        
-        # Actualizar indicador visual
-        st.markdown("""
-        <div style="text-align: center; margin-bottom: 1rem;">
-            <div style="background: #F4C430; color: #1E1E1E; border-radius: 50%; width: 50px; height: 50px; display: flex; align-items: center; justify-content: center; margin: 0 auto; font-weight: bold; font-size: 1.2rem;">2</div>
-            <h4 style="color: #F4C430; margin-top: 0.5rem;">PASO ACTUAL</h4>
-        </div>
-        """, unsafe_allow_html=True)
+        mostrar_cromo_paso(2, progress)
 
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
@@ -1195,7 +1651,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         carnes_res_magras = st.multiselect(
             "¿Cuáles de estas carnes de res magras consumes? (Puedes seleccionar varios)",
-            ["Filete (lomo fino)", "Lomo bajo (striploin limpio)", "Centro de diezmillo limpio", "Sirloin limpio/Aguayón", "Bola/Pulpa bola", "Cuete", "Pulpa negra", "Pulpa blanca", "Espaldilla limpia", "Milanesa de bola", "Bistec de pierna", "Molida 90/10", "Molida 95/5", "Molida 97/3", "Falda limpia", "Chamorro limpio", "Tampiqueña magra", "Medallones de res magros", "Top round", "Bottom round", "Flank steak limpio", "Maciza limpia", "Ninguno"],
+            OPCIONES["carnes_res_magras"],
             key="carnes_res_magras",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todas las carnes de res magras que consumas. Marca 'Ninguno' si no consumes ninguna de estas carnes."
@@ -1205,7 +1661,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         carnes_cerdo_magras = st.multiselect(
             "¿Cuáles de estas carnes de cerdo magras consumes? (Puedes seleccionar varios)",
-            ["Lomo de cerdo", "Filete de cerdo", "Chuleta magra sin grasa", "Solomillo de cerdo", "Tenderloin", "Ninguno"],
+            OPCIONES["carnes_cerdo_magras"],
             key="carnes_cerdo_magras",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todas las carnes de cerdo magras que consumas. Marca 'Ninguno' si no consumes ninguna de estas carnes."
@@ -1215,7 +1671,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         carnes_pollo_magras = st.multiselect(
             "¿Cuáles de estas carnes de pollo/pavo magras consumes? (Puedes seleccionar varios)",
-            ["Pechuga de pollo sin piel", "Pechuga de pavo sin piel", "Muslo de pollo sin piel", "Pierna de pavo sin piel", "Ninguno"],
+            OPCIONES["carnes_pollo_magras"],
             key="carnes_pollo_magras",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todas las carnes de pollo/pavo magras que consumas. Marca 'Ninguno' si no consumes ninguna de estas carnes."
@@ -1225,7 +1681,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         organos_magros = st.multiselect(
             "¿Cuáles de estos órganos y vísceras magros consumes? (Puedes seleccionar varios)",
-            ["Corazón de res", "Lengua de res", "Hígado de ternera", "Riñones de ternera", "Corazón de pollo", "Hígado de pollo", "Molleja de ternera", "Ninguno"],
+            OPCIONES["organos_magros"],
             key="organos_magros",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los órganos magros que consumas. Marca 'Ninguno' si no consumes ninguno de estos alimentos."
@@ -1235,7 +1691,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         pescados_magros = st.multiselect(
             "¿Cuáles de estos pescados magros consumes? (Puedes seleccionar varios)",
-            ["Tilapia", "Basa", "Huachinango", "Merluza", "Robalo", "Atún en agua", "Bacalao", "Lenguado", "Mero", "Dorado", "Pargo", "Ninguno"],
+            OPCIONES["pescados_magros"],
             key="pescados_magros",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los pescados magros que consumas. Marca 'Ninguno' si no consumes ninguno de estos pescados."
@@ -1245,7 +1701,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         mariscos_magros = st.multiselect(
             "¿Cuáles de estos mariscos/comida marina magros consumes? (Puedes seleccionar varios)",
-            ["Camarón", "Callo de hacha", "Almeja", "Langostino", "Jaiba", "Ninguno"],
+            OPCIONES["mariscos_magros"],
             key="mariscos_magros",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los mariscos magros que consumas. Marca 'Ninguno' si no consumes ninguno de estos mariscos."
@@ -1255,8 +1711,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         quesos_magros = st.multiselect(
             "¿Cuáles de estos quesos magros consumes? (Puedes seleccionar varios)",
-            ["Queso panela", "Queso cottage", "Queso ricotta light", "Queso oaxaca reducido en grasa", 
-             "Queso mozzarella light", "Queso fresco bajo en grasa", "Queso de cabra magro", "Ninguno"],
+            OPCIONES["quesos_magros"],
             key="quesos_magros",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los quesos magros que consumes. Marca 'Ninguno' si no consumes ninguno de estos quesos."
@@ -1266,10 +1721,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         lacteos_light = st.multiselect(
             "¿Cuáles de estos lácteos light o reducidos consumes? (Puedes seleccionar varios)",
-            ["Leche descremada", "Leche deslactosada light", "Leche de almendra sin azúcar", 
-             "Leche de coco sin azúcar", "Leche de soya sin azúcar", "Yogur griego natural sin azúcar", 
-             "Yogur griego light", "Yogur bebible bajo en grasa", "Yogur sin azúcar añadida", 
-             "Yogur de frutas bajo en grasa y sin azúcar añadida", "Queso crema light", "Ninguno"],
+            OPCIONES["lacteos_light"],
             key="lacteos_light",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los lácteos light que uses. Marca 'Ninguno' si no consumes ninguno de estos lácteos."
@@ -1279,7 +1731,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         huevos_embutidos_light = st.multiselect(
             "¿Cuáles de estos huevos y embutidos light consumes? (Puedes seleccionar varios)",
-            ["Clara de huevo", "Jamón de pechuga de pavo", "Jamón de pierna bajo en grasa", "Salchicha de pechuga de pavo (light)", "Pechuga de pavo rebanada", "Jamón serrano magro", "Ninguno"],
+            OPCIONES["huevos_embutidos_light"],
             key="huevos_embutidos_light",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los huevos y embutidos light que consumes. Marca 'Ninguno' si no consumes ninguno de estos alimentos."
@@ -1310,68 +1762,7 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # GRUPO 3: FUENTES DE GRASA SALUDABLE
     elif current_step == 3:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #FF9800 0%, #F57C00 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(255, 152, 0, 0.3);
-            border: 3px solid #FF9800;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🥑 PASO 3: FUENTES DE GRASA SALUDABLE
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 3 de 12 - Selecciona las grasas saludables que consumes
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso3"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso3');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #F4C430 0%, #DAA520 100%); color: #1E1E1E; margin-bottom: 2rem; border: 3px solid #DAA520;">
-            <h2 style="color: #1E1E1E; text-align: center; margin-bottom: 1rem;">
-                🥑 PASO 3: FUENTES DE GRASA SALUDABLE
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(25, text="Paso 3 de 12: Fuentes de grasa saludable")
-        
-        # Actualizar indicador visual
-        st.markdown("""
-        <div style="text-align: center; margin-bottom: 1rem;">
-            <div style="background: #F4C430; color: #1E1E1E; border-radius: 50%; width: 50px; height: 50px; display: flex; align-items: center; justify-content: center; margin: 0 auto; font-weight: bold; font-size: 1.2rem;">3</div>
-            <h4 style="color: #F4C430; margin-top: 0.5rem;">PASO ACTUAL</h4>
-        </div>
-        """, unsafe_allow_html=True)
+        mostrar_cromo_paso(3, progress)
 
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
@@ -1386,8 +1777,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         grasas_naturales = st.multiselect(
             "¿Cuáles de estas grasas naturales consumes? (Puedes seleccionar varios)",
-            ["Aguacate", "Yema de huevo", "Aceitunas (negras, verdes)", "Coco rallado natural", 
-             "Coco fresco", "Leche de coco sin azúcar", "Ninguno"],
+            OPCIONES["grasas_naturales"],
             key="grasas_naturales",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todas las grasas naturales que consumes. Marca 'Ninguno' si no consumes ninguna de estas grasas."
@@ -1397,8 +1787,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         frutos_secos_semillas = st.multiselect(
             "¿Cuáles de estos frutos secos y semillas consumes? (Puedes seleccionar varios)",
-            ["Almendras", "Nueces", "Nuez de la India", "Pistaches", "Cacahuates naturales (sin sal)", 
-             "Semillas de chía", "Semillas de linaza", "Semillas de girasol", "Semillas de calabaza (pepitas)", "Ninguno"],
+            OPCIONES["frutos_secos_semillas"],
             key="frutos_secos_semillas",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los frutos secos y semillas que consumes. Marca 'Ninguno' si no consumes ninguno de estos."
@@ -1408,8 +1797,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         mantequillas_vegetales = st.multiselect(
             "¿Cuáles de estas mantequillas y pastas vegetales consumes? (Puedes seleccionar varios)",
-            ["Mantequilla de maní natural", "Mantequilla de almendra", "Tahini (pasta de ajonjolí)", 
-             "Mantequilla de nuez de la India", "Ninguno"],
+            OPCIONES["mantequillas_vegetales"],
             key="mantequillas_vegetales",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todas las mantequillas vegetales que consumes. Marca 'Ninguno' si no consumes ninguna de estas."
@@ -1435,68 +1823,7 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # GRUPO 4: CARBOHIDRATOS COMPLEJOS Y CEREALES
     elif current_step == 4:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #9C27B0 0%, #7B1FA2 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(156, 39, 176, 0.3);
-            border: 3px solid #9C27B0;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🍞 PASO 4: CARBOHIDRATOS COMPLEJOS Y CEREALES
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 4 de 12 - Selecciona los carbohidratos que consumes
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso4"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso4');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #F4C430 0%, #DAA520 100%); color: #1E1E1E; margin-bottom: 2rem; border: 3px solid #DAA520;">
-            <h2 style="color: #1E1E1E; text-align: center; margin-bottom: 1rem;">
-                🍞 PASO 4: CARBOHIDRATOS COMPLEJOS Y CEREALES
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(33, text="Paso 4 de 12: Carbohidratos complejos y cereales")
-        
-        # Actualizar indicador visual
-        st.markdown("""
-        <div style="text-align: center; margin-bottom: 1rem;">
-            <div style="background: #F4C430; color: #1E1E1E; border-radius: 50%; width: 50px; height: 50px; display: flex; align-items: center; justify-content: center; margin: 0 auto; font-weight: bold; font-size: 1.2rem;">4</div>
-            <h4 style="color: #F4C430; margin-top: 0.5rem;">PASO ACTUAL</h4>
-        </div>
-        """, unsafe_allow_html=True)
+        mostrar_cromo_paso(4, progress)
 
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
@@ -1511,9 +1838,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         cereales_integrales = st.multiselect(
             "¿Cuáles de estos cereales y granos integrales consumes? (Puedes seleccionar varios)",
-            ["Avena tradicional", "Avena instantánea sin azúcar", "Arroz integral", "Arroz blanco", 
-             "Arroz jazmín", "Arroz basmati", "Trigo bulgur", "Cuscús", "Quinoa", "Amaranto", 
-             "Trigo inflado natural", "Cereal de maíz sin azúcar", "Cereal integral bajo en azúcar", "Ninguno"],
+            OPCIONES["cereales_integrales"],
             key="cereales_integrales",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los cereales y granos que consumes. Marca 'Ninguno' si no consumes ninguno de estos."
@@ -1523,7 +1848,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         pastas = st.multiselect(
             "¿Cuáles de estas pastas consumes? (Puedes seleccionar varios)",
-            ["Pasta integral", "Pasta de trigo regular", "Pasta de arroz", "Pasta de quinoa", "Pasta de legumbres (lentejas, garbanzos)", "Fideos de arroz", "Fideos chinos", "Spaguetti", "Macarrones", "Lasaña", "Ninguno"],
+            OPCIONES["pastas"],
             key="pastas",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todas las pastas que consumes. Marca 'Ninguno' si no consumes ninguna de estas."
@@ -1533,9 +1858,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         tortillas_panes = st.multiselect(
             "¿Cuáles de estas tortillas y panes consumes? (Puedes seleccionar varios)",
-            ["Tortilla de maíz", "Tortilla de nopal", "Tortilla integral", "Tortilla de harina", 
-             "Tortilla de avena", "Pan integral", "Pan multigrano", "Pan de centeno", 
-             "Pan de caja sin azúcar añadida", "Pan pita integral", "Pan tipo Ezekiel (germinado)", "Ninguno"],
+            OPCIONES["tortillas_panes"],
             key="tortillas_panes",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todos los tipos de tortillas y panes que consumes. Marca 'Ninguno' si no consumes ninguno."
@@ -1545,7 +1868,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         raices_tuberculos = st.multiselect(
             "¿Cuáles de estas raíces y tubérculos consumes? (Puedes seleccionar varios)",
-            ["Papa", "Camote", "Yuca", "Plátano macho", "Jícama", "Zanahoria", "Betabel", "Ninguno"],
+            OPCIONES["raices_tuberculos"],
             key="raices_tuberculos",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Incluye todos los tubérculos y raíces que consumes en su forma base. Marca 'Ninguno' si no consumes ninguno de estos."
@@ -1555,8 +1878,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Preferentemente elige al menos uno de esta lista. Se pueden seleccionar más de uno. Si no consumes ninguno, selecciona 'Ninguno'.")
         leguminosas = st.multiselect(
             "¿Cuáles de estas leguminosas consumes? (Puedes seleccionar varios)",
-            ["Frijoles negros", "Frijoles bayos", "Frijoles pintos", "Lentejas", "Garbanzos", 
-             "Habas cocidas", "Soya texturizada", "Edamames (vainas de soya)", "Hummus (puré de garbanzo)", "Ninguno"],
+            OPCIONES["leguminosas"],
             key="leguminosas",
             placeholder="🔽 Haz clic aquí para ver y seleccionar opciones",
             help="Selecciona todas las leguminosas que consumes. Marca 'Ninguno' si no consumes ninguna de estas."
@@ -1584,68 +1906,7 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # GRUPO 5: VEGETALES
     elif current_step == 5:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #4CAF50 0%, #388E3C 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(76, 175, 80, 0.3);
-            border: 3px solid #4CAF50;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🥬 PASO 5: VEGETALES
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 5 de 12 - Selecciona los vegetales que consumes
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso5"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso5');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #F4C430 0%, #DAA520 100%); color: #1E1E1E; margin-bottom: 2rem; border: 3px solid #DAA520;">
-            <h2 style="color: #1E1E1E; text-align: center; margin-bottom: 1rem;">
-                🥬 PASO 5: VEGETALES
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(42, text="Paso 5 de 12: Vegetales")
-        
-        # Actualizar indicador visual
-        st.markdown("""
-        <div style="text-align: center; margin-bottom: 1rem;">
-            <div style="background: #F4C430; color: #1E1E1E; border-radius: 50%; width: 50px; height: 50px; display: flex; align-items: center; justify-content: center; margin: 0 auto; font-weight: bold; font-size: 1.2rem;">5</div>
-            <h4 style="color: #F4C430; margin-top: 0.5rem;">PASO ACTUAL</h4>
-        </div>
-        """, unsafe_allow_html=True)
+        mostrar_cromo_paso(5, progress)
 
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
@@ -1660,12 +1921,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         
         vegetales_lista = st.multiselect(
             "¿Cuáles de estos vegetales consumes o toleras fácilmente? (Puedes seleccionar varios)",
-            ["Espinaca", "Acelga", "Kale", "Lechuga (romana, italiana, orejona, iceberg)", 
-             "Col morada", "Col verde", "Repollo", "Brócoli", "Coliflor", "Ejote", "Chayote", 
-             "Calabacita", "Nopal", "Betabel", "Zanahoria", "Jitomate saladet", "Jitomate bola", 
-             "Tomate verde", "Cebolla blanca", "Cebolla morada", "Pimiento morrón (rojo, verde, amarillo, naranja)", 
-             "Pepino", "Apio", "Rábano", "Ajo", "Berenjena", "Champiñones", "Guisantes (chícharos)", 
-             "Verdolaga", "Habas tiernas", "Germen de alfalfa", "Germen de soya", "Flor de calabaza", "Ninguno"],
+            OPCIONES["vegetales_lista"],
             key="vegetales_lista",
             placeholder="🔽 Haz clic aquí para ver y seleccionar todos los vegetales que consumes",
             help="Selecciona todos los vegetales que consumes o toleras. Marca 'Ninguno' si no consumes ninguno de estos vegetales."
@@ -1695,68 +1951,7 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # GRUPO 6: FRUTAS
     elif current_step == 6:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #E91E63 0%, #C2185B 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(233, 30, 99, 0.3);
-            border: 3px solid #E91E63;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🍎 PASO 6: FRUTAS
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 6 de 12 - Selecciona las frutas que consumes
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso6"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso6');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #F4C430 0%, #DAA520 100%); color: #1E1E1E; margin-bottom: 2rem; border: 3px solid #DAA520;">
-            <h2 style="color: #1E1E1E; text-align: center; margin-bottom: 1rem;">
-                🍎 PASO 6: FRUTAS
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(50, text="Paso 6 de 12: Frutas - ¡Completando grupos principales!")
-        
-        # Actualizar indicador visual
-        st.markdown("""
-        <div style="text-align: center; margin-bottom: 1rem;">
-            <div style="background: #F4C430; color: #1E1E1E; border-radius: 50%; width: 50px; height: 50px; display: flex; align-items: center; justify-content: center; margin: 0 auto; font-weight: bold; font-size: 1.2rem;">6</div>
-            <h4 style="color: #F4C430; margin-top: 0.5rem;">¡ÚLTIMO GRUPO PRINCIPAL!</h4>
-        </div>
-        """, unsafe_allow_html=True)
+        mostrar_cromo_paso(6, progress)
 
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
@@ -1771,12 +1966,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         
         frutas_lista = st.multiselect(
             "¿Cuáles de estas frutas disfrutas o toleras bien? (Puedes seleccionar varios)",
-            ["Manzana (roja, verde, gala, fuji)", "Naranja", "Mandarina", "Mango (petacón, ataulfo)", 
-             "Papaya", "Sandía", "Melón", "Piña", "Plátano (tabasco, dominico, macho)", "Uvas", 
-             "Fresas", "Arándanos", "Zarzamoras", "Frambuesas", "Higo", "Kiwi", "Pera", "Durazno", 
-             "Ciruela", "Granada", "Cereza", "Chabacano", "Lima", "Limón", "Guayaba", "Tuna", 
-             "Níspero", "Mamey", "Pitahaya (dragon fruit)", "Tamarindo", "Coco (carne, rallado)", 
-             "Caqui (persimón)", "Maracuyá", "Manzana en puré sin azúcar", "Fruta en almíbar light", "Ninguno"],
+            OPCIONES["frutas_lista"],
             key='frutas_lista',
             placeholder="🔽 Haz clic aquí para ver y seleccionar todas las frutas que disfrutas",
             help="Selecciona todas las frutas que disfrutas. Marca 'Ninguno' si no consumes ninguna de estas frutas."
@@ -1814,62 +2004,8 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # APARTADO EXTRA 1: ACEITES DE COCCIÓN (PASO 7)
     elif current_step == 7:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #795548 0%, #5D4037 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(121, 85, 72, 0.3);
-            border: 3px solid #795548;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🍳 PASO 7: ACEITES DE COCCIÓN PREFERIDOS
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 7 de 12 - Información Adicional (Opcional)
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso7"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso7');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #27AE60 0%, #2ECC71 100%); color: #1E1E1E; margin-bottom: 2rem; border: 3px solid #27AE60;">
-            <h2 style="color: #1E1E1E; text-align: center; margin-bottom: 1rem;">
-                🍳 PASO 7: ACEITES DE COCCIÓN PREFERIDOS
-            </h2>
-            <p style="text-align: center; margin: 0; font-weight: bold;">Información Adicional - Opcional</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(58, text="Paso 7 de 12: Aceites de cocción (Opcional)")
-        
+        mostrar_cromo_paso(7, progress)
+
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
         ### 🎯 ¿Qué necesitamos saber?
@@ -1883,10 +2019,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         
         aceites_coccion = st.multiselect(
             "¿Cuáles de estas grasas/aceites usas para cocinar? (Puedes seleccionar varios)",
-            ["🫒 Aceite de oliva extra virgen", "🥑 Aceite de aguacate", "🥥 Aceite de coco virgen", 
-             "🧈 Mantequilla con sal", "🧈 Mantequilla sin sal", "🧈 Mantequilla clarificada (ghee)", 
-             "🐷 Manteca de cerdo (casera o artesanal)", "🧴 Spray antiadherente sin calorías (aceite de oliva o aguacate)", 
-             "❌ Prefiero cocinar sin aceite o con agua", "Ninguno"],
+            OPCIONES["aceites_coccion"],
             key='aceites_coccion',
             placeholder="🔽 Haz clic aquí para seleccionar los aceites que usas para cocinar",
             help="Selecciona todos los aceites y grasas que usas en tu cocina. Marca 'Ninguno' si no usas ninguno de estos aceites."
@@ -1912,62 +2045,8 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # APARTADO EXTRA 2: BEBIDAS (PASO 8)
     elif current_step == 8:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #00BCD4 0%, #0097A7 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(0, 188, 212, 0.3);
-            border: 3px solid #00BCD4;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🥤 PASO 8: BEBIDAS PARA HIDRATACIÓN
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 8 de 12 - Información Adicional (Opcional)
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso8"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso8');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #27AE60 0%, #2ECC71 100%); color: #1E1E1E; margin-bottom: 2rem; border: 3px solid #27AE60;">
-            <h2 style="color: #1E1E1E; text-align: center; margin-bottom: 1rem;">
-                🥤 PASO 8: BEBIDAS PARA HIDRATACIÓN
-            </h2>
-            <p style="text-align: center; margin: 0; font-weight: bold;">Información Adicional - Opcional</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(67, text="Paso 8 de 12: Bebidas para hidratación (Opcional)")
-        
+        mostrar_cromo_paso(8, progress)
+
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
         ### 🎯 ¿Qué necesitamos saber?
@@ -1981,11 +2060,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         
         bebidas_sin_calorias = st.multiselect(
             "¿Cuáles de estas bebidas sin calorías consumes regularmente? (Puedes seleccionar varios)",
-            ["💧 Agua natural", "💦 Agua mineral", "⚡ Bebidas con electrolitos sin azúcar (Electrolit Zero, SueroX, LMNT, etc.)", 
-             "🍋 Agua infusionada con frutas naturales (limón, pepino, menta, etc.)", 
-             "🍵 Té de hierbas sin azúcar (manzanilla, menta, jengibre, etc.)", 
-             "🍃 Té verde o té negro sin azúcar", "☕ Café negro sin azúcar", 
-             "🥤 Refrescos sin calorías (Coca Cola Zero, Pepsi Light, etc.)", "Ninguno"],
+            OPCIONES["bebidas_sin_calorias"],
             key='bebidas_sin_calorias',
             placeholder="🔽 Haz clic aquí para seleccionar las bebidas que consumes",
             help="Selecciona todas las bebidas sin calorías que acostumbres. Marca 'Ninguno' si no consumes ninguna de estas bebidas."
@@ -2011,62 +2086,8 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # APARTADO EXTRA 3: ALERGIAS/INTOLERANCIAS (PASO 9)
     elif current_step == 9:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #F44336 0%, #D32F2F 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(244, 67, 54, 0.3);
-            border: 3px solid #F44336;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🚨 PASO 9: ALERGIAS E INTOLERANCIAS
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 9 de 12 - Información Crítica para tu Seguridad
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso9"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso9');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #E74C3C 0%, #C0392B 100%); color: #FFFFFF; margin-bottom: 2rem; border: 3px solid #E74C3C;">
-            <h2 style="color: #FFFFFF; text-align: center; margin-bottom: 1rem;">
-                🚨 PASO 9: ALERGIAS E INTOLERANCIAS
-            </h2>
-            <p style="text-align: center; margin: 0; font-weight: bold;">Información Crítica para tu Seguridad</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(75, text="Paso 9 de 12: Alergias e intolerancias (Crítico)")
-        
+        mostrar_cromo_paso(9, progress)
+
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         
         st.markdown("""
@@ -2080,7 +2101,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Debes seleccionar al menos una opción. Si no tienes alergias, selecciona 'Ninguna'.")
         alergias_alimentarias = st.multiselect(
             "Selecciona TODAS las alergias alimentarias que tienes:",
-            ["Lácteos", "Huevo", "Frutos secos", "Mariscos", "Pescado", "Gluten", "Soya", "Semillas", "Ninguna"],
+            OPCIONES["alergias_alimentarias"],
             key='alergias_alimentarias',
             placeholder="🔽 Selecciona si tienes alguna alergia alimentaria o marca 'Ninguna'",
             help="Incluye cualquier alergia, desde leve hasta severa. Si no tienes alergias, selecciona 'Ninguna'."
@@ -2099,7 +2120,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Instrucción:** Debes seleccionar al menos una opción. Si no tienes intolerancias, selecciona 'Ninguna'.")
         intolerancias_digestivas = st.multiselect(
             "Selecciona las intolerancias o malestares digestivos que experimentas:",
-            ["Lácteos con lactosa", "Leguminosas", "FODMAPs", "Gluten", "Crucíferas", "Endulzantes artificiales", "Ninguna"],
+            OPCIONES["intolerancias_digestivas"],
             key='intolerancias_digestivas',
             placeholder="🔽 Selecciona si tienes intolerancias digestivas o marca 'Ninguna'",
             help="Incluye alimentos que te causen malestar digestivo. Si no tienes intolerancias, selecciona 'Ninguna'."
@@ -2128,8 +2149,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         
         metodos_coccion_accesibles = st.multiselect(
             "Selecciona los métodos de cocción que más usas o prefieres:",
-            ["🔥 A la plancha", "🔥 A la parrilla", "💧 Hervido", "♨️ Al vapor", "🔥 Horneado / al horno", 
-             "💨 Air fryer (freidora de aire)", "⚡ Microondas", "🥄 Salteado (con poco aceite)"],
+            OPCIONES["metodos_coccion_accesibles"],
             key='metodos_coccion_accesibles',
             placeholder="🔽 Selecciona los métodos de cocción que usas",
             help="Incluye todos los métodos que uses regularmente o que tengas disponibles"
@@ -2175,62 +2195,8 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # APARTADO EXTRA 4: ANTOJOS (PASO 10)
     elif current_step == 10:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #673AB7 0%, #512DA8 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(103, 58, 183, 0.3);
-            border: 3px solid #673AB7;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                😋 PASO 10: EVALUACIÓN DE ANTOJOS
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 10 de 12 - Información para Estrategias
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso10"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso10');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-                // Focus on the first multiselect dropdown in this step
-                setTimeout(function() {
-                    const firstMultiselect = window.parent.document.querySelector('[data-testid="stMultiSelect"] input');
-                    if (firstMultiselect) {
-                        firstMultiselect.focus();
-                        firstMultiselect.click();
-                    }
-                }, 200);
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="content-card" style="background: linear-gradient(135deg, #9B59B6 0%, #8E44AD 100%); color: #FFFFFF; margin-bottom: 2rem; border: 3px solid #9B59B6;">
-            <h2 style="color: #FFFFFF; text-align: center; margin-bottom: 1rem;">
-                😋 PASO 10: EVALUACIÓN DE ANTOJOS
-            </h2>
-            <p style="text-align: center; margin: 0; font-weight: bold;">¡Último Paso! - Información para Estrategias</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(83, text="Paso 10 de 12: Antojos alimentarios")
-        
+        mostrar_cromo_paso(10, progress)
+
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
         ### 🧠 ¿Por qué evaluamos tus antojos?
@@ -2248,10 +2214,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Ayuda:** Incluye cualquier dulce, postre o alimento azucarado que se te antoje frecuentemente. Si no tienes antojos dulces, selecciona 'Ninguno'.")
         antojos_dulces = st.multiselect(
             "¿Cuáles de estos alimentos dulces se te antojan frecuentemente? (Puedes seleccionar varios)",
-            ["Chocolate con leche", "Chocolate amargo", "Pan dulce (conchas, donas, cuernitos)", 
-             "Pastel (tres leches, chocolate, etc.)", "Galletas (Marías, Emperador, Chokis, etc.)", 
-             "Helado / Nieve", "Flan / Gelatina", "Dulces tradicionales (cajeta, obleas, jamoncillo, glorias)", 
-             "Cereal azucarado", "Leche condensada", "Churros", "Ninguno"],
+            OPCIONES["antojos_dulces"],
             key='antojos_dulces',
             placeholder="🔽 Selecciona los alimentos dulces que se te antojan o marca 'Ninguno'",
             help="Incluye todos los dulces que frecuentemente deseas. Si no tienes antojos dulces, selecciona 'Ninguno'."
@@ -2262,9 +2225,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Ayuda:** Incluye botanas, frituras o alimentos salados que se te antojen. Si no tienes antojos salados, selecciona 'Ninguno'.")
         antojos_salados = st.multiselect(
             "¿Cuáles de estos alimentos salados se te antojan frecuentemente? (Puedes seleccionar varios)",
-            ["Papas fritas (Sabritas, Ruffles, etc.)", "Cacahuates enchilados", "Frituras (Doritos, Cheetos, Takis, etc.)", 
-             "Totopos con salsa", "Galletas saladas", "Cacahuates japoneses", "Chicharrón (de cerdo o harina)", 
-             "Nachos con queso", "Queso derretido o gratinado", "Ninguno"],
+            OPCIONES["antojos_salados"],
             key='antojos_salados',
             placeholder="🔽 Selecciona los alimentos salados que se te antojan o marca 'Ninguno'",
             help="Incluye todas las botanas y snacks salados que frecuentemente deseas. Si no tienes antojos salados, selecciona 'Ninguno'."
@@ -2275,9 +2236,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Ayuda:** Incluye comida rápida, platillos callejeros o preparaciones que se te antojen. Si no tienes antojos de comida rápida, selecciona 'Ninguno'.")
         antojos_comida_rapida = st.multiselect(
             "¿Cuáles de estas comidas rápidas se te antojan frecuentemente? (Puedes seleccionar varios)",
-            ["Tacos (pastor, asada, birria, etc.)", "Tortas (cubana, ahogada, etc.)", "Hamburguesas", "Hot dogs", 
-             "Pizza", "Quesadillas fritas", "Tamales", "Pambazos", "Sopes / gorditas", "Elotes / esquites", 
-             "Burritos", "Enchiladas", "Empanadas", "Ninguno"],
+            OPCIONES["antojos_comida_rapida"],
             key='antojos_comida_rapida',
             placeholder="🔽 Selecciona las comidas rápidas que se te antojan o marca 'Ninguno'",
             help="Incluye toda la comida rápida o callejera que frecuentemente deseas. Si no tienes antojos de comida rápida, selecciona 'Ninguno'."
@@ -2288,10 +2247,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Ayuda:** Incluye bebidas azucaradas, alcohólicas o postres líquidos que se te antojen. Si no tienes antojos de bebidas, selecciona 'Ninguno'.")
         antojos_bebidas = st.multiselect(
             "¿Cuáles de estas bebidas se te antojan frecuentemente? (Puedes seleccionar varios)",
-            ["Refrescos regulares (Coca-Cola, Fanta, etc.)", "Jugos industrializados (Boing, Jumex, etc.)", 
-             "Malteadas / Frappés", "Agua de sabor con azúcar (jamaica, horchata, tamarindo)", 
-             "Café con azúcar y leche", "Champurrado / atole", "Licuado de plátano con azúcar", 
-             "Bebidas alcohólicas (cerveza, tequila, vino, etc.)", "Ninguno"],
+            OPCIONES["antojos_bebidas"],
             key='antojos_bebidas',
             placeholder="🔽 Selecciona las bebidas que se te antojan o marca 'Ninguno'",
             help="Incluye todas las bebidas con calorías que frecuentemente deseas. Si no tienes antojos de bebidas, selecciona 'Ninguno'."
@@ -2302,9 +2258,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         st.info("💡 **Ayuda:** Incluye alimentos picantes, con chile o condimentos intensos que se te antojen. Si no tienes antojos picantes, selecciona 'Ninguno'.")
         antojos_picantes = st.multiselect(
             "¿Cuáles de estos alimentos picantes se te antojan frecuentemente? (Puedes seleccionar varios)",
-            ["Chiles en escabeche", "Salsas picantes", "Salsa Valentina, Tajín o Chamoy", 
-             "Pepinos con chile y limón", "Mangos verdes con chile", "Gomitas enchiladas", 
-             "Fruta con Miguelito o chile en polvo", "Ninguno"],
+            OPCIONES["antojos_picantes"],
             key='antojos_picantes',
             placeholder="🔽 Selecciona los alimentos picantes que se te antojan o marca 'Ninguno'",
             help="Incluye todos los alimentos con chile o condimentos estimulantes que deseas. Si no tienes antojos picantes, selecciona 'Ninguno'."
@@ -2357,45 +2311,8 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # PASO 11: FRECUENCIA DE COMIDAS
     elif current_step == 11:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #FF9800 0%, #F57C00 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(255, 152, 0, 0.3);
-            border: 3px solid #FF9800;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                🍽️ PASO 11: FRECUENCIA DE COMIDAS PREFERIDA
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                Estás en el paso 11 de 12 - Adaptación a tu Estilo de Vida
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso11"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso11');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(92, text="Paso 11 de 12: Frecuencia de comidas preferida")
-        
+        mostrar_cromo_paso(11, progress)
+
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
         ### 🎯 ¿Cuál es tu frecuencia de comidas ideal?
@@ -2409,13 +2326,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         
         frecuencia_comidas = st.radio(
             "¿Cuál es la frecuencia de comidas que mejor se adapta a tu agenda diaria?",
-            [
-                "Desayuno, comida y cena (3 comidas principales)",
-                "Desayuno, comida, cena y una colación",
-                "Desayuno, comida, cena y dos colaciones", 
-                "Solo dos comidas principales al día",
-                "Otro (especificar)"
-            ],
+            LISTAS["frecuencia_comidas"],
             key='frecuencia_comidas',
             help="Selecciona la estructura de comidas que mejor se ajuste a tu rutina diaria"
         )
@@ -2461,45 +2372,8 @@ if datos_personales_completos and st.session_state.datos_completos:
 
     # PASO 12: SUGERENCIAS DE MENÚS
     elif current_step == 12:
-        # Add prominent visual step indicator
-        st.markdown("""
-        <div style="
-            background: linear-gradient(135deg, #4CAF50 0%, #388E3C 100%);
-            color: white;
-            padding: 1.5rem;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 2rem;
-            box-shadow: 0 8px 25px rgba(76, 175, 80, 0.3);
-            border: 3px solid #4CAF50;
-            animation: slideIn 0.5s ease-out;
-        ">
-            <h2 style="margin: 0; font-size: 1.8rem; font-weight: bold; color: white;">
-                📝 PASO 12: SUGERENCIAS DE MENÚS
-            </h2>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem; opacity: 0.9; color: white;">
-                ¡Último Paso! Estás en el paso 12 de 12 - Personalización Final
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Add unique HTML marker for this step
-        st.markdown("""
-        <div id="paso12"></div>
-        <script>
-        // Auto-scroll to this step's marker and focus on first input for better UX
-        setTimeout(function() {
-            const stepElement = window.parent.document.getElementById('paso12');
-            if (stepElement) {
-                stepElement.scrollIntoView({behavior: 'smooth'});
-            }
-        }, 100);
-        </script>
-        """, unsafe_allow_html=True)
-        
-        # Actualizar progreso
-        progress.progress(100, text="Paso 12 de 12: Sugerencias de menús - ¡Último paso!")
-        
+        mostrar_cromo_paso(12, progress)
+
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("""
         ### 💭 Sugerencias de Menús y Preferencias Adicionales
@@ -2533,15 +2407,7 @@ if datos_personales_completos and st.session_state.datos_completos:
         
         opcion_rapida = st.selectbox(
             "Selecciona una opción si no tienes sugerencias específicas:",
-            [
-                "Seleccionar...",
-                "Que el equipo decida completamente por mí",
-                "Prefiero comida mexicana saludable",
-                "Quiero menús sencillos y fáciles de preparar", 
-                "Me gusta variar mucho los sabores",
-                "Prefiero preparaciones al vapor y a la plancha",
-                "Quiero incluir más recetas internacionales saludables"
-            ],
+            LISTAS["opcion_rapida_menu"],
             key='opcion_rapida_menu',
             help="Estas son opciones generales que puedes usar si no tienes ideas específicas"
         )
@@ -2580,435 +2446,90 @@ if datos_personales_completos and st.session_state.datos_completos:
                 st.balloons()
                 # Marcar este paso como completado
                 st.session_state.step_completed[12] = True
+                guardar_punto_control()
 
+    cronometro.marcar("resultado_final")
     # RESULTADO FINAL: Análisis completo del nuevo cuestionario
+    # Solo se calcula y dibuja en el paso final o cuando el usuario lo pide explícitamente;
+    # el perfil se cachea por la huella de las selecciones.
     with st.expander("📈 **RESULTADO FINAL: Tu Perfil Alimentario Completo**", expanded=False):
-        progress.progress(100, text="Análisis completo: Generando tu perfil alimentario personalizado")
-
-        st.markdown('<div class="content-card">', unsafe_allow_html=True)
-        
-        st.markdown("### 🎯 Tu Perfil Alimentario Personalizado")
-        
-        # Crear resumen del perfil por grupos actuales
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### 👤 Información Personal")
-            st.write(f"• **Nombre:** {st.session_state.get('nombre', 'No especificado')}")
-            st.write(f"• **Edad:** {st.session_state.get('edad', 'No especificado')} años")
-            st.write(f"• **Sexo:** {st.session_state.get('sexo', 'No especificado')}")
-            st.write(f"• **Fecha evaluación:** {st.session_state.get('fecha_llenado', 'No especificado')}")
-            
-            st.markdown("#### 🥩 Grupo 1: Proteínas Grasas")
-            total_proteinas_grasas = len(st.session_state.get('huevos_embutidos', [])) + len(st.session_state.get('carnes_res_grasas', [])) + len(st.session_state.get('carnes_cerdo_grasas', [])) + len(st.session_state.get('carnes_pollo_grasas', [])) + len(st.session_state.get('organos_grasos', [])) + len(st.session_state.get('quesos_grasos', [])) + len(st.session_state.get('lacteos_enteros', [])) + len(st.session_state.get('pescados_grasos', [])) + len(st.session_state.get('mariscos_grasos', []))
-            st.write(f"• **Total alimentos seleccionados:** {total_proteinas_grasas}")
-            if st.session_state.get('huevos_embutidos'):
-                st.write(f"• **Huevos/embutidos:** {len(st.session_state.get('huevos_embutidos', []))}")
-            if st.session_state.get('carnes_res_grasas'):
-                st.write(f"• **Carnes de res grasas:** {len(st.session_state.get('carnes_res_grasas', []))}")
-            if st.session_state.get('carnes_cerdo_grasas'):
-                st.write(f"• **Carnes de cerdo grasas:** {len(st.session_state.get('carnes_cerdo_grasas', []))}")
-            if st.session_state.get('carnes_pollo_grasas'):
-                st.write(f"• **Carnes de pollo/pavo grasas:** {len(st.session_state.get('carnes_pollo_grasas', []))}")
-            
-            st.markdown("#### 🍗 Grupo 2: Proteínas Magras")
-            total_proteinas_magras = len(st.session_state.get('carnes_res_magras', [])) + len(st.session_state.get('carnes_cerdo_magras', [])) + len(st.session_state.get('carnes_pollo_magras', [])) + len(st.session_state.get('organos_magros', [])) + len(st.session_state.get('pescados_magros', [])) + len(st.session_state.get('mariscos_magros', [])) + len(st.session_state.get('quesos_magros', [])) + len(st.session_state.get('lacteos_light', [])) + len(st.session_state.get('huevos_embutidos_light', []))
-            st.write(f"• **Total alimentos seleccionados:** {total_proteinas_magras}")
-            if st.session_state.get('carnes_res_magras'):
-                st.write(f"• **Carnes de res magras:** {len(st.session_state.get('carnes_res_magras', []))}")
-            if st.session_state.get('pescados_magros'):
-                st.write(f"• **Pescados magros:** {len(st.session_state.get('pescados_magros', []))}")
-        
-        with col2:
-            st.markdown("#### 🥑 Grupo 3: Grasas Saludables")
-            total_grasas = len(st.session_state.get('grasas_naturales', [])) + len(st.session_state.get('frutos_secos_semillas', [])) + len(st.session_state.get('mantequillas_vegetales', []))
-            st.write(f"• **Total alimentos seleccionados:** {total_grasas}")
-            if st.session_state.get('grasas_naturales'):
-                st.write(f"• **Grasas naturales:** {len(st.session_state.get('grasas_naturales', []))}")
-            if st.session_state.get('frutos_secos_semillas'):
-                st.write(f"• **Frutos secos/semillas:** {len(st.session_state.get('frutos_secos_semillas', []))}")
-            
-            st.markdown("#### 🍞 Grupo 4: Carbohidratos")
-            total_carbohidratos = len(st.session_state.get('cereales_integrales', [])) + len(st.session_state.get('pastas', [])) + len(st.session_state.get('tortillas_panes', [])) + len(st.session_state.get('raices_tuberculos', [])) + len(st.session_state.get('leguminosas', []))
-            st.write(f"• **Total alimentos seleccionados:** {total_carbohidratos}")
-            if st.session_state.get('cereales_integrales'):
-                st.write(f"• **Cereales:** {len(st.session_state.get('cereales_integrales', []))}")
-            if st.session_state.get('tortillas_panes'):
-                st.write(f"• **Tortillas/panes:** {len(st.session_state.get('tortillas_panes', []))}")
-            
-            st.markdown("#### 🥬 Grupos 5 y 6: Vegetales y Frutas")
-            st.write(f"• **Vegetales:** {len(st.session_state.get('vegetales_lista', []))} seleccionados")
-            st.write(f"• **Frutas:** {len(st.session_state.get('frutas_lista', []))} seleccionadas")
-        
-        # Sección de información adicional
-        st.markdown("### 🍳 Información Adicional")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### 🧈 Aceites de Cocción")
-            if st.session_state.get('aceites_coccion'):
-                st.write(f"• **Aceites preferidos:** {len(st.session_state.get('aceites_coccion', []))} seleccionados")
-                aceites_top = st.session_state.get('aceites_coccion', [])[:3]
-                for aceite in aceites_top:
-                    st.write(f"  - {aceite}")
-            
-            st.markdown("#### 🥤 Bebidas Sin Calorías")
-            if st.session_state.get('bebidas_sin_calorias'):
-                st.write(f"• **Bebidas preferidas:** {len(st.session_state.get('bebidas_sin_calorias', []))} seleccionadas")
-                bebidas_top = st.session_state.get('bebidas_sin_calorias', [])[:3]
-                for bebida in bebidas_top:
-                    st.write(f"  - {bebida}")
-        
-        with col2:
-            st.markdown("#### 👨‍🍳 Métodos de Cocción")
-            if st.session_state.get('metodos_coccion_accesibles'):
-                st.write(f"• **Métodos preferidos:** {len(st.session_state.get('metodos_coccion_accesibles', []))} seleccionados")
-                metodos_top = st.session_state.get('metodos_coccion_accesibles', [])[:3]
-                for metodo in metodos_top:
-                    st.write(f"  - {metodo}")
-            
-            if st.session_state.get('otro_metodo_coccion'):
-                st.write(f"• **Otro método:** {st.session_state.get('otro_metodo_coccion', 'No especificado')}")
-
-        # Restricciones importantes
-        if st.session_state.get('alergias_alimentarias') or st.session_state.get('intolerancias_digestivas'):
-            st.markdown("### ⚠️ Restricciones Importantes")
-            if st.session_state.get('alergias_alimentarias'):
-                st.warning(f"**Alergias alimentarias:** {', '.join(st.session_state.get('alergias_alimentarias', []))}")
-                if st.session_state.get('otra_alergia'):
-                    st.write(f"• **Otra alergia:** {st.session_state.get('otra_alergia')}")
-            
-            if st.session_state.get('intolerancias_digestivas'):
-                st.info(f"**Intolerancias digestivas:** {', '.join(st.session_state.get('intolerancias_digestivas', []))}")
-                if st.session_state.get('otra_intolerancia'):
-                    st.write(f"• **Otra intolerancia:** {st.session_state.get('otra_intolerancia')}")
-
-        # Antojos alimentarios
-        st.markdown("### 😋 Patrones de Antojos Alimentarios")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.session_state.get('antojos_dulces'):
-                st.write(f"• **Antojos dulces:** {len(st.session_state.get('antojos_dulces', []))} tipos")
-            if st.session_state.get('antojos_salados'):
-                st.write(f"• **Antojos salados:** {len(st.session_state.get('antojos_salados', []))} tipos")
-            if st.session_state.get('antojos_comida_rapida'):
-                st.write(f"• **Comida rápida:** {len(st.session_state.get('antojos_comida_rapida', []))} tipos")
-        
-        with col2:
-            if st.session_state.get('antojos_bebidas'):
-                st.write(f"• **Bebidas con calorías:** {len(st.session_state.get('antojos_bebidas', []))} tipos")
-            if st.session_state.get('antojos_picantes'):
-                st.write(f"• **Condimentos picantes:** {len(st.session_state.get('antojos_picantes', []))} tipos")
-            if st.session_state.get('otros_antojos'):
-                st.write(f"• **Otros antojos especificados:** Sí")
-
-        # Información adicional especificada
-        if st.session_state.get('alimento_adicional'):
-            st.markdown("### ➕ Alimentos Adicionales Especificados")
-            st.info(f"**Alimentos mencionados:** {st.session_state.get('alimento_adicional', 'No especificado')}")
-
-        # Información de frecuencia de comidas
-        if st.session_state.get('frecuencia_comidas'):
-            st.markdown("### 🍽️ Frecuencia de Comidas Preferida")
-            frecuencia = st.session_state.get('frecuencia_comidas', 'No especificado')
-            if frecuencia == "Otro (especificar)" and st.session_state.get('otra_frecuencia'):
-                st.info(f"**Frecuencia personalizada:** {st.session_state.get('otra_frecuencia')}")
-            else:
-                st.info(f"**Frecuencia seleccionada:** {frecuencia}")
-
-        # Sugerencias de menús
-        if st.session_state.get('sugerencias_menus'):
-            st.markdown("### 📝 Sugerencias de Menús")
-            sugerencias = st.session_state.get('sugerencias_menus', '')
-            palabra_count = len(sugerencias.split()) if sugerencias else 0
-            st.info(f"**Sugerencias del cliente:** {sugerencias[:200]}{'...' if len(sugerencias) > 200 else ''}")
-            if palabra_count > 0:
-                st.success(f"**Detalle:** {palabra_count} palabras de sugerencias específicas proporcionadas")
-
-        # Recomendaciones personalizadas basadas en datos reales
-        st.markdown("### 💡 Recomendaciones Personalizadas Iniciales")
-        
-        # Análisis básico basado en las respuestas actuales
-        recomendaciones = []
-        
-        # Verificar diversidad de alimentos por grupo
-        total_grupos_completos = 0
-        if len(st.session_state.get('huevos_embutidos', [])) + len(st.session_state.get('carnes_res_grasas', [])) > 0:
-            total_grupos_completos += 1
-        if len(st.session_state.get('carnes_res_magras', [])) + len(st.session_state.get('pescados_magros', [])) > 0:
-            total_grupos_completos += 1
-        if len(st.session_state.get('grasas_naturales', [])) + len(st.session_state.get('frutos_secos_semillas', [])) > 0:
-            total_grupos_completos += 1
-        if len(st.session_state.get('cereales_integrales', [])) + len(st.session_state.get('pastas', [])) + len(st.session_state.get('tortillas_panes', [])) > 0:
-            total_grupos_completos += 1
-        if len(st.session_state.get('vegetales_lista', [])) > 5:
-            total_grupos_completos += 1
-        if len(st.session_state.get('frutas_lista', [])) > 5:
-            total_grupos_completos += 1
-        
-        if total_grupos_completos >= 5:
-            recomendaciones.append("✅ **Diversidad nutricional excelente:** Tienes una buena variedad de alimentos en la mayoría de grupos alimentarios.")
-        elif total_grupos_completos >= 3:
-            recomendaciones.append("🔄 **Diversidad nutricional moderada:** Considera ampliar la variedad en algunos grupos alimentarios.")
+        en_paso_final = current_step == 12 or st.session_state.step_completed.get(12, False)
+        ver_resultado = en_paso_final or st.toggle("📊 Mostrar mi perfil alimentario con las respuestas actuales", key="ver_resultado_final")
+
+        if ver_resultado:
+            if en_paso_final:
+                progress.progress(100, text="Análisis completo: Generando tu perfil alimentario personalizado")
+            selecciones = obtener_selecciones()
+            perfil = calcular_perfil_alimentario(hash_selecciones(selecciones), selecciones)
+            mostrar_perfil_alimentario(perfil)
         else:
-            recomendaciones.append("📈 **Oportunidad de mejora:** Ampliar la variedad de alimentos puede enriquecer tu plan nutricional.")
-        
-        # Verificar métodos de cocción
-        if len(st.session_state.get('metodos_coccion_accesibles', [])) >= 4:
-            recomendaciones.append("👨‍🍳 **Versatilidad culinaria:** Tienes múltiples métodos de cocción disponibles, ideal para variedad en preparaciones.")
-        elif len(st.session_state.get('metodos_coccion_accesibles', [])) >= 2:
-            recomendaciones.append("🔧 **Métodos básicos:** Con tus métodos de cocción actuales puedes crear preparaciones nutritivas y variadas.")
-        
-        # Verificar restricciones
-        if st.session_state.get('alergias_alimentarias') or st.session_state.get('intolerancias_digestivas'):
-            recomendaciones.append("⚠️ **Plan especializado:** Tus restricciones alimentarias requerirán un plan personalizado cuidadoso.")
-        
-        # Verificar antojos
-        total_antojos = len(st.session_state.get('antojos_dulces', [])) + len(st.session_state.get('antojos_salados', [])) + len(st.session_state.get('antojos_comida_rapida', []))
-        if total_antojos > 10:
-            recomendaciones.append("🧠 **Manejo de antojos:** Se recomienda desarrollar estrategias específicas para controlar los antojos identificados.")
-        elif total_antojos > 5:
-            recomendaciones.append("⚖️ **Equilibrio:** Incluir alternativas saludables para satisfacer antojos ocasionales.")
-        
-        if not recomendaciones:
-            recomendaciones.append("📋 **Perfil base establecido:** Se requiere más información para recomendaciones específicas.")
-        
-        for i, rec in enumerate(recomendaciones, 1):
-            st.write(f"{i}. {rec}")
-
-        st.success(f"""
-        ### ✅ Análisis de patrones alimentarios completado exitosamente
-        
-        **Tu perfil nutricional personalizado está listo** y incluye información detallada sobre:
-        - 6 grupos alimentarios principales evaluados
-        - Métodos de cocción disponibles y preferidos  
-        - Restricciones, alergias e intolerancias específicas
-        - Patrones de antojos alimentarios identificados
-        - Aceites de cocción y bebidas sin calorías preferidas
-        
-        **Este análisis integral permitirá crear un plan nutricional completamente adaptado** 
-        a tus gustos, tolerancias y necesidades específicas.
-        
-        La información será enviada a nuestro equipo de nutrición para desarrollar tu plan personalizado.
-        """)
-
-        st.markdown('</div>', unsafe_allow_html=True)
-
-# Construir resumen completo para email
-def crear_resumen_email():
-    resumen = f"""
-=====================================
-CUESTIONARIO DE SELECCIÓN ALIMENTARIA PERSONALIZADA - MUPAI
-=====================================
-Generado: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-Sistema: MUPAI v2.0 - Muscle Up Performance Assessment Intelligence
-
-=====================================
-DATOS DEL CLIENTE:
-=====================================
-- Nombre completo: {st.session_state.get('nombre', 'No especificado')}
-- Edad: {st.session_state.get('edad', 'No especificado')} años
-- Sexo: {st.session_state.get('sexo', 'No especificado')}
-- Teléfono: {st.session_state.get('telefono', 'No especificado')}
-- Email: {st.session_state.get('email_cliente', 'No especificado')}
-- Fecha evaluación: {st.session_state.get('fecha_llenado', 'No especificado')}
-
-=====================================
-🥩 GRUPO 1: PROTEÍNA ANIMAL CON MÁS CONTENIDO GRASO
-=====================================
-🍳 Huevos y embutidos:
-- {', '.join(st.session_state.get('huevos_embutidos', [])) if st.session_state.get('huevos_embutidos') else 'No especificado'}
-
-🐄 Carnes de res grasas:
-- {', '.join(st.session_state.get('carnes_res_grasas', [])) if st.session_state.get('carnes_res_grasas') else 'No especificado'}
-
-🐷 Carnes de cerdo grasas:
-- {', '.join(st.session_state.get('carnes_cerdo_grasas', [])) if st.session_state.get('carnes_cerdo_grasas') else 'No especificado'}
-
-🐔 Carnes de pollo/pavo grasas:
-- {', '.join(st.session_state.get('carnes_pollo_grasas', [])) if st.session_state.get('carnes_pollo_grasas') else 'No especificado'}
-
-🫀 Órganos y vísceras grasas:
-- {', '.join(st.session_state.get('organos_grasos', [])) if st.session_state.get('organos_grasos') else 'No especificado'}
-
-🐟 Pescados grasos:
-- {', '.join(st.session_state.get('pescados_grasos', [])) if st.session_state.get('pescados_grasos') else 'No especificado'}
-
-🦐 Mariscos/comida marina grasos:
-- {', '.join(st.session_state.get('mariscos_grasos', [])) if st.session_state.get('mariscos_grasos') else 'No especificado'}
-
-🧀 Quesos altos en grasa:
-- {', '.join(st.session_state.get('quesos_grasos', [])) if st.session_state.get('quesos_grasos') else 'No especificado'}
-
-🥛 Lácteos enteros:
-- {', '.join(st.session_state.get('lacteos_enteros', [])) if st.session_state.get('lacteos_enteros') else 'No especificado'}
-
-🐟 Pescados grasos:
-- {', '.join(st.session_state.get('pescados_grasos', [])) if st.session_state.get('pescados_grasos') else 'No especificado'}
-
-=====================================
-🍗 GRUPO 2: PROTEÍNA ANIMAL MAGRA
-=====================================
-🐄 Carnes de res magras:
-- {', '.join(st.session_state.get('carnes_res_magras', [])) if st.session_state.get('carnes_res_magras') else 'No especificado'}
-
-🐷 Carnes de cerdo magras:
-- {', '.join(st.session_state.get('carnes_cerdo_magras', [])) if st.session_state.get('carnes_cerdo_magras') else 'No especificado'}
-
-🐔 Carnes de pollo/pavo magras:
-- {', '.join(st.session_state.get('carnes_pollo_magras', [])) if st.session_state.get('carnes_pollo_magras') else 'No especificado'}
-
-🫀 Órganos y vísceras magros:
-- {', '.join(st.session_state.get('organos_magros', [])) if st.session_state.get('organos_magros') else 'No especificado'}
-
-🐟 Pescados magros:
-- {', '.join(st.session_state.get('pescados_magros', [])) if st.session_state.get('pescados_magros') else 'No especificado'}
-
-🦐 Mariscos/comida marina magros:
-- {', '.join(st.session_state.get('mariscos_magros', [])) if st.session_state.get('mariscos_magros') else 'No especificado'}
+            st.caption("Tu perfil completo se genera al llegar al paso 12, o actívalo arriba para verlo con tus respuestas actuales.")
+
+# Datos estructurados para los adjuntos JSON/CSV del email, a partir del mismo perfil cacheado
+def crear_datos_estructurados():
+    selecciones = obtener_selecciones()
+    perfil = calcular_perfil_alimentario(hash_selecciones(selecciones), selecciones)
+    sel = dict(selecciones)
+    n = perfil["conteos"]
+
+    def unir(*claves):
+        return [alimento for clave in claves for alimento in sel[clave]]
+
+    return {
+        "nombre": st.session_state.get('nombre', ''),
+        "email": st.session_state.get('email_cliente', ''),
+        "telefono": st.session_state.get('telefono', ''),
+        "edad": st.session_state.get('edad', ''),
+        "sexo": st.session_state.get('sexo', ''),
+        "fecha_evaluacion": st.session_state.get('fecha_llenado', ''),
+        "total_proteinas_grasas": perfil["total_proteinas_grasas"],
+        "total_proteinas_magras": perfil["total_proteinas_magras"],
+        "total_grasas": perfil["total_grasas"],
+        "total_carbohidratos": perfil["total_carbohidratos"],
+        "total_vegetales": n['vegetales_lista'],
+        "total_frutas": n['frutas_lista'],
+        "total_metodos_coccion": n['metodos_coccion_accesibles'],
+        "total_antojos": sum(n[clave] for clave in CLAVES_MULTISELECCION if clave.startswith('antojos_')),
+        "proteinas_grasas": unir(*CLAVES_MULTISELECCION[0:9]),
+        "proteinas_magras": unir(*CLAVES_MULTISELECCION[9:18]),
+        "grasas": unir('grasas_naturales', 'frutos_secos_semillas', 'mantequillas_vegetales'),
+        "carbohidratos": unir('cereales_integrales', 'pastas', 'tortillas_panes', 'raices_tuberculos', 'leguminosas'),
+        "vegetales": unir('vegetales_lista'),
+        "frutas": unir('frutas_lista'),
+        "aceites_coccion": unir('aceites_coccion'),
+        "bebidas_sin_calorias": unir('bebidas_sin_calorias'),
+        "metodos_coccion": unir('metodos_coccion_accesibles'),
+        "alergias": perfil["alergias"],
+        "intolerancias": perfil["intolerancias"],
+        "antojos_dulces": unir('antojos_dulces'),
+        "antojos_salados": unir('antojos_salados'),
+        "antojos_comida_rapida": unir('antojos_comida_rapida'),
+        "antojos_bebidas": unir('antojos_bebidas'),
+        "antojos_picantes": unir('antojos_picantes'),
+        **perfil["textos"],
+    }
 
-🧀 Quesos magros:
-- {', '.join(st.session_state.get('quesos_magros', [])) if st.session_state.get('quesos_magros') else 'No especificado'}
+# Resumen completo para email desde plantillas/resumen_patrones_alimentarios.txt (compilada una vez por proceso)
+PLANTILLA_RESUMEN = cargar_plantilla("resumen_patrones_alimentarios")
 
-🥛 Lácteos light o reducidos:
-- {', '.join(st.session_state.get('lacteos_light', [])) if st.session_state.get('lacteos_light') else 'No especificado'}
+# Campos que la plantilla muestra tal cual (datos personales y respuestas de texto)
+CLAVES_RESUMEN_TEXTO = (
+    ('nombre', 'edad', 'sexo', 'telefono', 'email_cliente', 'fecha_llenado')
+    + CLAVES_TEXTO_PERFIL + ('opcion_rapida_menu',)
+)
 
-🥚 Huevos y embutidos light:
-- {', '.join(st.session_state.get('huevos_embutidos_light', [])) if st.session_state.get('huevos_embutidos_light') else 'No especificado'}
+def datos_resumen_email():
+    """Datos de la plantilla del resumen tomados de session_state; las listas se unen en la plantilla"""
+    datos = {clave: st.session_state.get(clave, 'No especificado') for clave in CLAVES_RESUMEN_TEXTO}
+    datos.update((clave, st.session_state.get(clave)) for clave in CLAVES_MULTISELECCION)
+    datos['generado'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return datos
 
-=====================================
-🥑 GRUPO 3: FUENTES DE GRASA SALUDABLE
-=====================================
-🥑 Grasas naturales de alimentos:
-- {', '.join(st.session_state.get('grasas_naturales', [])) if st.session_state.get('grasas_naturales') else 'No especificado'}
-
-🌰 Frutos secos y semillas:
-- {', '.join(st.session_state.get('frutos_secos_semillas', [])) if st.session_state.get('frutos_secos_semillas') else 'No especificado'}
-
-🧈 Mantequillas y pastas vegetales:
-- {', '.join(st.session_state.get('mantequillas_vegetales', [])) if st.session_state.get('mantequillas_vegetales') else 'No especificado'}
-
-=====================================
-🍞 GRUPO 4: CARBOHIDRATOS COMPLEJOS Y CEREALES
-=====================================
-🌾 Cereales y granos integrales:
-- {', '.join(st.session_state.get('cereales_integrales', [])) if st.session_state.get('cereales_integrales') else 'No especificado'}
-
-🍝 Pastas:
-- {', '.join(st.session_state.get('pastas', [])) if st.session_state.get('pastas') else 'No especificado'}
-
-🌽 Tortillas y panes:
-- {', '.join(st.session_state.get('tortillas_panes', [])) if st.session_state.get('tortillas_panes') else 'No especificado'}
-
-🥔 Raíces y tubérculos (forma base):
-- {', '.join(st.session_state.get('raices_tuberculos', [])) if st.session_state.get('raices_tuberculos') else 'No especificado'}
-
-🫘 Leguminosas:
-- {', '.join(st.session_state.get('leguminosas', [])) if st.session_state.get('leguminosas') else 'No especificado'}
-
-=====================================
-🥬 GRUPO 5: VEGETALES
-=====================================
-- {', '.join(st.session_state.get('vegetales_lista', [])) if st.session_state.get('vegetales_lista') else 'No especificado'}
-
-=====================================
-🍎 GRUPO 6: FRUTAS
-=====================================
-- {', '.join(st.session_state.get('frutas_lista', [])) if st.session_state.get('frutas_lista') else 'No especificado'}
-
-=====================================
-🍳 APARTADO EXTRA: GRASA/ACEITE DE COCCIÓN FAVORITA
-=====================================
-- {', '.join(st.session_state.get('aceites_coccion', [])) if st.session_state.get('aceites_coccion') else 'No especificado'}
-
-=====================================
-🥤 BEBIDAS SIN CALORÍAS PARA HIDRATACIÓN
-=====================================
-- {', '.join(st.session_state.get('bebidas_sin_calorias', [])) if st.session_state.get('bebidas_sin_calorias') else 'No especificado'}
-
-=====================================
-🚨 SECCIÓN FINAL: ALERGIAS, INTOLERANCIAS Y PREFERENCIAS
-=====================================
-❗ 1. Alergias alimentarias:
-- {', '.join(st.session_state.get('alergias_alimentarias', [])) if st.session_state.get('alergias_alimentarias') else 'No especificado'}
-- Otra alergia especificada: {st.session_state.get('otra_alergia', 'No especificado')}
-
-⚠️ 2. Intolerancias o malestar digestivo:
-- {', '.join(st.session_state.get('intolerancias_digestivas', [])) if st.session_state.get('intolerancias_digestivas') else 'No especificado'}
-- Otra intolerancia especificada: {st.session_state.get('otra_intolerancia', 'No especificado')}
-
-➕ 3. Alimentos o bebidas adicionales deseados:
-- {st.session_state.get('alimento_adicional', 'No especificado')}
-
-➕ 4. Métodos de cocción más accesibles para el día a día:
-- {', '.join(st.session_state.get('metodos_coccion_accesibles', [])) if st.session_state.get('metodos_coccion_accesibles') else 'No especificado'}
-- Otro método especificado: {st.session_state.get('otro_metodo_coccion', 'No especificado')}
-
-=====================================
-😋 SECCIÓN DE ANTOJOS ALIMENTARIOS
-=====================================
-🍫 Alimentos dulces / postres:
-- {', '.join(st.session_state.get('antojos_dulces', [])) if st.session_state.get('antojos_dulces') else 'No especificado'}
-
-🧂 Alimentos salados / snacks:
-- {', '.join(st.session_state.get('antojos_salados', [])) if st.session_state.get('antojos_salados') else 'No especificado'}
-
-🌮 Comidas rápidas / callejeras:
-- {', '.join(st.session_state.get('antojos_comida_rapida', [])) if st.session_state.get('antojos_comida_rapida') else 'No especificado'}
-
-🍹 Bebidas y postres líquidos:
-- {', '.join(st.session_state.get('antojos_bebidas', [])) if st.session_state.get('antojos_bebidas') else 'No especificado'}
-
-🔥 Alimentos con condimentos estimulantes:
-- {', '.join(st.session_state.get('antojos_picantes', [])) if st.session_state.get('antojos_picantes') else 'No especificado'}
-
-❓ Otros antojos especificados:
-- {st.session_state.get('otros_antojos', 'No especificado')}
-
-=====================================
-🍽️ FRECUENCIA DE COMIDAS PREFERIDA
-=====================================
-- Frecuencia seleccionada: {st.session_state.get('frecuencia_comidas', 'No especificado')}
-- Especificación adicional: {st.session_state.get('otra_frecuencia', 'No especificado')}
-
-=====================================
-📝 SUGERENCIAS DE MENÚS Y PREFERENCIAS
-=====================================
-- Sugerencias del cliente: {st.session_state.get('sugerencias_menus', 'No especificado')}
-- Opción rápida seleccionada: {st.session_state.get('opcion_rapida_menu', 'No especificado')}
-
-=====================================
-RESUMEN DE ANÁLISIS IDENTIFICADO:
-=====================================
-Este cuestionario completo de patrones alimentarios proporciona una base integral 
-para el desarrollo de recomendaciones nutricionales altamente personalizadas basadas en:
-
-1. 6 grupos alimentarios principales evaluados
-2. Métodos de cocción disponibles y preferidos
-3. Restricciones específicas (alergias e intolerancias)  
-4. Patrones de preferencias detallados
-5. Análisis de antojos y alimentación emocional
-6. Frecuencia de comidas preferida del cliente
-7. Sugerencias específicas de menús y preferencias adicionales
-8. Contexto personal, familiar y social completo
-
-RECOMENDACIONES PARA SEGUIMIENTO:
-- Desarrollar plan nutricional personalizado basado en estos patrones
-- Considerar restricciones y alergias como prioridad absoluta
-- Aprovechar métodos de cocción preferidos y disponibles
-- Integrar estrategias para manejo de antojos identificados
-- Estructurar la frecuencia de comidas según la preferencia del cliente
-- Incorporar sugerencias específicas de menús proporcionadas por el cliente
-- Adaptar recomendaciones al contexto personal y familiar específico
-
-=====================================
-© 2025 MUPAI - Muscle up GYM
-Alimentary Pattern Assessment Intelligence
-=====================================
-"""
-    return resumen
+def crear_resumen_email(html=False):
+    datos = datos_resumen_email()
+    return PLANTILLA_RESUMEN.html(datos) if html else PLANTILLA_RESUMEN.texto(datos)
 
+cronometro.marcar("resumen_final")
 # RESUMEN FINAL Y ENVÍO DE EMAIL
 st.markdown("---")
 st.markdown('<div class="content-card" style="background: linear-gradient(135deg, #F4C430 0%, #DAA520 100%); color: #1E1E1E;">', unsafe_allow_html=True)
@@ -3102,6 +2623,7 @@ def verificar_grupos_obligatorios_completos():
         
     return grupos_incompletos
 
+cronometro.marcar("envio_email")
 # Botón para enviar email
 if not st.session_state.get("correo_enviado", False):
     if st.button("📧 Terminar cuestionario y enviar resumen por email", key="enviar_email"):
@@ -3122,24 +2644,30 @@ if not st.session_state.get("correo_enviado", False):
             """)
         else:
             with st.spinner("📧 Enviando resumen de patrones alimentarios por email..."):
-                resumen_completo = crear_resumen_email()
-                ok = enviar_email_resumen(
+                with medir_seccion("construccion_resumen"):
+                    resumen_completo = crear_resumen_email()
+                email_id = enviar_email_resumen(
                     resumen_completo, 
                     st.session_state.get('nombre', ''), 
                     st.session_state.get('email_cliente', ''), 
                     st.session_state.get('fecha_llenado', ''), 
                     st.session_state.get('edad', ''), 
-                    st.session_state.get('telefono', '')
+                    st.session_state.get('telefono', ''),
+                    datos=crear_datos_estructurados(),
+                    html=crear_resumen_email(html=True)
                 )
-                if ok:
+                if email_id:
+                    if email_id == st.session_state.get("email_id"):
+                        st.info("ℹ️ El resumen no cambió desde el último envío, así que no se volvió a enviar.")
                     st.session_state["correo_enviado"] = True
-                    st.success("✅ Email enviado exitosamente a administración")
+                    st.session_state["email_id"] = email_id
                 else:
-                    st.error("❌ Error al enviar email. Contacta a soporte técnico.")
+                    st.error("❌ Error al preparar el email. Contacta a soporte técnico.")
 else:
     st.info("✅ El resumen ya fue enviado por email. Si requieres reenviarlo, usa el botón de 'Reenviar Email'.")
 
 # Opción para reenviar manualmente
+forzar_reenvio = st.checkbox("Forzar reenvío aunque el resumen no haya cambiado", key="forzar_reenvio")
 if st.button("📧 Reenviar Email", key="reenviar_email"):
     faltantes = datos_completos_para_email()
     grupos_incompletos = verificar_grupos_obligatorios_completos()
@@ -3156,20 +2684,30 @@ if st.button("📧 Reenviar Email", key="reenviar_email"):
         """)
     else:
         with st.spinner("📧 Reenviando resumen por email..."):
-            resumen_completo = crear_resumen_email()
-            ok = enviar_email_resumen(
+            with medir_seccion("construccion_resumen"):
+                resumen_completo = crear_resumen_email()
+            email_id = enviar_email_resumen(
                 resumen_completo, 
                 st.session_state.get('nombre', ''), 
                 st.session_state.get('email_cliente', ''), 
                 st.session_state.get('fecha_llenado', ''), 
                 st.session_state.get('edad', ''), 
-                st.session_state.get('telefono', '')
+                st.session_state.get('telefono', ''),
+                forzar=forzar_reenvio,
+                datos=crear_datos_estructurados(),
+                html=crear_resumen_email(html=True)
             )
-            if ok:
+            if email_id:
+                if email_id == st.session_state.get("email_id"):
+                    st.info("ℹ️ El resumen no cambió desde el último envío, así que no se volvió a enviar.")
                 st.session_state["correo_enviado"] = True
-                st.success("✅ Email reenviado exitosamente a administración")
+                st.session_state["email_id"] = email_id
             else:
-                st.error("❌ Error al reenviar email. Contacta a soporte técnico.")
+                st.error("❌ Error al preparar el email. Contacta a soporte técnico.")
+
+# Estado de entrega del último email (se actualiza solo mientras sigue en cola)
+if st.session_state.get("email_id"):
+    mostrar_estado_envio(st.session_state["email_id"])
 
 # Limpieza de sesión y botón de nueva evaluación
 if st.button("🔄 Nueva Evaluación", key="nueva"):
@@ -3177,6 +2715,7 @@ if st.button("🔄 Nueva Evaluación", key="nueva"):
         del st.session_state[key]
     st.rerun()
 
+cronometro.marcar("pie")
 # Footer moderno
 st.markdown("""
 <div class="footer-mupai">
@@ -3188,3 +2727,24 @@ st.markdown("""
     <a href="https://muscleupgym.fitness" target="_blank">muscleupgym.fitness</a>
 </div>
 """, unsafe_allow_html=True)
+
+# Guardar datos y selecciones en el almacén local (solo cuando cambian entre reruns)
+if st.session_state.datos_completos:
+    id_evaluacion = persistir_evaluacion("patrones_alimentarios", crear_datos_estructurados())
+    # Las 38 multiselecciones también se guardan como bitset del catálogo (una fila por
+    # cliente), solo con el cuestionario terminado: una evaluación nueva a medias no debe
+    # reemplazar las últimas respuestas completas del cliente
+    if st.session_state.step_completed.get(12, False):
+        persistir_selecciones(
+            id_evaluacion, st.session_state.get('email_cliente'), st.session_state.get('telefono'),
+            dict(obtener_selecciones()[:len(CLAVES_MULTISELECCION)]),
+        )
+
+cronometro.terminar()
+mostrar_acceso_administrador()
+mostrar_panel_latencias()
+mostrar_panel_payload()
+mostrar_panel_buzon()
+mostrar_panel_archivo()
+mostrar_panel_almacen()
+mostrar_panel_consultas()
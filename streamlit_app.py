@@ -2,11 +2,23 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import time
 import re
+from mupai_almacen import mostrar_panel_almacen, persistir_evaluacion, registrar_suscriptores
+from mupai_archivo import archivar_resumen, mostrar_panel_archivo
+from mupai_config import ADMIN_PASSWORD, mostrar_acceso_administrador
+from mupai_correo import encolar_email, enviar_una_vez, mostrar_estado_envio, mostrar_panel_buzon
+from mupai_estructurado import adjuntos_estructurados
+from mupai_menus import mostrar_menus_cliente
+from mupai_metricas import (
+    iniciar_cronometro, instalar_medidor_payload,
+    mostrar_panel_latencias, mostrar_panel_payload
+)
+from mupai_plantillas import Fragmento, cargar_plantilla
+from mupai_series import mostrar_progreso_cliente
+
+# Series por cliente y agregados de analítica se actualizan en cada evaluación guardada
+registrar_suscriptores()
 
 # ==================== FUNCIONES DE VALIDACIÓN ESTRICTA ====================
 def validate_name(name):
@@ -68,6 +80,10 @@ def validate_email(email):
     
     return True, ""
 
+# Instrumentación: tiempo y bytes de HTML de cada sección de este rerun (paneles admin en la barra lateral)
+instalar_medidor_payload()
+cronometro = iniciar_cronometro("evaluacion_fitness")
+cronometro.marcar("encabezado")
 # ==================== CONFIGURACIÓN DE PÁGINA Y CSS MEJORADO ====================
 st.set_page_config(
     page_title="MUPAI - Evaluación Fitness Personalizada",
@@ -398,6 +414,7 @@ st.markdown(f"""
 defaults = {
     "datos_completos": False,
     "correo_enviado": False,
+    "email_id": None,
     "datos_ejercicios": {},
     "niveles_ejercicios": {},
     "nombre": "",
@@ -413,8 +430,9 @@ for k, v in defaults.items():
     if k not in st.session_state:
         st.session_state[k] = v
 
+cronometro.marcar("autenticacion")
 # ==================== SISTEMA DE AUTENTICACIÓN ====================
-ADMIN_PASSWORD = "MUPAI2025"  # Contraseña predefinida
+# ADMIN_PASSWORD viene de mupai_config (secret `admin_password` o variable de entorno)
 
 # Si no está autenticado, mostrar login
 if not st.session_state.authenticated:
@@ -881,32 +899,152 @@ def obtener_porcentaje_para_proyeccion(plan_elegido, psmf_recs, GE, porcentaje):
         # Para plan tradicional, usar el porcentaje tradicional
         return porcentaje if porcentaje is not None else 0
 
-def enviar_email_resumen(contenido, nombre_cliente, email_cliente, fecha, edad, telefono):
-    """Envía el email con el resumen completo de la evaluación."""
+def clasificar_grasa_corporal(sexo, grasa_corregida):
+    """Devuelve (categoría, color) del % de grasa corregido según sexo."""
+    limites = [6, 12, 18, 25] if sexo == "Hombre" else [12, 17, 23, 30]
+    categorias = [
+        ("Muy bajo (Competición)", "#E74C3C"),
+        ("Atlético", "#27AE60"),
+        ("Fitness", "#F39C12"),
+        ("Promedio", "#3498DB"),
+    ]
+    for limite, categoria in zip(limites, categorias):
+        if grasa_corregida < limite:
+            return categoria
+    return ("Alto", "#E74C3C")
+
+def construir_resumen_evaluacion(sexo, edad, peso, estatura, grasa_corregida, edad_metabolica,
+                                 nivel_entrenamiento, fase, porcentaje, plan_elegido, psmf_recs, GE,
+                                 ingesta_calorica, proteina_g, grasa_g, carbo_g,
+                                 proteina_kcal, grasa_kcal, carbo_kcal):
+    """
+    Calcula una sola vez las cifras derivadas de la evaluación.
+    
+    El Resumen Final en pantalla, la tabla del email y la sección de proyección leen
+    de este mismo diccionario, de modo que lo mostrado y lo enviado siempre coinciden.
+    
+    Returns:
+        dict con IMC, ratios por kg, % de macros, evaluación de edad metabólica,
+        categoría de grasa y la proyección científica a 6 semanas
+    """
+    peso_proyeccion = peso if peso > 0 else 70  # Fallback si no hay peso
+    nivel_entrenamiento = nivel_entrenamiento or 'intermedio'
+
+    def pct_de_ingesta(kcal):
+        return round(kcal / ingesta_calorica * 100, 1) if ingesta_calorica > 0 else 0
+
+    # Edad metabólica frente a la cronológica
     try:
-        email_origen = "administracion@muscleupgym.fitness"
-        email_destino = "administracion@muscleupgym.fitness"
-        password = st.secrets.get("zoho_password", "TU_PASSWORD_AQUI")
+        edad_num = int(edad)
+        diferencia_edad = edad_metabolica - edad_num
+        if edad_metabolica > edad_num + 2:
+            evaluacion_edad = '⚠️ Mejorar'
+            mensaje_motivacional = "Tu edad metabólica indica que hay margen significativo de mejora. ¡Este plan te ayudará a rejuvenecer metabólicamente!"
+        elif edad_metabolica < edad_num - 2:
+            evaluacion_edad = '✅ Excelente'
+            mensaje_motivacional = "¡Excelente! Tu edad metabólica es menor que tu edad real. Mantén este gran trabajo."
+        else:
+            evaluacion_edad = '👍 Normal'
+            mensaje_motivacional = "Tu edad metabólica está bien alineada con tu edad cronológica. Sigamos optimizando tu composición corporal."
+    except (ValueError, TypeError):
+        diferencia_edad = 0
+        evaluacion_edad = '👍 Normal'
+        mensaje_motivacional = "Tu edad metabólica está bien alineada con tu edad cronológica. Sigamos optimizando tu composición corporal."
+
+    # Proyección con el porcentaje del plan elegido (tradicional o PSMF)
+    porcentaje_proyeccion = obtener_porcentaje_para_proyeccion(plan_elegido, psmf_recs, GE, porcentaje)
+    proyeccion = calcular_proyeccion_cientifica(
+        sexo, grasa_corregida, nivel_entrenamiento, peso_proyeccion, porcentaje_proyeccion
+    )
+    if porcentaje_proyeccion < 0:
+        objetivo_texto, tipo_cambio, direccion = "(déficit)", "pérdida", "-"
+    elif porcentaje_proyeccion > 0:
+        objetivo_texto, tipo_cambio, direccion = "(superávit)", "ganancia", "+"
+    else:
+        objetivo_texto, tipo_cambio, direccion = "(mantenimiento)", "mantenimiento", ""
+
+    categoria_grasa, color_categoria = clasificar_grasa_corporal(sexo, grasa_corregida)
 
-        msg = MIMEMultipart()
-        msg['From'] = email_origen
-        msg['To'] = email_destino
-        msg['Subject'] = f"Resumen evaluación MUPAI - {nombre_cliente} ({fecha})"
+    return {
+        "peso": peso,
+        "peso_proyeccion": peso_proyeccion,
+        "estatura": estatura,
+        "imc": peso / (estatura / 100) ** 2 if estatura > 0 else 0,
+        "diferencia_edad": diferencia_edad,
+        "evaluacion_edad": evaluacion_edad,
+        "mensaje_motivacional": mensaje_motivacional,
+        "nivel_entrenamiento": nivel_entrenamiento,
+        "fase": fase,
+        "plan_elegido": plan_elegido,
+        "estrategia": plan_elegido.split('(')[0].strip() if plan_elegido else "Plan tradicional",
+        "es_psmf": 'PSMF' in (plan_elegido or ""),
+        "ingesta_calorica": ingesta_calorica,
+        "kcal_por_kg": ingesta_calorica / peso if peso > 0 else 0,
+        "proteina_g": proteina_g,
+        "proteina_kcal": proteina_kcal,
+        "proteina_pct": pct_de_ingesta(proteina_kcal),
+        "proteina_g_kg": proteina_g / peso if peso > 0 else 0,
+        "grasa_g": grasa_g,
+        "grasa_kcal": grasa_kcal,
+        "grasa_pct": pct_de_ingesta(grasa_kcal),
+        "carbo_g": carbo_g,
+        "carbo_kcal": carbo_kcal,
+        "carbo_pct": pct_de_ingesta(carbo_kcal),
+        "categoria_grasa": categoria_grasa,
+        "color_categoria": color_categoria,
+        "porcentaje_proyeccion": porcentaje_proyeccion,
+        "objetivo_texto": objetivo_texto,
+        "tipo_cambio": tipo_cambio,
+        "direccion": direccion,
+        "proyeccion": proyeccion,
+    }
 
-        msg.attach(MIMEText(contenido, 'plain'))
+# Plantillas del email de resumen (plantillas/resumen_evaluacion_fitness*.txt), compiladas una vez por proceso
+PLANTILLA_RESUMEN = cargar_plantilla("resumen_evaluacion_fitness")
+PLANTILLA_PROYECCION = cargar_plantilla("resumen_evaluacion_fitness_proyeccion")
+PLANTILLA_PSMF = cargar_plantilla("resumen_evaluacion_fitness_psmf")
+PLANTILLA_SIN_PSMF = cargar_plantilla("resumen_evaluacion_fitness_sin_psmf")
 
-        server = smtplib.SMTP('smtp.zoho.com', 587)
-        server.starttls()
-        server.login(email_origen, password)
-        server.send_message(msg)
-        server.quit()
+def enviar_email_resumen(contenido, nombre_cliente, email_cliente, fecha, edad, telefono, forzar=False,
+                         datos=None, html=None):
+    """
+    Deja en el buzón de salida el email con el resumen completo de la evaluación.
+    Regresa de inmediato con el id del mensaje (None si no se pudo encolar); un hilo
+    de fondo lo entrega por SMTP con reintentos (ver mupai_correo). Un resumen
+    idéntico a uno enviado hace poco devuelve el id original sin reenviarse, salvo forzar=True.
+    Si se pasan datos, el email lleva además los adjuntos JSON y CSV del esquema evaluacion_fitness;
+    html es la versión HTML del mismo resumen, renderizada con la misma plantilla.
+    Cada resumen nuevo queda también en el archivo local comprimido (ver mupai_archivo).
+    Los clics simultáneos de la misma sesión con el mismo resumen se agrupan en un solo envío.
+    """
+    def encolar_y_archivar():
+        adjuntos = None
+        if datos is not None:
+            adjuntos = adjuntos_estructurados(
+                "evaluacion_fitness", datos, f"evaluacion_mupai_{nombre_cliente}_{fecha}"
+            )
+        email_id = encolar_email(
+            f"Resumen evaluación MUPAI - {nombre_cliente} ({fecha})",
+            contenido,
+            app="evaluacion_fitness",
+            forzar=forzar,
+            adjuntos=adjuntos,
+            html=html
+        )
+        if email_id and email_id != st.session_state.get("email_id"):
+            # Un resumen duplicado devuelve el id anterior y ya está archivado
+            archivar_resumen("evaluacion_fitness", nombre_cliente, email_cliente, fecha, contenido, datos)
+        return email_id
 
-        return True
+    try:
+        # Clics simultáneos de esta sesión con el mismo resumen comparten un solo envío
+        return enviar_una_vez(contenido, encolar_y_archivar)
     except Exception as e:
-        st.error(f"Error al enviar email: {str(e)}")
-        return False
+        st.error(f"Error al preparar el email: {str(e)}")
+        return None
         # ==================== VISUALES INICIALES ====================
 
+cronometro.marcar("datos_personales")
 # Misión, Visión y Compromiso con diseño mejorado
 with st.expander("🎯 **Misión, Visión y Compromiso MUPAI**", expanded=False):
     col1, col2, col3 = st.columns(3)
@@ -1045,6 +1183,7 @@ if not st.session_state.datos_completos:
     </div>
     """, unsafe_allow_html=True)
 
+cronometro.marcar("paso_1")
 # VALIDACIÓN DATOS PERSONALES PARA CONTINUAR
 datos_personales_completos = all([nombre, telefono, email_cliente]) and acepto_terminos
 
@@ -1256,6 +1395,7 @@ metodo_grasa = st.session_state.get("metodo_grasa", "Omron HBF-516 (BIA)")
 
 # Note: Session state is automatically managed by widget keys
 
+cronometro.marcar("psmf")
 # --- Recalcula variables críticas para PSMF ---
 grasa_corregida = corregir_porcentaje_grasa(grasa_corporal, metodo_grasa, sexo)
 mlg = calcular_mlg(peso, grasa_corregida)
@@ -1301,6 +1441,7 @@ if fuera_rango:
 progress = st.progress(0)
 progress_text = st.empty()
 
+cronometro.marcar("paso_2")
 # BLOQUE 2: Evaluación funcional mejorada (versión científica y capciosa)
 with st.expander("💪 **Paso 2: Evaluación Funcional y Nivel de Entrenamiento**", expanded=True):
     progress.progress(40)
@@ -1487,6 +1628,7 @@ if 'experiencia' not in locals() or experiencia is None:
 if 'niveles_ejercicios' not in locals() or niveles_ejercicios is None:
     niveles_ejercicios = {}  # Diccionario vacío por defecto
 
+cronometro.marcar("nivel_global")
 # Calcular nivel global con ponderación
 puntos_ffmi = {"Bajo": 1, "Promedio": 2, "Bueno": 3, "Avanzado": 4, "Élite": 5}.get(nivel_ffmi, 1)
 puntos_exp = {"A)": 1, "B)": 2, "C)": 3, "D)": 4}.get(experiencia[:2] if experiencia and len(experiencia) >= 2 else "", 1)
@@ -1640,6 +1782,7 @@ if 'ffmi' in locals() and 'nivel_entrenamiento' in locals() and ffmi > 0:
 else:
     st.info("Completa primero todos los datos anteriores para ver tu potencial genético.")
 
+cronometro.marcar("paso_3")
 # BLOQUE 3: Actividad física diaria
 with st.expander("🚶 **Paso 3: Nivel de Actividad Física Diaria**", expanded=True):
     progress.progress(60)
@@ -1707,6 +1850,7 @@ with st.expander("🚶 **Paso 3: Nivel de Actividad Física Diaria**", expanded=
 
     st.markdown('</div>', unsafe_allow_html=True)
     # BLOQUE 4: ETA (Efecto Térmico de los Alimentos)
+cronometro.marcar("paso_4")
 with st.expander("🍽️ **Paso 4: Efecto Térmico de los Alimentos (ETA)**", expanded=True):
     progress.progress(70)
     progress_text.text("Paso 4 de 5: Cálculo del efecto térmico")
@@ -1759,6 +1903,7 @@ with st.expander("🍽️ **Paso 4: Efecto Térmico de los Alimentos (ETA)**", e
 
     st.markdown('</div>', unsafe_allow_html=True)
     # BLOQUE 5: Entrenamiento de fuerza
+cronometro.marcar("paso_5")
 with st.expander("🏋️ **Paso 5: Gasto Energético del Ejercicio (GEE)**", expanded=True):
     progress.progress(80)
     progress_text.text("Paso 5 de 5: Cálculo del gasto por ejercicio")
@@ -1822,6 +1967,7 @@ with st.expander("🏋️ **Paso 5: Gasto Energético del Ejercicio (GEE)**", ex
     """, unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
     # BLOQUE 6: Cálculo final con comparativa PSMF
+cronometro.marcar("resultado_final")
 with st.expander("📈 **RESULTADO FINAL: Tu Plan Nutricional Personalizado**", expanded=True):
     progress.progress(100)
     progress_text.text("Paso final: Calculando tu plan nutricional personalizado")
@@ -2108,6 +2254,16 @@ peso = st.session_state.get("peso", 0)
 estatura = st.session_state.get("estatura", 0)
 grasa_corporal = st.session_state.get("grasa_corporal", 0)
 
+# Resumen único de la evaluación: lo usan el Resumen Final, el email y la proyección
+resumen_evaluacion = construir_resumen_evaluacion(
+    sexo, edad, peso, estatura, grasa_corregida, edad_metabolica,
+    nivel_entrenamiento if 'nivel_entrenamiento' in locals() else 'intermedio',
+    fase, porcentaje, plan_elegido, psmf_recs, GE,
+    ingesta_calorica, proteina_g, grasa_g, carbo_g,
+    proteina_kcal, grasa_kcal, carbo_kcal
+)
+
+cronometro.marcar("resumen_final")
 # RESUMEN FINAL MEJORADO
 st.markdown("---")
 st.markdown('<div class="content-card" style="background: linear-gradient(135deg, #F4C430 0%, #DAA520 100%); color: #1E1E1E;">', unsafe_allow_html=True)
@@ -2117,22 +2273,12 @@ st.markdown(f"*Fecha: {fecha_llenado} | Cliente: {nombre}*")
 # Crear resumen visual con métricas clave
 col1, col2, col3 = st.columns(3)
 with col1:
-    # Ensure edad is numeric for calculations
-    try:
-        edad_num = int(edad)
-        diferencia_edad = edad_metabolica - edad_num
-        evaluacion = '⚠️ Mejorar' if edad_metabolica > edad_num + 2 else '✅ Excelente' if edad_metabolica < edad_num - 2 else '👍 Normal'
-    except (ValueError, TypeError):
-        edad_num = 25  # Default fallback
-        diferencia_edad = 0
-        evaluacion = '👍 Normal'
-    
     st.markdown(f"""
     ### 👤 Perfil Personal
     - **Edad cronológica:** {edad} años
     - **Edad metabólica:** {edad_metabolica} años
-    - **Diferencia:** {diferencia_edad:+d} años
-    - **Evaluación:** {evaluacion}
+    - **Diferencia:** {resumen_evaluacion['diferencia_edad']:+d} años
+    - **Evaluación:** {resumen_evaluacion['evaluacion_edad']}
     """)
 with col2:
     st.markdown(f"""
@@ -2143,12 +2289,11 @@ with col2:
     - **Potencial:** {porc_potencial:.0f}% alcanzado
     """)
 with col3:
-    # Safe calculations for display
-    proteina_ratio = f"({proteina_g/peso:.2f}g/kg)" if peso > 0 else "(–g/kg)"
-    grasa_percent = f"({round(grasa_kcal/ingesta_calorica*100)}%)" if ingesta_calorica > 0 else "(–%)"
-    carbo_percent = f"({round(carbo_kcal/ingesta_calorica*100)}%)" if ingesta_calorica > 0 else "(–%)"
-    estrategia = plan_elegido.split('(')[0].strip() if 'plan_elegido' in locals() and plan_elegido else "Plan tradicional"
-    
+    # Valores seguros para mostrar (vienen del resumen único)
+    proteina_ratio = f"({resumen_evaluacion['proteina_g_kg']:.2f}g/kg)" if peso > 0 else "(–g/kg)"
+    grasa_percent = f"({resumen_evaluacion['grasa_pct']:.0f}%)" if ingesta_calorica > 0 else "(–%)"
+    carbo_percent = f"({resumen_evaluacion['carbo_pct']:.0f}%)" if ingesta_calorica > 0 else "(–%)"
+
     st.markdown(f"""
     ### 🍽️ Plan Nutricional
     - **Objetivo:** {fase}
@@ -2156,32 +2301,19 @@ with col3:
     - **Proteína:** {proteina_g}g {proteina_ratio}
     - **Grasas:** {grasa_g}g {grasa_percent}
     - **Carbohidratos:** {carbo_g}g {carbo_percent}
-    - **Estrategia:** {estrategia}
+    - **Estrategia:** {resumen_evaluacion['estrategia']}
     """)
 
-# Mensaje motivacional personalizado
-mensaje_motivacional = ""
-try:
-    edad_num = int(edad)
-    if edad_metabolica > edad_num + 2:
-        mensaje_motivacional = "Tu edad metabólica indica que hay margen significativo de mejora. ¡Este plan te ayudará a rejuvenecer metabólicamente!"
-    elif edad_metabolica < edad_num - 2:
-        mensaje_motivacional = "¡Excelente! Tu edad metabólica es menor que tu edad real. Mantén este gran trabajo."
-    else:
-        mensaje_motivacional = "Tu edad metabólica está bien alineada con tu edad cronológica. Sigamos optimizando tu composición corporal."
-except (ValueError, TypeError):
-    mensaje_motivacional = "Tu edad metabólica está bien alineada con tu edad cronológica. Sigamos optimizando tu composición corporal."
-
 st.success(f"""
 ### ✅ Evaluación completada exitosamente
 
-{mensaje_motivacional}
+{resumen_evaluacion['mensaje_motivacional']}
 
 **Tu plan personalizado** considera todos los factores evaluados: composición corporal, 
 nivel de entrenamiento, actividad diaria y objetivos. La fase recomendada es **{fase}** 
 con una ingesta de **{ingesta_calorica:.0f} kcal/día**.
 
-{'⚠️ **Nota:** Elegiste el protocolo PSMF. Recuerda que es temporal (6-8 semanas máximo) y requiere supervisión.' if 'PSMF' in plan_elegido else ''}
+{'⚠️ **Nota:** Elegiste el protocolo PSMF. Recuerda que es temporal (6-8 semanas máximo) y requiere supervisión.' if resumen_evaluacion['es_psmf'] else ''}
 """)
 # Advertencias finales si aplican
 if fuera_rango:
@@ -2194,6 +2326,7 @@ if fuera_rango:
 
 st.markdown('</div>', unsafe_allow_html=True)
 
+cronometro.marcar("construccion_resumen")
 # ====== BOTONES Y ENVÍO FINAL (SOLO POR BOTÓN, NUNCA AUTOMÁTICO) ======
 
 def datos_completos_para_email():
@@ -2208,141 +2341,12 @@ def datos_completos_para_email():
     faltantes = [campo for campo, valor in obligatorios.items() if not valor]
     return faltantes
 
-# Construir tabla_resumen robusta para el email (idéntica a tu estructura, NO resumida)
-# Calculate safe values
-try:
-    imc = peso/(estatura/100)**2 if estatura > 0 else 0
-    ratio_kcal_kg = ingesta_calorica/peso if peso > 0 else 0
-    proteina_percent = round(proteina_kcal/ingesta_calorica*100, 1) if ingesta_calorica > 0 else 0
-    grasa_percent = round(grasa_kcal/ingesta_calorica*100, 1) if ingesta_calorica > 0 else 0
-    carbo_percent = round(carbo_kcal/ingesta_calorica*100, 1) if ingesta_calorica > 0 else 0
-    proteina_kcal_safe = proteina_g * 4 if 'proteina_g' in locals() else 0
-    grasa_kcal_safe = grasa_g * 9 if 'grasa_g' in locals() else 0
-    carbo_kcal_safe = carbo_g * 4 if 'carbo_g' in locals() else 0
-except:
-    imc = 0
-    ratio_kcal_kg = 0
-    proteina_percent = 0
-    grasa_percent = 0
-    carbo_percent = 0
-    proteina_kcal_safe = 0
-    grasa_kcal_safe = 0
-    carbo_kcal_safe = 0
-
+# Construir tabla_resumen para el email desde plantillas/resumen_evaluacion_fitness*.txt
+# Todas las cifras derivadas salen de resumen_evaluacion, igual que en pantalla
 # Initialize missing variables
 if 'fbeo' not in locals():
     fbeo = 1.0
 
-tabla_resumen = f"""
-=====================================
-EVALUACIÓN MUPAI - INFORME COMPLETO
-=====================================
-Generado: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-Sistema: MUPAI v2.0 - Muscle Up Performance Assessment Intelligence
-
-=====================================
-DATOS DEL CLIENTE:
-=====================================
-- Nombre completo: {nombre}
-- Edad: {edad} años
-- Sexo: {sexo}
-- Teléfono: {telefono}
-- Email: {email_cliente}
-- Fecha evaluación: {fecha_llenado}
-
-=====================================
-ANTROPOMETRÍA Y COMPOSICIÓN:
-=====================================
-- Peso: {peso} kg
-- Estatura: {estatura} cm
-- IMC: {imc:.1f} kg/m²
-- Método medición grasa: {metodo_grasa}
-- % Grasa medido: {grasa_corporal}%
-- % Grasa corregido (DEXA): {grasa_corregida:.1f}%
-- Masa Libre de Grasa: {mlg:.1f} kg
-- Masa Grasa: {peso - mlg:.1f} kg
-
-=====================================
-ÍNDICES METABÓLICOS:
-=====================================
-- TMB (Cunningham): {tmb:.0f} kcal
-- FFMI actual: {ffmi:.2f}
-- Clasificación FFMI: {nivel_ffmi}
-- FFMI máximo estimado: {ffmi_genetico_max:.1f}
-- Potencial alcanzado: {porc_potencial:.0f}%
-- Margen de crecimiento: {max(0, ffmi_genetico_max - ffmi):.1f} puntos FFMI
-
-=====================================
-FACTORES DE ACTIVIDAD:
-=====================================
-- Nivel actividad diaria: {nivel_actividad.split('(')[0].strip()}
-- Factor GEAF: {geaf}
-- Factor ETA: {eta}
-- Días entreno/semana: {dias_fuerza}
-- Gasto por sesión: {kcal_sesion} kcal
-- GEE promedio diario: {gee_prom_dia:.0f} kcal
-- Gasto Energético Total: {GE:.0f} kcal
-
-=====================================
-PLAN NUTRICIONAL CALCULADO:
-=====================================
-- Fase: {fase}
-- Factor FBEO: {fbeo:.2f}
-- Ingesta calórica: {ingesta_calorica:.0f} kcal/día
-- Ratio kcal/kg: {ratio_kcal_kg:.1f}
-
-DISTRIBUCIÓN DE MACRONUTRIENTES:
-- Proteína: {proteina_g}g ({proteina_kcal_safe:.0f} kcal) = {proteina_percent}%
-- Grasas: {grasa_g}g ({grasa_kcal_safe:.0f} kcal) = {grasa_percent}%
-- Carbohidratos: {carbo_g}g ({carbo_kcal_safe:.0f} kcal) = {carbo_percent}%
-
-=====================================
-RESUMEN PERSONALIZADO Y PROYECCIÓN
-=====================================
-📊 DIAGNÓSTICO PERSONALIZADO:
-- Categoría grasa corporal: {
-    "Muy bajo (Competición)" if (sexo == "Hombre" and grasa_corregida < 6) or (sexo == "Mujer" and grasa_corregida < 12)
-    else "Atlético" if (sexo == "Hombre" and grasa_corregida < 12) or (sexo == "Mujer" and grasa_corregida < 17)
-    else "Fitness" if (sexo == "Hombre" and grasa_corregida < 18) or (sexo == "Mujer" and grasa_corregida < 23)
-    else "Promedio" if (sexo == "Hombre" and grasa_corregida < 25) or (sexo == "Mujer" and grasa_corregida < 30)
-    else "Alto"
-} ({grasa_corregida:.1f}%)
-- Nivel de entrenamiento: {nivel_entrenamiento.capitalize() if 'nivel_entrenamiento' in locals() else 'Intermedio'}
-- Objetivo recomendado: {fase}
-
-📈 PROYECCIÓN CIENTÍFICA 6 SEMANAS:"""
-
-# Calcular proyección científica para el email
-try:
-    # Determinar el porcentaje correcto según el plan elegido usando función centralizada
-    porcentaje_email = obtener_porcentaje_para_proyeccion(
-        plan_elegido if 'plan_elegido' in locals() else "",
-        psmf_recs if 'psmf_recs' in locals() else {},
-        GE if 'GE' in locals() else 0,
-        porcentaje if 'porcentaje' in locals() else 0
-    )
-        
-    proyeccion_email = calcular_proyeccion_cientifica(
-        sexo, 
-        grasa_corregida, 
-        nivel_entrenamiento if 'nivel_entrenamiento' in locals() else 'intermedio',
-        peso, 
-        porcentaje_email
-    )
-    objetivo_texto = "(déficit)" if porcentaje_email < 0 else "(superávit)" if porcentaje_email > 0 else "(mantenimiento)"
-    porcentaje_valor = porcentaje_email
-    
-    tabla_resumen += f"""
-- Objetivo recomendado: {porcentaje_valor:+.0f}% {objetivo_texto}
-- Rango semanal científico: {proyeccion_email['rango_semanal_pct'][0]:.1f}% a {proyeccion_email['rango_semanal_pct'][1]:.1f}% del peso corporal
-- Cambio semanal estimado: {proyeccion_email['rango_semanal_kg'][0]:+.2f} a {proyeccion_email['rango_semanal_kg'][1]:+.2f} kg/semana
-- Rango total 6 semanas: {proyeccion_email['rango_total_6sem_kg'][0]:+.2f} a {proyeccion_email['rango_total_6sem_kg'][1]:+.2f} kg
-- Peso actual → rango proyectado: {peso:.1f} kg → {peso + proyeccion_email['rango_total_6sem_kg'][0]:.1f} a {peso + proyeccion_email['rango_total_6sem_kg'][1]:.1f} kg
-- Explicación científica: {proyeccion_email['explicacion_textual']}
-"""
-except:
-    tabla_resumen += "\n- Error en cálculo de proyección. Usar valores por defecto.\n"
-
 # Agregar secciones adicionales del cuestionario
 experiencia_text = experiencia if 'experiencia' in locals() and experiencia else "No especificado"
 nivel_actividad_text = nivel_actividad.split('(')[0].strip() if 'nivel_actividad' in locals() and nivel_actividad else "No especificado"
@@ -2367,159 +2371,180 @@ plan_psmf_disponible = psmf_recs.get("psmf_aplicable", False) if 'psmf_recs' in
 dias_fuerza_text = dias_fuerza if 'dias_fuerza' in locals() else 0
 kcal_sesion_text = kcal_sesion if 'kcal_sesion' in locals() else 0
 
-tabla_resumen += f"""
-
-=====================================
-EXPERIENCIA Y RESPUESTAS FUNCIONALES
-=====================================
-📋 EXPERIENCIA DE ENTRENAMIENTO:
-{experiencia_text}
-
-💪 EVALUACIÓN FUNCIONAL DETALLADA:
-{ejercicios_detalle}
-
-=====================================
-NIVEL GLOBAL DE ENTRENAMIENTO
-=====================================
-🎯 DESGLOSE DEL NIVEL GLOBAL:
-- Desarrollo muscular (FFMI): {puntos_ffmi if 'puntos_ffmi' in locals() else 0}/5 puntos → {nivel_ffmi}
-- Rendimiento funcional: {puntos_funcional if 'puntos_funcional' in locals() else 0:.1f}/4 puntos → Promedio de ejercicios
-- Experiencia declarada: {puntos_exp if 'puntos_exp' in locals() else 0}/4 puntos → {experiencia_text[:50]}...
-- PONDERACIÓN APLICADA: {'40% FFMI + 40% Funcional + 20% Experiencia (rango saludable)' if (en_rango_saludable if 'en_rango_saludable' in locals() else True) else '0% FFMI + 80% Funcional + 20% Experiencia (fuera de rango saludable)'}
-- GRASA CORPORAL: {grasa_corregida:.1f}% ({'En rango saludable' if (en_rango_saludable if 'en_rango_saludable' in locals() else True) else f'Fuera de rango saludable (>{25 if sexo == "Hombre" else 32}%)'})
-- RESULTADO FINAL: {nivel_entrenamiento.upper() if 'nivel_entrenamiento' in locals() else 'INTERMEDIO'} (Score: {puntaje_total if 'puntaje_total' in locals() else 0:.2f}/1.0)
-
-=====================================
-ACTIVIDAD FÍSICA DIARIA Y FACTORES
-=====================================
-🚶 NIVEL DE ACTIVIDAD DIARIA:
-- Clasificación: {nivel_actividad_text}
-- Factor GEAF aplicado: {geaf if 'geaf' in locals() else 1.0}
-- Descripción: {nivel_actividad if 'nivel_actividad' in locals() and nivel_actividad else 'No especificado'}
-- Impacto metabólico: Multiplica el TMB en {(geaf-1)*100 if 'geaf' in locals() else 0:.0f}%
-
-🔥 EFECTO TÉRMICO DE LOS ALIMENTOS (ETA):
-- Factor ETA: {eta if 'eta' in locals() else 1.1}
-- Criterio aplicado: {eta_desc if 'eta_desc' in locals() else 'ETA estándar'}
-- Justificación: Basado en % grasa corporal ({grasa_corregida:.1f}%) y sexo ({sexo})
-
-=====================================
-ENTRENAMIENTO DE FUERZA - DETALLE
-=====================================
-🏋️ FRECUENCIA Y GASTO ENERGÉTICO:
-- Días de entrenamiento/semana: {dias_fuerza_text} días
-- Gasto por sesión: {kcal_sesion_text} kcal
-- Criterio del gasto: Basado en nivel global ({nivel_entrenamiento.capitalize() if 'nivel_entrenamiento' in locals() else 'Intermedio'})
-- Gasto semanal total: {gee_semanal if 'gee_semanal' in locals() else 0:.0f} kcal
-- Promedio diario (GEE): {gee_prom_dia if 'gee_prom_dia' in locals() else 0:.0f} kcal/día
-
-=====================================
-COMPARATIVA COMPLETA DE PLANES NUTRICIONALES
-=====================================
-📊 PLAN TRADICIONAL (DÉFICIT/SUPERÁVIT MODERADO):
-- Calorías: {plan_tradicional_calorias:.0f} kcal/día
-- Estrategia: {fase}
-- Proteína: {peso * 1.8 if 'peso' in locals() and peso > 0 else 0:.1f}g/día (1.8g/kg peso)
-- Grasas: ~40% del TMB = {tmb * 0.40 / 9 if 'tmb' in locals() else 0:.1f}g/día (ajustado por límites 20-40% calorías)
-- Carbohidratos: Resto de calorías disponibles
-- Sostenibilidad: ALTA - Recomendado para adherencia a largo plazo
-- Pérdida/ganancia esperada: 0.3-0.7% peso corporal/semana
-- Duración recomendada: Indefinida con ajustes periódicos
-
-⚡ PROTOCOLO PSMF ACTUALIZADO {'(APLICABLE)' if plan_psmf_disponible else '(NO APLICABLE)'}:"""
+# Proyección científica para el email (la misma que se muestra en pantalla)
+try:
+    proyeccion_email = resumen_evaluacion['proyeccion']
+    bloque_proyeccion = Fragmento(PLANTILLA_PROYECCION, {
+        "porcentaje_proyeccion": resumen_evaluacion['porcentaje_proyeccion'],
+        "objetivo_texto": resumen_evaluacion['objetivo_texto'],
+        "semanal_pct_min": proyeccion_email['rango_semanal_pct'][0],
+        "semanal_pct_max": proyeccion_email['rango_semanal_pct'][1],
+        "semanal_kg_min": proyeccion_email['rango_semanal_kg'][0],
+        "semanal_kg_max": proyeccion_email['rango_semanal_kg'][1],
+        "total_6sem_kg_min": proyeccion_email['rango_total_6sem_kg'][0],
+        "total_6sem_kg_max": proyeccion_email['rango_total_6sem_kg'][1],
+        "peso": peso,
+        "peso_proyectado_min": peso + proyeccion_email['rango_total_6sem_kg'][0],
+        "peso_proyectado_max": peso + proyeccion_email['rango_total_6sem_kg'][1],
+        "explicacion": proyeccion_email['explicacion_textual'],
+    })
+except:
+    bloque_proyeccion = "- Error en cálculo de proyección. Usar valores por defecto.\n"
 
 if plan_psmf_disponible:
-    tabla_resumen += f"""
-- Calorías: {psmf_recs['calorias_dia']:.0f} kcal/día
-- Criterio de aplicabilidad: {psmf_recs.get('criterio', 'No especificado')}
-- Proteína: {psmf_recs['proteina_g_dia']:.1f}g/día (1.8g/kg peso mínimo)
-- Multiplicador calórico: {psmf_recs.get('multiplicador', 8.3)} (perfil: {psmf_recs.get('perfil_grasa', 'alto % grasa')})
-- Grasas: 30-50g/día (fuentes magras: pescado, aceite oliva mínimo)
-- Carbohidratos: Solo de vegetales fibrosos ({(psmf_recs['calorias_dia'] - psmf_recs['proteina_g_dia']*4 - 40*9)/4 if psmf_recs.get('calorias_dia', 0) > 0 else 0:.1f}g estimados)
-- Déficit estimado: ~{int((1 - psmf_recs['calorias_dia']/(GE if 'GE' in locals() else 2000)) * 100) if psmf_recs.get('calorias_dia', 0) > 0 else 0}%
-- Pérdida esperada: {psmf_recs.get('perdida_semanal_kg', (0.6, 1.0))[0]}-{psmf_recs.get('perdida_semanal_kg', (0.6, 1.0))[1]} kg/semana
-- Sostenibilidad: BAJA - Máximo 6-8 semanas
-- Duración recomendada: 6-8 semanas con supervisión médica obligatoria
-- Suplementación necesaria: Multivitamínico, omega-3, electrolitos, magnesio
-- Monitoreo requerido: Análisis de sangre regulares"""
+    bloque_psmf = Fragmento(PLANTILLA_PSMF, {
+        "calorias_dia": psmf_recs['calorias_dia'],
+        "criterio": psmf_recs.get('criterio', 'No especificado'),
+        "proteina_g_dia": psmf_recs['proteina_g_dia'],
+        "multiplicador": psmf_recs.get('multiplicador', 8.3),
+        "perfil_grasa": psmf_recs.get('perfil_grasa', 'alto % grasa'),
+        "carbos_estimados": (psmf_recs['calorias_dia'] - psmf_recs['proteina_g_dia']*4 - 40*9)/4 if psmf_recs.get('calorias_dia', 0) > 0 else 0,
+        "deficit_pct": int((1 - psmf_recs['calorias_dia']/(GE if 'GE' in locals() else 2000)) * 100) if psmf_recs.get('calorias_dia', 0) > 0 else 0,
+        "perdida_min": psmf_recs.get('perdida_semanal_kg', (0.6, 1.0))[0],
+        "perdida_max": psmf_recs.get('perdida_semanal_kg', (0.6, 1.0))[1],
+    })
 else:
-    tabla_resumen += f"""
-- RAZÓN DE NO APLICABILIDAD: % grasa no cumple criterios mínimos
-- Criterio hombres: >18% grasa corporal (actual: {grasa_corregida:.1f}%)
-- Criterio mujeres: >23% grasa corporal (actual: {grasa_corregida:.1f}%)
-- RECOMENDACIÓN: Usar plan tradicional hasta alcanzar % grasa objetivo"""
-
-tabla_resumen += f"""
-
-📋 ANÁLISIS COMPARATIVO DE ESTRATEGIAS:
-- TRADICIONAL vs PSMF: {'Ambos aplicables - Usuario puede elegir' if plan_psmf_disponible else 'Solo tradicional aplicable'}
-- Velocidad de resultados: {'PSMF 2-3x más rápido' if plan_psmf_disponible else 'Tradicional = velocidad moderada sostenible'}
-- Riesgo de pérdida muscular: {'PSMF = mayor riesgo' if plan_psmf_disponible else 'Tradicional = riesgo mínimo'}
-- Facilidad de adherencia: {'Tradicional >> PSMF' if plan_psmf_disponible else 'Tradicional = alta adherencia'}
-- Impacto en rendimiento: {'PSMF = reducción significativa' if plan_psmf_disponible else 'Tradicional = impacto mínimo'}
-
-=====================================
-PREFERENCIAS Y HÁBITOS ADICIONALES
-=====================================
-🍽️ INFORMACIÓN NUTRICIONAL ADICIONAL:
-- Método medición grasa: {metodo_grasa} → Ajuste DEXA: {grasa_corregida - grasa_corporal:+.1f}%
-- Edad metabólica calculada: {edad_metabolica} años (vs cronológica: {edad} años)
-- Categoría de grasa corporal: {
-    "Muy bajo (Competición)" if (sexo == "Hombre" and grasa_corregida < 6) or (sexo == "Mujer" and grasa_corregida < 12)
-    else "Atlético" if (sexo == "Hombre" and grasa_corregida < 12) or (sexo == "Mujer" and grasa_corregida < 17)
-    else "Fitness" if (sexo == "Hombre" and grasa_corregida < 18) or (sexo == "Mujer" and grasa_corregida < 23)
-    else "Promedio" if (sexo == "Hombre" and grasa_corregida < 25) or (sexo == "Mujer" and grasa_corregida < 30)
-    else "Alto"
+    bloque_psmf = Fragmento(PLANTILLA_SIN_PSMF, {"grasa_corregida": grasa_corregida})
+
+en_rango_grasa = en_rango_saludable if 'en_rango_saludable' in locals() else True
+datos_resumen = {
+    "generado": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    "nombre": nombre,
+    "edad": edad,
+    "sexo": sexo,
+    "telefono": telefono,
+    "email_cliente": email_cliente,
+    "fecha_llenado": fecha_llenado,
+    "peso": peso,
+    "estatura": estatura,
+    "imc": resumen_evaluacion['imc'],
+    "metodo_grasa": metodo_grasa,
+    "grasa_corporal": grasa_corporal,
+    "grasa_corregida": grasa_corregida,
+    "mlg": mlg,
+    "masa_grasa": peso - mlg,
+    "tmb": tmb,
+    "ffmi": ffmi,
+    "nivel_ffmi": nivel_ffmi,
+    "ffmi_genetico_max": ffmi_genetico_max,
+    "porc_potencial": porc_potencial,
+    "margen_ffmi": max(0, ffmi_genetico_max - ffmi),
+    "nivel_actividad_text": nivel_actividad_text,
+    "geaf": geaf,
+    "eta": eta,
+    "dias_fuerza": dias_fuerza,
+    "kcal_sesion": kcal_sesion,
+    "gee_prom_dia": gee_prom_dia,
+    "GE": GE,
+    "fase": fase,
+    "fbeo": fbeo,
+    "ingesta_calorica": ingesta_calorica,
+    "kcal_por_kg": resumen_evaluacion['kcal_por_kg'],
+    "proteina_g": proteina_g,
+    "proteina_kcal": resumen_evaluacion['proteina_kcal'],
+    "proteina_pct": resumen_evaluacion['proteina_pct'],
+    "grasa_g": grasa_g,
+    "grasa_kcal": resumen_evaluacion['grasa_kcal'],
+    "grasa_pct": resumen_evaluacion['grasa_pct'],
+    "carbo_g": carbo_g,
+    "carbo_kcal": resumen_evaluacion['carbo_kcal'],
+    "carbo_pct": resumen_evaluacion['carbo_pct'],
+    "categoria_grasa": resumen_evaluacion['categoria_grasa'],
+    "nivel_entrenamiento_resumen": resumen_evaluacion['nivel_entrenamiento'],
+    "bloque_proyeccion": bloque_proyeccion,
+    "experiencia_text": experiencia_text,
+    "experiencia_corta": experiencia_text[:50],
+    "ejercicios_detalle": ejercicios_detalle,
+    "puntos_ffmi": puntos_ffmi if 'puntos_ffmi' in locals() else 0,
+    "puntos_funcional": puntos_funcional if 'puntos_funcional' in locals() else 0,
+    "puntos_exp": puntos_exp if 'puntos_exp' in locals() else 0,
+    "ponderacion": '40% FFMI + 40% Funcional + 20% Experiencia (rango saludable)' if en_rango_grasa else '0% FFMI + 80% Funcional + 20% Experiencia (fuera de rango saludable)',
+    "rango_grasa": 'En rango saludable' if en_rango_grasa else f'Fuera de rango saludable (>{25 if sexo == "Hombre" else 32}%)',
+    "nivel_entrenamiento": nivel_entrenamiento if 'nivel_entrenamiento' in locals() else 'intermedio',
+    "puntaje_total": puntaje_total if 'puntaje_total' in locals() else 0,
+    "nivel_actividad": nivel_actividad if 'nivel_actividad' in locals() and nivel_actividad else 'No especificado',
+    "impacto_geaf": (geaf-1)*100 if 'geaf' in locals() else 0,
+    "eta_desc": eta_desc if 'eta_desc' in locals() else 'ETA estándar',
+    "dias_fuerza_text": dias_fuerza_text,
+    "kcal_sesion_text": kcal_sesion_text,
+    "gee_semanal": gee_semanal if 'gee_semanal' in locals() else 0,
+    "plan_tradicional_calorias": plan_tradicional_calorias,
+    "proteina_tradicional": peso * 1.8 if 'peso' in locals() and peso > 0 else 0,
+    "grasa_tradicional": tmb * 0.40 / 9 if 'tmb' in locals() else 0,
+    "psmf_aplicable": '(APLICABLE)' if plan_psmf_disponible else '(NO APLICABLE)',
+    "bloque_psmf": bloque_psmf,
+    "comparativa_planes": 'Ambos aplicables - Usuario puede elegir' if plan_psmf_disponible else 'Solo tradicional aplicable',
+    "comparativa_velocidad": 'PSMF 2-3x más rápido' if plan_psmf_disponible else 'Tradicional = velocidad moderada sostenible',
+    "comparativa_riesgo": 'PSMF = mayor riesgo' if plan_psmf_disponible else 'Tradicional = riesgo mínimo',
+    "comparativa_adherencia": 'Tradicional >> PSMF' if plan_psmf_disponible else 'Tradicional = alta adherencia',
+    "comparativa_rendimiento": 'PSMF = reducción significativa' if plan_psmf_disponible else 'Tradicional = impacto mínimo',
+    "ajuste_dexa": grasa_corregida - grasa_corporal,
+    "edad_metabolica": edad_metabolica,
+    "nota_suplementos_psmf": '- ADICIONAL PARA PSMF: Electrolitos, magnesio, complejo B' if plan_psmf_disponible else '',
+    "nota_supervision_psmf": '- CRÍTICO PARA PSMF: Supervisión médica OBLIGATORIA con análisis de sangre regulares' if plan_psmf_disponible else '',
+    "hidratacion_ml": peso * 35 if 'peso' in locals() and peso > 0 else 2450,
+    "enfoque_principal": 'Pérdida de grasa manteniendo músculo' if porcentaje < 0 else 'Ganancia muscular controlada' if porcentaje > 0 else 'Recomposición corporal',
+}
+tabla_resumen = PLANTILLA_RESUMEN.texto(datos_resumen)
+
+# Mismas cifras en formato estructurado (JSON + CSV adjuntos al email) para administración
+proyeccion_datos = resumen_evaluacion.get('proyeccion') or {}
+rango_semanal_kg = proyeccion_datos.get('rango_semanal_kg') or (None, None)
+rango_6sem_kg = proyeccion_datos.get('rango_total_6sem_kg') or (None, None)
+datos_estructurados = {
+    "nombre": nombre,
+    "email": email_cliente,
+    "telefono": telefono,
+    "edad": edad,
+    "sexo": sexo,
+    "fecha_evaluacion": fecha_llenado,
+    "peso_kg": peso,
+    "estatura_cm": estatura,
+    "imc": resumen_evaluacion['imc'],
+    "metodo_grasa": metodo_grasa,
+    "grasa_medida_pct": grasa_corporal,
+    "grasa_corregida_pct": grasa_corregida,
+    "mlg_kg": mlg,
+    "masa_grasa_kg": peso - mlg,
+    "categoria_grasa": resumen_evaluacion['categoria_grasa'],
+    "tmb_kcal": tmb,
+    "ffmi": ffmi,
+    "nivel_ffmi": nivel_ffmi,
+    "ffmi_max_estimado": ffmi_genetico_max,
+    "potencial_pct": porc_potencial,
+    "edad_metabolica": edad_metabolica,
+    "nivel_actividad": nivel_actividad_text,
+    "geaf": geaf,
+    "eta": eta,
+    "dias_fuerza": dias_fuerza_text,
+    "kcal_sesion": kcal_sesion_text,
+    "gee_promedio_kcal": gee_prom_dia,
+    "gasto_total_kcal": GE,
+    "nivel_entrenamiento": resumen_evaluacion['nivel_entrenamiento'],
+    "fase": fase,
+    "plan_elegido": resumen_evaluacion['plan_elegido'],
+    "psmf_aplicable": plan_psmf_disponible,
+    "es_psmf": resumen_evaluacion['es_psmf'],
+    "ingesta_kcal": ingesta_calorica,
+    "kcal_por_kg": resumen_evaluacion['kcal_por_kg'],
+    "proteina_g": proteina_g,
+    "proteina_pct": resumen_evaluacion['proteina_pct'],
+    "grasa_g": grasa_g,
+    "grasa_pct": resumen_evaluacion['grasa_pct'],
+    "carbo_g": carbo_g,
+    "carbo_pct": resumen_evaluacion['carbo_pct'],
+    "proyeccion_pct": resumen_evaluacion['porcentaje_proyeccion'],
+    "cambio_semanal_kg_min": rango_semanal_kg[0],
+    "cambio_semanal_kg_max": rango_semanal_kg[1],
+    "cambio_6sem_kg_min": rango_6sem_kg[0],
+    "cambio_6sem_kg_max": rango_6sem_kg[1],
 }
 
-💊 SUPLEMENTACIÓN RECOMENDADA:
-- Creatina monohidrato: 5g/día (mejora rendimiento y recuperación)
-- Vitamina D3: 2000-4000 UI/día (optimización hormonal)
-- Omega-3 (EPA+DHA): 2-3g/día (antiinflamatorio y salud cardiovascular)
-- Multivitamínico: 1/día (seguro nutricional)
-{'- ADICIONAL PARA PSMF: Electrolitos, magnesio, complejo B' if plan_psmf_disponible else ''}
-
-=====================================
-NOTAS, ADVERTENCIAS Y RECOMENDACIONES
-=====================================
-⚠️ ADVERTENCIAS IMPORTANTES:
-- Este análisis es una herramienta de apoyo, NO sustituye supervisión profesional
-- Los cálculos están basados en ecuaciones científicas validadas pero la respuesta individual varía
-- Se recomienda evaluación médica antes de iniciar cualquier plan nutricional restrictivo
-{'- CRÍTICO PARA PSMF: Supervisión médica OBLIGATORIA con análisis de sangre regulares' if plan_psmf_disponible else ''}
-- Hidratación mínima: {peso * 35 if 'peso' in locals() and peso > 0 else 2450:.0f}ml/día (35ml/kg peso)
-
-🎯 RECOMENDACIONES ESPECÍFICAS:
-- Reevaluación recomendada: Cada 2-3 semanas para ajustes
-- Enfoque principal: {'Pérdida de grasa manteniendo músculo' if porcentaje < 0 else 'Ganancia muscular controlada' if porcentaje > 0 else 'Recomposición corporal'}
-- Timing de nutrientes: Proteína en cada comida, carbohidratos pre/post entreno
-- Descanso óptimo: 7-9 horas/noche para maximizar resultados
-- Gestión del estrés: Técnicas de relajación y mindfulness recomendadas
-
-📈 MÉTRICAS DE SEGUIMIENTO SUGERIDAS:
-- Peso corporal: Diario (misma hora, condiciones)
-- Medidas corporales: Semanal (cintura, cadera, brazos)
-- Fotos progreso: Bisemanal (misma iluminación y pose)
-- Rendimiento en ejercicios: Cada sesión (seguimiento de cargas/repeticiones)
-- Energía y bienestar: Diario (escala 1-10)
-
-⚠️ IMPORTANTE - NATURALEZA DE LAS ESTIMACIONES:
-Estas son estimaciones basadas en modelos científicos. El cuerpo humano 
-es un sistema complejo, no lineal y dinámico. Los resultados reales 
-dependerán de múltiples factores como:
-
-- Adherencia estricta al plan nutricional y de entrenamiento
-- Calidad del sueño y gestión del estrés  
-- Respuesta individual y adaptaciones metabólicas
-- Factores hormonales y genéticos
-- Variaciones en la actividad diaria no planificada
-
-RECOMENDACIÓN: Utiliza estas proyecciones como guía inicial y ajusta 
-según tu progreso real. Se recomienda evaluación periódica cada 2-3 
-semanas para optimizar resultados.
-
-"""
+# Guardar entradas y resultados en el almacén local (solo cuando cambian entre reruns)
+if st.session_state.datos_completos and peso > 0:
+    persistir_evaluacion("evaluacion_fitness", datos_estructurados)
 
+cronometro.marcar("proyeccion")
 # ==================== RESUMEN PERSONALIZADO ====================
 # Solo mostrar si los datos están completos para la evaluación
 if st.session_state.datos_completos and 'peso' in locals() and peso > 0:
@@ -2532,70 +2557,13 @@ if st.session_state.datos_completos and 'peso' in locals() and peso > 0:
     </div>
     """, unsafe_allow_html=True)
     
-    # Categorizar grasa corporal
-    if sexo == "Hombre":
-        if grasa_corregida < 6:
-            categoria_grasa = "Muy bajo (Competición)"
-            color_categoria = "#E74C3C"
-        elif grasa_corregida < 12:
-            categoria_grasa = "Atlético"
-            color_categoria = "#27AE60"
-        elif grasa_corregida < 18:
-            categoria_grasa = "Fitness"
-            color_categoria = "#F39C12"
-        elif grasa_corregida < 25:
-            categoria_grasa = "Promedio"
-            color_categoria = "#3498DB"
-        else:
-            categoria_grasa = "Alto"
-            color_categoria = "#E74C3C"
-    else:  # Mujer
-        if grasa_corregida < 12:
-            categoria_grasa = "Muy bajo (Competición)"
-            color_categoria = "#E74C3C"
-        elif grasa_corregida < 17:
-            categoria_grasa = "Atlético"
-            color_categoria = "#27AE60"
-        elif grasa_corregida < 23:
-            categoria_grasa = "Fitness"
-            color_categoria = "#F39C12"
-        elif grasa_corregida < 30:
-            categoria_grasa = "Promedio"
-            color_categoria = "#3498DB"
-        else:
-            categoria_grasa = "Alto"
-            color_categoria = "#E74C3C"
-    
-    # Usar proyección científica realista
-    peso_actual = peso if peso > 0 else 70  # Fallback si no hay peso
-    
-    # Determinar el porcentaje correcto según el plan elegido usando función centralizada
-    porcentaje_for_projection = obtener_porcentaje_para_proyeccion(
-        plan_elegido if 'plan_elegido' in locals() else "",
-        psmf_recs if 'psmf_recs' in locals() else {},
-        GE if 'GE' in locals() else 0,
-        porcentaje if 'porcentaje' in locals() else 0
-    )
-    
-    # Calcular proyección científica
-    proyeccion = calcular_proyeccion_cientifica(
-        sexo, 
-        grasa_corregida, 
-        nivel_entrenamiento if 'nivel_entrenamiento' in locals() else 'intermedio',
-        peso_actual, 
-        porcentaje_for_projection
-    )
-    
-    # Determinar tipo de cambio y dirección
-    if porcentaje_for_projection < 0:  # Déficit (pérdida) - valor negativo
-        tipo_cambio = "pérdida"
-        direccion = "-"
-    elif porcentaje_for_projection > 0:  # Superávit (ganancia) - valor positivo
-        tipo_cambio = "ganancia"
-        direccion = "+"
-    else:  # Mantenimiento
-        tipo_cambio = "mantenimiento"
-        direccion = ""
+    # Categoría, proyección y dirección del cambio vienen del resumen único
+    categoria_grasa = resumen_evaluacion['categoria_grasa']
+    color_categoria = resumen_evaluacion['color_categoria']
+    peso_actual = resumen_evaluacion['peso_proyeccion']
+    proyeccion = resumen_evaluacion['proyeccion']
+    tipo_cambio = resumen_evaluacion['tipo_cambio']
+    direccion = resumen_evaluacion['direccion']
     
     # Usar el rango medio para la proyección visual
     cambio_semanal_medio = (proyeccion['rango_semanal_kg'][0] + proyeccion['rango_semanal_kg'][1]) / 2
@@ -2615,7 +2583,7 @@ if st.session_state.datos_completos and 'peso' in locals() and peso > 0:
             </div>
             <div style="margin-bottom: 1rem;">
                 <strong style="color: #CCCCCC;">Nivel de Entrenamiento:</strong><br>
-                <span style="color: var(--mupai-yellow); font-weight: bold;">{nivel_entrenamiento.capitalize() if 'nivel_entrenamiento' in locals() else 'Intermedio'}</span>
+                <span style="color: var(--mupai-yellow); font-weight: bold;">{resumen_evaluacion['nivel_entrenamiento'].capitalize()}</span>
             </div>
             <div style="margin-bottom: 1rem;">
                 <strong style="color: #CCCCCC;">Objetivo Recomendado:</strong><br>
@@ -2681,6 +2649,16 @@ if st.session_state.datos_completos and 'peso' in locals() and peso > 0:
     </div>
     """, unsafe_allow_html=True)
 
+    # Progreso contra las evaluaciones anteriores del cliente (lee solo su resumen precalculado)
+    mostrar_progreso_cliente(email_cliente, telefono, st.session_state.get("id_almacen_evaluacion_fitness"))
+
+    # Menús de ejemplo con los alimentos del cuestionario de patrones alimentarios, si ya lo respondió:
+    # solo para el cliente registrado y guardado en esta sesión (no lo que esté tecleado ahora)
+    if st.session_state.get("id_almacen_evaluacion_fitness"):
+        mostrar_menus_cliente(st.session_state.email_cliente, st.session_state.telefono,
+                              proteina_g, grasa_g, carbo_g)
+
+cronometro.marcar("envio_email")
 # --- Botón para enviar email (solo si no se ha enviado y todo completo) ---
 if not st.session_state.get("correo_enviado", False):
     if st.button("📧 Enviar Resumen por Email", key="enviar_email"):
@@ -2689,28 +2667,41 @@ if not st.session_state.get("correo_enviado", False):
             st.error(f"❌ No se puede enviar el email. Faltan: {', '.join(faltantes)}")
         else:
             with st.spinner("📧 Enviando resumen por email..."):
-                ok = enviar_email_resumen(tabla_resumen, nombre, email_cliente, fecha_llenado, edad, telefono)
-                if ok:
+                email_id = enviar_email_resumen(tabla_resumen, nombre, email_cliente, fecha_llenado, edad, telefono,
+                                                datos=datos_estructurados,
+                                                html=PLANTILLA_RESUMEN.html(datos_resumen))
+                if email_id:
+                    if email_id == st.session_state.get("email_id"):
+                        st.info("ℹ️ El resumen no cambió desde el último envío, así que no se volvió a enviar.")
                     st.session_state["correo_enviado"] = True
-                    st.success("✅ Email enviado exitosamente a administración")
+                    st.session_state["email_id"] = email_id
                 else:
-                    st.error("❌ Error al enviar email. Contacta a soporte técnico.")
+                    st.error("❌ Error al preparar el email. Contacta a soporte técnico.")
 else:
     st.info("✅ El resumen ya fue enviado por email. Si requieres reenviarlo, refresca la página o usa el botón de 'Reenviar Email'.")
 
 # --- Opción para reenviar manualmente (opcional) ---
+forzar_reenvio = st.checkbox("Forzar reenvío aunque el resumen no haya cambiado", key="forzar_reenvio")
 if st.button("📧 Reenviar Email", key="reenviar_email"):
     faltantes = datos_completos_para_email()
     if faltantes:
         st.error(f"❌ No se puede reenviar el email. Faltan: {', '.join(faltantes)}")
     else:
         with st.spinner("📧 Reenviando resumen por email..."):
-            ok = enviar_email_resumen(tabla_resumen, nombre, email_cliente, fecha_llenado, edad, telefono)
-            if ok:
+            email_id = enviar_email_resumen(tabla_resumen, nombre, email_cliente, fecha_llenado, edad, telefono,
+                                            forzar=forzar_reenvio, datos=datos_estructurados,
+                                            html=PLANTILLA_RESUMEN.html(datos_resumen))
+            if email_id:
+                if email_id == st.session_state.get("email_id"):
+                    st.info("ℹ️ El resumen no cambió desde el último envío, así que no se volvió a enviar.")
                 st.session_state["correo_enviado"] = True
-                st.success("✅ Email reenviado exitosamente a administración")
+                st.session_state["email_id"] = email_id
             else:
-                st.error("❌ Error al reenviar email. Contacta a soporte técnico.")
+                st.error("❌ Error al preparar el email. Contacta a soporte técnico.")
+
+# Estado de entrega del último email (se actualiza solo mientras sigue en cola)
+if st.session_state.get("email_id"):
+    mostrar_estado_envio(st.session_state["email_id"])
 
 # --- Limpieza de sesión y botón de nueva evaluación ---
 if st.button("🔄 Nueva Evaluación", key="nueva"):
@@ -2718,6 +2709,7 @@ if st.button("🔄 Nueva Evaluación", key="nueva"):
         del st.session_state[key]
     st.rerun()
 
+cronometro.marcar("pie")
 # Footer moderno
 st.markdown("""
 <div class="footer-mupai">
@@ -2729,3 +2721,11 @@ st.markdown("""
     <a href="https://muscleupgym.fitness" target="_blank">muscleupgym.fitness</a>
 </div>
 """, unsafe_allow_html=True)
+
+cronometro.terminar()
+mostrar_acceso_administrador()
+mostrar_panel_latencias()
+mostrar_panel_payload()
+mostrar_panel_buzon()
+mostrar_panel_archivo()
+mostrar_panel_almacen()
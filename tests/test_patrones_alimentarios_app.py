@@ -0,0 +1,77 @@
+"""
+Pruebas de la app de patrones alimentarios con el AppTest de Streamlit.
+
+Corren la app real en el proceso, con el almacén en una carpeta temporal:
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+# Antes de importar cualquier módulo mupai_*: la app y el almacén leen la carpeta al importarse
+os.environ["MUPAI_DATOS"] = tempfile.mkdtemp(prefix="mupai_pruebas_")
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from mupai_almacen import ALMACEN  # noqa: E402
+from mupai_config import ADMIN_PASSWORD  # noqa: E402
+
+APP = os.path.join(RAIZ, "patrones_alimentarios_app.py")
+EMAIL = "cliente.prueba@ejemplo.com"
+TELEFONO = "8661234567"
+
+
+def _boton(at, texto):
+    return next(boton for boton in at.button if texto in boton.label)
+
+
+def _iniciar_sesion():
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.text_input(key="password_input").input(ADMIN_PASSWORD)
+    _boton(at, "Acceder").click().run()
+    return at
+
+
+def _comenzar(at):
+    campos = {campo.label: campo for campo in at.text_input}
+    campos["Nombre completo*"].input("Cliente De Prueba")
+    campos["Teléfono*"].input(TELEFONO)
+    campos["Email*"].input(EMAIL)
+    at.checkbox[0].check().run()
+    _boton(at, "COMENZAR").click().run()
+
+
+def _cambiar_paso(at, texto):
+    # El clic cambia de paso en ese rerun; el paso nuevo se dibuja en el siguiente
+    _boton(at, texto).click().run()
+    at.run()
+
+
+def test_reanudar_restaura_las_respuestas_de_pasos_anteriores():
+    at = _iniciar_sesion()
+    _comenzar(at)
+    at.multiselect(key="huevos_embutidos").select("Huevo entero").run()
+    _cambiar_paso(at, "Siguiente")
+    pollo = at.multiselect(key="carnes_pollo_magras").options[0]
+    at.multiselect(key="carnes_pollo_magras").select(pollo).run()
+    _cambiar_paso(at, "Siguiente")
+    assert at.session_state.current_step == 3
+    assert not at.exception
+    ALMACEN.esperar()
+
+    # Sesión nueva: reanudar con email y teléfono
+    at = _iniciar_sesion()
+    at.text_input(key="email_reanudar").input(EMAIL)
+    at.text_input(key="telefono_reanudar").input(TELEFONO).run()
+    _boton(at, "Continuar mi evaluación").click().run()
+    assert not at.exception
+    assert at.session_state.current_step == 3
+
+    # Los pasos anteriores se muestran con lo ya elegido, sin volver a capturarlo
+    _cambiar_paso(at, "Anterior")
+    assert at.multiselect(key="carnes_pollo_magras").value == [pollo]
+    _cambiar_paso(at, "Anterior")
+    assert at.multiselect(key="huevos_embutidos").value == ["Huevo entero"]